@@ -0,0 +1,292 @@
+"""
+User administration on top of Firebase Auth and the Realtime Database.
+
+``UserDirectory`` wraps the ``firebase_admin.auth`` and ``firebase_admin.db``
+modules (or the in-memory stand-ins from memory_firebase.py):
+
+- ``list_users`` pages through ``auth.list_users`` with an opaque cursor that
+  wraps the Firebase page token, so no account is dropped past the first
+  1000. Search (email, name or uid substring) and role filters are applied on
+  the server; a filtered page scans Firebase pages until it has ``limit`` matches
+  and its cursor remembers where inside a Firebase page it stopped.
+- Firebase pages are cached for ``ttl_seconds``; every write through the
+  directory drops the cache.
+- Bulk import, update and delete use ``auth.import_users`` /
+  ``auth.delete_users`` in chunks of 1000 and write the matching ``users/``
+  profiles with multi-path RTDB updates instead of one round trip per user.
+"""
+
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+AUTH_BATCH   = 1000     # import_users / delete_users limit per call
+DB_BATCH     = 500      # paths per multi-path RTDB update
+SCAN_PAGE    = 1000     # Firebase page size while filtering
+AUTH_WORKERS = 8        # concurrent per-user auth calls in bulk updates
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(page_token: Optional[str], skip: int = 0) -> str:
+    raw = json.dumps([page_token, skip], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> tuple[Optional[str], int]:
+    if not cursor:
+        return None, 0
+    try:
+        token, skip = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if (token is not None and not isinstance(token, str)) or not isinstance(skip, int) or skip < 0:
+            raise ValueError
+        return token, skip
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from exc
+
+
+def user_dict(u) -> dict:
+    claims = u.custom_claims or {}
+    return {
+        "uid":           u.uid,
+        "email":         u.email,
+        "display_name":  u.display_name,
+        "disabled":      u.disabled,
+        "role":          claims.get("role", "user"),
+        "custom_claims": u.custom_claims,
+        "created_at":    getattr(getattr(u, "user_metadata", None), "creation_timestamp", None),
+    }
+
+
+def _matches(user: dict, search: Optional[str], role: Optional[str]) -> bool:
+    if role and user["role"] != role:
+        return False
+    if search:
+        return any(search in (user[k] or "").lower() for k in ("email", "display_name", "uid"))
+    return True
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield i, items[i:i + size]
+
+
+class UserDirectory:
+    def __init__(self, auth, db, ttl_seconds: float = 30.0, max_pages: int = 128):
+        self.auth        = auth
+        self.db          = db
+        self.ttl_seconds = ttl_seconds
+        self.max_pages   = max_pages
+
+        self._pages: OrderedDict = OrderedDict()   # (token, size) -> (expires_at, users, next_token)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits          = 0
+        self.misses        = 0
+        self.invalidations = 0
+
+    # ── Cache ────────────────────────────────────────────────────────────────
+    def invalidate(self):
+        with self._lock:
+            self._pages.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def _page(self, token: Optional[str], size: int) -> tuple[list[dict], Optional[str]]:
+        key = (token, size)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry and entry[0] > now:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            generation = self._generation
+
+        page  = self.auth.list_users(page_token=token, max_results=size)
+        users = [user_dict(u) for u in page.users]
+        nxt   = page.next_page_token or None
+
+        with self._lock:
+            # A write that landed while we were fetching makes this page stale
+            if self.ttl_seconds > 0 and generation == self._generation:
+                self._pages[key] = (now + self.ttl_seconds, users, nxt)
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return users, nxt
+
+    def stats(self) -> dict:
+        return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses,
+                "invalidations": self.invalidations, "ttl_seconds": self.ttl_seconds}
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+    def list_users(self, cursor: Optional[str] = None, limit: int = 100,
+                   search: Optional[str] = None, role: Optional[str] = None) -> dict:
+        """One page of users: ``{"users": [...], "next_cursor": str | None}``."""
+        token, skip = decode_cursor(cursor)
+        search = (search or "").strip().lower() or None
+
+        if not search and not role:
+            # Unfiltered pages map one-to-one onto Firebase pages
+            users, nxt = self._page(token, limit)
+            users = users[skip:]
+            return {"users": users, "next_cursor": encode_cursor(nxt) if nxt else None}
+
+        found = []
+        while True:
+            users, nxt = self._page(token, SCAN_PAGE)
+            for i in range(skip, len(users)):
+                if _matches(users[i], search, role):
+                    found.append(users[i])
+                    if len(found) == limit:
+                        if i + 1 < len(users):
+                            return {"users": found, "next_cursor": encode_cursor(token, i + 1)}
+                        return {"users": found, "next_cursor": encode_cursor(nxt) if nxt else None}
+            if not nxt:
+                return {"users": found, "next_cursor": None}
+            token, skip = nxt, 0
+
+    # ── Single-user writes ───────────────────────────────────────────────────
+    def create(self, email: str, password: str, display_name: str, role: Optional[str]) -> str:
+        try:
+            u = self.auth.create_user(email=email, password=password, display_name=display_name)
+            self.auth.set_custom_user_claims(u.uid, {"role": role})
+            self.db.reference(f"users/{u.uid}").set(
+                {
+                    "name":      display_name,
+                    "email":     email,
+                    "role":      role,
+                    "createdAt": getattr(u.user_metadata, "creation_timestamp", None),
+                }
+            )
+            return u.uid
+        finally:
+            self.invalidate()
+
+    def update(self, uid: str, display_name: Optional[str] = None, role: Optional[str] = None,
+               disabled: Optional[bool] = None):
+        try:
+            profile = self._apply_auth_update(uid, display_name, role, disabled)
+            if profile:
+                self.db.reference(f"users/{uid}").update(profile)
+        finally:
+            self.invalidate()
+
+    def delete(self, uid: str):
+        try:
+            self.auth.delete_user(uid)
+            self.db.reference(f"users/{uid}").delete()
+        finally:
+            self.invalidate()
+
+    def _apply_auth_update(self, uid, display_name, role, disabled) -> dict:
+        """Auth side of an update; returns the RTDB profile fields to change."""
+        updates = {}
+        if display_name:
+            updates["display_name"] = display_name
+        if disabled is not None:
+            updates["disabled"] = disabled
+        if updates:
+            self.auth.update_user(uid, **updates)
+        profile = {}
+        if role:
+            self.auth.set_custom_user_claims(uid, {"role": role})
+            profile["role"] = role
+        if display_name:
+            profile["name"] = display_name
+        return profile
+
+    # ── Bulk writes ──────────────────────────────────────────────────────────
+    def _write_profiles(self, paths: dict):
+        items = list(paths.items())
+        for _, chunk in _chunks(items, DB_BATCH):
+            self.db.reference("/").update(dict(chunk))
+
+    def import_users(self, users: list[dict]) -> dict:
+        """
+        Create accounts with ``auth.import_users``. Each entry has ``email``,
+        ``display_name`` and optionally ``uid``, ``role`` and ``disabled``.
+        Imported accounts have no password; users set one through the
+        password-reset flow.
+        """
+        failed, profiles = [], {}
+        now_ms = int(time.time() * 1000)
+        try:
+            for offset, chunk in _chunks(users, AUTH_BATCH):
+                records = []
+                for u in chunk:
+                    u.setdefault("uid", uuid.uuid4().hex)
+                    records.append(self.auth.ImportUserRecord(
+                        uid=u["uid"], email=u["email"], display_name=u.get("display_name"),
+                        disabled=bool(u.get("disabled")), custom_claims={"role": u.get("role") or "user"},
+                    ))
+                result = self.auth.import_users(records)
+                bad = {e.index: e.reason for e in result.errors}
+                for i, u in enumerate(chunk):
+                    if i in bad:
+                        failed.append({"index": offset + i, "email": u["email"], "error": bad[i]})
+                        continue
+                    profiles[f"users/{u['uid']}"] = {
+                        "name":      u.get("display_name"),
+                        "email":     u["email"],
+                        "role":      u.get("role") or "user",
+                        "createdAt": now_ms,
+                    }
+            self._write_profiles(profiles)
+        finally:
+            self.invalidate()
+        return {"imported": len(profiles), "failed": failed,
+                "uids": [p.split("/", 1)[1] for p in profiles]}
+
+    def update_users(self, updates: list[dict]) -> dict:
+        """
+        Apply ``{"uid", "display_name"?, "role"?, "disabled"?}`` updates. Auth has
+        no batch update, so those calls run on a small thread pool; the RTDB
+        profile changes go out as multi-path updates.
+        """
+        def apply(u):
+            try:
+                return u["uid"], self._apply_auth_update(
+                    u["uid"], u.get("display_name"), u.get("role"), u.get("disabled")), None
+            except Exception as exc:
+                return u["uid"], None, str(exc)
+
+        failed, paths, updated = [], {}, 0
+        try:
+            with ThreadPoolExecutor(max_workers=min(AUTH_WORKERS, max(1, len(updates)))) as pool:
+                for index, (uid, profile, error) in enumerate(pool.map(apply, updates)):
+                    if error is not None:
+                        failed.append({"index": index, "uid": uid, "error": error})
+                        continue
+                    updated += 1
+                    for field, value in profile.items():
+                        paths[f"users/{uid}/{field}"] = value
+            self._write_profiles(paths)
+        finally:
+            self.invalidate()
+        return {"updated": updated, "failed": failed}
+
+    def delete_users(self, uids: list[str]) -> dict:
+        failed, paths = [], {}
+        try:
+            for offset, chunk in _chunks(uids, AUTH_BATCH):
+                result = self.auth.delete_users(chunk)
+                bad = {e.index: e.reason for e in result.errors}
+                for i, uid in enumerate(chunk):
+                    if i in bad:
+                        failed.append({"index": offset + i, "uid": uid, "error": bad[i]})
+                    else:
+                        paths[f"users/{uid}"] = None
+            self._write_profiles(paths)
+        finally:
+            self.invalidate()
+        return {"deleted": len(paths), "failed": failed}
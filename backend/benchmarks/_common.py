@@ -0,0 +1,112 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Benchmarks run in-process against fast_server.app. They use the real model
+at Model/output/model.joblib when it exists and fall back to the synthetic
+artifacts from synthetic_model.py otherwise, so they run on any checkout.
+"""
+
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def load_server():
+    """Import fast_server and make sure a model is loaded."""
+    import fast_server
+
+    if fast_server.model_artifacts is None:
+        from synthetic_model import make_synthetic_artifacts
+        print("Real model not found - benchmarking synthetic 200-tree forest.")
+        fast_server.model_artifacts = make_synthetic_artifacts()
+    return fast_server
+
+
+def random_requests(n: int, seed: int = 0) -> list[dict]:
+    """n /predict bodies scattered over Gilgit-Baltistan."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    terrains  = ["Valley", "Hilly", "Mountainous", "Unknown"]
+    districts = ["Gilgit", "Hunza", "Skardu", "Astore", "Ghizer", "Unknown"]
+    return [
+        {
+            "latitude":             float(rng.uniform(34.6, 37.1)),
+            "longitude":            float(rng.uniform(72.5, 77.8)),
+            "district":             districts[int(rng.integers(len(districts)))],
+            "rainfall":             float(rng.gamma(1.2, 80.0)),
+            "river_level":          float(rng.uniform(0, 30)),
+            "temperature_elevated": bool(rng.random() < 0.2),
+            "terrain":              terrains[int(rng.integers(len(terrains)))],
+            "seismic_activity":     bool(rng.random() < 0.25),
+        }
+        for _ in range(n)
+    ]
+
+
+def timeit(fn, repeat: int = 3) -> float:
+    """Best wall-clock time of ``repeat`` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def write_results(path: str, suite: str, config: dict, results) -> dict:
+    """
+    Write benchmark ``results`` as JSON with enough context (commit, host,
+    Python) to compare runs across commits. Returns the document written.
+    """
+    import json
+    import platform
+    import subprocess
+    from datetime import datetime, timezone
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    doc = {
+        "suite":     suite,
+        "commit":    commit,
+        "dirty":     dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host":      {"machine": platform.machine(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "config":    config,
+        "results":   results,
+    }
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+    print(f"\nResults written to {path}")
+    return doc
+
+
+def compare(baseline_path: str, results: dict, metrics: tuple[str, ...]):
+    """Print the relative change of ``metrics`` per entry against a previous results file."""
+    import json
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange vs {baseline_path} (commit {baseline.get('commit')}), negative = faster:")
+    for name, current in results.items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        deltas = []
+        for m in metrics:
+            if old.get(m) and current.get(m) is not None:
+                deltas.append(f"{m} {100 * (current[m] - old[m]) / old[m]:+6.1f}%")
+        print(f"  {name:<28} " + "  ".join(deltas))
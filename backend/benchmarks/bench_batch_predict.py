@@ -0,0 +1,42 @@
+"""
+Throughput of POST /predict/batch versus N sequential POST /predict calls.
+
+    python backend/benchmarks/bench_batch_predict.py [N ...]
+
+Both paths go through the full FastAPI stack via TestClient (no network),
+so the numbers include request parsing and response serialisation.
+"""
+
+import sys
+
+from _common import load_server, random_requests, timeit
+
+
+def main(sizes: list[int]):
+    from fastapi.testclient import TestClient
+
+    server = load_server()
+    client = TestClient(server.app)
+
+    print(f"{'N':>7} {'sequential':>12} {'batch':>10} {'seq rows/s':>12} {'batch rows/s':>13} {'speedup':>8}")
+    for n in sizes:
+        rows = random_requests(n)
+
+        def sequential():
+            for r in rows:
+                client.post("/predict", json=r).raise_for_status()
+
+        def batch():
+            client.post("/predict/batch", json={"rows": rows}).raise_for_status()
+
+        repeat = 1 if n >= 1000 else 3
+        t_seq   = timeit(sequential, repeat)
+        t_batch = timeit(batch, repeat)
+        print(
+            f"{n:>7} {t_seq * 1000:>10.1f}ms {t_batch * 1000:>8.1f}ms "
+            f"{n / t_seq:>12.0f} {n / t_batch:>13.0f} {t_seq / t_batch:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 10, 100, 1000])
@@ -0,0 +1,92 @@
+"""
+Cold-start regression benchmark.
+
+    python backend/benchmarks/bench_cold_start.py [--budget-ms 2500] [--runs 5]
+
+Writes the synthetic 200-tree model both as model.joblib and as the
+memory-mapped array export, then starts fresh interpreters that import
+fast_server and answer one /predict call. Each configuration (eager / lazy
+startup x joblib / arrays) reports the median import time and time to first
+prediction. Exits with status 1 when the lazy + arrays configuration (the
+serverless setup) exceeds the budget for time to first prediction.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _common import BACKEND_DIR
+
+CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import fast_server
+t_import = time.perf_counter()
+body = {"latitude": 36.3, "longitude": 74.6, "rainfall": 120.0, "river_level": 4.0, "terrain": "Valley"}
+result = asyncio.run(fast_server.predict_risk(fast_server.PredictionRequest(**body)))
+t_first = time.perf_counter()
+heavy = sorted(m for m in ("joblib", "sklearn", "firebase_admin", "httpx") if m in sys.modules)
+sys.stdout.write("\n@@" + json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "first_ms":  (t_first - t0) * 1000,
+    "prediction": result["prediction"],
+    "heavy_modules": heavy,
+}))
+"""
+
+
+def run(env: dict) -> dict:
+    proc = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.rsplit("@@", 1)[1])
+
+
+def main(budget_ms: float, runs: int) -> int:
+    import joblib
+
+    from inference import save_model_arrays
+    from synthetic_model import make_synthetic_artifacts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts   = make_synthetic_artifacts()
+        joblib_path = os.path.join(tmp, "model.joblib")
+        arrays_dir  = os.path.join(tmp, "model_arrays")
+        joblib.dump(artifacts, joblib_path)
+        save_model_arrays(artifacts, arrays_dir)
+        missing = os.path.join(tmp, "absent")
+
+        configs = {
+            "eager + joblib": {"GBDMS_LAZY_STARTUP": "0", "GBDMS_MODEL_PATH": joblib_path, "GBDMS_MODEL_ARRAYS_DIR": missing},
+            "lazy  + joblib": {"GBDMS_LAZY_STARTUP": "1", "GBDMS_MODEL_PATH": joblib_path, "GBDMS_MODEL_ARRAYS_DIR": missing},
+            "eager + arrays": {"GBDMS_LAZY_STARTUP": "0", "GBDMS_MODEL_PATH": missing, "GBDMS_MODEL_ARRAYS_DIR": arrays_dir},
+            "lazy  + arrays": {"GBDMS_LAZY_STARTUP": "1", "GBDMS_MODEL_PATH": missing, "GBDMS_MODEL_ARRAYS_DIR": arrays_dir},
+        }
+        print(f"{'config':<16} {'import ms':>10} {'first /predict ms':>18}  heavy modules loaded")
+        medians = {}
+        for name, extra in configs.items():
+            env = {**os.environ, **extra, "GBDMS_PREDICT_CACHE_SIZE": "0"}
+            results = [run(env) for _ in range(runs)]
+            imp   = statistics.median(r["import_ms"] for r in results)
+            first = statistics.median(r["first_ms"] for r in results)
+            medians[name] = first
+            print(f"{name:<16} {imp:10.0f} {first:18.0f}  {', '.join(results[-1]['heavy_modules']) or '-'}")
+
+    serverless = medians["lazy  + arrays"]
+    if serverless > budget_ms:
+        print(f"\nFAIL: lazy + arrays first prediction {serverless:.0f} ms exceeds budget {budget_ms:.0f} ms")
+        return 1
+    print(f"\nOK: lazy + arrays first prediction {serverless:.0f} ms within budget {budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("GBDMS_COLD_START_BUDGET_MS", "2500")))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(main(args.budget_ms, args.runs))
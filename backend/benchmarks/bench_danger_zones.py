@@ -0,0 +1,75 @@
+"""
+Live danger-zone engine on synthetic incident-report streams.
+
+    python backend/benchmarks/bench_danger_zones.py [--sizes 10000,100000]
+                                                    [--batch 100] [--json out.json] [--baseline old.json]
+
+Feeds synthetic_reports() (40 hotspots plus 30% scattered noise over 90
+days) to a DangerZoneEngine in time-ordered batches, as the report listener
+would, then builds the /danger-zones list once. Each entry reports ingest
+throughput, the zone-list time, the cells and zones held at the end and
+the peak traced memory (from a second, traced run).
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from _common import BACKEND_DIR, compare, write_results  # noqa: F401  (puts backend/ on sys.path)
+
+
+def run(reports: list[dict], batch: int):
+    from danger_zones import DangerZoneEngine
+
+    engine = DangerZoneEngine()
+    t0 = time.perf_counter()
+    for i in range(0, len(reports), batch):
+        chunk = reports[i:i + batch]
+        engine.ingest(chunk, now=chunk[-1]["time"])
+    return engine, time.perf_counter() - t0
+
+
+def main(sizes: list[int], batch: int, json_path: str | None, baseline: str | None):
+    from danger_zones import synthetic_reports
+
+    results = {}
+    for n in sizes:
+        reports = synthetic_reports(n, seed=0, hotspots=40, hours=24 * 90)
+        engine, ingest = run(reports, batch)
+        t0 = time.perf_counter()
+        zones = engine.zones_at(reports[-1]["time"])
+        listing = time.perf_counter() - t0
+        # Memory on a second pass: tracing slows ingest down about twofold
+        tracemalloc.start()
+        run(reports, batch)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        name = f"stream[{n}]"
+        stats = engine.stats()
+        results[name] = {
+            "ingest_seconds":   round(ingest, 3),
+            "us_per_report":    round(ingest / n * 1e6, 1),
+            "zones_ms":         round(listing * 1000, 2),
+            "zones":            len(zones),
+            "cells":            stats["cells"],
+            "peak_mb":          round(peak / 1e6, 1),
+        }
+        r = results[name]
+        print(f"{name:<16} {r['us_per_report']:7.1f} us/report  zones in {r['zones_ms']:7.2f} ms  "
+              f"{r['zones']:4d} zones  {r['cells']:6d} cells  {r['peak_mb']:6.1f} MB peak")
+
+    if json_path:
+        write_results(json_path, "danger_zones", {"sizes": sizes, "batch": batch}, results)
+    if baseline:
+        compare(baseline, results, ("us_per_report", "zones_ms", "peak_mb"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated report counts")
+    parser.add_argument("--batch", type=int, default=100, help="reports per ingest call")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    args = parser.parse_args()
+    main([int(s) for s in args.sizes.split(",")], args.batch, args.json, args.baseline)
@@ -0,0 +1,74 @@
+"""
+Bulk evacuation planner on synthetic population points.
+
+    python backend/benchmarks/bench_evacuation.py [--sizes 1000,10000,100000]
+                                                  [--json out.json] [--baseline old.json]
+
+Scatters population points (1-200 people each) and 20 safe zones over
+Gilgit-Baltistan and times evacuation.plan at each size for three capacity
+levels: ample (1.3x the population), tight (1.0x) and short (0.8x). Each
+entry reports the solve time, scaling waves, person-km against the
+nearest-zone baseline and how many people the baseline sends to full zones.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _common import BACKEND_DIR, compare, write_results  # noqa: F401  (puts backend/ on sys.path)
+
+N_ZONES = 20
+RATIOS  = {"ample": 1.3, "tight": 1.0, "short": 0.8}
+
+
+def instance(n: int, ratio: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lat, lon = rng.uniform(34.6, 37.1, n), rng.uniform(72.5, 77.8, n)
+    people = rng.integers(1, 200, n)
+    z_lat, z_lng = rng.uniform(34.6, 37.1, N_ZONES), rng.uniform(72.5, 77.8, N_ZONES)
+    weight = rng.integers(1, 100, N_ZONES)
+    capacity = (weight / weight.sum() * people.sum() * ratio).astype(np.int64)
+    return lat, lon, people, z_lat, z_lng, capacity
+
+
+def main(sizes: list[int], json_path: str | None, baseline: str | None):
+    from evacuation import nearest_only, plan
+
+    results = {}
+    for n in sizes:
+        for label, ratio in RATIOS.items():
+            lat, lon, people, z_lat, z_lng, capacity = instance(n, ratio)
+            t0 = time.perf_counter()
+            result = plan(lat, lon, people, z_lat, z_lng, capacity)
+            seconds = time.perf_counter() - t0
+            near = nearest_only(lat, lon, people, z_lat, z_lng)
+            assert (result["load"] <= capacity).all()
+
+            name = f"plan[{n}, {label}]"
+            results[name] = {
+                "seconds":          round(seconds, 3),
+                "waves":            result["waves"],
+                "people":           int(people.sum()),
+                "unassigned":       int(result["unassigned"].sum()),
+                "mean_km":          round(result["cost"] / max(1, people.sum() - result["unassigned"].sum()), 2),
+                "nearest_mean_km":  round(near["cost"] / people.sum(), 2),
+                "nearest_overflow": int(np.maximum(near["load"] - capacity, 0).sum()),
+            }
+            r = results[name]
+            print(f"{name:<26} {seconds:8.2f} s  {r['waves']:6d} waves  {r['mean_km']:6.1f} km/person "
+                  f"(nearest {r['nearest_mean_km']:.1f}, {r['nearest_overflow']:,} over capacity)")
+
+    if json_path:
+        write_results(json_path, "evacuation", {"sizes": sizes, "zones": N_ZONES, "ratios": RATIOS}, results)
+    if baseline:
+        compare(baseline, results, ("seconds", "waves"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated point counts")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    args = parser.parse_args()
+    main([int(s) for s in args.sizes.split(",")], args.json, args.baseline)
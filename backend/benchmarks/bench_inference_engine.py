@@ -0,0 +1,40 @@
+"""
+Latency of the compiled NumPy forest versus sklearn predict_proba.
+
+    python backend/benchmarks/bench_inference_engine.py [N ...]
+
+Both sides start from the same raw feature matrix; the sklearn side includes
+scaler.transform since the compiled forest has the scaler folded in.
+"""
+
+import sys
+
+from _common import load_server, timeit
+
+
+def main(sizes: list[int]):
+    import numpy as np
+
+    from inference import CompiledForest
+    from synthetic_model import sample_features
+
+    artifacts = load_server().model_artifacts
+    scaler, clf = artifacts["scaler"], artifacts["model"]
+
+    forest = CompiledForest.from_artifacts(artifacts)
+    print(f"Forest: {forest.n_trees} trees, {forest.n_nodes} nodes, max depth {forest.max_depth}")
+    compile_s = timeit(lambda: CompiledForest.from_artifacts(artifacts), repeat=1)
+    print(f"Compile time: {compile_s * 1000:.1f} ms\n")
+
+    print(f"{'N':>7} {'sklearn':>12} {'compiled':>12} {'speedup':>8} {'max |dp|':>10}")
+    for n in sizes:
+        X = sample_features(n, seed=3)
+        repeat = 3 if n >= 1000 else 20
+        t_sk = timeit(lambda: clf.predict_proba(scaler.transform(X)), repeat)
+        t_cf = timeit(lambda: forest.predict_proba(X), repeat)
+        diff = np.abs(clf.predict_proba(scaler.transform(X)) - forest.predict_proba(X)).max()
+        print(f"{n:>7} {t_sk * 1000:>10.2f}ms {t_cf * 1000:>10.2f}ms {t_sk / t_cf:>7.1f}x {diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 100, 10_000])
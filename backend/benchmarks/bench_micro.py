@@ -0,0 +1,116 @@
+"""
+Micro-benchmarks of the per-request helpers on the /predict path.
+
+    python backend/benchmarks/bench_micro.py [--json out.json] [--baseline old.json]
+
+Times build_feature_row, build_feature_matrix, encode_district (by name),
+encode_locations (district from coordinates, 1 and 1000 points),
+haversine_km, the forest call (compiled and sklearn, 1 and 64 rows),
+attributions (1 and 64 rows), format_prediction, a 100,800-row
+/predict/sweep grid and the sensor store (one minute of readings from 500
+stations, their rolling aggregates, inputs for 1000 villages). Each entry
+reports the median and best per-call time over several rounds of ``timeit``.
+"""
+
+import argparse
+import itertools
+import statistics
+import timeit
+
+import numpy as np
+
+from _common import compare, load_server, random_requests, write_results
+
+
+def measure(fn, min_time: float = 0.2, rounds: int = 5) -> dict:
+    """Per-call seconds: median and best of ``rounds`` runs of an auto-sized loop."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    per_call = [t / number for t in timer.repeat(repeat=rounds, number=number)]
+    return {
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "best_us":   round(min(per_call) * 1e6, 3),
+        "loops":     number,
+    }
+
+
+def main(json_path: str | None, baseline: str | None):
+    from explain import PathExplainer
+    from features import build_feature_matrix, build_feature_row
+    from inference import CompiledForest
+    from sensors import SensorStore
+    from sweep import grid_proba
+    from synthetic_model import sample_features
+
+    server = load_server()
+    artifacts = server.model_artifacts
+    forest = CompiledForest.from_artifacts(artifacts)
+    explainer = PathExplainer(forest)
+    body = random_requests(1)[0]
+    X1, X64 = sample_features(1, seed=3), sample_features(64, seed=4)
+    probs = forest.predict_proba(X1)[0]
+    sweep = server.SweepRequest(latitude=35.92, longitude=74.31, district="Hunza", terrain="Hilly",
+                                rainfall={"max": 300, "steps": 100}, river_level={"max": 15, "steps": 84})
+    months, rain, river = range(1, 13), sweep.rainfall.values(), sweep.river_level.values()
+    sweep_base = server._sweep_rows(sweep, artifacts, 1, 0.0, 0.0)[0]
+    sweep_axes = [server._sweep_rows(sweep, artifacts, list(months), 0.0, 0.0),
+                  server._sweep_rows(sweep, artifacts, 1, rain, 0.0),
+                  server._sweep_rows(sweep, artifacts, 1, 0.0, river)]
+
+    # 500 stations with a day of one-a-minute readings; each ingest call adds the next minute
+    rng = np.random.default_rng(5)
+    store = SensorStore([{"id": f"S{i}", "lat": 35 + rng.random() * 2, "lon": 73 + rng.random() * 3} for i in range(500)])
+    ids = [f"S{i}" for i in range(500)]
+    store.ingest(np.repeat(ids, 1440), np.tile(np.arange(1440) * 60.0, 500), rng.random((720000, 3)))
+    minute = itertools.count(1440)
+    village_lat, village_lon = 35 + rng.random(1000) * 2, 73 + rng.random(1000) * 3
+
+    cases = {
+        "build_feature_row": lambda: build_feature_row(
+            body["latitude"], body["longitude"], 4, 7, body["rainfall"], body["river_level"],
+            body["temperature_elevated"], body["terrain"], body["seismic_activity"],
+        ),
+        "build_feature_matrix[1]": lambda: build_feature_matrix(
+            [body["latitude"]], [body["longitude"]], [4], 7, [body["rainfall"]], [body["river_level"]],
+            [body["temperature_elevated"]], [body["terrain"]], [body["seismic_activity"]],
+            artifacts["features"],
+        ),
+        "encode_district":         lambda: server.encode_district("Hunza", artifacts),
+        "encode_locations[1]":     lambda: server.encode_locations([body["latitude"]], [body["longitude"]], ["Unknown"], artifacts),
+        "encode_locations[1000]":  lambda: server.encode_locations(village_lat, village_lon, ["Unknown"] * 1000, artifacts),
+        "haversine_km":            lambda: server.haversine_km(35.92, 74.31, 36.31, 74.65),
+        "forest[compiled, 1]":     lambda: forest.predict_proba(X1),
+        "forest[compiled, 64]":    lambda: forest.predict_proba(X64),
+        "explain[1]":              lambda: explainer.contributions(X1),
+        "explain[64]":             lambda: explainer.contributions(X64),
+        "format_prediction":       lambda: server.format_prediction(probs, forest.classes_),
+        "sweep[12x100x84]":        lambda: grid_proba(forest, sweep_base, sweep_axes),
+        "sensors.ingest[500]":     lambda: store.ingest(ids, np.full(500, next(minute) * 60.0), rng.random((500, 3))),
+        "sensors.aggregates[500]": lambda: store.aggregates(next(minute) * 60.0),
+        "sensors.features[1000]":  lambda: store.features(village_lat, village_lon, now=next(minute) * 60.0),
+    }
+    if "model" in artifacts:
+        scaler, clf = artifacts["scaler"], artifacts["model"]
+        cases["forest[sklearn, 1]"]  = lambda: clf.predict_proba((X1 - scaler.mean_) / scaler.scale_)
+        cases["forest[sklearn, 64]"] = lambda: clf.predict_proba((X64 - scaler.mean_) / scaler.scale_)
+
+    results = {}
+    print(f"{'benchmark':<26} {'median us':>11} {'best us':>10} {'loops':>8}")
+    for name, fn in cases.items():
+        results[name] = measure(fn)
+        r = results[name]
+        print(f"{name:<26} {r['median_us']:11.2f} {r['best_us']:10.2f} {r['loops']:8d}")
+
+    if json_path:
+        write_results(json_path, "micro", {"forest_trees": forest.n_trees, "forest_nodes": forest.n_nodes}, results)
+    if baseline:
+        compare(baseline, results, ("median_us", "best_us"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    args = parser.parse_args()
+    main(args.json, args.baseline)
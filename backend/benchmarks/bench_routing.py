@@ -0,0 +1,89 @@
+"""
+Offline router latency on a generated road grid.
+
+    python backend/benchmarks/bench_routing.py [GRID_SIDE]
+
+Writes a GRID_SIDE x GRID_SIDE street grid as OSM XML (with faster arterial
+roads every 10th row/column), builds the CSR graph and times A* queries
+between random points, then the shelter tree: full build, nearest-shelter
+lookups and incremental repair after blocking a road.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from _common import BACKEND_DIR  # noqa: F401  (puts backend/ on sys.path)
+
+
+def write_grid_osm(path: str, side: int, spacing_deg: float = 0.002):
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        for i in range(side):
+            for j in range(side):
+                f.write(f'  <node id="{i * side + j + 1}" lat="{35.5 + i * spacing_deg:.6f}" '
+                        f'lon="{74.0 + j * spacing_deg:.6f}"/>\n')
+        way_id = 1
+        for axis in range(2):
+            for i in range(side):
+                refs = [(i * side + j if axis == 0 else j * side + i) + 1 for j in range(side)]
+                highway = "primary" if i % 10 == 0 else "residential"
+                f.write(f'  <way id="{way_id}">' + "".join(f'<nd ref="{r}"/>' for r in refs)
+                        + f'<tag k="highway" v="{highway}"/></way>\n')
+                way_id += 1
+        f.write("</osm>\n")
+
+
+def main(side: int):
+    import numpy as np
+
+    from road_network import RoadNetwork, build_graph
+    from shelter_tree import ShelterTree
+
+    with tempfile.TemporaryDirectory() as tmp:
+        osm = os.path.join(tmp, "grid.osm")
+        write_grid_osm(osm, side)
+        t0 = time.perf_counter()
+        meta = build_graph(osm, os.path.join(tmp, "graph"))
+        print(f"Built {meta['n_nodes']:,} nodes / {meta['n_edges']:,} edges in {time.perf_counter() - t0:.1f} s")
+
+        net = RoadNetwork(os.path.join(tmp, "graph"))
+        rng = np.random.default_rng(0)
+        span = (side - 1) * 0.002
+        times = []
+        for _ in range(50):
+            a = (35.5 + rng.uniform(0, span), 74.0 + rng.uniform(0, span))
+            b = (35.5 + rng.uniform(0, span), 74.0 + rng.uniform(0, span))
+            t0 = time.perf_counter()
+            net.route(*a, *b)
+            times.append(time.perf_counter() - t0)
+        times = np.asarray(times) * 1000
+        print(f"route(): p50 {np.percentile(times, 50):.1f} ms  p95 {np.percentile(times, 95):.1f} ms  "
+              f"max {times.max():.1f} ms over {len(times)} queries")
+
+        zones = [{"lat": 35.5 + rng.uniform(0, span), "lng": 74.0 + rng.uniform(0, span)} for _ in range(20)]
+        t0 = time.perf_counter()
+        tree = ShelterTree.build(net, zones)
+        print(f"ShelterTree.build(): {time.perf_counter() - t0:.2f} s for {len(zones)} zones")
+
+        times = []
+        for _ in range(200):
+            t0 = time.perf_counter()
+            tree.route(35.5 + rng.uniform(0, span), 74.0 + rng.uniform(0, span))
+            times.append(time.perf_counter() - t0)
+        times = np.asarray(times) * 1000
+        print(f"tree.route(): p50 {np.percentile(times, 50):.2f} ms  p95 {np.percentile(times, 95):.2f} ms")
+
+        times = []
+        for node in rng.choice(np.flatnonzero(tree.next_node >= 0), 20, replace=False):
+            edges = tree.edges_between([int(node), int(tree.next_node[node])])
+            t0 = time.perf_counter()
+            tree.block_edges(edges)
+            times.append(time.perf_counter() - t0)
+        times = np.asarray(times) * 1000
+        print(f"block_edges(): p50 {np.percentile(times, 50):.1f} ms  max {times.max():.1f} ms over {len(times)} blocks")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
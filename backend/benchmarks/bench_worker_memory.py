@@ -0,0 +1,160 @@
+"""
+Per-worker memory of `uvicorn fast_server:app --workers N`.
+
+    python backend/benchmarks/bench_worker_memory.py [--workers 1 4 16] [--trees 200]
+
+Writes a synthetic unpruned forest as model.joblib, then starts uvicorn with
+1, 4 and 16 workers in two modes:
+
+    per-worker   every worker unpickles model.joblib (the default)
+    shared       GBDMS_SHARED_MODEL=1: one worker exports the forest to
+                 memory-mapped arrays, every worker maps the same files
+
+After each worker has served a few /predict/batch calls, reads
+/proc/<pid>/smaps_rollup for every worker and reports the mean RSS, PSS
+(shared pages divided among the processes mapping them) and USS (private
+pages), plus the PSS total across workers. RSS counts shared pages in full
+in every process, so PSS/USS are the numbers that show what a node pays.
+Linux only.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from _common import BACKEND_DIR, random_requests
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss / Pss / Uss in kB from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def worker_pids(parent: int) -> list[int]:
+    """uvicorn's worker processes (children of the supervisor that are not its helpers)."""
+    with open(f"/proc/{parent}/task/{parent}/children") as f:
+        children = [int(p) for p in f.read().split()]
+    workers = []
+    for pid in children:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read()
+        if b"resource_tracker" not in cmdline:
+            workers.append(pid)
+    return workers
+
+
+def measure(n_workers: int, env: dict, timeout: float = 600) -> dict:
+    port = free_port()
+    log = tempfile.TemporaryFile(mode="w+")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fast_server:app", "--port", str(port),
+         "--workers", str(n_workers), "--log-level", "info"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            log.seek(0)
+            if log.read().count("Application startup complete") >= n_workers:
+                break
+            if proc.poll() is not None or time.monotonic() > deadline:
+                log.seek(0)
+                raise RuntimeError(f"uvicorn did not start {n_workers} workers:\n{log.read()[-2000:]}")
+            time.sleep(0.5)
+
+        # New connection per call so the kernel spreads them over the workers
+        body = json.dumps({"rows": random_requests(200)}).encode()
+        for _ in range(n_workers * 8):
+            req = urllib.request.Request(
+                f"http://127.0.0.1:{port}/predict/batch", data=body,
+                headers={"Content-Type": "application/json", "Connection": "close"},
+            )
+            urllib.request.urlopen(req, timeout=60).read()
+
+        # With one worker uvicorn serves from the supervisor process itself
+        pids = worker_pids(proc.pid) if n_workers > 1 else [proc.pid]
+        per_worker = [memory_kb(pid) for pid in pids]
+        return {
+            key: statistics.mean(m[key] for m in per_worker) / 1024 for key in ("rss", "pss", "uss")
+        } | {"pss_total": sum(m["pss"] for m in per_worker) / 1024, "workers": len(per_worker)}
+    finally:
+        proc.terminate()
+        proc.wait(30)
+        log.close()
+
+
+def main(worker_counts: list[int], trees: int, samples: int):
+    import joblib
+
+    from inference import CompiledForest
+    from synthetic_model import make_synthetic_artifacts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Training synthetic forest ({trees} trees, {samples} samples, unpruned)...")
+        artifacts = make_synthetic_artifacts(n_samples=samples, n_estimators=trees, max_depth=None)
+        forest = CompiledForest.from_artifacts(artifacts)
+        joblib_path = os.path.join(tmp, "model.joblib")
+        joblib.dump(artifacts, joblib_path)
+        print(f"model.joblib {os.path.getsize(joblib_path) / 2**20:.1f} MiB, "
+              f"compiled forest {forest.n_nodes:,} nodes\n")
+        del artifacts, forest
+
+        missing = os.path.join(tmp, "absent")
+        base = {
+            **os.environ,
+            "GBDMS_MODEL_PATH":         joblib_path,
+            "GBDMS_MODEL_ARRAYS_DIR":   missing,
+            "GBDMS_MODEL_REGISTRY_DIR": missing,
+            "GBDMS_ROAD_GRAPH_DIR":     missing,
+            "GBDMS_PREDICT_CACHE_SIZE": "0",
+        }
+        modes = {
+            "per-worker": {**base, "GBDMS_SHARED_MODEL": "0"},
+            "shared":     {**base, "GBDMS_SHARED_MODEL": "1",
+                           "GBDMS_SHARED_MODEL_DIR": os.path.join(tmp, "shared")},
+        }
+
+        print(f"{'mode':<11} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} "
+              f"{'USS/worker':>11} {'PSS total':>10}   (MiB)")
+        for n in worker_counts:
+            for mode, env in modes.items():
+                try:
+                    m = measure(n, env)
+                except (OSError, RuntimeError) as exc:
+                    # Typically a worker killed by the OOM killer: the node cannot host n copies
+                    print(f"{mode:<11} {n:>7}   failed: {exc.__class__.__name__}: {str(exc).splitlines()[0]}")
+                    continue
+                print(f"{mode:<11} {m['workers']:>7} {m['rss']:11.1f} {m['pss']:11.1f} "
+                      f"{m['uss']:11.1f} {m['pss_total']:10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=40000)
+    args = parser.parse_args()
+    main(args.workers, args.trees, args.samples)
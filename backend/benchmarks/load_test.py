@@ -0,0 +1,223 @@
+"""
+HTTP load generator for the risk engine.
+
+    python backend/benchmarks/load_test.py [--rps 50] [--duration 20] [--json out.json] [--baseline old.json]
+
+Starts the OSRM / Nominatim stubs from stub_upstreams.py and a uvicorn
+server on a synthetic model, synthetic danger zones and fresh caches (or
+targets ``--url`` instead), then sends an open-loop request stream at the
+target rate: request i is due at start + i / rps whether or not earlier ones
+have finished, and its latency is measured from that due time, so a stalled
+server shows up as latency instead of as a lower request rate.
+
+The mix (``--mix predict=4,routes=2,geocode=3,danger-zones=1``) covers:
+
+    /predict        random inputs over Gilgit-Baltistan
+    /routes         random start points (OSRM stub when no road graph is set)
+    /geocode        gazetteer names and prefixes, plus unique names that go
+                    to the Nominatim stub (``--geocode-miss`` of the calls)
+    /danger-zones   the precomputed list
+
+Reports achieved rate, errors by status and p50 / p95 / p99 / max latency
+per endpoint; ``--json`` writes them for comparison between commits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+from _common import BACKEND_DIR, compare, random_requests, write_results
+from stub_upstreams import StubUpstream
+
+GAZETTEER_QUERIES = [
+    "Gilgit", "Skardu", "Hunza", "Karimabad", "Aliabad", "Gupis", "Astore", "Chilas",
+    "Khaplu", "Shigar", "Passu", "Attabad", "gil", "ska", "hun", "Sost", "Jaglot", "Danyor",
+]
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"predict", "routes", "geocode", "danger-zones"}
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def make_request(endpoint: str, i: int, rng: random.Random, geocode_miss: float) -> tuple[str, str, dict]:
+    """(method, path, kwargs for httpx) of the i-th call to ``endpoint``."""
+    if endpoint == "predict":
+        return "POST", "/predict", {"json": random_requests(1, seed=i)[0]}
+    if endpoint == "routes":
+        start = {"latitude": rng.uniform(35.0, 36.8), "longitude": rng.uniform(73.0, 76.5)}
+        return "POST", "/routes", {"json": {"start": start}}
+    if endpoint == "geocode":
+        q = f"Hamlet {i}" if rng.random() < geocode_miss else rng.choice(GAZETTEER_QUERIES)
+        return "GET", "/geocode", {"params": {"q": q}}
+    return "GET", "/danger-zones", {}
+
+
+async def run_load(base_url: str, mix: dict, rps: float, duration: float, geocode_miss: float,
+                   timeout: float, seed: int = 0) -> dict:
+    import httpx
+
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    n_total = int(rps * duration)
+    plan = [make_request(e, i, rng, geocode_miss) + (e,)
+            for i, e in enumerate(rng.choices(names, weights, k=n_total))]
+    latencies: dict[str, list[float]] = {e: [] for e in names}
+    statuses:  dict[str, dict[str, int]] = {e: {} for e in names}
+
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time() + 0.5
+
+        async def one(i, method, path, kwargs, endpoint):
+            due = start + i / rps
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            try:
+                resp = await client.request(method, path, **kwargs)
+                status = str(resp.status_code)
+            except httpx.HTTPError as exc:
+                status = exc.__class__.__name__
+            latencies[endpoint].append(loop.time() - due)
+            statuses[endpoint][status] = statuses[endpoint].get(status, 0) + 1
+
+        await asyncio.gather(*(one(i, *p) for i, p in enumerate(plan)))
+        elapsed = loop.time() - start
+
+    results = {}
+    for e in names:
+        lat = np.asarray(latencies[e]) * 1000
+        ok = sum(n for s, n in statuses[e].items() if s.startswith("2"))
+        results[e] = {
+            "requests": len(lat),
+            "rps":      round(len(lat) / elapsed, 2),
+            "ok":       ok,
+            "statuses": statuses[e],
+            **({
+                "p50_ms": round(float(np.percentile(lat, 50)), 2),
+                "p95_ms": round(float(np.percentile(lat, 95)), 2),
+                "p99_ms": round(float(np.percentile(lat, 99)), 2),
+                "max_ms": round(float(lat.max()), 2),
+            } if len(lat) else {}),
+        }
+    return results
+
+
+def start_server(tmp: str, osrm_url: str, nominatim_url: str, workers: int) -> tuple[subprocess.Popen, str]:
+    """uvicorn on a synthetic model, synthetic danger zones and empty caches."""
+    import socket
+    import urllib.request
+
+    from inference import save_model_arrays
+    from synthetic_model import make_synthetic_artifacts
+
+    arrays = save_model_arrays(make_synthetic_artifacts(), os.path.join(tmp, "model_arrays"))
+    rng = np.random.default_rng(0)
+    zones = [
+        {"lat": float(lat), "lng": float(lng), "type": t, "risk": "High", "location": "Synthetic", "event_count": 3}
+        for lat, lng, t in zip(rng.uniform(34.6, 37.1, 300), rng.uniform(72.5, 77.8, 300),
+                               rng.choice(["Flood", "Landslide", "GLOF", "Earthquake"], 300))
+    ]
+    dz_path = os.path.join(tmp, "danger_zones.json")
+    with open(dz_path, "w") as f:
+        json.dump(zones, f)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    missing = os.path.join(tmp, "absent")
+    env = {
+        **os.environ,
+        "GBDMS_MODEL_ARRAYS_DIR":   arrays,
+        "GBDMS_MODEL_PATH":         missing,
+        "GBDMS_MODEL_REGISTRY_DIR": missing,
+        "GBDMS_DANGER_ZONES_PATH":  dz_path,
+        "GBDMS_ROAD_GRAPH_DIR":     os.environ.get("GBDMS_ROAD_GRAPH_DIR", missing),
+        "GBDMS_GEOCODE_CACHE_PATH": os.path.join(tmp, "geocode.sqlite"),
+        "GBDMS_OSRM_URL":           osrm_url,
+        "GBDMS_NOMINATIM_URL":      nominatim_url,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fast_server:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            urllib.request.urlopen(url + "/", timeout=2).read()
+            return proc, url
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise SystemExit("server did not start")
+            time.sleep(0.3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--mix", default="predict=4,routes=2,geocode=3,danger-zones=1")
+    parser.add_argument("--geocode-miss", type=float, default=0.2,
+                        help="share of /geocode calls with names the gazetteer does not know")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--osrm-latency-ms", type=float, default=80)
+    parser.add_argument("--nominatim-latency-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    with ExitStack() as stack:
+        osrm = stack.enter_context(StubUpstream(
+            "osrm", args.osrm_latency_ms, args.jitter_ms, args.upstream_error_rate))
+        nominatim = stack.enter_context(StubUpstream(
+            "nominatim", args.nominatim_latency_ms, args.jitter_ms, args.upstream_error_rate))
+        url = args.url
+        if url is None:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            proc, url = start_server(tmp, osrm.url, nominatim.url, args.workers)
+            stack.callback(proc.wait, 30)
+            stack.callback(proc.terminate)
+
+        print(f"Load: {args.rps:g} req/s for {args.duration:g} s against {url} (mix {args.mix})")
+        results = asyncio.run(run_load(url, mix, args.rps, args.duration, args.geocode_miss, args.timeout))
+
+        print(f"\n{'endpoint':<14} {'reqs':>6} {'rps':>7} {'ok':>6} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'max ms':>8}  statuses")
+        for name, r in results.items():
+            print(f"{name:<14} {r['requests']:6d} {r['rps']:7.1f} {r['ok']:6d} {r.get('p50_ms', 0):8.1f} "
+                  f"{r.get('p95_ms', 0):8.1f} {r.get('p99_ms', 0):8.1f} {r.get('max_ms', 0):8.1f}  "
+                  f"{json.dumps(r['statuses'])}")
+        print(f"\nUpstream stub calls: osrm {osrm.hits}, nominatim {nominatim.hits}")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("json", "baseline")}
+    if args.json:
+        write_results(args.json, "load", config, results)
+    if args.baseline:
+        compare(args.baseline, results, ("p50_ms", "p95_ms", "p99_ms"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Local stand-ins for the public OSRM and Nominatim servers.
+
+    python backend/benchmarks/stub_upstreams.py [--osrm-latency-ms 80] [--nominatim-latency-ms 150]
+
+Each stub answers in the real service's JSON shape after a configurable
+latency (mean plus uniform jitter) and can fail a fraction of requests with
+HTTP 503, so load tests exercise the async client, coalescing and circuit
+breaker without touching the public servers. Point the backend at them with
+GBDMS_OSRM_URL / GBDMS_NOMINATIM_URL.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def _osrm_route(path: str) -> dict:
+    """Straight-line OSRM /route/v1 answer between the two coordinates in ``path``."""
+    coords = unquote(path.rsplit("/", 1)[-1]).split(";")
+    (lng1, lat1), (lng2, lat2) = [tuple(float(v) for v in c.split(",")) for c in coords[:2]]
+    dist_m = 111_000 * math.hypot(lat2 - lat1, (lng2 - lng1) * math.cos(math.radians(lat1)))
+    steps = 20
+    line = [[lng1 + (lng2 - lng1) * i / steps, lat1 + (lat2 - lat1) * i / steps] for i in range(steps + 1)]
+    return {
+        "code": "Ok",
+        "routes": [{
+            "distance": round(dist_m * 1.3, 1),
+            "duration": round(dist_m * 1.3 / 8.3, 1),        # ~30 km/h on mountain roads
+            "geometry": {"type": "LineString", "coordinates": line},
+        }],
+    }
+
+
+def _nominatim_search(query: str) -> list:
+    rng = random.Random(query)
+    lat, lon = rng.uniform(34.6, 37.1), rng.uniform(72.5, 77.8)
+    return [{
+        "place_id":     rng.randrange(10**8),
+        "name":         query.title(),
+        "display_name": f"{query.title()}, Gilgit-Baltistan, Pakistan",
+        "lat":          f"{lat:.6f}",
+        "lon":          f"{lon:.6f}",
+        "class":        "place",
+        "type":         "village",
+        "addresstype":  "village",
+    }]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.hits += 1
+        delay = max(0.0, srv.latency_ms + random.uniform(-srv.jitter_ms, srv.jitter_ms)) / 1000
+        time.sleep(delay)
+
+        url = urlsplit(self.path)
+        if random.random() < srv.error_rate:
+            status, body = 503, {"error": "stub failure"}
+        elif srv.kind == "osrm" and url.path.startswith("/route/v1/"):
+            status, body = 200, _osrm_route(url.path)
+        elif srv.kind == "nominatim" and url.path == "/search":
+            status, body = 200, _nominatim_search(parse_qs(url.query).get("q", [""])[0])
+        else:
+            status, body = 404, {"error": "unknown path"}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubUpstream:
+    """One stub server on 127.0.0.1; ``kind`` is "osrm" or "nominatim"."""
+
+    def __init__(self, kind: str, latency_ms: float = 50.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, port: int = 0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.server.daemon_threads = True
+        self.server.kind       = kind
+        self.server.latency_ms = latency_ms
+        self.server.jitter_ms  = jitter_ms
+        self.server.error_rate = error_rate
+        self.server.hits       = 0
+        self.server.lock       = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def hits(self) -> int:
+        return self.server.hits
+
+    def start(self) -> "StubUpstream":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--osrm-port", type=int, default=5000)
+    parser.add_argument("--nominatim-port", type=int, default=8088)
+    parser.add_argument("--osrm-latency-ms", type=float, default=80)
+    parser.add_argument("--nominatim-latency-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    osrm = StubUpstream("osrm", args.osrm_latency_ms, args.jitter_ms, args.error_rate, args.osrm_port).start()
+    nominatim = StubUpstream("nominatim", args.nominatim_latency_ms, args.jitter_ms, args.error_rate,
+                             args.nominatim_port).start()
+    print(f"GBDMS_OSRM_URL={osrm.url}\nGBDMS_NOMINATIM_URL={nominatim.url}\n(Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        osrm.stop()
+        nominatim.stop()
@@ -0,0 +1,396 @@
+"""
+Forest compaction and distillation with a bounded accuracy trade-off.
+
+Starting from a model.joblib artifacts dict, builds smaller forests four ways
+and combinations of them:
+
+    subset    keep the n trees that, added greedily, best reproduce the full
+              forest's votes on a selection sample
+    depth     cut every tree at a maximum depth; the cut node becomes a leaf
+              with its own (training) class distribution
+    merge     collapse every subtree whose leaves all share one argmax class
+              into a single leaf (the tree's own vote never changes)
+    distill   train a new, smaller RandomForest on synthetic rows drawn over
+              the feature ranges and labelled by the full forest
+
+Each candidate is compiled and measured for size (node count, array bytes),
+latency (one row and a 1000-row batch through CompiledForest) and agreement
+with the full forest on a separate sample. With a labelled holdout
+(``--test``, an .npz with raw feature rows ``X`` and class labels ``y``) the
+candidates are also scored for accuracy, and the allowed drop and the
+Pareto front use accuracy; without one both use agreement with the full
+forest.
+
+The report lists every candidate and marks the size/latency/accuracy (or
+agreement) Pareto front. The smallest candidate within the allowed drop is written with
+inference.save_model_arrays, so the server (GBDMS_MODEL_ARRAYS_DIR) and
+``model_registry.py publish`` load it like any other array export.
+
+    python compaction.py [model.joblib] [--out DIR] [--max-drop 0.01]
+                         [--test holdout.npz] [--json report.json]
+"""
+
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+
+from inference import MODEL_PATH, CompiledForest, save_model_arrays
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+COMPACT_ARRAYS_DIR = os.path.join(_HERE, "../Model/output/model_arrays_compact")
+
+DEFAULT_MAX_DROP = 0.01
+DEFAULT_DEPTHS   = (4, 6, 8, 10, 12)
+DEFAULT_DISTILL  = ((10, 8), (10, 12), (30, 8), (30, 12))   # (n_estimators, max_depth)
+
+# Fractions of the full forest tried as tree subsets
+_SUBSET_FRACTIONS = (0.05, 0.1, 0.2, 0.5)
+_BATCH_ROWS = 1000
+
+
+# ── Tree surgery (sklearn layout: leaves have left == -1) ────────────────────
+
+def forest_trees(clf) -> list[dict]:
+    """Per-tree arrays of a fitted RandomForestClassifier, values for every node."""
+    return [
+        {
+            "left":      est.tree_.children_left.astype(np.int64),
+            "right":     est.tree_.children_right.astype(np.int64),
+            "feature":   est.tree_.feature.astype(np.int64),
+            "threshold": est.tree_.threshold.astype(np.float64),
+            "value":     est.tree_.value[:, 0, :].astype(np.float64),
+        }
+        for est in clf.estimators_
+    ]
+
+
+def _rebuild(tree: dict, cut: np.ndarray) -> dict:
+    """Copy of ``tree`` with the ``cut`` nodes turned into leaves and their subtrees dropped."""
+    left, right = tree["left"], tree["right"]
+    order, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if left[node] != -1 and not cut[node]:
+            stack += [right[node], left[node]]
+    order = np.asarray(order, dtype=np.int64)
+    pos = np.full(len(left), -1, dtype=np.int64)
+    pos[order] = np.arange(len(order))
+
+    is_leaf = (left[order] == -1) | cut[order]
+    return {
+        "left":      np.where(is_leaf, -1, pos[left[order]]),
+        "right":     np.where(is_leaf, -1, pos[right[order]]),
+        "feature":   np.where(is_leaf, -2, tree["feature"][order]),
+        "threshold": np.where(is_leaf, -2.0, tree["threshold"][order]),
+        "value":     tree["value"][order],
+    }
+
+
+def _depths(tree: dict) -> np.ndarray:
+    left, right = tree["left"], tree["right"]
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):            # sklearn numbers parents before children
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return depth
+
+
+def truncate(tree: dict, max_depth: int) -> dict:
+    """Cut ``tree`` at ``max_depth``: nodes at that depth become leaves."""
+    depth = _depths(tree)
+    if depth.max() <= max_depth:
+        return tree
+    return _rebuild(tree, depth >= max_depth)
+
+
+def merge_leaves(tree: dict) -> dict:
+    """Collapse every subtree whose leaves all have the same argmax class into one leaf."""
+    left, right = tree["left"], tree["right"]
+    label = tree["value"].argmax(axis=1)
+    uniform = np.where(left == -1, label, -1)
+    cut = np.zeros(len(left), dtype=bool)
+    for node in np.argsort(_depths(tree), kind="stable")[::-1]:    # children first
+        if left[node] == -1:
+            continue
+        a, b = uniform[left[node]], uniform[right[node]]
+        if a != -1 and a == b:
+            uniform[node] = a
+            cut[node] = True
+    return _rebuild(tree, cut) if cut.any() else tree
+
+
+def select_trees(per_tree: np.ndarray, target: np.ndarray, n: int) -> list[int]:
+    """
+    Greedy forward selection of ``n`` trees. ``per_tree`` is (rows, trees,
+    classes) leaf probabilities; each step adds the tree whose vote, summed
+    with those already chosen, matches ``target`` on the most rows.
+    """
+    chosen: list[int] = []
+    remaining = list(range(per_tree.shape[1]))
+    votes = np.zeros((per_tree.shape[0], per_tree.shape[2]))
+    for _ in range(min(n, len(remaining))):
+        trial = votes[:, None, :] + per_tree[:, remaining, :]
+        hits  = (trial.argmax(axis=2) == target[:, None]).sum(axis=0)
+        best  = remaining.pop(int(hits.argmax()))
+        chosen.append(best)
+        votes += per_tree[:, best, :]
+    return chosen
+
+
+# ── Samples ──────────────────────────────────────────────────────────────────
+
+def sample_inputs(artifacts: dict, n: int, seed: int = 0) -> np.ndarray:
+    """
+    Raw feature rows drawn over the training feature ranges. The standard
+    schema uses synthetic_model's sampler; any other feature list is drawn
+    uniformly over the span of the forest's split thresholds.
+    """
+    from synthetic_model import FEATURES, sample_features
+    if list(artifacts["features"]) == FEATURES:
+        return sample_features(n, seed)
+
+    forest = CompiledForest.from_artifacts(artifacts)
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n, forest.n_features))
+    split = np.isfinite(forest.threshold)
+    for f in range(forest.n_features):
+        t = forest.threshold[split & (forest.feature == f)]
+        if t.size:
+            pad = max(t.max() - t.min(), 1.0) * 0.1
+            X[:, f] = rng.uniform(t.min() - pad, t.max() + pad, n)
+    return X
+
+
+def distill(artifacts: dict, X: np.ndarray, labels: np.ndarray, n_estimators: int,
+            max_depth: int | None, seed: int = 0) -> list[dict]:
+    """Trees of a RandomForest trained on ``X`` (raw rows) labelled with class indices."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    scaler = artifacts.get("scaler")
+    Xs = X if scaler is None else scaler.transform(X)
+    student = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, random_state=seed, n_jobs=1,
+    ).fit(Xs, labels)
+    # Classes the teacher never predicted on X are absent from the student
+    n_classes = len(artifacts["classes"])
+    trees = forest_trees(student)
+    for tree in trees:
+        value = np.zeros((len(tree["left"]), n_classes))
+        value[:, student.classes_] = tree["value"]
+        tree["value"] = value
+    return trees
+
+
+# ── Evaluation ───────────────────────────────────────────────────────────────
+
+def _compile(artifacts: dict, trees: list[dict]) -> CompiledForest:
+    scaler = artifacts.get("scaler")
+    return CompiledForest.from_trees(
+        trees,
+        classes    = list(artifacts["classes"]),
+        n_features = len(artifacts["features"]),
+        mean       = None if scaler is None else scaler.mean_,
+        scale      = None if scaler is None else scaler.scale_,
+    )
+
+
+def _latency(forest: CompiledForest, X: np.ndarray) -> tuple[float, float]:
+    """Median single-row latency (µs) and best 1000-row batch latency (ms)."""
+    row = X[:1]
+    forest.predict_proba(row)                  # warm-up
+    single = []
+    for _ in range(50):
+        t0 = time.perf_counter()
+        forest.predict_proba(row)
+        single.append(time.perf_counter() - t0)
+    batch = X[:_BATCH_ROWS]
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        forest.predict_proba(batch)
+        best = min(best, time.perf_counter() - t0)
+    return float(np.median(single)) * 1e6, best * 1e3
+
+
+def measure(forest: CompiledForest, X_eval: np.ndarray, reference: np.ndarray, test=None) -> dict:
+    """Size, latency, agreement with ``reference`` labels and (optionally) holdout accuracy."""
+    row_us, batch_ms = _latency(forest, X_eval)
+    result = {
+        "n_trees":          forest.n_trees,
+        "n_nodes":          forest.n_nodes,
+        "max_depth":        forest.max_depth,
+        "bytes":            int(sum(getattr(forest, k).nbytes for k in ("left", "feature", "threshold", "value", "roots"))),
+        "latency_row_us":   round(row_us, 1),
+        "latency_batch_ms": round(batch_ms, 3),
+        "agreement":        round(float((forest.predict_proba(X_eval).argmax(axis=1) == reference).mean()), 4),
+        "accuracy":         None,
+    }
+    if test is not None:
+        X_test, y_test = test
+        predicted = forest.classes_[forest.predict_proba(X_test).argmax(axis=1)]
+        result["accuracy"] = round(float((predicted.astype(str) == y_test.astype(str)).mean()), 4)
+    return result
+
+
+def pareto_front(rows: list[dict], metric: str = "agreement") -> list[bool]:
+    """Rows not dominated in (bytes, latency_batch_ms) lower and ``metric`` higher."""
+    def key(r):
+        return (r["bytes"], r["latency_batch_ms"], -r[metric])
+    flags = []
+    for r in rows:
+        a = key(r)
+        flags.append(not any(
+            all(x <= y for x, y in zip(key(o), a)) and key(o) != a for o in rows
+        ))
+    return flags
+
+
+# ── Compaction ───────────────────────────────────────────────────────────────
+
+def compact(
+    artifacts: dict,
+    max_drop: float = DEFAULT_MAX_DROP,
+    test: tuple[np.ndarray, np.ndarray] | None = None,
+    n_samples: int = 20000,
+    tree_counts: list[int] | None = None,
+    depths=DEFAULT_DEPTHS,
+    distill_grid=DEFAULT_DISTILL,
+    seed: int = 0,
+) -> dict:
+    """
+    Build and measure compaction candidates for a model.joblib artifacts dict.
+
+    Returns ``{"baseline", "candidates", "chosen", "artifacts"}``: the full
+    forest's measurements, one row per candidate (with ``pareto`` and
+    ``within_budget`` flags), the name of the smallest candidate within
+    ``max_drop`` (or None) and an artifacts dict carrying its compiled
+    ``forest``, ready for save_model_arrays. The compacted artifacts are a
+    model of their own: ``trained_at`` gets a ``-compact-<candidate>``
+    suffix (so registry versions, caches and rasters never mix it up with
+    the source), and ``source_version`` / ``compacted_at`` record where and
+    when it came from. ``test_accuracy`` is the holdout accuracy of the
+    chosen candidate, or None without ``test``; ``source_agreement`` is its
+    agreement with the source forest.
+    """
+    if "model" not in artifacts:
+        raise ValueError("compaction needs the sklearn model of a model.joblib artifacts dict")
+    trees = forest_trees(artifacts["model"])
+    full  = _compile(artifacts, trees)
+
+    X_select = sample_inputs(artifacts, n_samples // 4, seed + 1)
+    X_eval   = sample_inputs(artifacts, n_samples, seed + 2)
+    reference = full.predict_proba(X_eval).argmax(axis=1)
+    baseline = {"name": "full forest", **measure(full, X_eval, reference, test)}
+
+    # Per-tree votes of the full forest on the selection sample
+    leaves   = full.apply(X_select)
+    per_tree = full.value[:, leaves].transpose(1, 2, 0)
+    target   = per_tree.sum(axis=1).argmax(axis=1)
+    if tree_counts is None:
+        tree_counts = sorted({max(1, round(len(trees) * f)) for f in _SUBSET_FRACTIONS})
+    tree_counts = [n for n in tree_counts if n < len(trees)]
+    order = select_trees(per_tree, target, max(tree_counts, default=0))
+    depth_limits = [None] + [d for d in depths if d < full.max_depth]
+
+    built: dict[str, tuple[list[dict], CompiledForest]] = {}
+    for n in [len(trees)] + tree_counts:
+        subset = trees if n == len(trees) else [trees[i] for i in sorted(order[:n])]
+        for depth in depth_limits:
+            cut = subset if depth is None else [truncate(t, depth) for t in subset]
+            for merged in (False, True):
+                if depth is None and n == len(trees) and not merged:
+                    continue                                  # the baseline itself
+                out = [merge_leaves(t) for t in cut] if merged else cut
+                name = f"trees={n} depth={depth or 'full'}" + (" merge" if merged else "")
+                built[name] = out
+
+    if distill_grid:
+        X_train = sample_inputs(artifacts, n_samples * 2, seed + 3)
+        labels  = full.predict_proba(X_train).argmax(axis=1)
+        for n_estimators, max_depth in distill_grid:
+            student = distill(artifacts, X_train, labels, n_estimators, max_depth, seed)
+            built[f"distill trees={n_estimators} depth={max_depth or 'full'}"] = student
+            built[f"distill trees={n_estimators} depth={max_depth or 'full'} merge"] = [
+                merge_leaves(t) for t in student
+            ]
+
+    forests, rows = {}, []
+    for name, candidate in built.items():
+        forests[name] = _compile(artifacts, candidate)
+        rows.append({"name": name, **measure(forests[name], X_eval, reference, test)})
+
+    metric = "agreement" if test is None else "accuracy"
+    for row, front in zip(rows, pareto_front(rows, metric)):
+        row["pareto"] = front
+        row["within_budget"] = (baseline[metric] if test is not None else 1.0) - row[metric] <= max_drop + 1e-12
+
+    ok = [r for r in rows if r["within_budget"]]
+    chosen = min(ok, key=lambda r: (r["bytes"], -r[metric]), default=None)
+    compacted = None
+    if chosen is not None:
+        compacted = {k: v for k, v in artifacts.items() if k not in ("model", "scaler", "registry_version")}
+        compacted["forest"] = forests[chosen["name"]]
+        candidate = re.sub(r"[^0-9a-z]+", "-", chosen["name"]).strip("-")
+        compacted["trained_at"] = f"{artifacts.get('trained_at') or 'untimestamped'}-compact-{candidate}"
+        compacted["source_version"] = artifacts.get("registry_version") or artifacts.get("trained_at")
+        compacted["compacted_at"] = datetime.now().isoformat(timespec="seconds")
+        # The source's test_accuracy was measured on the full forest, not this one
+        compacted["test_accuracy"] = chosen["accuracy"]
+        compacted["source_agreement"] = chosen["agreement"]
+    return {
+        "baseline":   baseline,
+        "candidates": rows,
+        "chosen":     None if chosen is None else chosen["name"],
+        "artifacts":  compacted,
+    }
+
+
+def _print_report(report: dict, max_drop: float):
+    metric = "agreement" if report["baseline"]["accuracy"] is None else "accuracy"
+    rows = [report["baseline"]] + sorted(report["candidates"], key=lambda r: r["bytes"])
+    print(f"{'':2}{'candidate':<32} {'trees':>5} {'nodes':>7} {'KiB':>8} {'row µs':>8} "
+          f"{'1k ms':>8} {'agree':>7} {'acc':>7}")
+    for r in rows:
+        mark = ">" if r["name"] == report["chosen"] else ("*" if r.get("pareto") else " ")
+        acc = "" if r["accuracy"] is None else f"{r['accuracy']:.4f}"
+        print(f"{mark} {r['name']:<32} {r['n_trees']:>5} {r['n_nodes']:>7} {r['bytes'] / 1024:>8.1f} "
+              f"{r['latency_row_us']:>8.1f} {r['latency_batch_ms']:>8.2f} {r['agreement']:>7.4f} {acc:>7}")
+    print(f"\n* Pareto front (size, latency, {metric})   > chosen (max drop {max_drop})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact or distill the trained forest.")
+    parser.add_argument("source", nargs="?", default=MODEL_PATH, help="model.joblib")
+    parser.add_argument("--out", default=COMPACT_ARRAYS_DIR, help="array export directory to write")
+    parser.add_argument("--max-drop", type=float, default=DEFAULT_MAX_DROP,
+                        help="largest allowed drop in holdout accuracy (or agreement without --test)")
+    parser.add_argument("--test", help=".npz holdout with raw feature rows X and class labels y")
+    parser.add_argument("--samples", type=int, default=20000, help="agreement sample size")
+    parser.add_argument("--no-distill", action="store_true", help="skip distilled candidates")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    import joblib
+    artifacts = joblib.load(args.source)
+    test = None
+    if args.test:
+        with np.load(args.test, allow_pickle=False) as data:
+            test = (np.asarray(data["X"], dtype=np.float64), np.asarray(data["y"]))
+
+    report = compact(artifacts, args.max_drop, test, n_samples=args.samples,
+                     distill_grid=() if args.no_distill else DEFAULT_DISTILL)
+    _print_report(report, args.max_drop)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({k: v for k, v in report.items() if k != "artifacts"}, f, indent=2)
+    if report["artifacts"] is None:
+        raise SystemExit("No candidate is within the allowed drop; nothing written.")
+    save_model_arrays(report["artifacts"], args.out)
+    print(f"Wrote {report['chosen']} to {os.path.abspath(args.out)}")
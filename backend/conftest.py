@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def artifacts():
+    """Synthetic model.joblib-shaped artifacts shared by the whole test session."""
+    from synthetic_model import make_synthetic_artifacts
+    return make_synthetic_artifacts(n_samples=3000, n_estimators=60, seed=0)
+
+
+@pytest.fixture
+def server(artifacts, monkeypatch):
+    """fast_server module with the synthetic model loaded."""
+    import fast_server
+    from geocode_cache import GeocodeCache
+    from prediction_cache import PredictionCache
+    monkeypatch.setattr(fast_server, "model_artifacts", artifacts)
+    monkeypatch.setattr(fast_server, "prediction_cache", PredictionCache())
+    monkeypatch.setattr(fast_server, "geocode_cache", GeocodeCache(":memory:"))
+    return fast_server
+
+
+@pytest.fixture
+def client(server):
+    from fastapi.testclient import TestClient
+    return TestClient(server.app)
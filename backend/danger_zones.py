@@ -0,0 +1,458 @@
+"""
+Live danger zones from verified incident reports.
+
+Reports fall into a grid of cells about ``cell_km`` wide. Each one adds a
+weight (by incident type) that halves every ``half_life_hours``. A cell
+whose decayed weight reaches ``min_weight`` is a core cell, and 8-connected
+core cells form one zone: DBSCAN on the grid, with the cell width as eps and
+``min_weight`` as the minimum number of (weighted, recent) reports.
+
+Weights use forward decay: a report of weight w at time t is stored as
+``w * 2**((t - epoch) / h)`` and read at ``now`` by multiplying with
+``2**(-(now - epoch) / h)``. Stored values never change as time passes, so a
+zone's totals (weight, weighted centroid, weight per incident type) are
+plain sums over its cells, updated by each report's delta. Without new
+reports a cell's decayed weight only falls, so the order in which cells
+stop being core is the order of their stored weights; a heap keyed on that
+drives expiry. When a cell stops being core only its own zone is checked
+for a split, so no step ever recomputes the whole grid.
+
+Memory is bounded: cells whose decayed weight falls below ``prune_weight``
+are dropped, at most ``max_cells`` cells are kept (the lightest go first)
+and report ids are remembered for de-duplication up to ``max_ids``.
+Individual reports are never stored.
+
+synthetic_reports() generates report streams (hotspots plus scattered
+noise) for tests and benchmarks.
+"""
+
+import heapq
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Relative weight of a report by incident type (others count 1)
+TYPE_WEIGHTS = {
+    "GLOF": 3.0, "Earthquake": 3.0, "Flash Flood": 2.0, "Flood": 2.0,
+    "Landslide": 2.0, "Avalanche": 2.0,
+}
+
+DEFAULT_CELL_KM      = 2.0
+DEFAULT_HALF_LIFE_H  = 72.0
+DEFAULT_MIN_WEIGHT   = 3.0
+DEFAULT_PRUNE_WEIGHT = 0.05
+DEFAULT_MAX_CELLS    = 50000
+DEFAULT_MAX_IDS      = 200000
+
+# Zone severity (decayed weight) as a multiple of min_weight -> risk level, as RiskMap.tsx colours them
+RISK_LEVELS = ((4.0, "Critical"), (2.0, "High"), (0.0, "Medium"))
+
+_KM_PER_DEG = 111.32
+_REF_LAT    = 35.85          # Gilgit-Baltistan; sets the longitude width of a cell
+_RESCALE_AT = 64.0           # half-lives since the epoch before stored values are rescaled
+_NEIGHBOURS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+# South-west and north-east corners of the region synthetic reports are drawn in
+_REGION = ((34.6, 72.5), (37.1, 77.8))
+
+
+class _Cell:
+    __slots__ = ("w", "lat_w", "lon_w", "types", "count", "last", "zone", "stamp")
+
+    def __init__(self):
+        self.w = self.lat_w = self.lon_w = 0.0
+        self.types: dict[str, float] = {}
+        self.count = 0
+        self.last  = -math.inf
+        self.zone: int | None = None
+        self.stamp = 0
+
+
+class _Zone:
+    __slots__ = ("cells", "w", "lat_w", "lon_w", "types", "count", "last", "first", "geometry")
+
+    def __init__(self, first: float):
+        self.cells: set[tuple[int, int]] = set()
+        self.w = self.lat_w = self.lon_w = 0.0
+        self.types: dict[str, float] = {}
+        self.count = 0
+        self.last  = -math.inf
+        self.first = first
+        self.geometry: dict | None = None       # cached bbox / hull; reset when cells change
+
+    def add(self, c: _Cell):
+        self.w += c.w
+        self.lat_w += c.lat_w
+        self.lon_w += c.lon_w
+        for t, v in c.types.items():
+            self.types[t] = self.types.get(t, 0.0) + v
+        self.count += c.count
+        self.last = max(self.last, c.last)
+
+
+class DangerZoneEngine:
+    def __init__(
+        self,
+        cell_km: float = DEFAULT_CELL_KM,
+        half_life_hours: float = DEFAULT_HALF_LIFE_H,
+        min_weight: float = DEFAULT_MIN_WEIGHT,
+        prune_weight: float = DEFAULT_PRUNE_WEIGHT,
+        max_cells: int = DEFAULT_MAX_CELLS,
+        max_ids: int = DEFAULT_MAX_IDS,
+        type_weights: dict[str, float] | None = None,
+        label=None,
+    ):
+        if not 0 < prune_weight < min_weight:
+            raise ValueError("need 0 < prune_weight < min_weight")
+        self.cell_km    = cell_km
+        self.dlat       = cell_km / _KM_PER_DEG
+        self.dlon       = cell_km / (_KM_PER_DEG * math.cos(math.radians(_REF_LAT)))
+        self.half_life  = half_life_hours * 3600.0
+        self.min_weight = min_weight
+        self.prune_weight = prune_weight
+        self.max_cells  = max_cells
+        self.max_ids    = max_ids
+        self.type_weights = TYPE_WEIGHTS if type_weights is None else type_weights
+        self.label      = label              # (lat, lon) -> place name for a zone, optional
+
+        self.epoch = None                    # forward-decay reference time
+        self.clock = -math.inf               # latest time seen
+        self.cells: dict[tuple[int, int], _Cell] = {}
+        self.zones: dict[int, _Zone] = {}
+        self._next_zone = 0
+        self._core_heap:  list = []          # (stored w, key, stamp) of core cells
+        self._prune_heap: list = []          # (stored w, key, stamp) of every cell
+        self._ids: OrderedDict = OrderedDict()
+        self.version = 0                     # bumped whenever a zone appears, changes or goes
+
+    # ── Time ─────────────────────────────────────────────────────────────────
+
+    def _scale(self, t: float) -> float:
+        return 2.0 ** ((t - self.epoch) / self.half_life)
+
+    def _rescale(self, now: float):
+        """Move the epoch to ``now`` so stored values stay in floating-point range."""
+        f = 1.0 / self._scale(now)
+        for c in self.cells.values():
+            c.w *= f
+            c.lat_w *= f
+            c.lon_w *= f
+            c.types = {t: v * f for t, v in c.types.items()}
+        for z in self.zones.values():
+            z.w *= f
+            z.lat_w *= f
+            z.lon_w *= f
+            z.types = {t: v * f for t, v in z.types.items()}
+        self.epoch = now
+        self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        self._core_heap  = [(c.w, k, c.stamp) for k, c in self.cells.items() if c.zone is not None]
+        self._prune_heap = [(c.w, k, c.stamp) for k, c in self.cells.items()]
+        heapq.heapify(self._core_heap)
+        heapq.heapify(self._prune_heap)
+
+    def advance(self, now: float | None = None):
+        """Expire core cells and drop faded cells up to ``now`` (default: wall clock)."""
+        now = time.time() if now is None else now
+        if self.epoch is None:
+            self.epoch = now
+        self.clock = max(self.clock, now)
+        if (self.clock - self.epoch) / self.half_life > _RESCALE_AT:
+            self._rescale(self.clock)
+
+        scale = self._scale(self.clock)
+        core_below, prune_below = self.min_weight * scale, self.prune_weight * scale
+        while self._core_heap and self._core_heap[0][0] < core_below:
+            _, key, stamp = heapq.heappop(self._core_heap)
+            c = self.cells.get(key)
+            if c is not None and c.stamp == stamp and c.zone is not None:
+                self._uncore(key, c)
+        while self._prune_heap and self._prune_heap[0][0] < prune_below:
+            _, key, stamp = heapq.heappop(self._prune_heap)
+            c = self.cells.get(key)
+            if c is not None and c.stamp == stamp:
+                self._drop(key, c)
+
+    # ── Ingest ───────────────────────────────────────────────────────────────
+
+    def ingest(self, reports, now: float | None = None) -> dict:
+        """
+        Add reports: dicts with ``lat``, ``lng``, ``type``, ``time`` (Unix
+        seconds) and optionally ``id`` (repeats are ignored) and ``weight``
+        (multiplies the type weight). Returns how many were accepted,
+        duplicates, invalid (no usable coordinates) or too old to count.
+        """
+        now = time.time() if now is None else now
+        self.advance(now)
+        counts = {"accepted": 0, "duplicates": 0, "invalid": 0, "stale": 0}
+        prune_below = self.prune_weight * self._scale(self.clock)
+        for r in reports:
+            rid = r.get("id")
+            if rid is not None and rid in self._ids:
+                counts["duplicates"] += 1
+                continue
+            try:
+                lat, lon = float(r["lat"]), float(r["lng"])
+            except (KeyError, TypeError, ValueError):
+                counts["invalid"] += 1
+                continue
+            if not (math.isfinite(lat) and math.isfinite(lon)):
+                counts["invalid"] += 1
+                continue
+            t = min(float(r.get("time", self.clock)), self.clock)
+            kind = str(r.get("type") or "Unknown")
+            w = self.type_weights.get(kind, 1.0) * float(r.get("weight", 1.0)) * self._scale(t)
+            if w < prune_below:
+                counts["stale"] += 1
+                continue
+            if rid is not None:
+                self._ids[rid] = None
+                if len(self._ids) > self.max_ids:
+                    self._ids.popitem(last=False)
+            self._add(lat, lon, kind, t, w)
+            counts["accepted"] += 1
+
+        if len(self._prune_heap) > 2 * len(self.cells) + 1024:
+            self._rebuild_heaps()                 # drop stale heap entries
+        return counts
+
+    def _add(self, lat: float, lon: float, kind: str, t: float, w: float):
+        key = (math.floor(lat / self.dlat), math.floor(lon / self.dlon))
+        c = self.cells.get(key)
+        if c is None:
+            c = self.cells[key] = _Cell()
+            if len(self.cells) > self.max_cells:
+                self._evict_lightest(keep=key)
+        c.w     += w
+        c.lat_w += lat * w
+        c.lon_w += lon * w
+        c.types[kind] = c.types.get(kind, 0.0) + w
+        c.count += 1
+        c.last   = max(c.last, t)
+        c.stamp += 1
+        heapq.heappush(self._prune_heap, (c.w, key, c.stamp))
+
+        if c.zone is not None:
+            z = self.zones[c.zone]
+            z.w     += w
+            z.lat_w += lat * w
+            z.lon_w += lon * w
+            z.types[kind] = z.types.get(kind, 0.0) + w
+            z.count += 1
+            z.last   = max(z.last, t)
+            heapq.heappush(self._core_heap, (c.w, key, c.stamp))
+            self.version += 1
+        elif c.w >= self.min_weight * self._scale(self.clock):
+            self._core(key, c)
+
+    def _evict_lightest(self, keep):
+        while self._prune_heap:
+            _, key, stamp = heapq.heappop(self._prune_heap)
+            c = self.cells.get(key)
+            if c is not None and c.stamp == stamp and key != keep:
+                self._drop(key, c)
+                return
+
+    # ── Zone maintenance ─────────────────────────────────────────────────────
+
+    def _core(self, key, c: _Cell):
+        """``key`` became a core cell: start a zone or join (and merge) its neighbours' zones."""
+        r, col = key
+        near = {self.cells[n].zone for n in ((r + dr, col + dc) for dr, dc in _NEIGHBOURS)
+                if n in self.cells and self.cells[n].zone is not None}
+        if not near:
+            zid = self._next_zone
+            self._next_zone += 1
+            self.zones[zid] = _Zone(first=c.last)
+        else:
+            zid = max(near, key=lambda z: len(self.zones[z].cells))
+            for other in near - {zid}:
+                gone = self.zones.pop(other)
+                for k in gone.cells:
+                    self.cells[k].zone = zid
+                self.zones[zid].cells |= gone.cells
+                self.zones[zid].add(gone)
+                self.zones[zid].first = min(self.zones[zid].first, gone.first)
+        z = self.zones[zid]
+        z.cells.add(key)
+        z.add(c)
+        z.geometry = None
+        c.zone = zid
+        heapq.heappush(self._core_heap, (c.w, key, c.stamp))
+        self.version += 1
+
+    def _uncore(self, key, c: _Cell):
+        """``key`` stopped being core: leave its zone, which may fall apart into several."""
+        zid, c.zone = c.zone, None
+        z = self.zones[zid]
+        z.cells.discard(key)
+        self.version += 1
+        if not z.cells:
+            del self.zones[zid]
+            return
+
+        # Connected components of what is left; the first keeps the zone id
+        left, parts = set(z.cells), []
+        while left:
+            seed = left.pop()
+            part, stack = {seed}, [seed]
+            while stack:
+                r, col = stack.pop()
+                for dr, dc in _NEIGHBOURS:
+                    n = (r + dr, col + dc)
+                    if n in left:
+                        left.discard(n)
+                        part.add(n)
+                        stack.append(n)
+            parts.append(part)
+
+        first = z.first
+        del self.zones[zid]
+        for i, part in enumerate(parts):
+            new_id = zid if i == 0 else self._next_zone
+            if i:
+                self._next_zone += 1
+            piece = self.zones[new_id] = _Zone(first=first)
+            piece.cells = part
+            for k in part:
+                self.cells[k].zone = new_id
+                piece.add(self.cells[k])
+
+    def _drop(self, key, c: _Cell):
+        if c.zone is not None:
+            self._uncore(key, c)
+        del self.cells[key]
+
+    # ── Output ───────────────────────────────────────────────────────────────
+
+    def _geometry(self, z: _Zone) -> dict:
+        if z.geometry is None:
+            keys  = np.array(sorted(z.cells), dtype=np.float64)
+            south, west = keys.min(axis=0) * (self.dlat, self.dlon)
+            north, east = (keys.max(axis=0) + 1) * (self.dlat, self.dlon)
+            corners = np.concatenate([(keys + off) * (self.dlat, self.dlon)
+                                      for off in ((0, 0), (0, 1), (1, 0), (1, 1))])
+            hull = _convex_hull(corners)
+            z.geometry = {
+                "bbox":    [round(float(v), 5) for v in (south, west, north, east)],
+                "polygon": [[round(lat, 5), round(lon, 5)] for lat, lon in hull],
+                "corners": corners,
+            }
+        return z.geometry
+
+    def zones_at(self, now: float | None = None) -> list[dict]:
+        """Current zones, most severe first, in the /danger-zones shape plus geometry."""
+        self.advance(now)
+        decay = 1.0 / self._scale(self.clock)
+        out = []
+        for zid, z in self.zones.items():
+            lat, lon = z.lat_w / z.w, z.lon_w / z.w
+            severity = z.w * decay
+            geometry = self._geometry(z)
+            corners = geometry["corners"]
+            radius = float(np.max(_km(lat, lon, corners[:, 0], corners[:, 1])))
+            kind = max(z.types, key=z.types.get)
+            out.append({
+                "id":          zid,
+                "lat":         round(lat, 5),
+                "lng":         round(lon, 5),
+                "type":        kind,
+                "risk":        next(level for k, level in RISK_LEVELS if severity >= k * self.min_weight),
+                "location":    self.label(lat, lon) if self.label else f"{lat:.3f}, {lon:.3f}",
+                "event_count": z.count,
+                "severity":    round(severity, 2),
+                "types":       {t: round(v * decay, 2) for t, v in sorted(z.types.items(), key=lambda kv: -kv[1])},
+                "radius_km":   round(radius, 2),
+                "bbox":        geometry["bbox"],
+                "polygon":     geometry["polygon"],
+                "cells":       len(z.cells),
+                "first_report": z.first,
+                "last_report":  z.last,
+                "source":      "reports",
+            })
+        out.sort(key=lambda d: -d["severity"])
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "cells":      len(self.cells),
+            "zones":      len(self.zones),
+            "heap":       len(self._core_heap) + len(self._prune_heap),
+            "report_ids": len(self._ids),
+            "version":    self.version,
+        }
+
+
+def _km(lat, lon, lats, lons) -> np.ndarray:
+    """Equirectangular distance in km (accurate to well under 1% at zone scale)."""
+    dy = (np.asarray(lats) - lat) * _KM_PER_DEG
+    dx = (np.asarray(lons) - lon) * _KM_PER_DEG * math.cos(math.radians(lat))
+    return np.hypot(dx, dy)
+
+
+def _convex_hull(points: np.ndarray) -> list[tuple[float, float]]:
+    """Monotone-chain hull of (lat, lon) points, counter-clockwise in (lon, lat)."""
+    pts = sorted({(float(a), float(b)) for a, b in points}, key=lambda p: (p[1], p[0]))
+
+    def cross(o, a, b):
+        return (a[1] - o[1]) * (b[0] - o[0]) - (a[0] - o[0]) * (b[1] - o[1])
+
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def synthetic_reports(
+    n: int,
+    seed: int = 0,
+    hotspots: int = 20,
+    noise: float = 0.3,
+    start: float = 0.0,
+    hours: float = 24 * 30,
+    spread_km: float = 2.0,
+) -> list[dict]:
+    """
+    ``n`` reports sorted by time over ``hours`` from ``start``: a ``noise``
+    share scattered over Gilgit-Baltistan, the rest around ``hotspots``
+    random centres (normal, ``spread_km`` wide), each active for a random
+    window of the period with one dominant incident type.
+    """
+    rng = np.random.default_rng(seed)
+    (south, west), (north, east) = _REGION
+    kinds = list(TYPE_WEIGHTS) + ["Other"]
+    centre = np.column_stack([rng.uniform(south, north, hotspots), rng.uniform(west, east, hotspots)])
+    begin  = rng.uniform(0, hours * 0.8, hotspots)
+    length = rng.uniform(hours * 0.05, hours * 0.3, hotspots)
+    kind   = rng.integers(0, len(kinds), hotspots)
+
+    is_noise = rng.random(n) < noise
+    h = rng.integers(0, hotspots, n)
+    lat = np.where(is_noise, rng.uniform(south, north, n),
+                   centre[h, 0] + rng.normal(0, spread_km / _KM_PER_DEG, n))
+    lon = np.where(is_noise, rng.uniform(west, east, n),
+                   centre[h, 1] + rng.normal(0, spread_km / (_KM_PER_DEG * 0.81), n))
+    t = np.where(is_noise, rng.uniform(0, hours, n), begin[h] + rng.uniform(0, 1, n) * length[h])
+    k = np.where(is_noise | (rng.random(n) < 0.1), rng.integers(0, len(kinds), n), kind[h])
+
+    order = np.argsort(t, kind="stable")
+    return [
+        {
+            "id":      f"r{i}",
+            "lat":     round(float(lat[i]), 5),
+            "lng":     round(float(lon[i]), 5),
+            "type":    kinds[int(k[i])],
+            "time":    start + float(t[i]) * 3600.0,
+            "hotspot": -1 if is_noise[i] else int(h[i]),
+        }
+        for i in order
+    ]
@@ -0,0 +1,346 @@
+"""
+District lookup from coordinates: point-in-polygon over district boundaries.
+
+Boundaries come from a GeoJSON FeatureCollection (default
+``data/districts.geojson``) whose features carry the district name in
+``properties.district`` (or ``name``) and a Polygon or MultiPolygon geometry.
+
+DistrictIndex lays a regular lat/lon grid over the boundaries. A cell that no
+boundary edge touches lies wholly inside one district (or outside all of
+them) and stores that answer directly; a cell crossed by edges lists the
+polygons whose edges cross it. A lookup is therefore one array read for
+most points, and an even-odd ray-crossing test against a few polygons near
+borders. locate() resolves whole arrays of points: border points are grouped
+per candidate polygon and each group is tested against that polygon's edges
+in one NumPy expression.
+
+The bundled file is an approximation: the Voronoi cells of the gazetteer's
+places (nearest named place, longitude scaled by cos(latitude)), dissolved
+per district and clipped to the Gilgit-Baltistan bounding box. Regenerate it
+with ``python districts.py build`` or point GBDMS_DISTRICTS_PATH at
+surveyed boundaries.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+DISTRICTS_PATH = os.path.join(_HERE, "data", "districts.geojson")
+
+# south, west, north, east (as risk_tiles.REGION_BBOX)
+REGION_BBOX = (34.6, 72.5, 37.1, 77.8)
+
+DEFAULT_CELL_DEG = 0.05
+
+# Grid cell states besides a district index
+_OUTSIDE = -1
+_BORDER  = -2
+
+
+def load_boundaries(path: str = DISTRICTS_PATH) -> list[tuple[str, list[np.ndarray]]]:
+    """``(district, rings)`` per polygon of a GeoJSON file; rings are (k, 2) lon/lat arrays."""
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+    polygons = []
+    for feature in collection["features"]:
+        props = feature.get("properties") or {}
+        name  = props.get("district") or props.get("name")
+        geom  = feature["geometry"]
+        parts = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        if geom["type"] not in ("Polygon", "MultiPolygon"):
+            raise ValueError(f"unsupported geometry {geom['type']!r} for {name}")
+        for rings in parts:
+            polygons.append((str(name), [np.asarray(r, dtype=np.float64)[:, :2] for r in rings]))
+    return polygons
+
+
+class DistrictIndex:
+    def __init__(self, polygons: list[tuple[str, list[np.ndarray]]], cell_deg: float = DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.names    = sorted({name for name, _ in polygons})
+        self.poly_district = np.array([self.names.index(name) for name, _ in polygons], dtype=np.intp)
+
+        # Edges of every polygon (all rings; even-odd handles holes): x0, y0, x1, y1, dx/dy.
+        # Horizontal edges never cross a test ray but still make their cells border cells.
+        self.edges, spans = [], []
+        for _, rings in polygons:
+            start = np.concatenate([r for r in rings])
+            end   = np.concatenate([np.roll(r, -1, axis=0) for r in rings])
+            spans.append((start, end))
+            keep  = start[:, 1] != end[:, 1]
+            x0, y0 = start[keep, 0], start[keep, 1]
+            x1, y1 = end[keep, 0], end[keep, 1]
+            self.edges.append((x0, y0, x1, y1, (x1 - x0) / (y1 - y0)))
+
+        points = np.concatenate([r for _, rings in polygons for r in rings])
+        self.lon0, self.lat0 = points.min(axis=0) - cell_deg
+        lon1, lat1 = points.max(axis=0) + cell_deg
+        self.n_rows = int(np.ceil((lat1 - self.lat0) / cell_deg))
+        self.n_cols = int(np.ceil((lon1 - self.lon0) / cell_deg))
+
+        # Cells touched by some edge (conservatively: by the edge's bounding box)
+        touched: dict[int, set[int]] = {}
+        for p, (start, end) in enumerate(spans):
+            r0, c0 = self._cell(np.minimum(start[:, 1], end[:, 1]), np.minimum(start[:, 0], end[:, 0]))
+            r1, c1 = self._cell(np.maximum(start[:, 1], end[:, 1]), np.maximum(start[:, 0], end[:, 0]))
+            for a, b, c, d in zip(r0, r1, c0, c1):
+                for row in range(a, b + 1):
+                    for key in range(row * self.n_cols + c, row * self.n_cols + d + 1):
+                        touched.setdefault(key, set()).add(p)
+
+        # Untouched cells: whatever contains their centre contains all of them
+        rows, cols = np.divmod(np.arange(self.n_rows * self.n_cols), self.n_cols)
+        self.grid = self._test_all(self.lat0 + (rows + 0.5) * cell_deg, self.lon0 + (cols + 0.5) * cell_deg)
+        self.border: dict[int, np.ndarray] = {}
+        for key, polys in touched.items():
+            self.grid[key] = _BORDER
+            self.border[key] = np.array(sorted(polys), dtype=np.intp)
+
+    @classmethod
+    def load(cls, path: str = DISTRICTS_PATH, cell_deg: float = DEFAULT_CELL_DEG) -> "DistrictIndex":
+        return cls(load_boundaries(path), cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _cell(self, lat, lon) -> tuple[np.ndarray, np.ndarray]:
+        row = np.floor((np.asarray(lat) - self.lat0) / self.cell_deg).astype(np.int64)
+        col = np.floor((np.asarray(lon) - self.lon0) / self.cell_deg).astype(np.int64)
+        return row, col
+
+    def _inside(self, p: int, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Even-odd test of points against polygon ``p``."""
+        x0, y0, x1, y1, slope = self.edges[p]
+        y = lat[:, None]
+        crosses = (y0 > y) != (y1 > y)
+        x_at = x0 + (y - y0) * slope
+        return (crosses & (lon[:, None] < x_at)).sum(axis=1) % 2 == 1
+
+    def _test_all(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        out = np.full(len(lat), _OUTSIDE, dtype=np.intp)
+        for p in range(len(self.edges)):
+            out[self._inside(p, lat, lon)] = self.poly_district[p]
+        return out
+
+    def locate(self, lat, lon) -> np.ndarray:
+        """District index (into ``names``) of every point; -1 outside all districts."""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        if lat.size == 1:
+            return np.array([self._locate_one(float(lat[0]), float(lon[0]))], dtype=np.intp)
+        row, col = self._cell(lat, lon)
+        inside = (row >= 0) & (row < self.n_rows) & (col >= 0) & (col < self.n_cols)
+        key = np.where(inside, row * self.n_cols + col, 0)
+        out = np.where(inside, self.grid[key], _OUTSIDE)
+
+        border = np.flatnonzero(out == _BORDER)
+        if border.size:
+            out[border] = _OUTSIDE
+            # Border points grouped by cell, then every (cell's points, candidate polygon) pair tested
+            keys, inverse, counts = np.unique(key[border], return_inverse=True, return_counts=True)
+            order  = border[np.argsort(inverse, kind="stable")]
+            starts = np.concatenate([[0], np.cumsum(counts)])
+            groups: dict[int, list[np.ndarray]] = {}
+            for i, k in enumerate(keys):
+                members = order[starts[i]:starts[i + 1]]
+                for p in self.border[int(k)]:
+                    groups.setdefault(int(p), []).append(members)
+            for p, members in groups.items():
+                members = np.concatenate(members)
+                hit = members[self._inside(p, lat[members], lon[members])]
+                out[hit] = self.poly_district[p]
+        return out
+
+    def _locate_one(self, lat: float, lon: float) -> int:
+        row = math.floor((lat - self.lat0) / self.cell_deg)
+        col = math.floor((lon - self.lon0) / self.cell_deg)
+        if not (0 <= row < self.n_rows and 0 <= col < self.n_cols):
+            return _OUTSIDE
+        key = row * self.n_cols + col
+        found = int(self.grid[key])
+        if found != _BORDER:
+            return found
+        point_lat, point_lon = np.array([lat]), np.array([lon])
+        for p in self.border[key]:
+            if self._inside(p, point_lat, point_lon)[0]:
+                return int(self.poly_district[p])
+        return _OUTSIDE
+
+    def district(self, lat: float, lon: float) -> str | None:
+        """Name of the district containing one point, or None."""
+        i = int(self.locate(lat, lon)[0])
+        return self.names[i] if i >= 0 else None
+
+
+def district_codes(classes) -> dict[str, int]:
+    """Name-to-code dict for a model's district encoder classes (sorted LabelEncoder order)."""
+    return {str(name): i for i, name in enumerate(classes)}
+
+
+def encode_districts(lat, lon, names, codes: dict[str, int], index: DistrictIndex | None) -> np.ndarray:
+    """
+    Model district codes for many points: the district containing each
+    point when ``index`` resolves it to a district the model knows, else the
+    given name, else the middle code (the neutral fallback the model was
+    served with before coordinates were used).
+    """
+    fallback = len(codes) // 2
+    n = len(names)
+    given = np.fromiter((codes.get(name, fallback) for name in names), dtype=np.int64, count=n)
+    if index is None or not codes:
+        return given
+    found = index.locate(lat, lon) if n else np.empty(0, dtype=np.intp)
+    known = np.array([codes.get(name, -1) for name in index.names] + [-1], dtype=np.int64)
+    code  = known[found]                              # -1 (outside) indexes the trailing -1
+    return np.where(code >= 0, code, given)
+
+
+# ── Bundled approximate boundaries ───────────────────────────────────────────
+
+def approximate_boundaries(places: list[dict], bbox=REGION_BBOX, digits: int = 5) -> dict:
+    """
+    GeoJSON FeatureCollection with one MultiPolygon per district: the
+    Voronoi cells of ``places`` (dicts with ``lat``, ``lon``, ``district``)
+    clipped to ``bbox`` and merged per district. Needs scipy.
+    """
+    from scipy.spatial import Voronoi
+
+    south, west, north, east = bbox
+    k = np.cos(np.radians((south + north) / 2))      # equal-distance scaling of longitude
+    seen, pts, district = set(), [], []
+    for p in places:
+        key = (round(p["lat"], 4), round(p["lon"], 4))
+        if key not in seen:
+            seen.add(key)
+            pts.append((p["lon"] * k, p["lat"]))
+            district.append(p["district"])
+    # Far-away sentinels close every real cell
+    far = 100.0
+    cx, cy = (west + east) / 2 * k, (south + north) / 2
+    sentinels = [(cx - far, cy - far), (cx + far, cy - far), (cx + far, cy + far), (cx - far, cy + far)]
+    vor = Voronoi(np.array(pts + sentinels))
+
+    edges: dict[str, dict[tuple, tuple]] = {}
+    for i, name in enumerate(district):
+        region = vor.regions[vor.point_region[i]]
+        cell = _clip_box(vor.vertices[region], west * k, south, east * k, north)
+        if len(cell) < 3:
+            continue
+        if _area(cell) < 0:
+            cell = cell[::-1]
+        ring = [(round(x / k, digits), round(y, digits)) for x, y in cell]
+        own = edges.setdefault(name, {})
+        for a, b in zip(ring, ring[1:] + ring[:1]):
+            if a == b:
+                continue
+            if (b, a) in own:                          # shared with a cell of the same district
+                del own[(b, a)]
+            else:
+                own[(a, b)] = (a, b)
+
+    features = []
+    for name in sorted(edges):
+        rings = _chain(list(edges[name]))
+        outers = [r for r in rings if _area(np.array(r)) > 0]
+        holes  = [r for r in rings if _area(np.array(r)) <= 0]
+        polygons = [[o] for o in outers]
+        for h in holes:
+            for poly in polygons:
+                if _ring_contains(poly[0], h[0]):
+                    poly.append(h)
+                    break
+        features.append({
+            "type": "Feature",
+            "properties": {"district": name},
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [[[list(v) for v in r + r[:1]] for r in poly] for poly in polygons],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _clip_box(poly: np.ndarray, x0: float, y0: float, x1: float, y1: float) -> list[tuple]:
+    """Sutherland-Hodgman clip of a convex polygon to a box; crossing points are order-independent."""
+    pts = [tuple(p) for p in poly]
+    for axis, bound, keep_low in ((0, x0, False), (0, x1, True), (1, y0, False), (1, y1, True)):
+        def inside(p):
+            return p[axis] <= bound if keep_low else p[axis] >= bound
+        out = []
+        for a, b in zip(pts, pts[1:] + pts[:1]):
+            if inside(a):
+                out.append(a)
+            if inside(a) != inside(b):
+                lo, hi = sorted((a, b))
+                t = (bound - lo[axis]) / (hi[axis] - lo[axis])
+                out.append(tuple(lo[i] + t * (hi[i] - lo[i]) if i != axis else bound for i in (0, 1)))
+        pts = out
+        if not pts:
+            break
+    return pts
+
+
+def _area(ring) -> float:
+    ring = np.asarray(ring, dtype=np.float64)
+    x, y = ring[:, 0], ring[:, 1]
+    return float((x * np.roll(y, -1) - np.roll(x, -1) * y).sum() / 2)
+
+
+def _chain(directed: list[tuple]) -> list[list[tuple]]:
+    """Join directed boundary edges into closed rings."""
+    nxt: dict[tuple, list[tuple]] = {}
+    for a, b in directed:
+        nxt.setdefault(a, []).append(b)
+    rings = []
+    while nxt:
+        start = next(iter(nxt))
+        ring, v = [start], start
+        while True:
+            targets = nxt[v]
+            w = targets.pop()
+            if not targets:
+                del nxt[v]
+            if w == start:
+                break
+            ring.append(w)
+            v = w
+        rings.append(ring)
+    return rings
+
+
+def _ring_contains(ring: list[tuple], point: tuple) -> bool:
+    r = np.asarray(ring)
+    x0, y0 = r[:, 0], r[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    crosses = (y0 > point[1]) != (y1 > point[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x0 + (point[1] - y0) * (x1 - x0) / (y1 - y0)
+    return bool((crosses & (point[0] < x_at)).sum() % 2)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from gazetteer import GAZETTEER_PATH, Gazetteer
+
+    parser = argparse.ArgumentParser(description="Build or query district boundaries.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="write approximate boundaries from the gazetteer's places")
+    b.add_argument("--gazetteer", default=GAZETTEER_PATH)
+    b.add_argument("--out", default=DISTRICTS_PATH)
+    q = sub.add_parser("locate", help="print the district of a point")
+    q.add_argument("lat", type=float)
+    q.add_argument("lon", type=float)
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        places = [p for p in Gazetteer.load(args.gazetteer).places if p["class"] == "place"]
+        collection = approximate_boundaries(places)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(collection, f, separators=(",", ":"))
+        print(f"Wrote {len(collection['features'])} districts from {len(places)} places to {args.out}")
+    else:
+        print(DistrictIndex.load().district(args.lat, args.lon))
@@ -0,0 +1,376 @@
+"""
+Capacity-aware evacuation planning: population points to safe zones.
+
+Sending everyone to their nearest zone overloads the few zones close to a
+town. ``plan`` instead solves the transportation problem
+
+    minimise   sum people[i -> z] * distance_km[i, z]
+    subject to every point's people placed once, zone loads <= capacity
+
+as a min-cost flow: point -> each of its ``k`` nearest zones -> sink, plus a
+direct point -> sink arc ("stay") that costs more than any trip, so people
+are only left unassigned when every zone they can reach is full.
+
+The solver is cost-scaling push-relabel (Goldberg) with the usual
+heuristics, arranged for "many points, few zones":
+
+  - points are relabelled auction-style (Bertsekas): a point with people to
+    place sends all of them to its cheapest option and raises its price to
+    its second-best option plus ``eps``. All such points move at once in
+    one vectorised step per wave
+  - a zone over capacity sends the excess on to the sink while it has room
+    and otherwise returns the people that are cheapest to move elsewhere;
+    each zone keeps its holders in a heap ordered by exactly that, so a
+    wave costs time proportional to what moves, not to the number of points
+  - a global price update (shortest paths to the nodes still short of
+    people, in units of ``eps``) runs at the start of every scaling phase
+    and every ``_UPDATE_EVERY`` waves; on a bipartite graph with few zones
+    it is a handful of vectorised Bellman-Ford passes
+
+``eps`` is divided by ``_SCALE_FACTOR`` per phase, from the largest cost
+down to ``eps`` km; the final plan is within ``eps`` km per person of the
+optimum.
+"""
+
+import heapq
+
+import numpy as np
+
+from safe_zones import haversine_np
+
+DEFAULT_CANDIDATES = 10
+DEFAULT_EPS_KM     = 0.01
+_CHUNK        = 8192
+_SCALE_FACTOR = 8.0
+_UPDATE_EVERY = 250
+
+
+def _eps_schedule(scale: float, eps: float, factor: float = _SCALE_FACTOR) -> list[float]:
+    """Phase tolerances from about ``scale / factor`` down to ``eps`` (eps-scaling)."""
+    steps = [eps]
+    while steps[-1] * factor < scale / factor:
+        steps.append(steps[-1] * factor)
+    return steps[::-1]
+
+
+def candidate_zones(lat, lon, zone_lat, zone_lng, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """The ``k`` nearest zones of every point and their distances in km, shape (n, k)."""
+    n, z = len(lat), len(zone_lat)
+    k = min(k, z)
+    idx  = np.empty((n, k), dtype=np.int64)
+    dist = np.empty((n, k))
+    for start in range(0, n, _CHUNK):
+        sl = slice(start, start + _CHUNK)
+        d  = haversine_np(lat[sl, None], lon[sl, None], zone_lat[None, :], zone_lng[None, :])
+        near = np.argpartition(d, k - 1, axis=1)[:, :k] if k < z else np.broadcast_to(np.arange(z), d.shape)
+        idx[sl]  = near
+        dist[sl] = np.take_along_axis(d, near, axis=1)
+    return idx, dist
+
+
+def _heap_add(heap: list, key: np.ndarray, point: np.ndarray, slot: np.ndarray) -> None:
+    items = list(zip(key.tolist(), point.tolist(), slot.tolist()))
+    if len(items) * 4 > len(heap):
+        heap.extend(items)
+        heapq.heapify(heap)
+    else:
+        for item in items:
+            heapq.heappush(heap, item)
+
+
+class _Network:
+    """
+    Flow state. Prices follow the convention "push along (u, v) while
+    cost + price[v] < price[u]"; arc (u, v) is eps-optimal while
+    cost + price[v] - price[u] >= -eps.
+    """
+
+    def __init__(self, cand, cost, stay, people, capacity):
+        self.cand, self.cost, self.stay, self.capacity = cand, cost, stay, capacity
+        n, k = cand.shape
+        self.flow      = np.zeros((n, k), dtype=np.int64)
+        self.stay_flow = np.zeros(n, dtype=np.int64)
+        self.to_sink   = np.zeros(len(capacity), dtype=np.int64)
+        self.ex_p = people.copy()
+        self.ex_z = np.zeros(len(capacity), dtype=np.int64)
+        self.ex_t = -int(people.sum())
+        self.phi_p = np.zeros(n)
+        self.phi_z = np.zeros(len(capacity))
+        self.phi_t = 0.0
+        self.waves = 0
+        # Heaps of (price - cost, point, slot) per zone; slot -1 for "stay" flow into the sink
+        self.holders: list[list] = [[] for _ in range(len(capacity))]
+        self.stayers: list = []
+
+    # ── Phase start ───────────────────────────────────────────────────────────
+
+    def refine(self) -> None:
+        """Undo every unit of flow on an arc that is no longer optimal for the current prices."""
+        cand, cost, stay = self.cand, self.cost, self.stay
+        value = cost + self.phi_z[cand]
+        self.phi_p = np.minimum(value.min(axis=1), stay + self.phi_t)
+
+        bad = (self.flow > 0) & (value > self.phi_p[:, None])
+        self.ex_p += np.where(bad, self.flow, 0).sum(axis=1)
+        np.subtract.at(self.ex_z, cand[bad], self.flow[bad])
+        self.flow[bad] = 0
+
+        bad = (self.stay_flow > 0) & (stay + self.phi_t > self.phi_p)
+        self.ex_p[bad] += self.stay_flow[bad]
+        self.ex_t      -= int(self.stay_flow[bad].sum())
+        self.stay_flow[bad] = 0
+
+        room = self.capacity - self.to_sink
+        fill = (room > 0) & (self.phi_z > self.phi_t)
+        self.ex_z[fill] -= room[fill]
+        self.ex_t       += int(room[fill].sum())
+        self.to_sink[fill] = self.capacity[fill]
+        back = (self.to_sink > 0) & (self.phi_z < self.phi_t)
+        self.ex_z[back] += self.to_sink[back]
+        self.ex_t       -= int(self.to_sink[back].sum())
+        self.to_sink[back] = 0
+
+    def update_prices(self, eps: float) -> None:
+        """
+        Global price update: raise every price by ``eps`` times its distance to
+        the nearest node still short of people, counting each residual arc as
+        ``floor(reduced cost / eps) + 1``. Then rebuild the holder heaps, whose
+        keys all changed.
+        """
+        cand, cost, stay, flow = self.cand, self.cost, self.stay, self.flow
+        phi_p, phi_z, phi_t = self.phi_p, self.phi_z, self.phi_t
+
+        def length(reduced):
+            return np.maximum(np.floor(reduced / eps) + 1, 0)
+
+        hold_p, hold_s = np.nonzero(flow)
+        hold_z = cand[hold_p, hold_s]
+        stayed = np.flatnonzero(self.stay_flow)
+        l_pz = length(cost + phi_z[cand] - phi_p[:, None])
+        l_pt = length(stay + phi_t - phi_p)
+        l_zp = length(phi_p[hold_p] - cost[hold_p, hold_s] - phi_z[hold_z])
+        l_zt = np.where(self.to_sink < self.capacity, length(phi_t - phi_z), np.inf)
+        l_tz = np.where(self.to_sink > 0, length(phi_z - phi_t), np.inf)
+        l_tp = length(phi_p[stayed] - stay - phi_t)
+
+        d_p = np.where(self.ex_p < 0, 0.0, np.inf)
+        d_z = np.where(self.ex_z < 0, 0.0, np.inf)
+        d_t = 0.0 if self.ex_t < 0 else np.inf
+        while True:
+            new_p = np.minimum(d_p, np.minimum((l_pz + d_z[cand]).min(axis=1), l_pt + d_t))
+            new_z = np.minimum(d_z, l_zt + d_t)
+            np.minimum.at(new_z, hold_z, l_zp + new_p[hold_p])
+            new_t = min(d_t, (l_tz + new_z).min(initial=np.inf), (l_tp + new_p[stayed]).min(initial=np.inf))
+            if new_t == d_t and np.array_equal(new_p, d_p) and np.array_equal(new_z, d_z):
+                break
+            d_p, d_z, d_t = new_p, new_z, new_t
+
+        # Nodes that cannot reach a deficit all move up together, past everything that can
+        top = max(d_p[np.isfinite(d_p)].max(initial=0), d_z[np.isfinite(d_z)].max(initial=0),
+                  d_t if np.isfinite(d_t) else 0) + 1
+        self.phi_p += eps * np.where(np.isfinite(d_p), d_p, top)
+        self.phi_z += eps * np.where(np.isfinite(d_z), d_z, top)
+        self.phi_t += eps * (d_t if np.isfinite(d_t) else top)
+
+        self.holders = [[] for _ in range(len(self.capacity))]
+        order = np.argsort(hold_z, kind="stable")
+        bounds = np.searchsorted(hold_z[order], np.arange(len(self.capacity) + 1))
+        for z in range(len(self.capacity)):
+            sel = order[bounds[z]:bounds[z + 1]]
+            _heap_add(self.holders[z], self.phi_p[hold_p[sel]] - cost[hold_p[sel], hold_s[sel]], hold_p[sel], hold_s[sel])
+        self.stayers = []
+        _heap_add(self.stayers, self.phi_p[stayed] - stay, stayed, np.full(len(stayed), -1))
+
+    # ── Waves ─────────────────────────────────────────────────────────────────
+
+    def push_points(self, active: np.ndarray, eps: float) -> None:
+        """Every active point sends all its people to its cheapest option (the last column is "stay")."""
+        cand, cost = self.cand, self.cost
+        value = np.concatenate([cost[active] + self.phi_z[cand[active]],
+                                np.full((len(active), 1), self.stay + self.phi_t)], axis=1)
+        two  = np.argpartition(value, 1, axis=1)[:, :2]
+        v2   = np.take_along_axis(value, two, axis=1)
+        near = v2[:, 0] <= v2[:, 1]
+        best = np.where(near, two[:, 0], two[:, 1])
+        self.phi_p[active] = np.where(near, v2[:, 1], v2[:, 0]) + eps
+
+        amount = self.ex_p[active]
+        self.ex_p[active] = 0
+        stays = best == cand.shape[1]
+        p = active[stays]
+        if len(p):
+            self.stay_flow[p] += amount[stays]
+            self.ex_t         += int(amount[stays].sum())
+            _heap_add(self.stayers, self.phi_p[p] - self.stay, p, np.full(len(p), -1))
+
+        p, s, amount = active[~stays], best[~stays], amount[~stays]
+        if not len(p):
+            return
+        z = cand[p, s]
+        self.flow[p, s] += amount
+        np.add.at(self.ex_z, z, amount)
+        key   = self.phi_p[p] - cost[p, s]
+        order = np.argsort(z, kind="stable")
+        bounds = np.searchsorted(z[order], np.arange(len(self.capacity) + 1))
+        for zone in np.flatnonzero(np.diff(bounds)):
+            sel = order[bounds[zone]:bounds[zone + 1]]
+            _heap_add(self.holders[zone], key[sel], p[sel], s[sel])
+
+    def _release(self, heap: list, need: int, limit: float, moved: list) -> int:
+        """
+        Return up to ``need`` people from the holders in ``heap`` whose key is
+        below ``limit``, cheapest to move first. Stale entries (flow gone, or a
+        price that has risen since) are dropped or re-keyed on the way.
+        """
+        while heap:
+            key, p, s = heap[0]
+            f = int(self.flow[p, s]) if s >= 0 else int(self.stay_flow[p])
+            if f == 0:
+                heapq.heappop(heap)
+                continue
+            current = self.phi_p[p] - (self.cost[p, s] if s >= 0 else self.stay)
+            if current != key:
+                heapq.heapreplace(heap, (float(current), p, s))
+                continue
+            if need == 0 or key >= limit:
+                break
+            t = min(f, need)
+            if s >= 0:
+                self.flow[p, s] -= t
+            else:
+                self.stay_flow[p] -= t
+            self.ex_p[p] += t
+            need -= t
+            moved.append(p)
+            if t == f:
+                heapq.heappop(heap)
+        return need
+
+    def discharge_zones(self, eps: float, moved: list) -> None:
+        for z in np.flatnonzero(self.ex_z > 0).tolist():
+            room = int(self.capacity[z] - self.to_sink[z])
+            if room > 0 and self.phi_z[z] > self.phi_t:
+                t = min(int(self.ex_z[z]), room)
+                self.to_sink[z] += t
+                self.ex_z[z]    -= t
+                self.ex_t       += t
+                if self.ex_z[z] == 0:
+                    continue
+            heap = self.holders[z]
+            self.ex_z[z] = self._release(heap, int(self.ex_z[z]), self.phi_z[z], moved)
+            if self.ex_z[z] > 0:
+                floor = self.phi_t if self.to_sink[z] < self.capacity[z] else np.inf
+                self.phi_z[z] = min(floor, heap[0][0] if heap else np.inf) + eps
+
+    def discharge_sink(self, eps: float, moved: list) -> None:
+        if self.ex_t <= 0:
+            return
+        for z in np.flatnonzero((self.to_sink > 0) & (self.phi_z < self.phi_t)).tolist():
+            t = min(self.ex_t, int(self.to_sink[z]))
+            self.to_sink[z] -= t
+            self.ex_z[z]    += t
+            self.ex_t       -= t
+            if self.ex_t == 0:
+                return
+        self.ex_t = self._release(self.stayers, self.ex_t, self.phi_t, moved)
+        if self.ex_t > 0:
+            used = self.to_sink > 0
+            self.phi_t = min(self.phi_z[used].min(initial=np.inf),
+                             self.stayers[0][0] if self.stayers else np.inf) + eps
+
+    def solve(self, eps: float, max_waves: int) -> None:
+        finite = self.cost[np.isfinite(self.cost)]
+        for phase_eps in _eps_schedule(max(finite.max(initial=0.0), eps), eps):
+            self.refine()
+            self.update_prices(phase_eps)
+            active = np.flatnonzero(self.ex_p > 0)
+            since_update = 0
+            while len(active) or (self.ex_z > 0).any() or self.ex_t > 0:
+                self.waves += 1
+                if self.waves > max_waves:
+                    raise RuntimeError(f"evacuation plan did not converge in {max_waves} waves")
+                since_update += 1
+                if since_update == _UPDATE_EVERY:
+                    self.update_prices(phase_eps)
+                    since_update = 0
+                moved: list[int] = []
+                if len(active):
+                    self.push_points(active, phase_eps)
+                self.discharge_zones(phase_eps, moved)
+                self.discharge_sink(phase_eps, moved)
+                active = np.unique(np.array(moved, dtype=np.int64))
+
+
+def plan(
+    lat,
+    lon,
+    people,
+    zone_lat,
+    zone_lng,
+    capacity,
+    k: int = DEFAULT_CANDIDATES,
+    max_km: float | None = None,
+    eps: float = DEFAULT_EPS_KM,
+    max_waves: int = 1_000_000,
+) -> dict:
+    """
+    Assign ``people[i]`` at (``lat[i]``, ``lon[i]``) to zones with
+    ``capacity[z]``. Returns arrays
+
+      - ``point``, ``zone``, ``people``, ``distance_km``: one entry per
+        (point, zone) pair with people assigned, sorted by point
+      - ``unassigned``: people per point left without a zone
+      - ``load``: people per zone
+
+    and ``cost`` (person-km) and ``waves``.
+    """
+    lat      = np.asarray(lat, dtype=np.float64)
+    lon      = np.asarray(lon, dtype=np.float64)
+    people   = np.asarray(people, dtype=np.int64)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    n, n_zones = len(lat), len(capacity)
+
+    if n_zones:
+        cand, dist = candidate_zones(lat, lon, np.asarray(zone_lat, dtype=np.float64),
+                                     np.asarray(zone_lng, dtype=np.float64), k)
+    else:
+        cand, dist = np.zeros((n, 0), dtype=np.int64), np.zeros((n, 0))
+    usable = capacity[cand] > 0
+    if max_km is not None:
+        usable &= dist <= max_km
+    cost = np.where(usable, dist, np.inf)
+    # Staying put is worse than any trip, so people are only left over when their zones are full
+    stay = (float(cost[np.isfinite(cost)].max()) if usable.any() else 0.0) + 1.0
+
+    # Points without a single usable zone never enter the network
+    reachable = usable.any(axis=1)
+    net = _Network(cand, cost, stay, np.where(reachable, people, 0), capacity)
+    if reachable.any():
+        net.solve(eps, max_waves)
+
+    point, slot = np.nonzero(net.flow)
+    count = net.flow[point, slot]
+    zone  = cand[point, slot]
+    distance = dist[point, slot]
+    return {
+        "point":       point,
+        "zone":        zone,
+        "people":      count,
+        "distance_km": distance,
+        "unassigned":  np.where(reachable, net.stay_flow, people),
+        "load":        np.bincount(zone, weights=count, minlength=n_zones).astype(np.int64),
+        "cost":        float((count * distance).sum()),
+        "waves":       net.waves,
+    }
+
+
+def nearest_only(lat, lon, people, zone_lat, zone_lng) -> dict:
+    """Everyone to their nearest zone, ignoring capacity (what /routes does per person)."""
+    cand, dist = candidate_zones(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64),
+                                 np.asarray(zone_lat, dtype=np.float64), np.asarray(zone_lng, dtype=np.float64), 1)
+    people = np.asarray(people, dtype=np.int64)
+    return {
+        "zone":  cand[:, 0],
+        "load":  np.bincount(cand[:, 0], weights=people, minlength=len(zone_lat)).astype(np.int64),
+        "cost":  float((people * dist[:, 0]).sum()),
+    }
@@ -1,62 +1,156 @@
 """
 GBDMS Risk Engine - FastAPI Backend
 
-All predictions come from the trained RandomForest model (Model/output/model.joblib).
+All predictions come from the trained RandomForest model (Model/output/model.joblib,
+or the memory-mapped Model/output/model_arrays/ export when present).
 There is no mock fallback: if the model is not loaded the /predict endpoint returns HTTP 503.
+
+With GBDMS_LAZY_STARTUP=1 (serverless) the model and Firebase are loaded by the
+first request that needs them instead of at import.
 """
 
-import json
-import math
-import os
-import sys
-from datetime import datetime
-from typing import Optional
-
-import joblib
-import numpy as np
-import pandas as pd
-import requests
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from startup_profile import StartupProfile
+
+startup = StartupProfile()
+
+with startup.stage("import", "stdlib + numpy"):
+    import asyncio
+    import json
+    import math
+    import os
+    import sys
+    import threading
+    import time
+    from contextlib import asynccontextmanager, nullcontext
+    from datetime import datetime, timezone
+    from typing import Annotated, Literal, Optional
+
+    import numpy as np
+    from dotenv import load_dotenv
+
+with startup.stage("import", "fastapi + pydantic"):
+    from fastapi import FastAPI, Header, HTTPException, Query, Response, WebSocket
+    from fastapi.responses import PlainTextResponse, StreamingResponse
+    from fastapi.middleware.cors import CORSMiddleware
+    from starlette.concurrency import run_in_threadpool
+    from pydantic import BaseModel, Field, ValidationError
+
+with startup.stage("import", "backend modules"):
+    from features import (
+        RIVER_DISCHARGE_SCALE,
+        TERRAIN_MAP,
+        build_feature_matrix,
+        build_feature_row,
+    )
+    import profiler
+    from admin_users import InvalidCursor, UserDirectory
+    from danger_zones import DangerZoneEngine
+    from districts import DISTRICTS_PATH, DistrictIndex, district_codes, encode_districts
+    from gazetteer import GAZETTEER_PATH, Gazetteer, normalize as normalize_place
+    from geocode_cache import GEOCODE_CACHE_PATH, GeocodeCache
+    from inference_executor import DeadlineExceeded, InferenceExecutor, QueueFull
+    from inference import (
+        MODEL_ARRAYS_DIR,
+        SHARED_ARRAYS_DIR,
+        CompiledForest,
+        load_model_arrays,
+        shared_model_arrays,
+    )
+    from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as metrics_registry
+    from metrics import Counter, Histogram, MetricsMiddleware
+    from model_registry import REGISTRY_DIR, ModelRegistry, ModelReloader, ShadowScorer
+    from prediction_cache import PredictionCache
+    from evacuation import DEFAULT_CANDIDATES as EVAC_CANDIDATES, nearest_only, plan as solve_evacuation
+    from explain import PathExplainer, format_attributions
+    from risk_tiles import RiskRasterStore
+    from risk_stream import RiskStream, Subscription
+    from road_network import GRAPH_DIR, RoadNetwork
+    from safe_zones import SafeZoneIndex, load_zones
+    from sensors import DEFAULT_CAPACITY as SENSOR_CAPACITY, METRICS as SENSOR_METRICS, SensorStore, load_stations
+    from shelter_tree import ShelterTree
+    from sweep import LEVELS as SWEEP_LEVELS, crossings as sweep_crossings, grid_proba, risk_levels
+    from upstream import Upstream, UpstreamError, UpstreamUnavailable
+
+load_dotenv()
+
+# Defer the model, Firebase and their imports to first use (serverless cold starts)
+LAZY_STARTUP = os.getenv("GBDMS_LAZY_STARTUP", "0") == "1"
 
 # ── Optional Firebase (graceful if credentials not set) ───────────────────────
-try:
-    import firebase_admin
-    from firebase_admin import auth, credentials, db as firebase_db
-
-    load_dotenv()
-    if not firebase_admin._apps:
-        key = os.getenv("FIREBASE_ADMIN_PRIVATE_KEY", "")
-        if key:
-            cred = credentials.Certificate(
-                {
-                    "type": "service_account",
-                    "project_id": os.getenv("FIREBASE_ADMIN_PROJECT_ID"),
-                    "private_key_id": os.getenv("FIREBASE_ADMIN_PRIVATE_KEY_ID"),
-                    "private_key": key.replace("\\n", "\n"),
-                    "client_email": os.getenv("FIREBASE_ADMIN_CLIENT_EMAIL"),
-                    "client_id": os.getenv("FIREBASE_ADMIN_CLIENT_ID"),
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                    "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                    "client_x509_cert_url": os.getenv("FIREBASE_ADMIN_CLIENT_CERT_URL"),
-                }
-            )
-            firebase_admin.initialize_app(
-                cred, {"databaseURL": os.getenv("VITE_FIREBASE_DATABASE_URL")}
-            )
-            print("Firebase Admin SDK initialised.")
-        else:
-            print("Firebase credentials not set — admin endpoints will be unavailable.")
-    FIREBASE_AVAILABLE = bool(firebase_admin._apps)
-except Exception as exc:
-    print(f"Firebase init skipped: {exc}")
-    FIREBASE_AVAILABLE = False
+auth = firebase_db = None
+FIREBASE_AVAILABLE = False
+_firebase_attempted = False
+
+# /admin/users page cache lifetime; writes through the admin endpoints drop it early
+USERS_CACHE_TTL = float(os.getenv("GBDMS_ADMIN_USERS_CACHE_TTL", "30"))
+user_directory: UserDirectory | None = None
+
+
+def init_firebase() -> bool:
+    """Import and initialise the Firebase Admin SDK once. Returns availability."""
+    global auth, firebase_db, FIREBASE_AVAILABLE, _firebase_attempted
+    if _firebase_attempted:
+        return FIREBASE_AVAILABLE
+    _firebase_attempted = True
+    with startup.stage("artifact", "firebase"):
+        try:
+            import firebase_admin
+            from firebase_admin import auth, credentials, db as firebase_db
+
+            if not firebase_admin._apps:
+                key = os.getenv("FIREBASE_ADMIN_PRIVATE_KEY", "")
+                if key:
+                    cred = credentials.Certificate(
+                        {
+                            "type": "service_account",
+                            "project_id": os.getenv("FIREBASE_ADMIN_PROJECT_ID"),
+                            "private_key_id": os.getenv("FIREBASE_ADMIN_PRIVATE_KEY_ID"),
+                            "private_key": key.replace("\\n", "\n"),
+                            "client_email": os.getenv("FIREBASE_ADMIN_CLIENT_EMAIL"),
+                            "client_id": os.getenv("FIREBASE_ADMIN_CLIENT_ID"),
+                            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                            "token_uri": "https://oauth2.googleapis.com/token",
+                            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+                            "client_x509_cert_url": os.getenv("FIREBASE_ADMIN_CLIENT_CERT_URL"),
+                        }
+                    )
+                    firebase_admin.initialize_app(
+                        cred, {"databaseURL": os.getenv("VITE_FIREBASE_DATABASE_URL")}
+                    )
+                    print("Firebase Admin SDK initialised.")
+                elif os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+                    # The SDK routes auth/db calls to the emulators and needs no credentials
+                    project = os.getenv("FIREBASE_ADMIN_PROJECT_ID", "demo-gbdms")
+                    db_host = os.getenv("FIREBASE_DATABASE_EMULATOR_HOST", "127.0.0.1:9000")
+                    firebase_admin.initialize_app(options={
+                        "projectId":   project,
+                        "databaseURL": os.getenv("VITE_FIREBASE_DATABASE_URL", f"http://{db_host}?ns={project}"),
+                    })
+                    print("Firebase Admin SDK initialised against the emulator.")
+                else:
+                    print("Firebase credentials not set — admin endpoints will be unavailable.")
+            FIREBASE_AVAILABLE = bool(firebase_admin._apps)
+        except Exception as exc:
+            print(f"Firebase init skipped: {exc}")
+            FIREBASE_AVAILABLE = False
+    return FIREBASE_AVAILABLE
+
+
+if not LAZY_STARTUP:
+    init_firebase()
 
 # ── App ───────────────────────────────────────────────────────────────────────
-app = FastAPI(title="GBDMS Risk Engine", version="2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if report_listener is not None:
+        report_listener.close()
+    inference_executor.shutdown(wait=False)
+    await osrm.aclose()
+    await nominatim.aclose()
+
+
+app = FastAPI(title="GBDMS Risk Engine", version="2.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -66,43 +160,221 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Metrics ───────────────────────────────────────────────────────────────────
+http_requests = Counter(
+    "gbdms_http_requests_total", "HTTP requests by route template and status code.",
+    ("method", "route", "status"),
+)
+http_latency = Histogram(
+    "gbdms_http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route"),
+)
+# features / queue / response (and explain, when asked) per request; scaler /
+# forest per forest call (a micro-batch may serve several requests; the
+# compiled engine has no scaler step)
+predict_stage = Histogram(
+    "gbdms_predict_stage_seconds", "Time spent in each prediction stage.", ("stage",),
+)
+app.add_middleware(MetricsMiddleware, requests=http_requests, latency=http_latency)
+
+# Sampling profiler behind GET /admin/profile; off unless GBDMS_PROFILER=1
+PROFILER_ENABLED = os.getenv("GBDMS_PROFILER", "0") == "1"
+_profile_lock = threading.Lock()
+
 # ── Model loading ─────────────────────────────────────────────────────────────
 _HERE = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(_HERE, "../Model/output/model.joblib")
-DZ_PATH    = os.path.join(_HERE, "../Model/output/danger_zones.json")
+MODEL_PATH = os.getenv("GBDMS_MODEL_PATH", os.path.join(_HERE, "../Model/output/model.joblib"))
+MODEL_ARRAYS_PATH = os.getenv("GBDMS_MODEL_ARRAYS_DIR", MODEL_ARRAYS_DIR)
+MODEL_REGISTRY_PATH = os.getenv("GBDMS_MODEL_REGISTRY_DIR", REGISTRY_DIR)
+DZ_PATH    = os.getenv("GBDMS_DANGER_ZONES_PATH", os.path.join(_HERE, "../Model/output/danger_zones.json"))
+
+# "compiled" runs the NumPy forest from inference.py; "sklearn" calls predict_proba
+# (array-format models have no sklearn estimator and always run compiled)
+INFERENCE_ENGINE = os.getenv("GBDMS_INFERENCE_ENGINE", "compiled").lower()
+
+# Multi-worker serving: export model.joblib to memory-mapped arrays once so
+# every worker runs from the same read-only pages instead of its own unpickled copy
+SHARED_MODEL = os.getenv("GBDMS_SHARED_MODEL", "0") == "1"
+SHARED_MODEL_DIR = os.getenv("GBDMS_SHARED_MODEL_DIR", SHARED_ARRAYS_DIR)
 
 model_artifacts: dict | None = None
-precomputed_danger_zones: list = []
+# Served verbatim by /danger-zones; kept as bytes so workers do not each hold a parsed copy
+precomputed_danger_zones: bytes = b""
+risk_rasters = RiskRasterStore()
+
+# /predict response cache; GBDMS_PREDICT_CACHE_SIZE=0 disables it. Keys are
+# exact unless coordinate rounding or rainfall / river-level buckets are set
+_CACHE_LATLON_DECIMALS = os.getenv("GBDMS_PREDICT_CACHE_LATLON_DECIMALS", "")
+prediction_cache = PredictionCache(
+    max_size        = int(os.getenv("GBDMS_PREDICT_CACHE_SIZE", "10000")),
+    ttl_seconds     = float(os.getenv("GBDMS_PREDICT_CACHE_TTL", "600")),
+    latlon_decimals = int(_CACHE_LATLON_DECIMALS) if _CACHE_LATLON_DECIMALS else None,
+    rainfall_bucket = float(os.getenv("GBDMS_PREDICT_CACHE_RAINFALL_BUCKET", "0")),
+    river_bucket    = float(os.getenv("GBDMS_PREDICT_CACHE_RIVER_BUCKET", "0")),
+)
 
-try:
-    if os.path.exists(MODEL_PATH):
-        model_artifacts = joblib.load(MODEL_PATH)
-        print(f"Model loaded from {MODEL_PATH}")
-        print(f"  Features : {model_artifacts['features']}")
-        print(f"  Classes  : {model_artifacts['classes']}")
-        print(f"  Test acc : {model_artifacts.get('test_accuracy', 'n/a')}")
-    else:
-        print(f"WARNING: model not found at {MODEL_PATH}")
-        print("  Run: python Model/scripts/run_model.py  to train first.")
-except Exception as exc:
-    print(f"ERROR loading model: {exc}")
+# Dedicated forest executor for /predict and /predict/batch: bounded queue,
+# micro-batching of concurrent requests, per-request deadlines
+inference_executor = InferenceExecutor(
+    lambda artifacts, X: predict_proba_matrix(X, artifacts, timed=True),
+    workers         = int(os.getenv("GBDMS_INFERENCE_THREADS", str(os.cpu_count() or 2))),
+    max_queue_rows  = int(os.getenv("GBDMS_INFERENCE_QUEUE_ROWS", "20000")),
+    max_batch_rows  = int(os.getenv("GBDMS_INFERENCE_MAX_BATCH", "512")),
+    batch_window_ms = float(os.getenv("GBDMS_INFERENCE_BATCH_WINDOW_MS", "0")),
+    deadline_ms     = float(os.getenv("GBDMS_PREDICT_DEADLINE_MS", "2000")),
+)
+predict_stage.attach(inference_executor.queue_wait, "queue")
+
+# Largest month x rainfall x river-level grid one /predict/sweep call may ask for
+SWEEP_MAX_ROWS = int(os.getenv("GBDMS_SWEEP_MAX_ROWS", "250000"))
+
+_model_lock = threading.Lock()
+_model_load_attempted = False
+
+# Versioned models for hot reload; new versions are validated against the
+# registry's golden set before they replace the serving model
+model_registry = ModelRegistry(MODEL_REGISTRY_PATH)
+shadow: ShadowScorer | None = None
+
+
+def install_model(artifacts: dict):
+    """
+    Make ``artifacts`` the serving model. The forest is compiled before the
+    swap, which is a single reference assignment: requests already running
+    keep the artifacts they took from _require_model().
+    """
+    global model_artifacts
+    artifacts.setdefault("forest", CompiledForest.from_artifacts(artifacts))
+    model_artifacts = artifacts
+    print(f"Model {model_version(artifacts)} installed")
+    risk_stream.refresh(datetime.now().month)
+
+
+model_reloader = ModelReloader(
+    model_registry,
+    install_model,
+    min_agreement=float(os.getenv("GBDMS_MODEL_MIN_AGREEMENT", "0.9")),
+)
+
+
+def load_model() -> dict | None:
+    """
+    Load the model once: the registry's current version when there is one,
+    else the memory-mapped array export when present (no joblib / sklearn
+    import), else model.joblib.
+    """
+    global model_artifacts, _model_load_attempted
+    with _model_lock:
+        if _model_load_attempted:
+            return model_artifacts
+        _model_load_attempted = True
+        try:
+            version = model_registry.current()
+            if version is not None:
+                with startup.stage("artifact", "model registry"):
+                    model_artifacts = model_registry.load(version)
+                model_reloader.active = version
+                print(f"Model {version} loaded from {MODEL_REGISTRY_PATH}")
+            elif os.path.exists(os.path.join(MODEL_ARRAYS_PATH, "meta.json")):
+                with startup.stage("artifact", "model arrays"):
+                    model_artifacts = load_model_arrays(MODEL_ARRAYS_PATH)
+                print(f"Model loaded from {MODEL_ARRAYS_PATH} (memory-mapped)")
+            elif os.path.exists(MODEL_PATH) and SHARED_MODEL:
+                with startup.stage("artifact", "shared model arrays"):
+                    model_artifacts = shared_model_arrays(MODEL_PATH, SHARED_MODEL_DIR)
+                print(f"Model loaded from {MODEL_PATH} (shared memory-mapped export in {SHARED_MODEL_DIR})")
+            elif os.path.exists(MODEL_PATH):
+                with startup.stage("artifact", "model.joblib"):
+                    import joblib
+                    model_artifacts = joblib.load(MODEL_PATH)
+                print(f"Model loaded from {MODEL_PATH}")
+            else:
+                print(f"WARNING: model not found at {MODEL_PATH}")
+                print("  Run: python Model/scripts/run_model.py  to train first.")
+                return None
+            print(f"  Features : {model_artifacts['features']}")
+            print(f"  Classes  : {model_artifacts['classes']}")
+            print(f"  Test acc : {model_artifacts.get('test_accuracy', 'n/a')}")
+            print(f"  Engine   : {INFERENCE_ENGINE}")
+        except Exception as exc:
+            print(f"ERROR loading model: {exc}")
+        return model_artifacts
+
+
+if not LAZY_STARTUP:
+    load_model()
+
+# Poll the registry's CURRENT pointer (0 = reload only via POST /admin/model/reload)
+_MODEL_WATCH_SECONDS = float(os.getenv("GBDMS_MODEL_WATCH_SECONDS", "0"))
+if _MODEL_WATCH_SECONDS > 0:
+    model_reloader.watch(_MODEL_WATCH_SECONDS)
 
 try:
     if os.path.exists(DZ_PATH):
-        with open(DZ_PATH) as f:
-            precomputed_danger_zones = json.load(f)
-        print(f"Danger zones loaded: {len(precomputed_danger_zones)} zones")
+        with startup.stage("artifact", "danger zones"), open(DZ_PATH, "rb") as f:
+            raw = f.read()
+        n_zones = len(json.loads(raw))
+        precomputed_danger_zones = raw if n_zones else b""
+        print(f"Danger zones loaded: {n_zones} zones")
 except Exception as exc:
     print(f"WARNING: could not load danger zones: {exc}")
 
+# Public upstreams behind a pooled async client, coalescing and a circuit breaker
+_BREAKER = dict(
+    failure_threshold = int(os.getenv("GBDMS_UPSTREAM_FAILURE_THRESHOLD", "5")),
+    reset_seconds     = float(os.getenv("GBDMS_UPSTREAM_RESET_SECONDS", "30")),
+)
+osrm = Upstream(
+    "osrm",
+    os.getenv("GBDMS_OSRM_URL", "https://router.project-osrm.org"),
+    max_concurrency = int(os.getenv("GBDMS_OSRM_CONCURRENCY", "8")),
+    timeout         = 8.0,
+    **_BREAKER,
+)
+nominatim = Upstream(
+    "nominatim",
+    os.getenv("GBDMS_NOMINATIM_URL", "https://nominatim.openstreetmap.org"),
+    max_concurrency = int(os.getenv("GBDMS_NOMINATIM_CONCURRENCY", "2")),
+    timeout         = 10.0,
+    **_BREAKER,
+)
+
+# Local place names answer /geocode first; Nominatim answers are kept on disk
+GAZETTEER_FILE = os.getenv("GBDMS_GAZETTEER_PATH", GAZETTEER_PATH)
 
-# ── Constants ─────────────────────────────────────────────────────────────────
+gazetteer: Gazetteer | None = None
+try:
+    with startup.stage("artifact", "gazetteer"):
+        gazetteer = Gazetteer.load(GAZETTEER_FILE)
+    print(f"Gazetteer loaded: {len(gazetteer)} places from {GAZETTEER_FILE}")
+except Exception as exc:
+    print(f"WARNING: could not load gazetteer: {exc}")
 
-# Scaling factor: user river_level (m) -> discharge proxy used in training
-# Training Flood Attribute 3 range: ~200-5000  /  user river_level max: 30 m
-RIVER_DISCHARGE_SCALE = 167.0
+# District boundaries: the district a prediction uses comes from its coordinates
+DISTRICTS_FILE = os.getenv("GBDMS_DISTRICTS_PATH", DISTRICTS_PATH)
 
-TERRAIN_MAP = {"Valley": 1, "Hilly": 2, "Mountainous": 3}
+district_index: DistrictIndex | None = None
+try:
+    with startup.stage("artifact", "district boundaries"):
+        district_index = DistrictIndex.load(DISTRICTS_FILE)
+    print(f"District boundaries loaded: {len(district_index)} districts from {DISTRICTS_FILE}")
+except Exception as exc:
+    print(f"WARNING: could not load district boundaries ({exc}); using the district names sent")
+# Raster cells take their district from the same boundaries as /predict
+risk_rasters.districts = district_index
+
+geocode_cache: GeocodeCache | None = None
+try:
+    with startup.stage("artifact", "geocode cache"):
+        geocode_cache = GeocodeCache(
+            os.getenv("GBDMS_GEOCODE_CACHE_PATH", GEOCODE_CACHE_PATH),
+            ttl_seconds=float(os.getenv("GBDMS_GEOCODE_CACHE_TTL", str(30 * 86400))),
+        )
+except Exception as exc:
+    print(f"WARNING: geocode cache disabled: {exc}")
+
+
+# ── Constants ─────────────────────────────────────────────────────────────────
 
 RISK_COLORS = {
     "Critical": "#ef4444",
@@ -153,6 +425,42 @@ SAFE_ZONES = [
     {"lat": 35.4190, "lng": 75.9870, "name": "Shigar Emergency Ground",      "type": "Open Ground",  "capacity": 800},
 ]
 
+# Optional facilities file (JSON list or CSV) replacing the built-in list above
+SAFE_ZONES_PATH = os.getenv("GBDMS_SAFE_ZONES_PATH", os.path.join(_HERE, "data/safe_zones.json"))
+
+try:
+    if os.path.exists(SAFE_ZONES_PATH):
+        with startup.stage("artifact", "safe zones"):
+            SAFE_ZONES = load_zones(SAFE_ZONES_PATH)
+        print(f"Safe zones loaded: {len(SAFE_ZONES)} from {SAFE_ZONES_PATH}")
+except Exception as exc:
+    print(f"WARNING: could not load safe zones ({exc}); using built-in list")
+
+safe_zone_index = SafeZoneIndex(SAFE_ZONES)
+
+# Offline road graph built by road_network.py; OSRM is only used without one
+ROAD_GRAPH_DIR = os.getenv("GBDMS_ROAD_GRAPH_DIR", GRAPH_DIR)
+
+road_network: RoadNetwork | None = None
+try:
+    with startup.stage("artifact", "road graph"):
+        road_network = RoadNetwork.load_if_present(ROAD_GRAPH_DIR)
+    if road_network is not None:
+        print(f"Road graph loaded: {road_network.n_nodes:,} nodes from {ROAD_GRAPH_DIR}")
+except Exception as exc:
+    print(f"WARNING: could not load road graph: {exc}")
+
+# Nearest-shelter tree over the road graph; repaired in place on road / shelter updates
+shelter_tree: ShelterTree | None = None
+shelter_tree_lock = threading.Lock()
+if road_network is not None:
+    try:
+        with startup.stage("artifact", "shelter tree"):
+            shelter_tree = ShelterTree.load_or_build(road_network, SAFE_ZONES, ROAD_GRAPH_DIR)
+        print(f"Shelter tree ready: {int((shelter_tree.zone >= 0).sum()):,} nodes reach a safe zone")
+    except Exception as exc:
+        print(f"WARNING: could not build shelter tree: {exc}")
+
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
@@ -174,66 +482,215 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 2 * R * math.asin(math.sqrt(a))
 
 
-def encode_district(district_name: str) -> int:
-    """Encode district name to integer using the saved LabelEncoder."""
-    if model_artifacts is None:
-        return 0
-    dist_le = model_artifacts.get("district_le")
-    if dist_le is None:
-        return 0
-    if district_name in dist_le.classes_:
-        return int(dist_le.transform([district_name])[0])
+_district_codes: tuple[dict | None, dict[str, int]] = (None, {})
+
+
+def model_district_codes(artifacts: dict | None = None) -> dict[str, int]:
+    """District name -> code for ``artifacts`` (index in the LabelEncoder's classes), built once per model."""
+    global _district_codes
+    artifacts = artifacts or model_artifacts
+    if artifacts is None:
+        return {}
+    cached_for, codes = _district_codes
+    if cached_for is not artifacts:
+        # Array-format models carry the encoder's sorted classes; for joblib models
+        # read them off the encoder (transform() costs ~200 us per call for the same index)
+        classes = artifacts.get("district_classes")
+        if classes is None and artifacts.get("district_le") is not None:
+            classes = list(artifacts["district_le"].classes_)
+        codes = district_codes(classes or [])
+        _district_codes = (artifacts, codes)
+    return codes
+
+
+def encode_district(district_name: str, artifacts: dict | None = None) -> int:
+    """Encode district name to integer: its index in the saved LabelEncoder's classes."""
+    codes = model_district_codes(artifacts)
     # Unknown district: use middle index as a neutral fallback
-    return len(dist_le.classes_) // 2
-
-
-def build_feature_row(
-    latitude: float,
-    longitude: float,
-    district_enc: int,
-    month: int,
-    rainfall_mm: float,
-    river_level_m: float,
-    temperature_elevated: bool,
-    terrain: str,
-    seismic_activity: bool,
-) -> dict:
-    """
-    Map user-provided environmental inputs to the trained model's feature space.
-
-    Feature semantics match the training engineering in run_model.py:
-      rainfall_mm        — direct mm input (Flood Attribute 2 range: 50-500)
-      river_discharge    — river_level_m * 167  (training range ~200-5000 for Flood)
-      temperature_elevated — 1 if user reports elevated temperature (GLOF trigger)
-      terrain_code       — Valley=1, Hilly=2, Mountainous=3, Unknown=0
-      seismic_trigger    — 1 if seismic activity detected
-      glacial_trigger    — 1 if temperature elevated (glacier melt) OR seismic near glacier
-      rainfall_trigger   — 1 if rainfall > 20 mm
-    """
-    river_discharge   = river_level_m * RIVER_DISCHARGE_SCALE
-    temp_elev_int     = 1 if temperature_elevated else 0
-    terrain_code      = TERRAIN_MAP.get(terrain, 0)
-    seismic_int       = 1 if seismic_activity else 0
-    # Glacial trigger: driven by temperature only (high temp melts glaciers → GLOF risk)
-    # Seismic activity does NOT set this flag; seismic_trigger alone routes to Earthquake/Landslide
-    glacial_int       = 1 if temperature_elevated else 0
-    rainfall_trig_int = 1 if rainfall_mm > 20 else 0
+    return codes.get(district_name, len(codes) // 2)
+
+
+def encode_locations(latitude, longitude, district_names, artifacts: dict | None = None) -> np.ndarray:
+    """
+    District codes for many locations: the district whose boundary contains
+    each point, else the name sent with it (see districts.encode_districts).
+    """
+    return encode_districts(latitude, longitude, district_names, model_district_codes(artifacts), district_index)
+
+
+def requests_to_matrix(reqs: list, month: int, artifacts: dict | None = None) -> np.ndarray:
+    """Build the model feature matrix for a list of PredictionRequest objects."""
+    artifacts = artifacts or model_artifacts
+    lat = [r.latitude for r in reqs]
+    lon = [r.longitude for r in reqs]
+    return build_feature_matrix(
+        latitude             = lat,
+        longitude            = lon,
+        district_enc         = encode_locations(lat, lon, [r.district or "Unknown" for r in reqs], artifacts),
+        month                = month,
+        rainfall_mm          = [r.rainfall or 0.0 for r in reqs],
+        river_level_m        = [r.river_level or 0.0 for r in reqs],
+        temperature_elevated = [bool(r.temperature_elevated) for r in reqs],
+        terrain              = [r.terrain or "Unknown" for r in reqs],
+        seismic_activity     = [bool(r.seismic_activity) for r in reqs],
+        features             = artifacts["features"],
+    )
+
+
+_compiled: tuple[dict | None, CompiledForest | None] = (None, None)
+
+
+def compiled_forest(artifacts: dict | None = None) -> CompiledForest:
+    """
+    CompiledForest for ``artifacts`` (default: the serving model). Installed
+    models carry theirs under ``forest``; others are compiled once and cached.
+    """
+    global _compiled
+    artifacts = artifacts or model_artifacts
+    if "forest" in artifacts:
+        return artifacts["forest"]
+    cached_for, forest = _compiled
+    if cached_for is not artifacts:
+        forest = CompiledForest.from_artifacts(artifacts)
+        _compiled = (artifacts, forest)
+    return forest
+
+
+_explainer: tuple[CompiledForest | None, PathExplainer | None] = (None, None)
+
+
+def explain_matrix(X: np.ndarray, artifacts: dict) -> list[dict]:
+    """
+    Per-input attributions (explain.format_attributions) for every row of
+    ``X``. The per-leaf path tables are built once per model and cached.
+    """
+    global _explainer
+    forest = compiled_forest(artifacts)
+    cached_for, explainer = _explainer
+    if cached_for is not forest:
+        explainer  = PathExplainer(forest)
+        _explainer = (forest, explainer)
+    inputs, contrib = explainer.explain(X, artifacts["features"])
+    return [format_attributions(explainer.bias, c, inputs, forest.classes_) for c in contrib]
+
+
+def predict_proba_matrix(X: np.ndarray, artifacts: dict | None = None, timed: bool = False) -> np.ndarray:
+    """
+    Class probabilities for a raw feature matrix, one forest pass over all rows.
+    The compiled engine has the scaler folded into its thresholds; the sklearn
+    path applies StandardScaler arithmetic directly (mean_/scale_) so a plain
+    ndarray can be passed without pandas column names. ``timed`` records the
+    scaler and forest stages in gbdms_predict_stage_seconds.
+    """
+    artifacts = artifacts or model_artifacts
+    stage = predict_stage.time if timed else _untimed
+    if INFERENCE_ENGINE == "compiled" or "model" not in artifacts:
+        with stage("forest"):
+            return compiled_forest(artifacts).predict_proba(X)
+    with stage("scaler"):
+        scaler   = artifacts["scaler"]
+        X_scaled = (X - scaler.mean_) / scaler.scale_
+    with stage("forest"):
+        return artifacts["model"].predict_proba(X_scaled)
+
+
+def _untimed(name: str):
+    return nullcontext()
+
+
+def model_classes(artifacts: dict | None = None):
+    """Class labels in the column order of predict_proba_matrix."""
+    artifacts = artifacts or model_artifacts
+    if INFERENCE_ENGINE == "compiled" or "model" not in artifacts:
+        return compiled_forest(artifacts).classes_
+    return artifacts["model"].classes_
+
+
+def model_version(artifacts: dict | None) -> str | None:
+    """Registry version of ``artifacts``, else their training timestamp."""
+    if artifacts is None:
+        return None
+    return artifacts.get("registry_version") or artifacts.get("trained_at")
+
+
+def _overloaded(exc: Exception) -> HTTPException:
+    """Load-shedding response: 429 when the queue is full, 503 when the deadline passed."""
+    if isinstance(exc, QueueFull):
+        return HTTPException(status_code=429, detail=f"Prediction queue is full: {exc}",
+                             headers={"Retry-After": "1"})
+    return HTTPException(status_code=503, detail=f"Prediction not served in time: {exc}",
+                         headers={"Retry-After": "1"})
+
+
+async def _infer(artifacts: dict, X: np.ndarray, deadline_ms: float | None = None) -> np.ndarray:
+    """Score ``X`` on the inference executor without blocking the event loop."""
+    try:
+        future = inference_executor.submit(artifacts, artifacts, X, deadline_ms)
+    except QueueFull as exc:
+        raise _overloaded(exc)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), inference_executor.wait_seconds(deadline_ms))
+    except asyncio.TimeoutError:
+        raise _overloaded(DeadlineExceeded("inference did not finish before the deadline"))
+    except DeadlineExceeded as exc:
+        raise _overloaded(exc)
+
+
+def _shadow_proba(artifacts: dict, reqs: list, month: int) -> np.ndarray:
+    return predict_proba_matrix(requests_to_matrix(reqs, month, artifacts), artifacts)
+
+
+def _shadow_score(reqs: list, month: int, labels: list[str], t0: float):
+    """Queue a comparison on the shadow model, if one is configured."""
+    scorer = shadow
+    if scorer is not None:
+        scorer.maybe_score(reqs, month, labels, (time.perf_counter() - t0) * 1000)
+
+
+def format_prediction(probs: np.ndarray, classes) -> dict:
+    """Turn one row of class probabilities into the /predict response body."""
+    max_i = int(np.argmax(probs))
+    pred  = str(classes[max_i])
+    conf  = float(probs[max_i])
+
+    risk  = get_risk_level(conf)
+    recs  = SAFETY_RECOMMENDATIONS.get(pred, ["Stay alert and follow local authority instructions."])
+
+    # All class probabilities for transparency
+    class_probs = {
+        str(cls): round(float(p), 3)
+        for cls, p in zip(classes, probs)
+    }
 
     return {
-        "latitude":             latitude,
-        "longitude":            longitude,
-        "district_enc":         district_enc,
-        "month":                month,
-        "rainfall_mm":          rainfall_mm,
-        "river_discharge":      river_discharge,
-        "temperature_elevated": temp_elev_int,
-        "terrain_code":         terrain_code,
-        "seismic_trigger":      seismic_int,
-        "glacial_trigger":      glacial_int,
-        "rainfall_trigger":     rainfall_trig_int,
+        "prediction":         pred,
+        "risk_level":         risk,
+        "confidence":         round(conf * 100, 1),
+        "visual_color":       RISK_COLORS.get(risk, "#94a3b8"),
+        "recommendations":    recs,
+        "class_probabilities": class_probs,
     }
 
 
+def _require_model() -> dict:
+    """
+    The serving model's artifacts. Callers use the returned snapshot for the
+    whole request so a hot reload never mixes two models in one response.
+    """
+    if model_artifacts is None and not _model_load_attempted:
+        load_model()
+    artifacts = model_artifacts
+    if artifacts is None:
+        raise HTTPException(
+            status_code=503,
+            detail=(
+                "Model not loaded. "
+                "Run 'python Model/scripts/run_model.py' to train and save the model."
+            ),
+        )
+    return artifacts
+
+
 # ── Request / Response Schemas ────────────────────────────────────────────────
 
 class Location(BaseModel):
@@ -253,11 +710,127 @@ class PredictionRequest(BaseModel):
     seismic_activity:     Optional[bool]  = False  # True if tremors / seismic alerts present
 
 
+class SweepAxis(BaseModel):
+    min:   float = Field(0.0, ge=0)
+    max:   float = Field(..., ge=0)
+    steps: int   = Field(..., ge=1, le=1000)
+
+    def values(self) -> np.ndarray:
+        return np.linspace(self.min, self.max, self.steps)
+
+
+class SweepRequest(BaseModel):
+    latitude:             float
+    longitude:            float
+    district:             Optional[str]  = "Unknown"
+    terrain:              Optional[str]  = "Unknown"
+    temperature_elevated: Optional[bool] = False
+    seismic_activity:     Optional[bool] = False
+    months:      list[int] = Field(default_factory=lambda: list(range(1, 13)), min_length=1, max_length=12)
+    rainfall:    SweepAxis = SweepAxis(min=0.0, max=200.0, steps=41)    # mm/24h
+    river_level: SweepAxis = SweepAxis(min=0.0, max=10.0, steps=21)     # meters above normal
+    max_crossings: int     = Field(1000, ge=0, le=100000)
+
+
+class ConditionsUpdate(BaseModel):
+    rainfall:             Optional[float] = Field(None, ge=0)
+    river_level:          Optional[float] = None
+    temperature_elevated: Optional[bool]  = None
+    seismic_activity:     Optional[bool]  = None
+
+
+class Station(BaseModel):
+    id:                 str
+    lat:                float
+    lon:                float
+    district:           Optional[str]   = "Unknown"
+    normal_temperature: Optional[float] = None   # seasonal average (°C); default: the station's own 72 h mean
+
+
+class SensorReading(BaseModel):
+    station:     str
+    time:        datetime                     # ISO 8601 or Unix seconds
+    rainfall:    Optional[float] = Field(None, ge=0)   # mm since the previous reading
+    river_level: Optional[float] = None       # meters above normal
+    temperature: Optional[float] = None       # °C
+
+
+class SensorBatch(BaseModel):
+    stations: list[Station]       = Field(default_factory=list)
+    readings: list[SensorReading] = Field(default_factory=list, max_length=100000)
+
+
+class SensorLocation(BaseModel):
+    latitude:  float
+    longitude: float
+    district:  Optional[str] = "Unknown"
+    terrain:   Optional[str] = "Unknown"
+
+
+class SensorPredictionRequest(BaseModel):
+    # Either every place of ``district`` or explicit ``locations``
+    district:         Optional[str] = None
+    locations:        list[SensorLocation] = Field(default_factory=list, max_length=10000)
+    k:                int   = Field(3, ge=1, le=20)
+    max_km:           Optional[float] = Field(None, gt=0)   # default GBDMS_SENSOR_MAX_KM
+    seismic_activity: bool  = False
+
+
+class BatchPredictionRequest(BaseModel):
+    # Rows are validated individually so one bad row does not fail the batch
+    rows: list[dict] = Field(..., max_length=10000)
+
+
 class RouteRequest(BaseModel):
     start: Location
     end:   Optional[Location] = None
 
 
+class RoadSegment(BaseModel):
+    start: Location
+    end:   Location
+
+
+class ZoneStatus(BaseModel):
+    at_capacity: bool
+
+
+class PopulationPoint(BaseModel):
+    latitude:  float
+    longitude: float
+    people:    int = Field(..., ge=0)
+
+
+class EvacuationPlanRequest(BaseModel):
+    points: list[PopulationPoint] = Field(..., min_length=1, max_length=100000)
+    k:      int             = Field(EVAC_CANDIDATES, ge=1, le=50)   # candidate zones per point
+    max_km: Optional[float] = Field(None, gt=0)                     # farthest acceptable zone
+
+
+class IncidentReport(BaseModel):
+    # Same fields as the Firebase ``reports`` tree; coordinates are optional
+    id:        str
+    type:      str
+    status:    str = "pending"
+    location:  Optional[str]      = None   # free text, placed with the gazetteer when no coordinates
+    latitude:  Optional[float]    = Field(None, ge=-90, le=90)
+    longitude: Optional[float]    = Field(None, ge=-180, le=180)
+    createdAt: Optional[datetime] = None   # default: now
+
+
+class ReportBatch(BaseModel):
+    reports: list[IncidentReport] = Field(..., min_length=1, max_length=10000)
+
+
+class ModelReload(BaseModel):
+    version: Optional[str] = None   # default: the registry's CURRENT version
+
+
+class ShadowConfig(BaseModel):
+    version: str
+    percent: float = Field(10.0, gt=0, le=100)
+
+
 class UserCreate(BaseModel):
     email:        str
     password:     str
@@ -271,6 +844,30 @@ class UserUpdate(BaseModel):
     disabled:     Optional[bool] = None
 
 
+class UserImportEntry(BaseModel):
+    email:        str
+    display_name: str
+    role:         Optional[str]  = "user"
+    disabled:     bool           = False
+    uid:          Optional[str]  = None
+
+
+class UserImport(BaseModel):
+    users: list[UserImportEntry] = Field(..., min_length=1, max_length=10000)
+
+
+class UserBulkUpdateEntry(UserUpdate):
+    uid: str
+
+
+class UserBulkUpdate(BaseModel):
+    users: list[UserBulkUpdateEntry] = Field(..., min_length=1, max_length=10000)
+
+
+class UserBulkDelete(BaseModel):
+    uids: list[str] = Field(..., min_length=1, max_length=10000)
+
+
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @app.get("/")
@@ -278,136 +875,491 @@ def health_check():
     return {
         "status":       "active",
         "model_loaded": model_artifacts is not None,
-        "model_version": model_artifacts.get("trained_at") if model_artifacts else None,
+        "model_version": model_version(model_artifacts),
+        "prediction_cache": prediction_cache.stats(),
+        "inference":    inference_executor.stats(),
+        "upstreams":    {"osrm": osrm.stats(), "nominatim": nominatim.stats()},
+        "geocode_cache": geocode_cache.stats() if geocode_cache is not None else None,
     }
 
 
+@app.get("/startup")
+def startup_report():
+    """Time spent per import group and artifact load, including deferred loads."""
+    return {"lazy": LAZY_STARTUP, **startup.report()}
+
+
+def _stats_gauges(prefix: str, help: str, stats: dict | None, labels: dict | None = None):
+    """Numeric entries of a component's stats() as one gauge each."""
+    for key, value in (stats or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}_{key}", "gauge", f"{help} ({key}).", [(labels or {}, value)]
+
+
+@metrics_registry.collector
+def _component_metrics():
+    yield ("gbdms_model_info", "gauge", "Serving model version (value is 1 when a model is loaded).",
+           [({"version": model_version(model_artifacts) or "", "engine": INFERENCE_ENGINE},
+             int(model_artifacts is not None))])
+    queue = inference_executor.stats()
+    yield ("gbdms_inference_batch_rows", "histogram",
+           "Rows scored per forest call.", [({}, inference_executor.batch_rows)])
+    for key in ("queue_depth", "queue_rows", "busy_workers", "rejected", "expired", "failed"):
+        yield f"gbdms_inference_{key}", "gauge", f"Inference executor {key.replace('_', ' ')}.", [({}, queue[key])]
+
+    for up in (osrm, nominatim):
+        labels = {"upstream": up.name}
+        yield ("gbdms_upstream_request_duration_seconds", "histogram",
+               "Upstream call latency.", [(labels, up.latency)])
+        stats = up.stats()
+        yield ("gbdms_upstream_circuit_open", "gauge", "1 while the upstream's circuit breaker is open.",
+               [(labels, int(stats.pop("circuit") == "open"))])
+        yield from _stats_gauges("gbdms_upstream", "Upstream counter", stats, labels)
+
+    yield from _stats_gauges("gbdms_prediction_cache", "Prediction cache", prediction_cache.stats())
+    if geocode_cache is not None:
+        yield from _stats_gauges("gbdms_geocode_cache", "Geocode cache", geocode_cache.stats())
+    yield from _stats_gauges("gbdms_risk_stream", "Risk stream", risk_stream.stats())
+    yield from _stats_gauges("gbdms_sensors", "Sensor readings", sensor_store.stats())
+    yield from _stats_gauges("gbdms_danger_zones", "Live danger zones", danger_engine.stats())
+    if user_directory is not None:
+        yield from _stats_gauges("gbdms_admin_users_cache", "Admin user page cache", user_directory.stats())
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of request, prediction, upstream, model and cache metrics."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/admin/profile")
+def get_profile(
+    seconds: float = Query(10.0, gt=0, le=profiler.MAX_SECONDS),
+    hz:      float = Query(100.0, gt=0, le=profiler.MAX_HZ),
+    idle:    bool  = False,
+):
+    """
+    Sample every thread's stack for ``seconds`` and return folded stacks for
+    flamegraph.pl / speedscope. Only available with GBDMS_PROFILER=1.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled; set GBDMS_PROFILER=1")
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already being recorded")
+    try:
+        counts, samples = profiler.sample_stacks(seconds, hz, idle)
+    finally:
+        _profile_lock.release()
+    return PlainTextResponse(
+        profiler.collapsed(counts),
+        headers={
+            "X-Profile-Samples": str(samples),
+            "Content-Disposition": f'attachment; filename="gbdms-{int(time.time())}.folded"',
+        },
+    )
+
+
 @app.post("/predict")
-def predict_risk(req: PredictionRequest):
+async def predict_risk(
+    req: PredictionRequest,
+    explain: bool = False,
+    x_deadline_ms: Annotated[Optional[float], Header()] = None,
+):
     """
     Predict disaster risk for a given location and environmental conditions.
-    Returns prediction, risk level, confidence, and safety recommendations.
-    Raises HTTP 503 if the model is not loaded.
+    Returns prediction, risk level, confidence, and safety recommendations;
+    ``?explain=true`` adds per-input ``attributions`` (not cached).
+    Raises HTTP 503 if the model is not loaded, 429/503 when overloaded
+    (queue full / ``X-Deadline-Ms`` passed before the forest ran).
     """
-    if model_artifacts is None:
-        raise HTTPException(
-            status_code=503,
-            detail=(
-                "Model not loaded. "
-                "Run 'python Model/scripts/run_model.py' to train and save the model."
-            ),
-        )
+    # First call under lazy startup loads the model; keep that off the event loop
+    artifacts = model_artifacts or await run_in_threadpool(_require_model)
 
     try:
-        month        = datetime.now().month
-        district_enc = encode_district(req.district or "Unknown")
-
-        feature_row = build_feature_row(
-            latitude             = req.latitude,
-            longitude            = req.longitude,
-            district_enc         = district_enc,
-            month                = month,
-            rainfall_mm          = req.rainfall or 0.0,
-            river_level_m        = req.river_level or 0.0,
-            temperature_elevated = req.temperature_elevated or False,
-            terrain              = req.terrain or "Unknown",
-            seismic_activity     = req.seismic_activity or False,
-        )
+        month = datetime.now().month
+        if prediction_cache.enabled and not explain:
+            version = model_version(artifacts)
+            key     = prediction_cache.key(prediction_cache.normalize(req.model_dump()), month)
+            cached  = prediction_cache.get(key, version)
+            if cached is not None:
+                return cached
+
+        t0     = time.perf_counter()
+        with predict_stage.time("features"):
+            X  = requests_to_matrix([req], month, artifacts)
+        probs  = (await _infer(artifacts, X, x_deadline_ms))[0]
+        with predict_stage.time("response"):
+            result = format_prediction(probs, model_classes(artifacts))
+            _shadow_score([req], month, [result["prediction"]], t0)
+
+            if prediction_cache.enabled and not explain:
+                prediction_cache.put(key, result, version)
+        if explain:
+            with predict_stage.time("explain"):
+                result = {**result, "attributions": (await run_in_threadpool(explain_matrix, X, artifacts))[0]}
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as exc:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {exc}")
 
-        features = model_artifacts["features"]
-        input_df = pd.DataFrame([feature_row])[features]
 
-        X_scaled = model_artifacts["scaler"].transform(input_df)
+@app.post("/predict/batch")
+def predict_risk_batch(
+    req: BatchPredictionRequest,
+    explain: bool = False,
+    x_deadline_ms: Annotated[Optional[float], Header()] = None,
+):
+    """
+    Score many locations with a single scaler + forest call.
+    Each row has the same shape as a /predict body. Results come back in input
+    order; rows that fail validation get an ``error`` entry instead of a
+    prediction and do not affect the rest of the batch. ``?explain=true``
+    adds ``attributions`` to every scored row.
+    """
+    artifacts = _require_model()
+
+    results: list[dict] = [{} for _ in req.rows]
+    valid_idx: list[int] = []
+    valid_reqs: list[PredictionRequest] = []
+    for i, row in enumerate(req.rows):
+        try:
+            parsed = PredictionRequest(**row)
+        except ValidationError as exc:
+            results[i] = {
+                "index": i,
+                "error": "; ".join(
+                    f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()
+                ),
+            }
+            continue
+        valid_idx.append(i)
+        valid_reqs.append(parsed)
+
+    if valid_reqs:
+        try:
+            month = datetime.now().month
+            t0    = time.perf_counter()
+            with predict_stage.time("features"):
+                X = requests_to_matrix(valid_reqs, month, artifacts)
+            probs = inference_executor.run(artifacts, artifacts, X, x_deadline_ms)
+        except (QueueFull, DeadlineExceeded) as exc:
+            raise _overloaded(exc)
+        except Exception as exc:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Batch prediction failed: {exc}")
+
+        with predict_stage.time("response"):
+            classes = model_classes(artifacts)
+            for i, p in zip(valid_idx, probs):
+                results[i] = {"index": i, **format_prediction(p, classes)}
+            _shadow_score(valid_reqs, month, [results[i]["prediction"] for i in valid_idx], t0)
+        if explain:
+            with predict_stage.time("explain"):
+                for i, attributions in zip(valid_idx, explain_matrix(X, artifacts)):
+                    results[i]["attributions"] = attributions
+
+    return {
+        "count":   len(results),
+        "failed":  len(results) - len(valid_reqs),
+        "results": results,
+    }
 
-        clf   = model_artifacts["model"]
-        probs = clf.predict_proba(X_scaled)[0]
-        max_i = int(np.argmax(probs))
-        pred  = clf.classes_[max_i]
-        conf  = float(probs[max_i])
 
-        risk  = get_risk_level(conf)
-        recs  = SAFETY_RECOMMENDATIONS.get(pred, ["Stay alert and follow local authority instructions."])
+def _sweep_rows(req: SweepRequest, artifacts: dict, month, rainfall, river_level) -> np.ndarray:
+    return build_feature_matrix(
+        latitude             = req.latitude,
+        longitude            = req.longitude,
+        district_enc         = encode_locations([req.latitude], [req.longitude], [req.district or "Unknown"], artifacts)[0],
+        month                = month,
+        rainfall_mm          = rainfall,
+        river_level_m        = river_level,
+        temperature_elevated = bool(req.temperature_elevated),
+        terrain              = req.terrain or "Unknown",
+        seismic_activity     = bool(req.seismic_activity),
+        features             = artifacts["features"],
+    )
 
-        # All class probabilities for transparency
-        class_probs = {
-            cls: round(float(p), 3)
-            for cls, p in zip(clf.classes_, probs)
-        }
 
-        return {
-            "prediction":         pred,
-            "risk_level":         risk,
-            "confidence":         round(conf * 100, 1),
-            "visual_color":       RISK_COLORS.get(risk, "#94a3b8"),
-            "recommendations":    recs,
-            "class_probabilities": class_probs,
-        }
+@app.post("/predict/sweep")
+def predict_sweep(req: SweepRequest):
+    """
+    Scenario sweep for one location: class probabilities over every
+    combination of ``months`` x ``rainfall`` x ``river_level`` (C order, river
+    level fastest), the risk level of each cell and the neighbouring cells
+    where the risk level changes. Probabilities are integers in thousandths.
+    """
+    artifacts = _require_model()
+    if any(not 1 <= m <= 12 for m in req.months) or len(set(req.months)) != len(req.months):
+        raise HTTPException(status_code=422, detail="months must be distinct values from 1 to 12")
+    for name, axis in (("rainfall", req.rainfall), ("river_level", req.river_level)):
+        if axis.max < axis.min:
+            raise HTTPException(status_code=422, detail=f"{name}.max must not be below {name}.min")
+
+    axes = {
+        "month":       np.asarray(req.months),
+        "rainfall":    req.rainfall.values(),
+        "river_level": req.river_level.values(),
+    }
+    shape = tuple(len(v) for v in axes.values())
+    n_rows = int(np.prod(shape))
+    if n_rows > SWEEP_MAX_ROWS:
+        raise HTTPException(status_code=422, detail=f"Sweep of {n_rows} rows exceeds the limit of {SWEEP_MAX_ROWS}")
 
+    try:
+        t0 = time.perf_counter()
+        with predict_stage.time("features"):
+            m0, r0, v0 = (float(v[0]) for v in axes.values())
+            base = _sweep_rows(req, artifacts, m0, r0, v0)[0]
+            axis_rows = [
+                _sweep_rows(req, artifacts, axes["month"], r0, v0),
+                _sweep_rows(req, artifacts, m0, axes["rainfall"], v0),
+                _sweep_rows(req, artifacts, m0, r0, axes["river_level"]),
+            ]
+        with predict_stage.time("forest"):
+            probs = grid_proba(compiled_forest(artifacts), base, axis_rows)
+            if probs is None:
+                # A feature mixes two swept inputs: score the whole grid row by row
+                grid = np.meshgrid(*axes.values(), indexing="ij")
+                X = _sweep_rows(req, artifacts, *(g.ravel() for g in grid))
+                probs = compiled_forest(artifacts).predict_proba(X).T.reshape((-1, *shape))
+        eval_ms = (time.perf_counter() - t0) * 1000
+
+        with predict_stage.time("response"):
+            levels = risk_levels(probs)
+            found, total = sweep_crossings(levels, axes, req.max_crossings)
+            classes = [str(c) for c in compiled_forest(artifacts).classes_]
+            body = {
+                "model_version": model_version(artifacts),
+                "axes":          {k: v.tolist() for k, v in axes.items()},
+                "shape":         list(shape),
+                "classes":       classes,
+                "probabilities": {c: np.rint(p * 1000).astype(np.int16).tolist() for c, p in zip(classes, probs)},
+                "risk_levels":   SWEEP_LEVELS,
+                "risk_level":    levels.tolist(),
+                "crossings":     found,
+                "crossings_total": total,
+                "eval_ms":       round(eval_ms, 1),
+            }
+            content = json.dumps(body, separators=(",", ":"))
+    except HTTPException:
+        raise
     except Exception as exc:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {exc}")
+        raise HTTPException(status_code=500, detail=f"Sweep failed: {exc}")
+    return Response(content=content, media_type="application/json")
+
+
+def _risk_raster():
+    raster = risk_rasters.get(_require_model())
+    if raster is None:
+        detail = "Risk raster for the current model version is being built; retry shortly."
+        if risk_rasters.last_error:
+            detail += f" Last build failed: {risk_rasters.last_error}"
+        raise HTTPException(status_code=503, detail=detail)
+    return raster
+
+
+@app.get("/tiles/{z}/{x}/{y}.png")
+def get_risk_tile(
+    z: int,
+    x: int,
+    y: int,
+    month:    Optional[int] = None,
+    terrain:  str = "Unknown",
+    scenario: str = "baseline",
+    layer:    str = "risk",
+):
+    """
+    XYZ map tile of the precomputed risk surface.
+    ``layer`` is "risk" (colour by risk level) or a class name (probability ramp).
+    """
+    if not (0 <= z <= 18 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    raster = _risk_raster()
+    try:
+        png = raster.tile_png(z, x, y, month or datetime.now().month, terrain, scenario, layer)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc.args[0]))
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=3600", "ETag": f'"{raster.version}"'},
+    )
+
+
+@app.get("/risk-grid")
+def get_risk_grid(
+    month:    Optional[int] = None,
+    terrain:  str = "Unknown",
+    scenario: str = "baseline",
+    stride:   int = 1,
+    bbox:     Optional[str] = None,
+):
+    """
+    Precomputed class probabilities on the regional lat/lon grid as JSON.
+    ``bbox`` is "south,west,north,east"; ``stride`` subsamples rows and columns.
+    """
+    raster = _risk_raster()
+    try:
+        box = tuple(float(v) for v in bbox.split(",")) if bbox else None
+        if box is not None and len(box) != 4:
+            raise ValueError
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be 'south,west,north,east'")
+    try:
+        return raster.grid(month or datetime.now().month, terrain, scenario, max(1, stride), box)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc.args[0]))
 
 
 @app.get("/danger-zones")
-def get_danger_zones():
+def get_danger_zones(source: Literal["all", "historical", "live"] = "all"):
     """
-    Return high-risk zones derived from historical dataset.
-    Loaded from danger_zones.json generated during model training.
+    Return high-risk zones: ``historical`` ones derived from the training
+    dataset (danger_zones.json), ``live`` ones clustered from verified
+    incident reports, or ``all`` of them (historical first).
     """
-    if not precomputed_danger_zones:
-        raise HTTPException(
-            status_code=503,
-            detail="Danger zones not available. Run 'python Model/scripts/run_model.py' first.",
-        )
-    return precomputed_danger_zones
+    historical = precomputed_danger_zones.strip()
+    if source == "historical" or (source == "all" and danger_engine.epoch is None):
+        # Nothing reported yet
+        if not historical:
+            raise HTTPException(
+                status_code=503,
+                detail="Danger zones not available. Run 'python Model/scripts/run_model.py' first.",
+            )
+        return Response(content=historical, media_type="application/json")
+    live = live_danger_zones()
+    if source == "live" or not historical:
+        return Response(content=live, media_type="application/json")
+    if live == b"[]":
+        return Response(content=historical, media_type="application/json")
+    return Response(content=historical[:-1] + b"," + live[1:], media_type="application/json")
+
+
+def _parse_floats(value: str, n: int, name: str, example: str) -> tuple:
+    try:
+        parts = tuple(float(v) for v in value.split(","))
+        if len(parts) != n:
+            raise ValueError
+        return parts
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be '{example}'")
 
 
 @app.get("/safe-zones")
-def get_safe_zones():
-    """Return known safe zones (hospitals, shelters, open grounds) in Gilgit-Baltistan."""
+def get_safe_zones(
+    bbox:         Optional[str]   = None,
+    near:         Optional[str]   = None,
+    k:            int             = 10,
+    radius_km:    Optional[float] = None,
+    zone_type:    Optional[str]   = Query(None, alias="type"),
+    min_capacity: Optional[int]   = None,
+):
+    """
+    Return known safe zones (hospitals, shelters, open grounds) in Gilgit-Baltistan.
+
+    With no parameters every zone is returned. ``bbox`` ("south,west,north,east")
+    limits the result to a map viewport; ``near`` ("lat,lng") returns the ``k``
+    nearest zones, or all within ``radius_km`` when given, closest first.
+    ``type`` (comma-separated) and ``min_capacity`` filter any of these.
+    """
+    types = [t.strip() for t in zone_type.split(",")] if zone_type else None
+    if near:
+        lat, lng = _parse_floats(near, 2, "near", "lat,lng")
+        if radius_km is not None:
+            return safe_zone_index.within_radius(lat, lng, radius_km, types, min_capacity)
+        return safe_zone_index.nearest(lat, lng, k, types, min_capacity)
+    if bbox:
+        south, west, north, east = _parse_floats(bbox, 4, "bbox", "south,west,north,east")
+        return safe_zone_index.within_bbox(south, west, north, east, types, min_capacity)
+    if types or min_capacity:
+        return safe_zone_index.within_bbox(-90, -180, 90, 180, types, min_capacity)
     return SAFE_ZONES
 
 
-@app.post("/routes")
-def get_evacuation_route(req: RouteRequest):
+def _local_route(start_lat: float, start_lng: float) -> dict:
     """
-    Calculate evacuation route to the nearest safe zone.
-    Uses OSRM public routing API for real road geometry (OpenStreetMap data).
-    Falls back to straight-line estimate if OSRM is unreachable.
+    Nearest safe zone and, when the offline road graph can answer, the road
+    route to it. CPU-bound, so /routes runs it in the threadpool.
     """
-    start_lat = req.start.latitude
-    start_lng = req.start.longitude
+    # ── Precomputed shelter tree: nearest zone by road travel time ───────────
+    if shelter_tree is not None:
+        try:
+            with shelter_tree_lock:
+                local = shelter_tree.route(start_lat, start_lng)
+            if local is not None:
+                return {
+                    "zone":      local["zone"],
+                    "path":      local["path"],
+                    "dist_km":   round(local["distance_km"], 1),
+                    "time_mins": local["time_mins"],
+                    "note":      "Road route via offline OpenStreetMap graph. Obey local road conditions.",
+                }
+        except Exception as exc:
+            print(f"Shelter tree lookup failed: {exc}")
 
     # Find nearest safe zone by great-circle distance
-    closest_zone = min(
-        SAFE_ZONES,
-        key=lambda z: haversine_km(start_lat, start_lng, z["lat"], z["lng"]),
-    )
+    nearest = safe_zone_index.nearest(start_lat, start_lng, k=1)
+    if not nearest:
+        raise HTTPException(status_code=503, detail="No safe zones configured.")
+    closest_zone = {k: v for k, v in nearest[0].items() if k != "distance_km"}
 
     straight_dist = haversine_km(start_lat, start_lng, closest_zone["lat"], closest_zone["lng"])
+    result = {
+        "zone":      closest_zone,
+        "path":      None,
+        "dist_km":   straight_dist,
+        "time_mins": max(1, int((straight_dist / 30.0) * 60)),  # 30 km/h mountain road estimate
+        "note":      "Straight-line estimate — follow local road signs.",
+    }
+
+    # ── Offline road graph ───────────────────────────────────────────────────
+    if road_network is not None:
+        try:
+            local = road_network.route(start_lat, start_lng, closest_zone["lat"], closest_zone["lng"])
+            if local is not None:
+                result.update(
+                    path      = local["path"],
+                    dist_km   = round(local["distance_km"], 1),
+                    time_mins = local["time_mins"],
+                    note      = "Road route via offline OpenStreetMap graph. Obey local road conditions.",
+                )
+        except Exception as exc:
+            print(f"Offline routing failed: {exc}")
+    return result
+
+
+@app.post("/routes")
+async def get_evacuation_route(req: RouteRequest):
+    """
+    Calculate evacuation route to the nearest safe zone.
+    With an offline road graph the zone is the one with the shortest travel
+    time, read from the precomputed shelter tree; otherwise the OSRM public
+    routing API (both OpenStreetMap data). Falls back to a straight-line
+    estimate if neither produces a route, or at once while OSRM's circuit
+    breaker is open.
+    """
+    start_lat = req.start.latitude
+    start_lng = req.start.longitude
 
-    # Defaults used if OSRM fails
-    path      = None
-    dist_km   = straight_dist
-    time_mins = max(1, int((straight_dist / 30.0) * 60))  # 30 km/h mountain road estimate
-    note      = "Straight-line estimate — follow local road signs."
+    route = await run_in_threadpool(_local_route, start_lat, start_lng)
+    closest_zone = route["zone"]
+    path, dist_km, time_mins, note = route["path"], route["dist_km"], route["time_mins"], route["note"]
 
     # ── OSRM road-based routing ───────────────────────────────────────────────
     # OSRM coordinate order is lng,lat (opposite of Leaflet)
-    try:
-        osrm_url = (
-            "https://router.project-osrm.org/route/v1/driving/"
-            f"{start_lng},{start_lat};{closest_zone['lng']},{closest_zone['lat']}"
-            "?geometries=geojson&overview=full"
-        )
-        resp = requests.get(
-            osrm_url,
-            timeout=8,
-            headers={"User-Agent": "GBDMS-RiskEngine/2.0"},
-        )
-        if resp.status_code == 200:
-            data = resp.json()
+    if path is None and road_network is None:
+        try:
+            data = await osrm.get_json(
+                f"/route/v1/driving/{start_lng},{start_lat};{closest_zone['lng']},{closest_zone['lat']}",
+                params={"geometries": "geojson", "overview": "full"},
+            )
             if data.get("code") == "Ok" and data.get("routes"):
                 osrm_route = data["routes"][0]
                 # GeoJSON coords are [lng, lat] — convert to Leaflet [lat, lng]
@@ -416,8 +1368,10 @@ def get_evacuation_route(req: RouteRequest):
                 dist_km   = round(osrm_route["distance"] / 1000, 1)
                 time_mins = max(1, int(osrm_route["duration"] / 60))
                 note      = "Road route via OpenStreetMap. Obey local road conditions."
-    except Exception as exc:
-        print(f"OSRM routing failed (using straight-line fallback): {exc}")
+        except UpstreamUnavailable:
+            pass
+        except Exception as exc:
+            print(f"OSRM routing failed (using straight-line fallback): {exc}")
 
     # ── Straight-line fallback (11 interpolated waypoints) ───────────────────
     if path is None:
@@ -438,92 +1392,728 @@ def get_evacuation_route(req: RouteRequest):
     }
 
 
+def _geocode_local(q: str) -> tuple[list, str, tuple | None]:
+    """Gazetteer matches, cache key and cached Nominatim answer for ``q`` (blocking: SQLite, fuzzy search)."""
+    local = gazetteer.search(q, limit=5) if gazetteer is not None else []
+    key = normalize_place(q)
+    if any(r["edits"] == 0 for r in local) or geocode_cache is None:
+        return local, key, None
+    return local, key, geocode_cache.get(key)
+
+
 @app.get("/geocode")
-def geocode_location(q: str):
-    """Proxy geocoding to Nominatim to avoid browser CORS restrictions."""
+async def geocode_location(q: str):
+    """
+    Place search. Names in the local gazetteer are answered in-process; other
+    queries go to Nominatim through the persistent geocode cache. When
+    Nominatim cannot be reached an expired cache entry or the closest
+    gazetteer matches are returned instead.
+    """
     if not q:
         return []
+    # The fuzzy search and the SQLite cache run in the threadpool, off the event loop
+    local, key, cached = await run_in_threadpool(_geocode_local, q)
+    if any(r["edits"] == 0 for r in local):
+        return local
+
+    if cached is not None and cached[1]:
+        return cached[0] or local
     try:
-        response = requests.get(
-            "https://nominatim.openstreetmap.org/search",
-            params={"q": q, "format": "json", "limit": 5},
-            headers={"User-Agent": "GBDMS-RiskEngine/2.0"},
-            timeout=10,
-        )
-        response.raise_for_status()
-        return response.json()
+        data = await nominatim.get_json("/search", params={"q": q, "format": "json", "limit": 5})
+    except UpstreamError as exc:
+        if cached is not None:
+            return cached[0] or local
+        if local:
+            return local
+        status = 503 if isinstance(exc, UpstreamUnavailable) else 502
+        raise HTTPException(status_code=status, detail=str(exc))
+    if geocode_cache is not None:
+        await run_in_threadpool(geocode_cache.put, key, data)
+    return data or local
+
+
+@app.get("/geocode/autocomplete")
+def geocode_autocomplete(q: str, limit: int = Query(8, ge=1, le=20)):
+    """Search-box suggestions from the local gazetteer only (never calls Nominatim)."""
+    if gazetteer is None or not q:
+        return []
+    return gazetteer.search(q, limit=limit)
+
+
+# ── Road / Shelter Status ────────────────────────────────────────────────────
+
+def _require_shelter_tree() -> ShelterTree:
+    if shelter_tree is None:
+        raise HTTPException(status_code=503, detail="Offline road graph not loaded.")
+    return shelter_tree
+
+
+def _segment_edges(tree: ShelterTree, seg: RoadSegment) -> list[int]:
+    a = tree.network.snap(seg.start.latitude, seg.start.longitude)
+    b = tree.network.snap(seg.end.latitude, seg.end.longitude)
+    if a is None or b is None:
+        raise HTTPException(status_code=404, detail="Segment endpoints are not on the road graph.")
+    found = tree.network.shortest_path(a[0], b[0]) or tree.network.shortest_path(b[0], a[0])
+    if found is None:
+        raise HTTPException(status_code=404, detail="No road connects the segment endpoints.")
+    return tree.edges_between(found[0])
+
+
+@app.post("/admin/roads/block")
+def block_road(seg: RoadSegment):
+    """Close the road between two points (both directions) for evacuation routing."""
+    tree = _require_shelter_tree()
+    edges = _segment_edges(tree, seg)
+    with shelter_tree_lock:
+        tree.block_edges(edges)
+    return {"blocked_edges": len(edges), "total_blocked": len(tree.blocked)}
+
+
+@app.post("/admin/roads/unblock")
+def unblock_road(seg: RoadSegment):
+    tree = _require_shelter_tree()
+    edges = _segment_edges(tree, seg)
+    with shelter_tree_lock:
+        tree.unblock_edges(edges)
+    return {"unblocked_edges": len(edges), "total_blocked": len(tree.blocked)}
+
+
+@app.put("/admin/safe-zones/{name}/status")
+def set_zone_status(name: str, status: ZoneStatus):
+    """Stop (or resume) routing evacuees to a safe zone that is full."""
+    tree = _require_shelter_tree()
+    matches = [i for i, z in enumerate(tree.zones) if z["name"] == name]
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"Unknown safe zone: {name}")
+    with shelter_tree_lock:
+        for i in matches:
+            tree.set_zone_open(i, not status.at_capacity)
+    return {"name": name, "at_capacity": status.at_capacity, "closed_zones": len(tree.closed)}
+
+
+# ── Evacuation Planning ──────────────────────────────────────────────────────
+
+@app.post("/evacuation/plan")
+def plan_evacuation(req: EvacuationPlanRequest):
+    """
+    Assign the people at every point to safe zones without exceeding zone
+    capacity, minimising total person-km (great-circle distance). Each point
+    considers its ``k`` nearest zones within ``max_km``; zones marked full via
+    /admin/safe-zones/{name}/status are skipped. People who fit nowhere are
+    reported as unassigned. Per-zone loads are returned next to what sending
+    everyone to their nearest zone would have produced.
+    """
+    closed = set()
+    if shelter_tree is not None:
+        with shelter_tree_lock:
+            closed = {shelter_tree.zones[i]["name"] for i in shelter_tree.closed}
+    zones = [z for z in SAFE_ZONES if z["name"] not in closed]
+    if not zones:
+        raise HTTPException(status_code=503, detail="No open safe zones.")
+
+    lat    = np.array([p.latitude for p in req.points])
+    lon    = np.array([p.longitude for p in req.points])
+    people = np.array([p.people for p in req.points], dtype=np.int64)
+    z_lat  = np.array([z["lat"] for z in zones])
+    z_lng  = np.array([z["lng"] for z in zones])
+    capacity = np.array([z["capacity"] for z in zones], dtype=np.int64)
+    result   = solve_evacuation(lat, lon, people, z_lat, z_lng, capacity, k=req.k, max_km=req.max_km)
+    baseline = nearest_only(lat, lon, people, z_lat, z_lng)
+
+    assigned = int(result["people"].sum())
+    over = np.maximum(baseline["load"] - capacity, 0)
+    return {
+        "assignments": [
+            {"point": int(i), "zone": zones[z]["name"], "people": int(n), "distance_km": round(float(d), 2)}
+            for i, z, n, d in zip(result["point"], result["zone"], result["people"], result["distance_km"])
+        ],
+        "unassigned": [
+            {"point": int(i), "people": int(result["unassigned"][i])} for i in np.flatnonzero(result["unassigned"])
+        ],
+        "zones": [
+            {**z, "load": int(result["load"][j]), "nearest_only_load": int(baseline["load"][j])}
+            for j, z in enumerate(zones)
+        ],
+        "summary": {
+            "people":      int(people.sum()),
+            "assigned":    assigned,
+            "unassigned":  int(result["unassigned"].sum()),
+            "person_km":   round(result["cost"], 1),
+            "mean_km":     round(result["cost"] / assigned, 2) if assigned else None,
+            "nearest_only": {
+                "person_km":        round(baseline["cost"], 1),
+                "overloaded_zones": int((over > 0).sum()),
+                "over_capacity":    int(over.sum()),
+            },
+        },
+    }
+
+
+# ── Model Management ─────────────────────────────────────────────────────────
+
+@app.get("/admin/model")
+def get_model_status():
+    """Serving version, registry contents, last reload and shadow comparison."""
+    return {
+        "serving":  model_version(model_artifacts),
+        "current":  model_registry.current(),
+        "versions": model_registry.versions(),
+        "reload":   model_reloader.status,
+        "shadow":   shadow.stats() if shadow is not None else None,
+    }
+
+
+@app.post("/admin/model/reload", status_code=202)
+def reload_model(req: ModelReload | None = None):
+    """
+    Load, validate and install a registry version in the background.
+    Poll GET /admin/model for the outcome; 409 while a reload is running.
+    """
+    version = req.version if req else None
+    if version is not None and version not in model_registry.versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{version}'")
+    if not model_reloader.request(version):
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    return model_reloader.status
+
+
+@app.post("/admin/model/shadow")
+def start_shadow(cfg: ShadowConfig):
+    """Score ``percent`` of /predict traffic on a candidate version off the request path."""
+    global shadow
+    if cfg.version not in model_registry.versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{cfg.version}'")
+    try:
+        candidate = model_registry.load(cfg.version)
+        candidate.setdefault("forest", CompiledForest.from_artifacts(candidate))
     except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
+        raise HTTPException(status_code=422, detail=f"Could not load {cfg.version}: {exc}")
+    previous, shadow = shadow, ShadowScorer(candidate, cfg.percent, _shadow_proba, model_classes)
+    if previous is not None:
+        previous.stop()
+    return shadow.stats()
+
+
+@app.delete("/admin/model/shadow")
+def stop_shadow():
+    """Stop shadow scoring and return its final comparison."""
+    global shadow
+    previous, shadow = shadow, None
+    if previous is None:
+        raise HTTPException(status_code=404, detail="No shadow model is running")
+    previous.stop()
+    return previous.stats()
+
+
+# ── Live Risk Stream ─────────────────────────────────────────────────────────
+
+def _stream_evaluate(rows: list[dict], month: int) -> list[dict] | None:
+    artifacts = model_artifacts
+    if artifacts is None:
+        return None
+    reqs    = [PredictionRequest(**r) for r in rows]
+    probs   = predict_proba_matrix(requests_to_matrix(reqs, month, artifacts), artifacts)
+    classes = model_classes(artifacts)
+    return [
+        {k: r[k] for k in ("prediction", "risk_level", "confidence")}
+        for r in (format_prediction(p, classes) for p in probs)
+    ]
+
+
+# Watch points are the gazetteer's places; conditions are set per district
+risk_stream = RiskStream(
+    [p for p in gazetteer.places if p["class"] == "place"] if gazetteer is not None else [],
+    _stream_evaluate,
+    min_interval=float(os.getenv("GBDMS_STREAM_MIN_INTERVAL_MS", "250")) / 1000,
+)
+STREAM_SEND_TIMEOUT = float(os.getenv("GBDMS_STREAM_SEND_TIMEOUT", "10"))
+STREAM_HEARTBEAT    = 15.0
+
+
+def _subscription(districts: list[str], bboxes: list) -> Subscription:
+    """Validate district names and ``south,west,north,east`` boxes (strings or lists)."""
+    known   = {d.lower() for d in risk_stream.districts()}
+    unknown = [d for d in districts if d.lower() not in known]
+    if unknown:
+        raise ValueError(f"Unknown districts: {', '.join(unknown)}")
+    boxes = []
+    for box in bboxes:
+        parts = box.split(",") if isinstance(box, str) else box
+        try:
+            s, w, n, e = (float(v) for v in parts)
+        except (TypeError, ValueError):
+            raise ValueError(f"bbox must be south,west,north,east: {box!r}")
+        boxes.append((s, w, n, e))
+    return Subscription(districts=list(districts), bboxes=boxes)
+
+
+async def _subscribe(subscription: Subscription):
+    # Under lazy startup the first subscriber loads the model (off the event loop)
+    if model_artifacts is None and not _model_load_attempted:
+        await run_in_threadpool(load_model)
+    return risk_stream.subscribe(subscription, datetime.now().month)
+
+
+@app.put("/admin/conditions/{district}")
+def update_conditions(district: str, update: ConditionsUpdate):
+    """
+    Set the current rainfall / river level / triggers for a district. Its
+    places are scored again and class or risk-level changes are pushed to
+    /ws/risk and /stream/risk subscribers.
+    """
+    values = update.model_dump(exclude_none=True)
+    try:
+        changes = risk_stream.update_conditions(district, values, datetime.now().month)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown district: {district}")
+    return {"district": district, "conditions": risk_stream.district_conditions(district), "changes": changes}
+
+
+@app.get("/conditions")
+def get_conditions():
+    return {d: risk_stream.district_conditions(d) for d in risk_stream.districts()}
+
+
+@app.websocket("/ws/risk")
+async def risk_socket(ws: WebSocket):
+    """
+    Risk-change stream. Subscribe with ``?district=...&bbox=s,w,n,e`` (none:
+    every place) and change it later by sending
+    ``{"districts": [...], "bboxes": [[s, w, n, e]]}``. Messages are a
+    ``snapshot`` of the covered places, then ``update`` batches of changes.
+    """
+    try:
+        subscription = _subscription(ws.query_params.getlist("district"), ws.query_params.getlist("bbox"))
+    except ValueError as exc:
+        await ws.close(code=1008, reason=str(exc))
+        return
+    await ws.accept()
+    sub = await _subscribe(subscription)
+
+    async def receive():
+        while True:
+            msg = await ws.receive_json()
+            try:
+                risk_stream.resubscribe(sub, _subscription(msg.get("districts", []), msg.get("bboxes", [])))
+            except (AttributeError, ValueError) as exc:
+                await ws.send_text(json.dumps({"type": "error", "detail": str(exc)}))
+
+    async def send():
+        while True:
+            msg = await sub.next_message()
+            # A client that stops reading is dropped instead of stalling its task forever
+            await asyncio.wait_for(ws.send_text(msg), STREAM_SEND_TIMEOUT)
+
+    tasks = {asyncio.create_task(receive()), asyncio.create_task(send())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if isinstance(task.exception(), asyncio.TimeoutError):
+                risk_stream.dropped += 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        risk_stream.unsubscribe(sub)
+
+
+@app.get("/stream/risk")
+async def risk_events(district: list[str] = Query(default=[]), bbox: list[str] = Query(default=[])):
+    """Server-sent events version of /ws/risk (one JSON message per ``data:`` line)."""
+    try:
+        subscription = _subscription(district, bbox)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    sub = await _subscribe(subscription)
+
+    async def events():
+        try:
+            while True:
+                msg = await sub.next_message(timeout=STREAM_HEARTBEAT)
+                yield ": keepalive\n\n" if msg is None else f"data: {msg}\n\n"
+        finally:
+            risk_stream.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── Sensor Stations ──────────────────────────────────────────────────────────
+
+# Optional station list (JSON); stations can also be registered with their readings
+STATIONS_PATH = os.getenv("GBDMS_STATIONS_PATH", os.path.join(_HERE, "data/stations.json"))
+SENSOR_MAX_KM = float(os.getenv("GBDMS_SENSOR_MAX_KM", "30"))
+
+sensor_store = SensorStore(capacity=int(os.getenv("GBDMS_SENSOR_CAPACITY", str(SENSOR_CAPACITY))))
+try:
+    if os.path.exists(STATIONS_PATH):
+        with startup.stage("artifact", "sensor stations"):
+            for station in load_stations(STATIONS_PATH):
+                sensor_store.add_station(station)
+        print(f"Sensor stations loaded: {len(sensor_store)} from {STATIONS_PATH}")
+except Exception as exc:
+    print(f"WARNING: could not load sensor stations ({exc})")
+
+
+def _finite(value):
+    return None if value is None or not math.isfinite(value) else round(float(value), 3)
+
+
+@app.post("/sensors/readings")
+def ingest_readings(batch: SensorBatch):
+    """
+    Store gauge readings (and register or move the stations in ``stations``).
+    Districts whose stations got new data have their live-stream conditions
+    recomputed from the station aggregates.
+    """
+    for station in batch.stations:
+        sensor_store.add_station(station.model_dump())
+    result = sensor_store.ingest(
+        [r.station for r in batch.readings],
+        [r.time.timestamp() for r in batch.readings],
+        np.array([[np.nan if getattr(r, m) is None else getattr(r, m) for m in SENSOR_METRICS]
+                  for r in batch.readings], dtype=np.float64).reshape(-1, len(SENSOR_METRICS)),
+    )
+
+    districts = sorted({sensor_store.stations[s]["district"] for s in result.pop("stations")})
+    month = datetime.now().month
+    for district in districts:
+        values = sensor_store.district_conditions(sensor_store.district_rows(district))
+        try:
+            risk_stream.update_conditions(district, values, month)
+        except KeyError:
+            pass   # no watch points in this district
+    return {**result, "districts": districts}
+
+
+@app.get("/sensors/stations")
+def get_stations():
+    """Every station with its latest values and rolling 1h / 24h / 72h aggregates."""
+    agg = sensor_store.aggregates()
+    return {
+        "count":    len(sensor_store),
+        "stations": [
+            {**st, **{k: (int(v[s]) if k.startswith("readings_") else _finite(v[s])) for k, v in agg.items()}}
+            for s, st in enumerate(sensor_store.stations)
+        ],
+    }
+
+
+@app.post("/predict/sensors")
+def predict_from_sensors(req: SensorPredictionRequest, x_deadline_ms: Annotated[Optional[float], Header()] = None):
+    """
+    Risk for every place of a district (or for ``locations``) with rainfall,
+    river level and temperature taken from the nearest stations instead of
+    the request. All rows are scored in one forest pass; each result lists
+    the inputs used and how many stations contributed (0: no station within
+    ``max_km``, inputs left at zero).
+    """
+    artifacts = _require_model()
+    if req.district:
+        places = [p for p in (gazetteer.places if gazetteer is not None else [])
+                  if p["class"] == "place" and p["district"].lower() == req.district.lower()]
+        if not places:
+            raise HTTPException(status_code=404, detail=f"No places known in district: {req.district}")
+        rows = [{"name": p["name"], "latitude": p["lat"], "longitude": p["lon"],
+                 "district": p["district"], "terrain": "Unknown"} for p in places]
+    elif req.locations:
+        rows = [loc.model_dump() for loc in req.locations]
+    else:
+        raise HTTPException(status_code=422, detail="Give a district or at least one location")
+
+    month = datetime.now().month
+    try:
+        with predict_stage.time("features"):
+            lat    = np.array([r["latitude"] for r in rows])
+            lon    = np.array([r["longitude"] for r in rows])
+            inputs = sensor_store.features(lat, lon, k=req.k, max_km=req.max_km or SENSOR_MAX_KM)
+            X = build_feature_matrix(
+                latitude             = lat,
+                longitude            = lon,
+                district_enc         = encode_locations(lat, lon, [r["district"] or "Unknown" for r in rows], artifacts),
+                month                = month,
+                rainfall_mm          = inputs["rainfall"],
+                river_level_m        = inputs["river_level"],
+                temperature_elevated = inputs["temperature_elevated"],
+                terrain              = [r["terrain"] or "Unknown" for r in rows],
+                seismic_activity     = req.seismic_activity,
+                features             = artifacts["features"],
+            )
+        probs = inference_executor.run(artifacts, artifacts, X, x_deadline_ms)
+    except (QueueFull, DeadlineExceeded) as exc:
+        raise _overloaded(exc)
+
+    with predict_stage.time("response"):
+        classes = model_classes(artifacts)
+        results = [
+            {
+                **row,
+                "inputs": {
+                    "rainfall":             round(float(inputs["rainfall"][i]), 2),
+                    "river_level":          round(float(inputs["river_level"][i]), 2),
+                    "temperature_elevated": bool(inputs["temperature_elevated"][i]),
+                    "stations":             int(inputs["stations"][i]),
+                },
+                **format_prediction(p, classes),
+            }
+            for i, (row, p) in enumerate(zip(rows, probs))
+        ]
+    return {"count": len(results), "results": results}
+
+
+# ── Incident Reports ─────────────────────────────────────────────────────────
+
+# Verified reports feed live danger zones; see danger_zones.py for the clustering
+danger_engine = DangerZoneEngine(
+    cell_km         = float(os.getenv("GBDMS_DANGER_CELL_KM", "2")),
+    half_life_hours = float(os.getenv("GBDMS_DANGER_HALF_LIFE_HOURS", "72")),
+    min_weight      = float(os.getenv("GBDMS_DANGER_MIN_WEIGHT", "3")),
+    max_cells       = int(os.getenv("GBDMS_DANGER_MAX_CELLS", "50000")),
+)
+danger_lock = threading.Lock()
+# Live zones are re-serialised at most this often unless a report changes them
+DANGER_REFRESH_SECONDS = float(os.getenv("GBDMS_DANGER_REFRESH_SECONDS", "10"))
+_live_zones: tuple[tuple | None, bytes] = (None, b"[]")
+
+# Subscribe to the Firebase ``reports`` tree instead of relying on POST /admin/reports
+REPORTS_LISTEN = os.getenv("GBDMS_REPORTS_LISTEN", "0") == "1"
+report_listener = None
+
+
+def _zone_labels():
+    """Name a zone after the nearest gazetteer town or village."""
+    if gazetteer is None:
+        return None
+    places = [p for p in gazetteer.places if p["class"] == "place"] or gazetteer.places
+    lat = np.array([p["lat"] for p in places])
+    lon = np.array([p["lon"] for p in places])
+    scale = math.cos(math.radians(float(lat.mean())))
+
+    def label(zone_lat: float, zone_lon: float) -> str:
+        p = places[int(np.argmin((lat - zone_lat) ** 2 + ((lon - zone_lon) * scale) ** 2))]
+        return f"{p['name']}, {p['district']}"
+
+    return label
+
+
+danger_engine.label = _zone_labels()
+
+
+def live_danger_zones() -> bytes:
+    """JSON list of the live zones, rebuilt when reports change them or every refresh period."""
+    global _live_zones
+    key = (danger_engine.version, int(time.time() // DANGER_REFRESH_SECONDS))
+    if _live_zones[0] == key:
+        return _live_zones[1]
+    with danger_lock:
+        zones = danger_engine.zones_at()
+        key = (danger_engine.version, key[1])
+    _live_zones = (key, json.dumps(zones).encode())
+    return _live_zones[1]
+
+
+def _report_time(value) -> float | None:
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)   # JS Date.now() is in ms
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def locate_report(location: str) -> tuple[float, float] | None:
+    """Coordinates for a free-text report location: the longest leading phrase, then any word, the gazetteer knows."""
+    if gazetteer is None:
+        return None
+    words = [w for w in location.replace(",", " ").split() if w]
+    phrases = [" ".join(words[:n]) for n in range(len(words), 0, -1)] + [w for w in words[1:] if len(w) >= 4]
+    for phrase in phrases:
+        found = gazetteer.search(phrase, limit=1, fuzzy=False)
+        if found:
+            return float(found[0]["lat"]), float(found[0]["lon"])
+    return None
+
+
+def report_records(items) -> tuple[list[dict], dict]:
+    """
+    Engine records for ``(id, report)`` pairs. Reports that are not verified
+    or cannot be placed (no coordinates, unknown location) are counted and
+    left out.
+    """
+    records, counts = [], {"unverified": 0, "unlocated": 0}
+    for rid, data in items:
+        if not isinstance(data, dict) or data.get("status") != "verified":
+            counts["unverified"] += 1
+            continue
+        lat, lon = data.get("latitude", data.get("lat")), data.get("longitude", data.get("lng"))
+        if lat is None or lon is None:
+            place = locate_report(str(data.get("location") or ""))
+            if place is None:
+                counts["unlocated"] += 1
+                continue
+            lat, lon = place
+        t = _report_time(data.get("createdAt") or data.get("created_at"))
+        records.append({
+            "id":   rid,
+            "lat":  lat,
+            "lng":  lon,
+            "type": data.get("type") or "Unknown",
+            "time": time.time() if t is None else t,
+        })
+    return records, counts
+
+
+def ingest_reports(items) -> dict:
+    records, counts = report_records(items)
+    with danger_lock:
+        result = danger_engine.ingest(records)
+    return {**counts, **result}
+
+
+def on_report_event(event):
+    """
+    Firebase listener callback for ``reports``. The first event holds the
+    whole tree; later ones a report (``/<id>``) or one of its fields
+    (``/<id>/status``), in which case the full report is read back.
+    """
+    base = [p for p in event.path.split("/") if p]
+    if event.event_type == "patch" and isinstance(event.data, dict):
+        changes = [(base + [p for p in key.split("/") if p], value) for key, value in event.data.items()]
+    else:
+        changes = [(base, event.data)]
+
+    items, reread = [], set()
+    for path, value in changes:
+        if value is None:
+            continue                      # deletions: the zone fades out with time
+        if not path:
+            items.extend(value.items() if isinstance(value, dict) else [])
+        elif len(path) == 1:
+            items.append((path[0], value))
+        else:
+            reread.add(path[0])
+    for rid in sorted(reread):
+        items.append((rid, firebase_db.reference(f"reports/{rid}").get()))
+    if items:
+        try:
+            ingest_reports(items)
+        except Exception as exc:
+            print(f"WARNING: could not ingest reports: {exc}")
+
+
+def start_report_listener() -> bool:
+    global report_listener
+    if report_listener is None and init_firebase():
+        report_listener = firebase_db.reference("reports").listen(on_report_event)
+        print("Listening for incident reports.")
+    return report_listener is not None
+
+
+if REPORTS_LISTEN:
+    try:
+        start_report_listener()
+    except Exception as exc:
+        print(f"WARNING: could not listen for incident reports: {exc}")
+
+
+@app.post("/admin/reports")
+def post_reports(batch: ReportBatch):
+    """
+    Feed incident reports to the live danger zones. Only ``verified``
+    reports count; each id is taken once, so re-sending a report is harmless.
+    """
+    return ingest_reports((r.id, r.model_dump()) for r in batch.reports)
 
 
-# ── Admin Endpoints (Firebase required) ──────────────────────────────────────
+@app.get("/admin/reports/stats")
+def report_stats():
+    with danger_lock:
+        danger_engine.advance()
+        return {**danger_engine.stats(), "listening": report_listener is not None}
+
+
+# ── Admin Endpoints (Firebase required)──────────────────────────────────────
 
 def _require_firebase():
-    if not FIREBASE_AVAILABLE:
+    if not init_firebase():
         raise HTTPException(
             status_code=503,
             detail="Firebase Admin SDK not configured. Set FIREBASE_ADMIN_* environment variables.",
         )
 
 
-@app.get("/admin/users")
-def list_users():
+def _users() -> UserDirectory:
+    global user_directory
     _require_firebase()
+    if user_directory is None:
+        user_directory = UserDirectory(auth, firebase_db, ttl_seconds=USERS_CACHE_TTL)
+    return user_directory
+
+
+@app.get("/admin/users")
+def list_users(
+    cursor: Optional[str] = None,
+    limit:  int = Query(100, ge=1, le=1000),
+    search: Optional[str] = None,
+    role:   Optional[str] = None,
+):
+    directory = _users()
     try:
-        page  = auth.list_users()
-        return [
-            {
-                "uid":           u.uid,
-                "email":         u.email,
-                "display_name":  u.display_name,
-                "disabled":      u.disabled,
-                "custom_claims": u.custom_claims,
-            }
-            for u in page.users
-        ]
+        return directory.list_users(cursor=cursor, limit=limit, search=search, role=role)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
 
 @app.post("/admin/users")
 def create_user(user: UserCreate):
-    _require_firebase()
+    directory = _users()
     try:
-        u = auth.create_user(
-            email=user.email,
-            password=user.password,
-            display_name=user.display_name,
-        )
-        auth.set_custom_user_claims(u.uid, {"role": user.role})
-        firebase_db.reference(f"users/{u.uid}").set(
-            {
-                "name":      user.display_name,
-                "email":     user.email,
-                "role":      user.role,
-                "createdAt": getattr(u.user_metadata, "creation_timestamp", None),
-            }
-        )
-        return {"uid": u.uid, "message": "User created successfully"}
+        uid = directory.create(user.email, user.password, user.display_name, user.role)
+        return {"uid": uid, "message": "User created successfully"}
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.post("/admin/users/import")
+def import_users(body: UserImport):
+    directory = _users()
+    try:
+        return directory.import_users([u.model_dump(exclude_none=True) for u in body.users])
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.post("/admin/users/bulk-update")
+def bulk_update_users(body: UserBulkUpdate):
+    directory = _users()
+    try:
+        return directory.update_users([u.model_dump() for u in body.users])
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.post("/admin/users/bulk-delete")
+def bulk_delete_users(body: UserBulkDelete):
+    directory = _users()
+    try:
+        return directory.delete_users(body.uids)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
 
 @app.put("/admin/users/{uid}")
 def update_user(uid: str, user: UserUpdate):
-    _require_firebase()
+    directory = _users()
     try:
-        updates = {}
-        if user.display_name:
-            updates["display_name"] = user.display_name
-        if user.disabled is not None:
-            updates["disabled"] = user.disabled
-        if updates:
-            auth.update_user(uid, **updates)
-        if user.role:
-            auth.set_custom_user_claims(uid, {"role": user.role})
-            firebase_db.reference(f"users/{uid}").update({"role": user.role})
-        if user.display_name:
-            firebase_db.reference(f"users/{uid}").update({"name": user.display_name})
+        directory.update(uid, user.display_name, user.role, user.disabled)
         return {"message": "User updated successfully"}
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
@@ -531,15 +2121,16 @@ def update_user(uid: str, user: UserUpdate):
 
 @app.delete("/admin/users/{uid}")
 def delete_user(uid: str):
-    _require_firebase()
+    directory = _users()
     try:
-        auth.delete_user(uid)
-        firebase_db.reference(f"users/{uid}").delete()
+        directory.delete(uid)
         return {"message": "User deleted successfully"}
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
 
+startup.mark_ready()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
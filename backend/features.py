@@ -0,0 +1,135 @@
+"""
+Feature engineering shared by the API server and the offline inference engine.
+
+Maps user-facing environmental inputs (rainfall, river level, terrain, ...) to
+the trained model's feature space. Kept free of heavy imports so that both
+fast_server.py and inference.py can use it without loading each other.
+"""
+
+import numpy as np
+
+# Scaling factor: user river_level (m) -> discharge proxy used in training
+# Training Flood Attribute 3 range: ~200-5000  /  user river_level max: 30 m
+RIVER_DISCHARGE_SCALE = 167.0
+
+TERRAIN_MAP = {"Valley": 1, "Hilly": 2, "Mountainous": 3}
+
+# rainfall_trigger is set above this many mm/24h
+RAINFALL_TRIGGER_MM = 20.0
+
+# User-facing input (the /predict field) each model feature is derived from
+FEATURE_INPUTS = {
+    "latitude":             "location",
+    "longitude":            "location",
+    "district_enc":         "district",
+    "month":                "month",
+    "rainfall_mm":          "rainfall",
+    "rainfall_trigger":     "rainfall",
+    "river_discharge":      "river_level",
+    "temperature_elevated": "temperature_elevated",
+    "glacial_trigger":      "temperature_elevated",
+    "terrain_code":         "terrain",
+    "seismic_trigger":      "seismic_activity",
+}
+
+
+def build_feature_row(
+    latitude: float,
+    longitude: float,
+    district_enc: int,
+    month: int,
+    rainfall_mm: float,
+    river_level_m: float,
+    temperature_elevated: bool,
+    terrain: str,
+    seismic_activity: bool,
+) -> dict:
+    """
+    Map user-provided environmental inputs to the trained model's feature space.
+
+    Feature semantics match the training engineering in run_model.py:
+      rainfall_mm        — direct mm input (Flood Attribute 2 range: 50-500)
+      river_discharge    — river_level_m * 167  (training range ~200-5000 for Flood)
+      temperature_elevated — 1 if user reports elevated temperature (GLOF trigger)
+      terrain_code       — Valley=1, Hilly=2, Mountainous=3, Unknown=0
+      seismic_trigger    — 1 if seismic activity detected
+      glacial_trigger    — 1 if temperature elevated (glacier melt) OR seismic near glacier
+      rainfall_trigger   — 1 if rainfall > 20 mm
+    """
+    river_discharge   = river_level_m * RIVER_DISCHARGE_SCALE
+    temp_elev_int     = 1 if temperature_elevated else 0
+    terrain_code      = TERRAIN_MAP.get(terrain, 0)
+    seismic_int       = 1 if seismic_activity else 0
+    # Glacial trigger: driven by temperature only (high temp melts glaciers → GLOF risk)
+    # Seismic activity does NOT set this flag; seismic_trigger alone routes to Earthquake/Landslide
+    glacial_int       = 1 if temperature_elevated else 0
+    rainfall_trig_int = 1 if rainfall_mm > RAINFALL_TRIGGER_MM else 0
+
+    return {
+        "latitude":             latitude,
+        "longitude":            longitude,
+        "district_enc":         district_enc,
+        "month":                month,
+        "rainfall_mm":          rainfall_mm,
+        "river_discharge":      river_discharge,
+        "temperature_elevated": temp_elev_int,
+        "terrain_code":         terrain_code,
+        "seismic_trigger":      seismic_int,
+        "glacial_trigger":      glacial_int,
+        "rainfall_trigger":     rainfall_trig_int,
+    }
+
+
+def build_feature_matrix(
+    latitude,
+    longitude,
+    district_enc,
+    month,
+    rainfall_mm,
+    river_level_m,
+    temperature_elevated,
+    terrain,
+    seismic_activity,
+    features: list[str],
+) -> np.ndarray:
+    """
+    Vectorised build_feature_row for many rows at once.
+
+    Every argument is a 1-D sequence over rows (scalars broadcast), ``terrain``
+    holds the user-facing terrain names. Returns a float64 matrix of shape
+    (n_rows, len(features)) with columns in the model's training order.
+    """
+    lat, lon, dist, mon, rain, river, temp, seis = np.broadcast_arrays(
+        np.asarray(latitude,             dtype=np.float64),
+        np.asarray(longitude,            dtype=np.float64),
+        np.asarray(district_enc,         dtype=np.float64),
+        np.asarray(month,                dtype=np.float64),
+        np.asarray(rainfall_mm,          dtype=np.float64),
+        np.asarray(river_level_m,        dtype=np.float64),
+        np.asarray(temperature_elevated, dtype=bool),
+        np.asarray(seismic_activity,     dtype=bool),
+    )
+    n = lat.shape[0] if lat.ndim else 1
+    if isinstance(terrain, str):
+        terrain = [terrain] * n
+    terrain_code = np.fromiter(
+        (TERRAIN_MAP.get(t, 0) for t in terrain), dtype=np.float64, count=n
+    )
+
+    columns = {
+        "latitude":             lat,
+        "longitude":            lon,
+        "district_enc":         dist,
+        "month":                mon,
+        "rainfall_mm":          rain,
+        "river_discharge":      river * RIVER_DISCHARGE_SCALE,
+        "temperature_elevated": temp.astype(np.float64),
+        "terrain_code":         terrain_code,
+        "seismic_trigger":      seis.astype(np.float64),
+        "glacial_trigger":      temp.astype(np.float64),
+        "rainfall_trigger":     (rain > RAINFALL_TRIGGER_MM).astype(np.float64),
+    }
+    X = np.empty((n, len(features)), dtype=np.float64)
+    for j, name in enumerate(features):
+        X[:, j] = columns[name]
+    return X
@@ -0,0 +1,170 @@
+"""
+In-process gazetteer of Gilgit-Baltistan place names for /geocode.
+
+Names and alternate names from ``data/gazetteer.csv`` are normalised
+(lower case, accents and punctuation stripped) and inserted into a
+character trie, together with every word-suffix of multi-word names so
+"lake" finds "Attabad Lake". Every trie node keeps the best few entries
+below it, ranked by place type, so a prefix lookup is one walk of
+len(query) nodes.
+
+Fuzzy matches walk the same trie below the query's first letter with a
+banded Levenshtein row per node and stop descending once every cell exceeds
+the edit budget; a node whose last cell is within budget matches the query
+as a prefix, and its best entries are taken as they are.
+
+Results use Nominatim's JSON shape so callers can treat both alike.
+"""
+
+import csv
+import os
+import re
+import unicodedata
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(_HERE, "data", "gazetteer.csv")
+
+# Larger is listed first among equally good matches
+TYPE_RANK = {"administrative": 5, "city": 4, "town": 3, "village": 2, "suburb": 2}
+BEST_PER_NODE = 10
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+class _Node:
+    __slots__ = ("children", "best")
+
+    def __init__(self):
+        self.children: dict[str, "_Node"] = {}
+        self.best: list[int] = []
+
+
+class Gazetteer:
+    def __init__(self, places: list[dict]):
+        self.places = places
+        self.rank = [TYPE_RANK.get(p["type"], 1) for p in places]
+        self.root = _Node()
+
+        for i, place in enumerate(places):
+            names = [place["name"], *place.get("alt_names", [])]
+            keys = set()
+            for name in names:
+                words = normalize(name).split()
+                keys.update(" ".join(words[j:]) for j in range(len(words)))
+            for key in keys:
+                node = self.root
+                for ch in key:
+                    node = node.children.setdefault(ch, _Node())
+                    node.best.append(i)
+
+        order = {i: (-r, places[i]["name"]) for i, r in enumerate(self.rank)}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.best = sorted(set(node.best), key=order.__getitem__)[:BEST_PER_NODE]
+            stack.extend(node.children.values())
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        """Read ``name,alt_names,class,type,district,lat,lon`` rows (alt names ``|``-separated)."""
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        places = [
+            {
+                "name":      r["name"],
+                "alt_names": [a for a in (r.get("alt_names") or "").split("|") if a],
+                "class":     r["class"],
+                "type":      r["type"],
+                "district":  r["district"],
+                "lat":       float(r["lat"]),
+                "lon":       float(r["lon"]),
+            }
+            for r in rows
+        ]
+        return cls(places)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    # ── Matching ─────────────────────────────────────────────────────────────
+
+    def _prefix(self, key: str) -> list[int]:
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return node.best
+
+    def _fuzzy(self, key: str, max_edits: int) -> dict[int, int]:
+        """Entries whose names start with ``key`` within ``max_edits`` edits -> edit count."""
+        n, cap = len(key), max_edits + 1
+        found: dict[int, int] = {}
+        # Typos in the first letter are rare; anchoring on it keeps the walk small
+        anchor = self.root.children.get(key[0])
+        if anchor is None:
+            return found
+        stack = [(anchor, key[0], [min(j, cap) for j in range(n + 1)], 1)]
+        while stack:
+            node, ch, prev, depth = stack.pop()
+            # Only cells within max_edits of the diagonal can stay under budget
+            row = [min(depth, cap)] + [cap] * n
+            floor = row[0]
+            for j in range(max(1, depth - max_edits), min(n, depth + max_edits) + 1):
+                v = prev[j - 1] + (key[j - 1] != ch)
+                if prev[j] + 1 < v:
+                    v = prev[j] + 1
+                if row[j - 1] + 1 < v:
+                    v = row[j - 1] + 1
+                if v < floor:
+                    floor = v
+                row[j] = v if v < cap else cap
+            edits = row[n]
+            if edits < cap:
+                for i in node.best:
+                    if edits < found.get(i, cap):
+                        found[i] = edits
+            # Deeper nodes can only match with >= min(row) edits
+            if floor < min(edits, cap):
+                stack.extend((child, c, row, depth + 1) for c, child in node.children.items())
+        return found
+
+    def search(self, query: str, limit: int = 5, fuzzy: bool = True) -> list[dict]:
+        """
+        Places matching ``query`` as a name prefix, best first. Exact prefix
+        matches come before fuzzy ones (same first letter, 1 edit for short
+        queries, 2 from 6 characters); each result carries its ``edits``.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        scored = {i: 0 for i in self._prefix(key)}
+        if fuzzy and len(scored) < limit and len(key) >= 3:
+            for i, d in self._fuzzy(key, 1 if len(key) < 6 else 2).items():
+                scored.setdefault(i, d)
+        ranked = sorted(scored, key=lambda i: (scored[i], -self.rank[i], self.places[i]["name"]))
+        return [self._result(i, scored[i]) for i in ranked[:limit]]
+
+    def _result(self, i: int, edits: int) -> dict:
+        p = self.places[i]
+        district = p["district"]
+        if p["type"] == "administrative":
+            display = f"{p['name']}, Gilgit-Baltistan, Pakistan"
+        else:
+            display = f"{p['name']}, {district} District, Gilgit-Baltistan, Pakistan"
+        return {
+            "place_id":     f"gazetteer:{i}",
+            "name":         p["name"],
+            "display_name": display,
+            "lat":          f"{p['lat']:.6f}",
+            "lon":          f"{p['lon']:.6f}",
+            "class":        p["class"],
+            "type":         p["type"],
+            "addresstype":  p["type"],
+            "district":     district,
+            "source":       "gazetteer",
+            "edits":        edits,
+        }
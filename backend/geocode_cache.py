@@ -0,0 +1,83 @@
+"""
+Persistent SQLite cache for upstream geocoding responses.
+
+Entries are keyed on the normalised query and survive restarts. Fresh
+entries (younger than ``ttl_seconds``) are served without contacting the
+upstream; expired ones are kept and only served when the upstream cannot be
+reached, so a query answered once keeps working offline.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+GEOCODE_CACHE_PATH = os.path.join(_HERE, "cache", "geocode.sqlite")
+
+
+class GeocodeCache:
+    def __init__(self, path: str = GEOCODE_CACHE_PATH, ttl_seconds: float = 30 * 86400):
+        self.path        = path
+        self.ttl_seconds = ttl_seconds
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db   = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " query TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+        self.hits   = 0
+        self.stale  = 0
+        self.misses = 0
+
+    def get(self, query: str) -> tuple[object, bool] | None:
+        """``(response, fresh)`` for ``query``, or None if it was never cached."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, fetched_at FROM geocode WHERE query = ?", (query,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        fresh = time.time() - row[1] < self.ttl_seconds
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale += 1
+        return json.loads(row[0]), fresh
+
+    def put(self, query: str, response):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode (query, response, fetched_at) VALUES (?, ?, ?)",
+                (query, json.dumps(response), time.time()),
+            )
+
+    def purge_expired(self, max_age_seconds: float) -> int:
+        """Drop entries older than ``max_age_seconds``. Returns the number removed."""
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM geocode WHERE fetched_at < ?", (time.time() - max_age_seconds,))
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "size":        len(self),
+            "ttl_seconds": self.ttl_seconds,
+            "hits":        self.hits,
+            "stale":       self.stale,
+            "misses":      self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
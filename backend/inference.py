@@ -0,0 +1,493 @@
+"""
+Compiled RandomForest inference without sklearn on the hot path.
+
+Every tree of the forest is packed into one set of contiguous typed arrays
+(the same left/right/feature/threshold/value layout train_and_export.py writes
+to model.json). The StandardScaler is folded into the split thresholds, so raw
+feature rows go straight into the traversal, which walks every tree for every
+input row at once with NumPy fancy indexing.
+
+sklearn tests ``float32((x - mean) / scale) <= t`` at every split. Folding
+uses the exact raw-space boundary of that test (see fold_thresholds), so leaf
+assignment is identical to sklearn and probabilities agree to float64
+summation tolerance.
+
+Trained models can also be stored as a directory of .npy arrays plus
+meta.json (save_model_arrays). Loading that format memory-maps the arrays and
+needs neither joblib nor sklearn, which keeps server cold starts short.
+The maps are read-only and backed by the page cache, so any number of
+server workers on one host share a single physical copy of the forest
+(shared_model_arrays exports model.joblib once for that purpose).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from features import build_feature_matrix
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(_HERE, "../Model/output/model.joblib")
+MODEL_ARRAYS_DIR = os.path.join(_HERE, "../Model/output/model_arrays")
+SHARED_ARRAYS_DIR = os.path.join(_HERE, "cache", "model_arrays")
+
+# Bumped when the on-disk array layout changes
+ARRAYS_FORMAT_VERSION = 1
+_FOREST_ARRAYS = ("left", "feature", "threshold", "value", "roots")
+
+# Artifact entries carried over to meta.json
+_META_KEYS = (
+    "features", "classes", "district_classes", "river_discharge_scale",
+    "terrain_map", "test_accuracy", "trained_at", "source_version", "compacted_at",
+    "source_agreement",
+)
+
+# Rows per traversal chunk; keeps the (rows, trees) index buffers cache-sized
+CHUNK_ROWS = 256
+
+# Upper bound on float64 ulp steps when refining a folded threshold
+_FOLD_MAX_STEPS = 64
+
+
+def fold_thresholds(threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Raw-space thresholds equivalent to sklearn's split test on scaled input.
+
+    sklearn casts the scaled row to float32 before comparing, so the test
+    ``float32((x - mean) / scale) <= t`` holds exactly for scaled values below
+    the rounding midpoint between the largest float32 <= t and its successor.
+    That midpoint is mapped back to raw space and then nudged ulp by ulp to
+    the largest float64 ``x`` that still goes left, so ``x <= folded`` agrees
+    with sklearn for every input.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    t32 = threshold.astype(np.float32)
+    t32 = np.where(t32.astype(np.float64) > threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+    midpoint = (t32.astype(np.float64) + np.nextafter(t32, np.float32(np.inf)).astype(np.float64)) / 2
+
+    folded = midpoint * scale + mean
+    for _ in range(_FOLD_MAX_STEPS):
+        down = ~goes_left(folded)
+        if not down.any():
+            break
+        folded[down] = np.nextafter(folded[down], -np.inf)
+    for _ in range(_FOLD_MAX_STEPS):
+        step = np.nextafter(folded, np.inf)
+        up = goes_left(step)
+        if not up.any():
+            break
+        folded[up] = step[up]
+    return folded
+
+
+def _sibling_order(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Breadth-first node order of one tree in which every pair of children is adjacent."""
+    order    = [np.zeros(1, dtype=np.int64)]
+    frontier = order[0]
+    while frontier.size:
+        internal = frontier[left[frontier] != -1]
+        frontier = np.column_stack([left[internal], right[internal]]).ravel()
+        order.append(frontier)
+    return np.concatenate(order)
+
+
+class CompiledForest:
+    """
+    All trees of a forest flattened into shared node arrays.
+
+    Nodes are laid out so that the right child of every internal node directly
+    follows its left child; one traversal step is then
+    ``idx = left[idx] + (x[feature[idx]] > threshold[idx])``. Leaves point to
+    themselves with an infinite threshold, so rows that reach a leaf early just
+    stay there until the deepest tree finishes.
+    """
+
+    def __init__(
+        self,
+        left: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: list,
+        n_features: int,
+        max_depth: int | None = None,
+    ):
+        self.left      = left        # intp    (n_nodes,)  left child (right = left + 1), self for leaves
+        self.feature   = feature     # intp    (n_nodes,)  split feature, 0 for leaves
+        self.threshold = threshold   # float64 (n_nodes,)  raw-space split, +inf for leaves
+        self.value     = value       # float64 (n_classes, n_nodes) normalised class probabilities
+        self.roots     = roots       # intp    (n_trees,)
+        self.classes_  = np.asarray(classes)
+        self.n_features = n_features
+        self.max_depth  = self._max_depth() if max_depth is None else max_depth
+
+    # ── Construction ─────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_trees(
+        cls,
+        trees,
+        classes: list,
+        n_features: int,
+        mean=None,
+        scale=None,
+    ) -> "CompiledForest":
+        """
+        Pack per-tree ``left/right/feature/threshold/value`` arrays (sklearn
+        layout: leaves have ``left == -1``) into one forest. When ``mean`` and
+        ``scale`` are given, thresholds are mapped from scaled to raw feature
+        space, roughly ``x <= t * scale + mean`` (exactly: fold_thresholds).
+        """
+        mean  = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        lefts, feats, thrs, vals, roots = [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            left  = np.asarray(tree["left"], dtype=np.int64)
+            right = np.asarray(tree["right"], dtype=np.int64)
+            order = _sibling_order(left, right)
+            pos   = np.empty_like(order)
+            pos[order] = np.arange(len(order))
+
+            left  = left[order]
+            feat  = np.asarray(tree["feature"], dtype=np.int64)[order]
+            thr   = np.asarray(tree["threshold"], dtype=np.float64)[order]
+            val   = np.asarray(tree["value"], dtype=np.float64).reshape(len(order), -1)[order]
+
+            is_leaf = left == -1
+            own     = np.arange(len(order)) + offset
+
+            feat = np.where(is_leaf, 0, feat)
+            thr  = np.where(is_leaf, np.inf, thr)
+            thr[~is_leaf] = fold_thresholds(thr[~is_leaf], mean[feat[~is_leaf]], scale[feat[~is_leaf]])
+
+            total = val.sum(axis=1, keepdims=True)
+            total[total == 0] = 1.0
+
+            lefts.append(np.where(is_leaf, own, pos[np.maximum(left, 0)] + offset))
+            feats.append(feat)
+            thrs.append(thr)
+            vals.append(val / total)
+            roots.append(offset)
+            offset += len(order)
+
+        return cls(
+            left      = np.concatenate(lefts).astype(np.intp),
+            feature   = np.concatenate(feats).astype(np.intp),
+            threshold = np.ascontiguousarray(np.concatenate(thrs)),
+            value     = np.ascontiguousarray(np.concatenate(vals).T),
+            roots     = np.asarray(roots, dtype=np.intp),
+            classes   = classes,
+            n_features = n_features,
+        )
+
+    @classmethod
+    def from_sklearn(cls, clf, scaler=None) -> "CompiledForest":
+        """Compile a fitted RandomForestClassifier (and optional StandardScaler)."""
+        trees = (
+            {
+                "left":      est.tree_.children_left,
+                "right":     est.tree_.children_right,
+                "feature":   est.tree_.feature,
+                "threshold": est.tree_.threshold,
+                "value":     est.tree_.value[:, 0, :],
+            }
+            for est in clf.estimators_
+        )
+        return cls.from_trees(
+            trees,
+            classes    = list(clf.classes_),
+            n_features = clf.n_features_in_,
+            mean       = None if scaler is None else scaler.mean_,
+            scale      = None if scaler is None else scaler.scale_,
+        )
+
+    @classmethod
+    def from_artifacts(cls, artifacts: dict) -> "CompiledForest":
+        """
+        Compile the ``model``/``scaler`` pair of a model.joblib artifacts dict.
+        Artifacts read by load_model_arrays already carry their ``forest``.
+        """
+        if "forest" in artifacts:
+            return artifacts["forest"]
+        return cls.from_sklearn(artifacts["model"], artifacts.get("scaler"))
+
+    @classmethod
+    def from_export(cls, model_json: dict) -> "CompiledForest":
+        """Compile the structure written by train_and_export.export_rf_to_json."""
+        return cls.from_trees(
+            model_json["forest"],
+            classes    = model_json["classes"],
+            n_features = len(model_json["features"]),
+            mean       = model_json["scaler"]["mean"],
+            scale      = model_json["scaler"]["scale"],
+        )
+
+    def _max_depth(self) -> int:
+        depth    = 0
+        frontier = self.roots
+        while True:
+            frontier = frontier[self.left[frontier] != frontier]
+            if frontier.size == 0:
+                return depth
+            frontier = np.concatenate([self.left[frontier], self.left[frontier] + 1])
+            depth += 1
+
+    def specialize(self, fixed: dict[int, float]) -> tuple["CompiledForest | None", np.ndarray]:
+        """
+        Partially evaluate the forest for rows whose features ``fixed`` (column
+        index -> value) are known in advance. Splits on those features are
+        resolved once, so the remaining trees only test the free features and
+        are usually far smaller and shallower.
+
+        Returns ``(forest, bias)``: the trees that still depend on a free
+        feature (None if none do) and the summed class probabilities of the
+        trees that collapsed to a single leaf. For rows agreeing with ``fixed``:
+
+            predict_proba(X) == (forest.predict_proba(X) * forest.n_trees + bias) / self.n_trees
+        """
+        n        = self.n_nodes
+        is_fixed = np.zeros(self.n_features, dtype=bool)
+        values   = np.zeros(self.n_features, dtype=np.float64)
+        for j, v in fixed.items():
+            is_fixed[j], values[j] = True, v
+
+        # Follow every node down through fixed-feature splits to the first free split or leaf
+        is_leaf = self.left == np.arange(n)
+        resolve = np.arange(n, dtype=np.intp)
+        for _ in range(self.max_depth):
+            todo = is_fixed[self.feature[resolve]] & ~is_leaf[resolve]
+            if not todo.any():
+                break
+            r = resolve[todo]
+            resolve[todo] = self.left[r] + (values[self.feature[r]] > self.threshold[r])
+
+        roots    = resolve[self.roots]
+        constant = is_leaf[roots]
+        bias     = self.value[:, roots[constant]].sum(axis=1)
+        roots    = roots[~constant]
+        if roots.size == 0:
+            return None, bias
+
+        # Re-lay the surviving nodes breadth-first with siblings adjacent, one tree after another
+        order, frontier = [roots], roots
+        tree, owner = [np.arange(roots.size)], np.arange(roots.size)
+        while True:
+            keep     = ~is_leaf[frontier]
+            internal = frontier[keep]
+            if internal.size == 0:
+                break
+            frontier = np.column_stack([resolve[self.left[internal]], resolve[self.left[internal] + 1]]).ravel()
+            owner    = np.repeat(owner[keep], 2)
+            order.append(frontier)
+            tree.append(owner)
+        tree  = np.concatenate(tree)
+        order = np.concatenate(order)[np.argsort(tree, kind="stable")]
+        pos   = np.empty(n, dtype=np.intp)
+        pos[order] = np.arange(len(order))
+        left = np.where(is_leaf[order], np.arange(len(order)), pos[resolve[self.left[order]]])
+
+        forest = CompiledForest(
+            left      = left.astype(np.intp),
+            feature   = self.feature[order],
+            threshold = np.ascontiguousarray(self.threshold[order]),
+            value     = np.ascontiguousarray(self.value[:, order]),
+            roots     = pos[roots],
+            classes   = list(self.classes_),
+            n_features = self.n_features,
+        )
+        return forest, bias
+
+    # ── Inference ────────────────────────────────────────────────────────────
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.left)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached in every tree: (n_rows, n_trees)."""
+        X    = np.ascontiguousarray(X, dtype=np.float64)
+        n    = X.shape[0]
+        flat = X.ravel()
+        base = (np.arange(n, dtype=np.intp) * X.shape[1])[:, None]
+        idx  = np.repeat(self.roots[None, :], n, axis=0)
+        for _ in range(self.max_depth):
+            go_right = flat.take(base + self.feature.take(idx)) > self.threshold.take(idx)
+            idx = self.left.take(idx) + go_right
+        return idx
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for raw (unscaled) feature rows, (n_rows, n_classes)."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got {X.shape[1]}")
+        out = np.empty((X.shape[0], self.value.shape[0]), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            for c, class_value in enumerate(self.value):
+                out[start:start + CHUNK_ROWS, c] = class_value.take(leaves).sum(axis=1)
+        out /= self.n_trees
+        return out
+
+
+# ── Array model format ───────────────────────────────────────────────────────
+
+def save_model_arrays(artifacts: dict, out_dir: str = MODEL_ARRAYS_DIR) -> str:
+    """
+    Write ``artifacts`` as compiled forest arrays (.npy) plus meta.json.
+    The directory is written under a temporary name and renamed into place.
+    """
+    forest  = CompiledForest.from_artifacts(artifacts)
+    staging = os.path.normpath(out_dir) + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name in _FOREST_ARRAYS:
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(getattr(forest, name)))
+
+    meta = {k: artifacts.get(k) for k in _META_KEYS}
+    meta.update(
+        format_version = ARRAYS_FORMAT_VERSION,
+        classes        = [str(c) for c in forest.classes_],
+        n_features     = forest.n_features,
+        max_depth      = forest.max_depth,
+        n_trees        = forest.n_trees,
+    )
+    if meta["district_classes"] is None and artifacts.get("district_le") is not None:
+        meta["district_classes"] = [str(c) for c in artifacts["district_le"].classes_]
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(staging, out_dir)
+    return out_dir
+
+
+def load_model_arrays(model_dir: str = MODEL_ARRAYS_DIR, mmap: bool = True) -> dict:
+    """
+    Artifacts dict for a directory written by save_model_arrays. The forest
+    arrays are memory-mapped (read-only) unless ``mmap`` is False; the dict
+    has a ready ``forest`` in place of the sklearn ``model``/``scaler``.
+    """
+    with open(os.path.join(model_dir, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != ARRAYS_FORMAT_VERSION:
+        raise ValueError(f"unsupported model array format {meta.get('format_version')!r} in {model_dir}")
+    arrays = {
+        # Plain ndarray views of the maps: same pages, no memmap.__getitem__ overhead
+        name: np.asarray(np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        for name in _FOREST_ARRAYS
+    }
+    forest = CompiledForest(
+        **arrays,
+        classes    = meta["classes"],
+        n_features = meta["n_features"],
+        max_depth  = meta["max_depth"],
+    )
+    return {**{k: meta.get(k) for k in _META_KEYS}, "classes": meta["classes"], "forest": forest}
+
+
+
+def shared_model_arrays(model_path: str = MODEL_PATH, cache_dir: str = SHARED_ARRAYS_DIR) -> dict:
+    """
+    load_model_arrays for a model.joblib, exporting it on first use.
+
+    The export lives in ``cache_dir/<key>`` where the key changes with the
+    file's path, size and mtime. Concurrent callers (workers starting
+    together) serialise on a lock file, so exactly one of them unpickles the
+    model; everyone then maps the same files. Exports of older models are
+    removed.
+    """
+    st  = os.stat(model_path)
+    key = hashlib.sha1(
+        f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}".encode()
+    ).hexdigest()[:16]
+    out_dir = os.path.join(cache_dir, key)
+    if not os.path.exists(os.path.join(out_dir, "meta.json")):
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, ".lock"), "w") as lock:
+            try:
+                import fcntl
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except ImportError:
+                pass                        # no flock on Windows; single-worker there
+            if not os.path.exists(os.path.join(out_dir, "meta.json")):
+                import joblib
+                save_model_arrays(joblib.load(model_path), out_dir)
+                for name in os.listdir(cache_dir):
+                    # Workers still mapping an old export keep their pages until they exit
+                    if name not in (key, ".lock"):
+                        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    return load_model_arrays(out_dir)
+
+
+class InferenceEngine:
+    """
+    Stand-alone predictor over a compiled forest, for scripts and offline use.
+    The API server compiles its own forest from the loaded artifacts.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, artifacts: dict | None = None):
+        self.artifacts = artifacts
+        self.forest: CompiledForest | None = None
+        self.loaded = False
+
+        if self.artifacts is None and os.path.isdir(model_path):
+            self.artifacts = load_model_arrays(model_path)
+        elif self.artifacts is None and os.path.exists(model_path):
+            import joblib
+            self.artifacts = joblib.load(model_path)
+        if self.artifacts is not None:
+            self.forest = CompiledForest.from_artifacts(self.artifacts)
+            self.loaded = True
+
+    def encode_district(self, district_name: str) -> int:
+        """Same encoding as fast_server.encode_district, without a LabelEncoder call."""
+        classes = list(self.artifacts.get("district_classes") or [])
+        if district_name in classes:
+            return classes.index(district_name)
+        return len(classes) // 2
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.forest.predict_proba(X)
+
+    def predict_risk(self, latitude: float, longitude: float, inputs: dict, month: int | None = None) -> dict:
+        """
+        Predict for one location. ``inputs`` uses the /predict field names
+        (rainfall, river_level, temperature_elevated, terrain, seismic_activity, district).
+        """
+        from datetime import datetime
+
+        X = build_feature_matrix(
+            latitude             = [latitude],
+            longitude            = [longitude],
+            district_enc         = [self.encode_district(inputs.get("district", "Unknown"))],
+            month                = month or datetime.now().month,
+            rainfall_mm          = [inputs.get("rainfall", 0.0)],
+            river_level_m        = [inputs.get("river_level", 0.0)],
+            temperature_elevated = [inputs.get("temperature_elevated", False)],
+            terrain              = [inputs.get("terrain", "Unknown")],
+            seismic_activity     = [inputs.get("seismic_activity", False)],
+            features             = self.artifacts["features"],
+        )
+        probs = self.predict_proba(X)[0]
+        max_i = int(np.argmax(probs))
+        return {
+            "prediction":          str(self.forest.classes_[max_i]),
+            "confidence":          round(float(probs[max_i]) * 100, 1),
+            "class_probabilities": {
+                str(c): round(float(p), 3) for c, p in zip(self.forest.classes_, probs)
+            },
+        }
@@ -0,0 +1,248 @@
+"""
+Bounded, micro-batching executor for forest evaluation.
+
+/predict and /predict/batch hand their feature matrices to one
+``InferenceExecutor`` instead of running the forest on Starlette's shared
+threadpool, so a prediction spike cannot starve the other endpoints:
+
+  - a fixed number of worker threads run the forest (NumPy releases the GIL
+    for the heavy gathers and sums, so threads scale without a process pool)
+  - the queue is bounded in rows; ``submit`` raises ``QueueFull`` instead of
+    letting the backlog, and every request's latency, grow without limit
+  - a worker takes the oldest job plus every queued job behind it that uses
+    the same model, up to ``max_batch_rows``, and scores them with one
+    forest call (optionally waiting ``batch_window_ms`` for more to arrive)
+  - every job has a deadline; jobs still queued when it passes are dropped
+    with ``DeadlineExceeded`` rather than computed for a client that gave up
+
+``submit`` returns a ``concurrent.futures.Future`` so sync handlers can block
+on it and async handlers can await it through ``asyncio.wrap_future``.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import HistogramChild
+
+# Upper bounds of the batch-size histogram buckets (rows per forest call)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+class QueueFull(Exception):
+    """The executor's queue is at capacity; the request was not queued."""
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the forest ran."""
+
+
+class _Job:
+    __slots__ = ("key", "payload", "X", "rows", "deadline", "future", "enqueued")
+
+    def __init__(self, key, payload, X: np.ndarray, deadline: float):
+        self.key      = key
+        self.payload  = payload
+        self.X        = X
+        self.rows     = X.shape[0]
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class InferenceExecutor:
+    """
+    ``predict(payload, X)`` computes class probabilities for ``X``. Jobs are
+    only batched together when they were submitted with the same ``key``
+    (the model snapshot), and ``payload`` of the first job is used for the
+    whole batch.
+    """
+
+    def __init__(
+        self,
+        predict,
+        workers: int = 2,
+        max_queue_rows: int = 20000,
+        max_batch_rows: int = 512,
+        batch_window_ms: float = 0.0,
+        deadline_ms: float = 2000.0,
+    ):
+        self.predict         = predict
+        self.workers         = max(1, workers)
+        self.max_queue_rows  = max_queue_rows
+        self.max_batch_rows  = max_batch_rows
+        self.batch_window    = batch_window_ms / 1000
+        self.deadline_ms     = deadline_ms
+
+        self._queue: deque[_Job] = deque()
+        self._queued_rows = 0
+        self._cond    = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._closed  = False
+
+        self.submitted     = 0
+        self.rejected      = 0
+        self.expired       = 0
+        self.failed        = 0
+        self.started       = 0
+        self.busy_workers  = 0
+        self.max_depth     = 0
+        self.batch_rows    = HistogramChild(BATCH_BUCKETS)   # rows per forest call
+        self.queue_wait    = HistogramChild()                # seconds from submit to start
+
+    # ── Submission ───────────────────────────────────────────────────────────
+
+    def submit(self, key, payload, X: np.ndarray, deadline_ms: float | None = None) -> Future:
+        """
+        Queue ``X`` for scoring. Raises QueueFull when accepting it would
+        exceed ``max_queue_rows`` (a single job larger than the whole queue
+        is still accepted when the queue is empty).
+        """
+        job = _Job(key, payload, X, time.monotonic() + self._budget_ms(deadline_ms) / 1000)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("inference executor is shut down")
+            if self._queue and self._queued_rows + job.rows > self.max_queue_rows:
+                self.rejected += 1
+                raise QueueFull(f"inference queue is full ({self._queued_rows} rows waiting)")
+            if not self._threads:
+                self._start()
+            self._queue.append(job)
+            self._queued_rows += job.rows
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify()
+        return job.future
+
+    def run(self, key, payload, X: np.ndarray, deadline_ms: float | None = None) -> np.ndarray:
+        """Blocking submit: probabilities for ``X`` or QueueFull / DeadlineExceeded."""
+        future = self.submit(key, payload, X, deadline_ms)
+        try:
+            return future.result(timeout=self.wait_seconds(deadline_ms))
+        except TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("inference did not finish before the deadline")
+
+    def _budget_ms(self, deadline_ms: float | None) -> float:
+        """Requested deadline, capped at the executor's."""
+        return self.deadline_ms if deadline_ms is None else min(deadline_ms, self.deadline_ms)
+
+    def wait_seconds(self, deadline_ms: float | None = None) -> float:
+        """
+        How long a caller should wait on a submitted job. The deadline only
+        governs queueing; a forest call already running when it passes is
+        given a moment to finish rather than being abandoned.
+        """
+        return self._budget_ms(deadline_ms) / 1000 + 1.0
+
+    # ── Workers ──────────────────────────────────────────────────────────────
+
+    def _start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _take(self) -> list[_Job] | None:
+        """Oldest live job plus compatible jobs queued behind it (called with the lock held)."""
+        while True:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            first = self._pop()
+            if first is not None:
+                break
+
+        batch, rows = [first], first.rows
+        window_end = time.monotonic() + self.batch_window
+        while rows < self.max_batch_rows:
+            if self._queue:
+                nxt = self._queue[0]
+                if nxt.key is not first.key or rows + nxt.rows > self.max_batch_rows:
+                    break
+                job = self._pop()
+                if job is not None:
+                    batch.append(job)
+                    rows += job.rows
+                continue
+            remaining = window_end - time.monotonic()
+            if remaining <= 0 or self._closed:
+                break
+            self._cond.wait(remaining)
+        return batch
+
+    def _pop(self) -> _Job | None:
+        """Dequeue the front job; None if it was cancelled or is past its deadline."""
+        job = self._queue.popleft()
+        self._queued_rows -= job.rows
+        now = time.monotonic()
+        if now > job.deadline:
+            self.expired += 1
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(DeadlineExceeded("deadline passed while queued"))
+            return None
+        if not job.future.set_running_or_notify_cancel():
+            return None                                  # caller gave up
+        self.started += 1
+        self.queue_wait.observe(now - job.enqueued)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                batch = self._take()
+                if batch is None:
+                    return
+                self.busy_workers += 1
+            rows = sum(j.rows for j in batch)
+            self.batch_rows.observe(rows)
+            try:
+                X = batch[0].X if len(batch) == 1 else np.concatenate([j.X for j in batch])
+                probs = self.predict(batch[0].payload, X)
+            except BaseException as exc:
+                with self._cond:
+                    self.failed += len(batch)
+                for job in batch:
+                    job.future.set_exception(exc)
+            else:
+                start = 0
+                for job in batch:
+                    job.future.set_result(probs[start:start + job.rows])
+                    start += job.rows
+            with self._cond:
+                self.busy_workers -= 1
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    # ── Metrics ──────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        with self._cond:
+            batches = self.batch_rows.count
+            labels = [f"<={b}" for b in BATCH_BUCKETS] + [f">{BATCH_BUCKETS[-1]}"]
+            return {
+                "workers":          self.workers,
+                "busy_workers":     self.busy_workers,
+                "queue_depth":      len(self._queue),
+                "queue_rows":       self._queued_rows,
+                "max_queue_depth":  self.max_depth,
+                "max_queue_rows":   self.max_queue_rows,
+                "submitted":        self.submitted,
+                "rejected":         self.rejected,
+                "expired":          self.expired,
+                "failed":           self.failed,
+                "batches":          batches,
+                "mean_batch_rows":  round(self.batch_rows.sum / batches, 2) if batches else None,
+                "batch_rows_histogram": dict(zip(labels, self.batch_rows.counts)),
+                "mean_queue_wait_ms": round(self.queue_wait.sum / self.started * 1000, 3) if self.started else None,
+            }
@@ -0,0 +1,200 @@
+"""
+In-memory stand-in for the parts of the Firebase Admin SDK the backend uses.
+
+``MemoryAuth`` mirrors ``firebase_admin.auth`` (list_users with page tokens,
+create/update/delete, custom claims, import_users, delete_users) and
+``MemoryDatabase`` mirrors ``firebase_admin.db`` (reference set / update with
+multi-path keys / delete / get). Both count calls, so tests can check how many
+round trips an endpoint made:
+
+    from admin_users import UserDirectory
+    directory = UserDirectory(MemoryAuth(), MemoryDatabase())
+
+Against the real SDK the same code can instead run on the Firebase emulator
+(see ``FIREBASE_AUTH_EMULATOR_HOST`` in README.md).
+"""
+
+import itertools
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+
+class UserNotFoundError(Exception):
+    pass
+
+
+class EmailAlreadyExistsError(ValueError):
+    pass
+
+
+class _UserRecord(SimpleNamespace):
+    pass
+
+
+class ImportUserRecord(SimpleNamespace):
+    def __init__(self, uid, email=None, display_name=None, disabled=None, custom_claims=None, **_):
+        super().__init__(uid=uid, email=email, display_name=display_name,
+                         disabled=bool(disabled), custom_claims=custom_claims)
+
+
+class MemoryAuth:
+    """``firebase_admin.auth`` lookalike; users are listed in uid order."""
+
+    ImportUserRecord  = ImportUserRecord
+    UserNotFoundError = UserNotFoundError
+    MAX_BATCH = 1000
+
+    def __init__(self):
+        self.users: dict[str, _UserRecord] = {}
+        self.calls = Counter()
+        self._ids  = itertools.count(1)
+        self._uids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _record(self, uid, email, display_name, disabled=False, custom_claims=None):
+        return _UserRecord(
+            uid=uid, email=email, display_name=display_name, disabled=disabled,
+            custom_claims=custom_claims, user_metadata=SimpleNamespace(creation_timestamp=next(self._ids)),
+        )
+
+    def _get(self, uid):
+        if uid not in self.users:
+            raise UserNotFoundError(f"No user record found for the provided user ID: {uid}.")
+        return self.users[uid]
+
+    def _check_email(self, email, uid=None):
+        if email and any(u.email == email and u.uid != uid for u in self.users.values()):
+            raise EmailAlreadyExistsError(f"The user with the provided email already exists ({email}).")
+
+    def list_users(self, page_token=None, max_results=1000):
+        self.calls["list_users"] += 1
+        with self._lock:
+            uids = sorted(u for u in self.users if page_token is None or u > page_token)
+            page = [self.users[u] for u in uids[:max_results]]
+        more = len(uids) > max_results
+        return SimpleNamespace(users=page, next_page_token=page[-1].uid if more else "",
+                               has_next_page=more)
+
+    def get_user(self, uid):
+        self.calls["get_user"] += 1
+        return self._get(uid)
+
+    def create_user(self, email=None, password=None, display_name=None, uid=None, disabled=False):
+        self.calls["create_user"] += 1
+        with self._lock:
+            self._check_email(email)
+            uid = uid or f"u{next(self._uids):08d}"
+            self.users[uid] = self._record(uid, email, display_name, disabled)
+            return self.users[uid]
+
+    def update_user(self, uid, **kwargs):
+        self.calls["update_user"] += 1
+        with self._lock:
+            user = self._get(uid)
+            self._check_email(kwargs.get("email"), uid)
+            for key in ("email", "display_name", "disabled"):
+                if key in kwargs:
+                    setattr(user, key, kwargs[key])
+            return user
+
+    def set_custom_user_claims(self, uid, custom_claims):
+        self.calls["set_custom_user_claims"] += 1
+        with self._lock:
+            self._get(uid).custom_claims = custom_claims
+
+    def delete_user(self, uid):
+        self.calls["delete_user"] += 1
+        with self._lock:
+            self._get(uid)
+            del self.users[uid]
+
+    def delete_users(self, uids):
+        self.calls["delete_users"] += 1
+        if len(uids) > self.MAX_BATCH:
+            raise ValueError(f"`uids` parameter must have <= {self.MAX_BATCH} entries.")
+        with self._lock:
+            for uid in uids:
+                self.users.pop(uid, None)   # like Firebase, unknown uids are not errors
+        return SimpleNamespace(success_count=len(uids), failure_count=0, errors=[])
+
+    def import_users(self, users, hash_alg=None):
+        self.calls["import_users"] += 1
+        if len(users) > self.MAX_BATCH:
+            raise ValueError(f"Users must be a non-empty list with no more than {self.MAX_BATCH} elements.")
+        errors = []
+        with self._lock:
+            for index, r in enumerate(users):
+                try:
+                    self._check_email(r.email, r.uid)
+                except EmailAlreadyExistsError as exc:
+                    errors.append(SimpleNamespace(index=index, reason=str(exc)))
+                    continue
+                self.users[r.uid] = self._record(r.uid, r.email, r.display_name, r.disabled, r.custom_claims)
+        return SimpleNamespace(success_count=len(users) - len(errors), failure_count=len(errors), errors=errors)
+
+
+class _Reference:
+    def __init__(self, store: "MemoryDatabase", path: str):
+        self._store = store
+        self._parts = [p for p in path.split("/") if p]
+
+    def _parent(self, parts, create):
+        node = self._store.data
+        for p in parts[:-1]:
+            if not isinstance(node.get(p), dict):
+                if not create:
+                    return None
+                node[p] = {}
+            node = node[p]
+        return node
+
+    def _write(self, parts, value):
+        if not parts:
+            self._store.data = value if isinstance(value, dict) else {}
+            return
+        parent = self._parent(parts, create=value is not None)
+        if parent is None:
+            return
+        if value is None:
+            parent.pop(parts[-1], None)
+        else:
+            parent[parts[-1]] = value
+
+    def get(self):
+        self._store.calls["get"] += 1
+        node = self._store.data
+        for p in self._parts:
+            if not isinstance(node, dict) or p not in node:
+                return None
+            node = node[p]
+        return node
+
+    def set(self, value):
+        self._store.calls["set"] += 1
+        with self._store.lock:
+            self._write(self._parts, value)
+
+    def update(self, value: dict):
+        """Multi-path update: keys may contain "/" and a ``None`` value deletes."""
+        self._store.calls["update"] += 1
+        with self._store.lock:
+            for key, v in value.items():
+                self._write(self._parts + [p for p in key.split("/") if p], v)
+
+    def delete(self):
+        self._store.calls["delete"] += 1
+        with self._store.lock:
+            self._write(self._parts, None)
+
+
+class MemoryDatabase:
+    """``firebase_admin.db`` lookalike holding the tree in a dict."""
+
+    def __init__(self):
+        self.data: dict = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def reference(self, path: str = "/") -> _Reference:
+        return _Reference(self, path)
@@ -0,0 +1,252 @@
+"""
+Prometheus text-format metrics without a client library.
+
+Counters and histograms are updated on the request path and are cheap: one
+lock and a few additions per observation. Values that other components
+already keep (cache statistics, upstream counters, executor queue depth) are
+read at scrape time by collector callbacks rather than duplicated.
+
+    requests = Counter("gbdms_http_requests_total", "HTTP requests.", ("route", "status"))
+    requests.inc("/predict", "200")
+    latency  = Histogram("gbdms_http_request_duration_seconds", "Latency.", ("route",))
+    with latency.time("/predict"):
+        ...
+    REGISTRY.render()        # body for GET /metrics
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond forest calls up to slow upstream requests
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class HistogramChild:
+    """One label combination of a histogram (also usable on its own)."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts  = [0] * (len(self.buckets) + 1)
+        self.sum     = 0.0
+        self._lock   = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum       += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the ``q`` quantile (None when empty)."""
+        with self._lock:
+            counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for upper, n in zip(self.buckets + (math.inf,), counts):
+            seen += n
+            if seen >= rank:
+                return upper
+        return math.inf
+
+    def samples(self, name: str, labels: dict):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for upper, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            yield f"{name}_bucket", {**labels, "le": _format_value(upper)}, cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class _Family:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), registry=None):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _child(self, labelvalues: tuple):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            for name, sample_labels, value in self._samples(child, labels):
+                lines.append(f"{name}{_format_labels(sample_labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return [0]
+
+    def inc(self, *labelvalues, amount: float = 1):
+        child = self._child(labelvalues)
+        with self._lock:
+            child[0] += amount
+
+    def value(self, *labelvalues) -> float:
+        child = self._children.get(labelvalues)
+        return child[0] if child else 0
+
+    def _samples(self, child, labels):
+        yield self.name, labels, child[0]
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS,
+                 registry=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def labels(self, *labelvalues) -> HistogramChild:
+        return self._child(labelvalues)
+
+    def attach(self, child: HistogramChild, *labelvalues):
+        """Expose a histogram kept by another component under this family."""
+        if child.buckets != self.buckets or len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name}: incompatible child for labels {labelvalues}")
+        with self._lock:
+            self._children[labelvalues] = child
+
+    def observe(self, *labelvalues, value: float):
+        self._child(labelvalues).observe(value)
+
+    def time(self, *labelvalues):
+        return self._child(labelvalues).time()
+
+    def _samples(self, child, labels):
+        yield from child.samples(self.name, labels)
+
+
+class Registry:
+    def __init__(self):
+        self._families: list[_Family] = []
+        self._collectors: list = []
+
+    def register(self, family: _Family):
+        self._families.append(family)
+
+    def collector(self, fn):
+        """
+        Register ``fn() -> iterable of (name, kind, help, samples)`` where
+        samples are ``(labels, value)`` pairs or, for kind "histogram",
+        ``(labels, HistogramChild)``. Usable as a decorator.
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for family in self._families:
+            lines.extend(family.collect())
+        # Collectors may yield one family several times (once per upstream, say);
+        # the exposition format wants each family's samples together
+        families: dict[str, tuple] = {}
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                families.setdefault(name, (kind, help, []))[2].extend(samples)
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if isinstance(value, HistogramChild):
+                    for sample_name, sample_labels, v in value.samples(name, labels):
+                        lines.append(f"{sample_name}{_format_labels(sample_labels)} {_format_value(v)}")
+                elif value is not None:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template
+    (``/tiles/{z}/{x}/{y}.png``, not the concrete path, to bound label
+    cardinality). Requests that match no route are recorded as "unmatched".
+    """
+
+    def __init__(self, app, requests: Counter, latency: Histogram):
+        self.app      = app
+        self.requests = requests
+        self.latency  = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path  = getattr(route, "path", None) or "unmatched"
+            self.latency.observe(scope["method"], path, value=time.perf_counter() - start)
+            self.requests.inc(scope["method"], path, str(status[0]))
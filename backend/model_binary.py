@@ -0,0 +1,249 @@
+"""
+Compact binary forest export for in-browser inference (model.bin).
+
+model.json stores every node of every tree as JSON numbers, including a class
+probability row for internal nodes that are never read. This format keeps
+only what a traversal needs, as little-endian typed arrays a browser can view
+directly (DataView / Float32Array / Int32Array over the fetched buffer):
+
+    "GBRF"  u16 format version  u16 prob_bits (8 or 16)  u32 header length
+    header      UTF-8 JSON, space-padded to a multiple of 4 bytes: features,
+                classes, scaler mean/scale, district_classes, terrain_map,
+                river_discharge_scale, trained_at, n_trees, n_leaves, ...
+    leaf table  n_leaves x n_classes uint8 / uint16, zero-padded to 4 bytes
+    trees       per tree:
+                  u32   n_internal
+                  i32   root
+                  i32   children[2 * n_internal]  (left, right) pairs
+                  f32   threshold[n_internal]
+                  u8    feature[n_internal], zero-padded to 4 bytes
+
+A child (or root) ``c >= 0`` is internal node ``c`` of the same tree; ``c < 0``
+is row ``-1 - c`` of the leaf table. Internal nodes go left when
+``float32((x - mean) / scale) <= threshold``, which is sklearn's own test:
+sklearn compares the float32 scaled input to a float64 threshold, and
+storing the largest float32 not above it gives identical splits.
+
+Leaf rows are class probabilities quantized to ``2**prob_bits - 1`` steps with
+largest-remainder rounding (so each row still sums to exactly 1) and stored
+once however many leaves share them. Averaged over the forest the error is
+below one step per class.
+
+write_model_binary streams: each tree is encoded as it arrives and spooled
+to a temporary file while the leaf table grows; the header and table are
+written in front once the last tree is in. read_model_binary is the
+reference decoder. It returns the model.json structure, so
+CompiledForest.from_export runs it.
+"""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"GBRF"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<4sHHI")
+_TREE_HEAD = struct.Struct("<Ii")
+
+# Artifact entries carried into the header (as in inference._META_KEYS)
+_META_KEYS = (
+    "features", "classes", "district_classes", "river_discharge_scale",
+    "terrain_map", "test_accuracy", "trained_at",
+)
+
+
+def _pad4(n: int) -> int:
+    return -n % 4
+
+
+def float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """Largest float32 not above each threshold."""
+    threshold = np.asarray(threshold, dtype=np.float64)
+    t32 = threshold.astype(np.float32)
+    return np.where(t32.astype(np.float64) > threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+
+
+def quantize(prob: np.ndarray, levels: int) -> np.ndarray:
+    """Rows of probabilities as integers summing to ``levels`` (largest remainder)."""
+    scaled = np.asarray(prob, dtype=np.float64) * levels
+    q = np.floor(scaled).astype(np.int64)
+    short = levels - q.sum(axis=1)
+    rank = np.argsort(q - scaled, axis=1, kind="stable")       # largest remainder first
+    bump = np.arange(q.shape[1])[None, :] < short[:, None]
+    np.put_along_axis(q, rank, np.take_along_axis(q, rank, axis=1) + bump, axis=1)
+    return q
+
+
+def sklearn_trees(clf):
+    """Per-tree left/right/feature/threshold/value arrays of a fitted forest, one at a time."""
+    for est in clf.estimators_:
+        tree = est.tree_
+        yield {
+            "left":      tree.children_left,
+            "right":     tree.children_right,
+            "feature":   tree.feature,
+            "threshold": tree.threshold,
+            "value":     tree.value[:, 0, :],
+        }
+
+
+def artifacts_meta(artifacts: dict) -> dict:
+    """Header fields for a model.joblib artifacts dict."""
+    meta = {k: artifacts.get(k) for k in _META_KEYS}
+    scaler = artifacts.get("scaler")
+    if scaler is not None:
+        meta["scaler"] = {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()}
+    if meta["district_classes"] is None and artifacts.get("district_le") is not None:
+        meta["district_classes"] = [str(c) for c in artifacts["district_le"].classes_]
+    meta["classes"] = [str(c) for c in meta["classes"]]
+    return meta
+
+
+def write_model_binary(path: str, meta: dict, trees, prob_bits: int = 8) -> dict:
+    """
+    Write ``trees`` (sklearn layout, as yielded by sklearn_trees or listed in
+    model.json) with header ``meta`` to ``path``. The file is written under a
+    temporary name and renamed into place. Returns size statistics.
+    """
+    if prob_bits not in (8, 16):
+        raise ValueError("prob_bits must be 8 or 16")
+    levels = (1 << prob_bits) - 1
+    dtype  = np.dtype("<u1" if prob_bits == 8 else "<u2")
+    n_classes = len(meta["classes"])
+    if len(meta["features"]) > 256:
+        raise ValueError("the format stores feature indices as uint8")
+
+    table: dict[bytes, int] = {}
+    n_trees = n_internal = n_leaf_nodes = 0
+    with tempfile.TemporaryFile() as spool:
+        for tree in trees:
+            left    = np.asarray(tree["left"], dtype=np.int64)
+            right   = np.asarray(tree["right"], dtype=np.int64)
+            is_leaf = left == -1
+
+            value = np.asarray(tree["value"], dtype=np.float64).reshape(len(left), -1)[is_leaf]
+            total = value.sum(axis=1, keepdims=True)
+            total[total == 0] = 1.0
+            rows  = quantize(value / total, levels).astype(dtype)
+            ids   = np.array([table.setdefault(r.tobytes(), len(table)) for r in rows], dtype=np.int64)
+
+            # Internal nodes keep their relative order; leaves become -1 - table id
+            ref = np.empty(len(left), dtype=np.int64)
+            ref[~is_leaf] = np.arange(int((~is_leaf).sum()))
+            ref[is_leaf]  = -1 - ids
+
+            internal = np.flatnonzero(~is_leaf)
+            children = np.column_stack([ref[left[internal]], ref[right[internal]]]).astype("<i4")
+            feature  = np.asarray(tree["feature"])[internal].astype("<u1")
+            spool.write(_TREE_HEAD.pack(len(internal), int(ref[0])))
+            spool.write(children.tobytes())
+            spool.write(float32_floor(np.asarray(tree["threshold"])[internal]).astype("<f4").tobytes())
+            spool.write(feature.tobytes() + b"\0" * _pad4(len(internal)))
+
+            n_trees      += 1
+            n_internal   += len(internal)
+            n_leaf_nodes += int(is_leaf.sum())
+
+        header = {
+            **meta,
+            "format_version": FORMAT_VERSION,
+            "n_trees":        n_trees,
+            "n_internal":     n_internal,
+            "n_leaves":       len(table),
+            "n_classes":      n_classes,
+            "prob_bits":      prob_bits,
+        }
+        raw = json.dumps(header, separators=(",", ":")).encode()
+        raw += b" " * _pad4(len(raw))
+        leaf_bytes = b"".join(table)
+
+        staging = path + ".tmp"
+        with open(staging, "wb") as out:
+            out.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, prob_bits, len(raw)))
+            out.write(raw)
+            out.write(leaf_bytes + b"\0" * _pad4(len(leaf_bytes)))
+            spool.seek(0)
+            shutil.copyfileobj(spool, out)
+    os.replace(staging, path)
+    return {
+        "bytes":         os.path.getsize(path),
+        "n_trees":       n_trees,
+        "n_internal":    n_internal,
+        "leaf_nodes":    n_leaf_nodes,
+        "unique_leaves": len(table),
+    }
+
+
+def read_model_binary(source) -> dict:
+    """
+    Decode a model.bin (path or bytes) into the model.json structure: header
+    fields plus ``forest``, a list of per-tree left/right/feature/threshold/
+    value arrays in sklearn layout (leaves have ``left == -1``; internal nodes
+    get an all-zero value row).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buf = bytes(source)
+    else:
+        with open(source, "rb") as f:
+            buf = f.read()
+    magic, version, prob_bits, header_len = _PREAMBLE.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("not a GBRF model file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported model.bin format version {version}")
+    pos = _PREAMBLE.size
+    header = json.loads(buf[pos:pos + header_len])
+    pos += header_len
+
+    n_classes = header["n_classes"]
+    dtype = np.dtype("<u1" if prob_bits == 8 else "<u2")
+    count = header["n_leaves"] * n_classes
+    table = np.frombuffer(buf, dtype=dtype, count=count, offset=pos).reshape(-1, n_classes)
+    table = table.astype(np.float64) / ((1 << prob_bits) - 1)
+    pos += count * dtype.itemsize
+    pos += _pad4(pos)
+
+    forest = []
+    for _ in range(header["n_trees"]):
+        n, root = _TREE_HEAD.unpack_from(buf, pos)
+        pos += _TREE_HEAD.size
+        children  = np.frombuffer(buf, dtype="<i4", count=2 * n, offset=pos).reshape(n, 2).astype(np.int64)
+        pos += 8 * n
+        threshold = np.frombuffer(buf, dtype="<f4", count=n, offset=pos).astype(np.float64)
+        pos += 4 * n
+        feature   = np.frombuffer(buf, dtype="<u1", count=n, offset=pos).astype(np.int64)
+        pos += n + _pad4(n)
+        forest.append(_sklearn_layout(root, children, threshold, feature, table))
+
+    return {**header, "forest": forest}
+
+
+def _sklearn_layout(root, children, threshold, feature, table) -> dict:
+    """Internal nodes 0..n-1 as stored, then one node per leaf reference."""
+    n = len(children)
+    refs = np.append(children.ravel(), root)
+    leaf_refs = refs[refs < 0]
+    node = refs.copy()
+    node[refs < 0] = n + np.arange(len(leaf_refs))
+    if n == 0:
+        # A single-leaf tree: its root is node 0
+        return {
+            "left": np.array([-1]), "right": np.array([-1]), "feature": np.array([-2]),
+            "threshold": np.array([-2.0]), "value": table[[-1 - root]],
+        }
+    m = n + len(leaf_refs)
+    left, right = np.full(m, -1), np.full(m, -1)
+    left[:n], right[:n] = node[:2 * n:2], node[1:2 * n:2]
+    value = np.zeros((m, table.shape[1]))
+    value[n:] = table[-1 - leaf_refs]
+    return {
+        "left":      left,
+        "right":     right,
+        "feature":   np.concatenate([feature, np.full(m - n, -2)]),
+        "threshold": np.concatenate([threshold, np.full(m - n, -2.0)]),
+        "value":     value,
+    }
@@ -0,0 +1,381 @@
+"""
+Versioned model registry with validated, atomic hot-reload.
+
+Layout of the registry directory (default ``Model/registry/``):
+
+    <version>/          one model: the array export (meta.json + .npy,
+                        see inference.save_model_arrays) or a model.joblib
+    CURRENT             name of the version the server should run
+                        (absent: the newest version by name)
+    golden.json         golden inputs with expected labels
+
+``ModelReloader`` loads a version on a background thread, checks it against
+the golden set and only then hands it to the server's install callback,
+which swaps one reference. Requests take that reference once when they
+start, so in-flight requests finish on the model they started with.
+
+``ShadowScorer`` scores a sample of live requests on a candidate model off
+the request path and reports how often it disagrees with the serving model
+and how long each takes.
+
+    python model_registry.py publish [model.joblib|arrays dir] [--current]
+    python model_registry.py golden [--n 64]
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from features import build_feature_matrix
+from inference import MODEL_PATH, InferenceEngine, load_model_arrays, save_model_arrays
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.path.join(_HERE, "../Model/registry")
+
+CURRENT_FILE = "CURRENT"
+GOLDEN_FILE  = "golden.json"
+
+# Golden inputs are drawn over the Gilgit-Baltistan bounding box
+_LAT_RANGE = (34.6, 37.1)
+_LON_RANGE = (72.5, 77.8)
+
+
+class ModelValidationError(Exception):
+    """A candidate model failed golden-set validation."""
+
+
+def golden_inputs(n: int = 64, seed: int = 0) -> list[dict]:
+    """Deterministic /predict-shaped inputs (with ``month``) spread over the region."""
+    rng = np.random.default_rng(seed)
+    terrains  = ["Valley", "Hilly", "Mountainous", "Unknown"]
+    districts = ["Gilgit", "Hunza", "Skardu", "Astore", "Ghizer", "Diamer", "Unknown"]
+    return [
+        {
+            "latitude":             round(float(rng.uniform(*_LAT_RANGE)), 4),
+            "longitude":            round(float(rng.uniform(*_LON_RANGE)), 4),
+            "district":             districts[int(rng.integers(len(districts)))],
+            "rainfall":             round(float(rng.gamma(1.2, 80.0)), 1),
+            "river_level":          round(float(rng.uniform(0, 30)), 1),
+            "temperature_elevated": bool(rng.random() < 0.2),
+            "terrain":              terrains[int(rng.integers(len(terrains)))],
+            "seismic_activity":     bool(rng.random() < 0.25),
+            "month":                int(rng.integers(1, 13)),
+        }
+        for _ in range(n)
+    ]
+
+
+def predict_labels(artifacts: dict, rows: list[dict]) -> tuple[list[str], np.ndarray]:
+    """Predicted labels and probabilities for golden-set rows."""
+    engine = InferenceEngine(artifacts=artifacts)
+    X = build_feature_matrix(
+        latitude             = [r["latitude"] for r in rows],
+        longitude            = [r["longitude"] for r in rows],
+        district_enc         = [engine.encode_district(r.get("district", "Unknown")) for r in rows],
+        month                = [r.get("month", 6) for r in rows],
+        rainfall_mm          = [r.get("rainfall", 0.0) for r in rows],
+        river_level_m        = [r.get("river_level", 0.0) for r in rows],
+        temperature_elevated = [r.get("temperature_elevated", False) for r in rows],
+        terrain              = [r.get("terrain", "Unknown") for r in rows],
+        seismic_activity     = [r.get("seismic_activity", False) for r in rows],
+        features             = artifacts["features"],
+    )
+    probs = engine.predict_proba(X)
+    return [str(c) for c in engine.forest.classes_[probs.argmax(axis=1)]], probs
+
+
+class ModelRegistry:
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = root
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def versions(self) -> list[str]:
+        """Published versions, oldest first (by name)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            v for v in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, v, "meta.json"))
+            or os.path.exists(os.path.join(self.root, v, "model.joblib"))
+        )
+
+    def current(self) -> str | None:
+        """Version named in CURRENT, else the newest one."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+            if version in self.versions():
+                return version
+        except FileNotFoundError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def set_current(self, version: str):
+        if version not in self.versions():
+            raise KeyError(version)
+        tmp = os.path.join(self.root, CURRENT_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
+
+    def load(self, version: str) -> dict:
+        """Artifacts of ``version`` with ``registry_version`` set."""
+        path = self.path(version)
+        if os.path.exists(os.path.join(path, "meta.json")):
+            artifacts = load_model_arrays(path)
+        elif os.path.exists(os.path.join(path, "model.joblib")):
+            import joblib
+            artifacts = joblib.load(os.path.join(path, "model.joblib"))
+        else:
+            raise KeyError(f"unknown model version {version!r}")
+        artifacts["registry_version"] = version
+        return artifacts
+
+    def publish(self, artifacts: dict, version: str | None = None, make_current: bool = False) -> str:
+        """Store ``artifacts`` as a new array-format version and return its name."""
+        if version is None:
+            stamp = artifacts.get("trained_at") or datetime.now().isoformat(timespec="seconds")
+            version = str(stamp).replace(":", "-")
+        os.makedirs(self.root, exist_ok=True)
+        save_model_arrays(artifacts, self.path(version))
+        if make_current:
+            self.set_current(version)
+        return version
+
+    # ── Golden set ───────────────────────────────────────────────────────────
+
+    def golden(self) -> list[dict]:
+        try:
+            with open(os.path.join(self.root, GOLDEN_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def write_golden(self, artifacts: dict, n: int = 64, seed: int = 0) -> list[dict]:
+        """Record ``artifacts``' labels on fresh golden inputs as the expected answers."""
+        rows = golden_inputs(n, seed)
+        labels, _ = predict_labels(artifacts, rows)
+        golden = [{**r, "expected": label} for r, label in zip(rows, labels)]
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, GOLDEN_FILE), "w") as f:
+            json.dump(golden, f, indent=1)
+        return golden
+
+    def validate(self, artifacts: dict, min_agreement: float = 0.9) -> dict:
+        """
+        Score the golden set with ``artifacts``. Raises ModelValidationError on
+        malformed output or when fewer than ``min_agreement`` of the rows
+        match their expected label; returns the validation report otherwise.
+        """
+        rows = self.golden() or golden_inputs(16)
+        t0 = time.perf_counter()
+        try:
+            labels, probs = predict_labels(artifacts, rows)
+        except Exception as exc:
+            raise ModelValidationError(f"scoring the golden set failed: {exc}") from exc
+        elapsed = time.perf_counter() - t0
+
+        if not np.isfinite(probs).all() or not np.allclose(probs.sum(axis=1), 1.0, atol=1e-6):
+            raise ModelValidationError("class probabilities are not finite rows summing to 1")
+        expected = [r.get("expected") for r in rows]
+        checked  = [(e, got) for e, got in zip(expected, labels) if e is not None]
+        agreement = sum(e == got for e, got in checked) / len(checked) if checked else None
+        if agreement is not None and agreement < min_agreement:
+            raise ModelValidationError(
+                f"golden-set agreement {agreement:.1%} is below the required {min_agreement:.1%}"
+            )
+        return {
+            "golden_rows": len(rows),
+            "agreement":   agreement,
+            "latency_ms":  round(elapsed * 1000, 2),
+        }
+
+
+class ModelReloader:
+    """
+    Background load -> validate -> install of registry versions. One reload
+    runs at a time; ``install`` is called with the validated artifacts.
+    """
+
+    def __init__(self, registry: ModelRegistry, install, min_agreement: float = 0.9):
+        self.registry      = registry
+        self.install       = install
+        self.min_agreement = min_agreement
+        self.active: str | None = None
+        self.status = {"state": "idle", "version": None, "error": None, "report": None, "finished_at": None}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._watcher: threading.Thread | None = None
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def request(self, version: str | None = None) -> bool:
+        """Start reloading ``version`` (default: the registry's current). False if one is running."""
+        with self._lock:
+            if self.busy:
+                return False
+            version = version or self.registry.current()
+            self.status = {"state": "loading", "version": version, "error": None, "report": None, "finished_at": None}
+            self._thread = threading.Thread(target=self._run, args=(version,), daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout: float | None = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, version: str | None):
+        try:
+            if version is None:
+                raise KeyError("the model registry is empty")
+            artifacts = self.registry.load(version)
+            self.status["state"] = "validating"
+            report = self.registry.validate(artifacts, self.min_agreement)
+            self.install(artifacts)
+            self.active = version
+            self.status.update(state="installed", report=report)
+        except Exception as exc:
+            self.status.update(state="failed", error=f"{exc.__class__.__name__}: {exc}")
+        self.status["finished_at"] = datetime.now().isoformat(timespec="seconds")
+
+    def watch(self, interval: float):
+        """Poll the registry every ``interval`` seconds and reload when CURRENT changes."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    current = self.registry.current()
+                except OSError:
+                    continue
+                if current and current != self.active and not self.busy \
+                        and not (self.status["state"] == "failed" and self.status["version"] == current):
+                    self.request(current)
+
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=loop, daemon=True)
+            self._watcher.start()
+
+
+class ShadowScorer:
+    """
+    Scores ``percent`` of requests on a candidate model in a worker thread.
+    ``score(artifacts, reqs, month)`` must return class probabilities and
+    ``classes(artifacts)`` the matching labels.
+    """
+
+    def __init__(self, artifacts: dict, percent: float, score, classes, window: int = 1000):
+        self.artifacts = artifacts
+        self.version   = artifacts.get("registry_version") or artifacts.get("trained_at")
+        self.percent   = percent
+        self._score    = score
+        self._classes  = classes
+        self._pool     = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._pending  = 0
+        self._lock     = threading.Lock()
+
+        self.compared      = 0
+        self.disagreements = 0
+        self.skipped       = 0
+        self.errors        = 0
+        self.primary_ms: deque = deque(maxlen=window)
+        self.shadow_ms:  deque = deque(maxlen=window)
+
+    def maybe_score(self, reqs: list, month: int, primary_labels: list[str], primary_ms: float):
+        if random.random() * 100 >= self.percent:
+            return
+        with self._lock:
+            if self._pending >= 8:          # never let the shadow queue grow behind live traffic
+                self.skipped += 1
+                return
+            self._pending += 1
+        self._pool.submit(self._compare, reqs, month, primary_labels, primary_ms)
+
+    def _compare(self, reqs, month, primary_labels, primary_ms):
+        try:
+            t0 = time.perf_counter()
+            probs = self._score(self.artifacts, reqs, month)
+            elapsed = (time.perf_counter() - t0) * 1000
+            classes = self._classes(self.artifacts)
+            labels = [str(classes[i]) for i in np.argmax(probs, axis=1)]
+            with self._lock:
+                self.compared      += len(labels)
+                self.disagreements += sum(a != b for a, b in zip(labels, primary_labels))
+                self.primary_ms.append(primary_ms)
+                self.shadow_ms.append(elapsed)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def drain(self):
+        """Wait for queued comparisons (tests, shutdown)."""
+        self._pool.submit(lambda: None).result()
+
+    def stop(self):
+        self._pool.shutdown(wait=False)
+
+    @staticmethod
+    def _percentiles(values) -> dict | None:
+        if not values:
+            return None
+        arr = np.asarray(values)
+        return {"p50": round(float(np.percentile(arr, 50)), 3), "p95": round(float(np.percentile(arr, 95)), 3)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version":          self.version,
+                "percent":          self.percent,
+                "compared":         self.compared,
+                "disagreements":    self.disagreements,
+                "disagreement_rate": round(self.disagreements / self.compared, 4) if self.compared else None,
+                "skipped":          self.skipped,
+                "errors":           self.errors,
+                "primary_ms":       self._percentiles(self.primary_ms),
+                "shadow_ms":        self._percentiles(self.shadow_ms),
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("publish", help="add a model.joblib or array export as a new version")
+    p.add_argument("source", nargs="?", default=MODEL_PATH)
+    p.add_argument("--version")
+    p.add_argument("--current", action="store_true", help="also make it the serving version")
+    g = sub.add_parser("golden", help="record the current version's answers as the golden set")
+    g.add_argument("--n", type=int, default=64)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.cmd == "publish":
+        if os.path.isdir(args.source):
+            source = load_model_arrays(args.source)
+        else:
+            import joblib
+            source = joblib.load(args.source)
+        version = registry.publish(source, args.version, make_current=args.current)
+        print(f"Published {version} to {registry.root}" + (" (current)" if args.current else ""))
+    else:
+        version = registry.current()
+        if version is None:
+            raise SystemExit(f"No versions in {registry.root}")
+        golden = registry.write_golden(registry.load(version), n=args.n)
+        print(f"Wrote {len(golden)} golden rows from {version}")
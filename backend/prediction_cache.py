@@ -0,0 +1,125 @@
+"""
+LRU + TTL cache for /predict responses.
+
+By default the key is the exact request plus the month, so a hit returns
+exactly what the model computes for it. Coordinates can be rounded and
+rainfall and river level snapped to (floor-aligned) buckets to raise the hit
+rate; a hit then returns the answer for the first request of its bucket.
+Buckets never span the rainfall trigger: whether rainfall is above
+RAINFALL_TRIGGER_MM is part of the key. Misses are always scored on the raw
+request. The whole cache is dropped when the loaded model version changes.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from features import RAINFALL_TRIGGER_MM
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 600.0,
+        latlon_decimals: int | None = None,
+        rainfall_bucket: float = 0.0,
+        river_bucket: float = 0.0,
+    ):
+        self.max_size        = max_size
+        self.ttl_seconds     = ttl_seconds
+        self.latlon_decimals = latlon_decimals
+        self.rainfall_bucket = rainfall_bucket
+        self.river_bucket    = river_bucket
+
+        self._entries: OrderedDict = OrderedDict()   # key -> (expires_at, value)
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+        self.expirations   = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def _bucket(value: float, width: float) -> float:
+        return round(math.floor(value / width) * width, 6) if width > 0 else value
+
+    def _round(self, value: float) -> float:
+        return value if self.latlon_decimals is None else round(value, self.latlon_decimals)
+
+    def normalize(self, inputs: dict) -> dict:
+        """Cache-key view of /predict inputs (bucketed when configured)."""
+        rainfall = inputs.get("rainfall") or 0.0
+        return {
+            "latitude":             self._round(inputs["latitude"]),
+            "longitude":            self._round(inputs["longitude"]),
+            "district":             inputs.get("district") or "Unknown",
+            "rainfall":             self._bucket(rainfall, self.rainfall_bucket),
+            "rainfall_trigger":     rainfall > RAINFALL_TRIGGER_MM,
+            "river_level":          self._bucket(inputs.get("river_level") or 0.0, self.river_bucket),
+            "temperature_elevated": bool(inputs.get("temperature_elevated")),
+            "terrain":              inputs.get("terrain") or "Unknown",
+            "seismic_activity":     bool(inputs.get("seismic_activity")),
+        }
+
+    @staticmethod
+    def key(normalized: dict, month: int) -> tuple:
+        return (month, *normalized.values())
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: tuple, version):
+        """Cached value for ``key`` under model ``version``, or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value, version):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled":       self.enabled,
+            "size":          len(self._entries),
+            "max_size":      self.max_size,
+            "ttl_seconds":   self.ttl_seconds,
+            "hits":          self.hits,
+            "misses":        self.misses,
+            "hit_rate":      round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions":     self.evictions,
+            "expirations":   self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,75 @@
+"""
+Opt-in sampling profiler for a running server.
+
+``sample_stacks`` walks every thread's current Python stack (from
+``sys._current_frames``) ``hz`` times a second for ``seconds`` and counts
+identical stacks. ``collapsed`` renders the counts in the folded format that
+flamegraph.pl, speedscope and inferno read:
+
+    MainThread;uvicorn/server.py:serve;fast_server.py:predict_risk 42
+
+Sampling runs in the caller's thread and reads frames without stopping the
+others, so it costs one stack walk per thread per sample and needs no
+restart or tracing hooks. fast_server exposes it as
+``GET /admin/profile`` when ``GBDMS_PROFILER=1``.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_SECONDS = 60.0
+MAX_HZ      = 1000.0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # Last two path components are enough to tell modules apart
+    short = os.path.join(*path.replace("\\", "/").split("/")[-2:]) if "/" in path or "\\" in path else path
+    return f"{short}:{code.co_name}"
+
+
+def sample_stacks(seconds: float = 10.0, hz: float = 100.0, idle: bool = False) -> tuple[Counter, int]:
+    """
+    Sample all threads other than the caller. Returns ``(stack counts,
+    number of samples)``. Threads parked in a wait (innermost frame in
+    ``threading``/``selectors``/``queue``) are skipped unless ``idle``.
+    """
+    seconds  = min(max(seconds, 0.0), MAX_SECONDS)
+    interval = 1.0 / min(max(hz, 1.0), MAX_HZ)
+    me       = threading.get_ident()
+    names    = {}
+    counts: Counter = Counter()
+    samples  = 0
+    deadline = time.monotonic() + seconds
+    next_at  = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        if now < next_at:
+            time.sleep(next_at - now)
+        next_at += interval
+        samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if not idle and frame.f_code.co_filename.endswith(("threading.py", "selectors.py", "queue.py")):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if ident not in names:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+    return counts, samples
+
+
+def collapsed(counts: Counter) -> str:
+    """Folded stacks, most frequent first."""
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
@@ -0,0 +1,274 @@
+"""
+Push risk changes to dashboards instead of having them poll /predict.
+
+``RiskStream`` keeps the predicted class and risk level of a fixed set of
+watch points (the gazetteer's places) under the current per-district
+conditions. When the conditions of a district change, or a new model is
+installed, the affected points are scored again and only points whose class
+or risk level actually changed are published.
+
+Subscribers choose districts and/or bounding boxes; the points each
+subscription covers are resolved once, so publishing a change is a lookup of
+the subscribers watching that point. Every subscriber has a mailbox keyed by
+point: a newer change for the same point replaces the pending one (and a
+point that flipped and flipped back is not sent at all), so a slow client
+holds at most one pending entry per point it watches and gets the latest
+state when it catches up. Messages to one client are at least
+``min_interval`` seconds apart, and each change is JSON-encoded once no
+matter how many clients receive it.
+
+Scoring runs in whichever thread calls ``update_conditions`` / ``refresh``;
+delivery happens on the event loop that subscribers were created on.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+CONDITION_DEFAULTS = {
+    "rainfall":             0.0,
+    "river_level":          0.0,
+    "temperature_elevated": False,
+    "seismic_activity":     False,
+}
+
+
+@dataclass
+class Subscription:
+    districts: list[str] = field(default_factory=list)
+    bboxes:    list[tuple[float, float, float, float]] = field(default_factory=list)   # south, west, north, east
+
+    def covers(self, point: dict) -> bool:
+        if not self.districts and not self.bboxes:
+            return True
+        if point["district"].lower() in {d.lower() for d in self.districts}:
+            return True
+        return any(s <= point["lat"] <= n and w <= point["lon"] <= e for s, w, n, e in self.bboxes)
+
+
+class Subscriber:
+    def __init__(self, stream: "RiskStream", points: list[int], min_interval: float):
+        self.stream       = stream
+        self.points       = points
+        self.min_interval = min_interval
+        self._pending: dict[int, tuple[dict, dict, str]] = {}   # point -> (first previous, change, encoded)
+        self._event       = asyncio.Event()
+        self._snapshot    = True
+        self._last_sent   = 0.0
+        self._event.set()
+
+    def _offer(self, i: int, change: dict, encoded: str):
+        if i in self._pending:
+            self.stream.coalesced += 1
+            self._pending[i] = (self._pending[i][0], change, encoded)
+        else:
+            self._pending[i] = (change["previous"], change, encoded)
+        self._event.set()
+
+    def _resync(self, points: list[int]):
+        self.points    = points
+        self._snapshot = True
+        self._pending.clear()
+        self._event.set()
+
+    async def next_message(self, timeout: float | None = None) -> str | None:
+        """
+        Next JSON message for this client: a ``snapshot`` of every covered
+        point first (and after resubscribing), then ``update`` batches.
+        Returns None if nothing changed within ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if not self._event.is_set():
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return None
+            self._event.clear()
+
+            if self._snapshot:
+                self._snapshot = False
+                self._pending.clear()
+                body = json.dumps({"type": "snapshot", "points": self.stream.snapshot(self.points)})
+            else:
+                encoded = [enc for prev, change, enc in self._pending.values()
+                           if (prev["prediction"], prev["risk_level"]) != (change["prediction"], change["risk_level"])]
+                self._pending.clear()
+                if not encoded:
+                    continue
+                body = '{"type":"update","changes":[' + ",".join(encoded) + "]}"
+            self._last_sent = time.monotonic()
+            self.stream.messages += 1
+            return body
+
+
+class RiskStream:
+    def __init__(
+        self,
+        points: list[dict],
+        evaluate: Callable[[list[dict], int], Optional[list[dict]]],
+        min_interval: float = 0.25,
+    ):
+        """
+        ``points`` are dicts with ``name``, ``district``, ``lat`` and ``lon``.
+        ``evaluate(rows, month)`` scores rows of /predict inputs and returns
+        one ``{"prediction", "risk_level", "confidence"}`` dict per row, or
+        None when no model is loaded.
+        """
+        self.points       = points
+        self.evaluate     = evaluate
+        self.min_interval = min_interval
+        self.conditions: dict[str, dict] = {}
+        self.states: list[dict | None] = [None] * len(points)
+        self.month   = None
+        self.started = False
+        self._lock   = threading.Lock()
+
+        self._by_district: dict[str, list[int]] = {}
+        for i, p in enumerate(points):
+            self._by_district.setdefault(p["district"].lower(), []).append(i)
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._watchers: list[set[Subscriber]] = [set() for _ in points]
+        self.subscribers: set[Subscriber] = set()
+
+        self.published = 0
+        self.coalesced = 0
+        self.messages  = 0
+        self.dropped   = 0
+
+    # ── Scoring ──────────────────────────────────────────────────────────────
+    def districts(self) -> list[str]:
+        return sorted({p["district"] for p in self.points})
+
+    def district_conditions(self, district: str) -> dict:
+        return {**CONDITION_DEFAULTS, **self.conditions.get(district.lower(), {})}
+
+    def _score(self, idx: list[int], month: int) -> list[tuple[int, dict]]:
+        """Score points ``idx`` and return ``(point, change)`` pairs (caller holds the lock)."""
+        rows = [
+            {"latitude": self.points[i]["lat"], "longitude": self.points[i]["lon"],
+             "district": self.points[i]["district"], **self.district_conditions(self.points[i]["district"])}
+            for i in idx
+        ]
+        results = self.evaluate(rows, month) if rows else []
+        if results is None:
+            return []
+        changes = []
+        for i, new in zip(idx, results):
+            old = self.states[i]
+            self.states[i] = {**self._point(i), **new}
+            if old is not None and (old["prediction"], old["risk_level"]) != (new["prediction"], new["risk_level"]):
+                changes.append((i, {
+                    **self.states[i],
+                    "previous": {"prediction": old["prediction"], "risk_level": old["risk_level"]},
+                    "at": time.time(),
+                }))
+        return changes
+
+    def _point(self, i: int) -> dict:
+        p = self.points[i]
+        return {"name": p["name"], "district": p["district"], "lat": p["lat"], "lon": p["lon"]}
+
+    def _ensure_started(self, month: int) -> list[tuple[int, dict]]:
+        """First scoring of all points, and a full rescore when the month rolls over."""
+        if not self.started or self.month != month or any(s is None for s in self.states):
+            self.started, self.month = True, month
+            return self._score(list(range(len(self.points))), month)
+        return []
+
+    def update_conditions(self, district: str, values: dict, month: int) -> list[dict]:
+        """Merge ``values`` into a district's conditions and publish what changed."""
+        key = district.lower()
+        if key not in self._by_district:
+            raise KeyError(district)
+        with self._lock:
+            changes = self._ensure_started(month)
+            self.conditions[key] = {**self.conditions.get(key, {}), **values}
+            changes += self._score(self._by_district[key], month)
+        self._publish(changes)
+        return [c for _, c in changes]
+
+    def refresh(self, month: int) -> list[dict]:
+        """Rescore every point (after a model reload); no-op until first used."""
+        with self._lock:
+            if not self.started:
+                return []
+            self.month = month
+            changes = self._score(list(range(len(self.points))), month)
+        self._publish(changes)
+        return [c for _, c in changes]
+
+    def snapshot(self, idx: list[int]) -> list[dict]:
+        return [self.states[i] or self._point(i) for i in idx]
+
+    # ── Fan-out ──────────────────────────────────────────────────────────────
+    def resolve(self, subscription: Subscription) -> list[int]:
+        return [i for i, p in enumerate(self.points) if subscription.covers(p)]
+
+    def subscribe(self, subscription: Subscription, month: int) -> Subscriber:
+        """Register a client; must be called on the event loop that will deliver to it."""
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            self._publish_later(self._ensure_started(month))
+        sub = Subscriber(self, self.resolve(subscription), self.min_interval)
+        self.subscribers.add(sub)
+        for i in sub.points:
+            self._watchers[i].add(sub)
+        return sub
+
+    def resubscribe(self, sub: Subscriber, subscription: Subscription):
+        for i in sub.points:
+            self._watchers[i].discard(sub)
+        sub._resync(self.resolve(subscription))
+        for i in sub.points:
+            self._watchers[i].add(sub)
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+        for i in sub.points:
+            self._watchers[i].discard(sub)
+
+    def _publish_later(self, changes: list[tuple[int, dict]]):
+        if changes and self._loop is not None:
+            self._loop.call_soon(self._deliver, changes)
+
+    def _publish(self, changes: list[tuple[int, dict]]):
+        loop = self._loop
+        if not changes or loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(changes)
+        else:
+            loop.call_soon_threadsafe(self._deliver, changes)
+
+    def _deliver(self, changes: list[tuple[int, dict]]):
+        for i, change in changes:
+            watchers = self._watchers[i]
+            if not watchers:
+                continue
+            encoded = json.dumps(change)
+            for sub in watchers:
+                sub._offer(i, change, encoded)
+            self.published += len(watchers)
+
+    def stats(self) -> dict:
+        return {
+            "points":      len(self.points),
+            "subscribers": len(self.subscribers),
+            "published":   self.published,
+            "coalesced":   self.coalesced,
+            "messages":    self.messages,
+            "dropped":     self.dropped,
+        }
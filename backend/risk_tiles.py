@@ -0,0 +1,398 @@
+"""
+Precomputed risk rasters and XYZ map tiles for Gilgit-Baltistan.
+
+A lat/lon grid over the region's bounding box is pushed through the model for
+every (month, terrain, trigger scenario) combination. Class probabilities are
+quantised to uint8 and stored in one memory-mapped .npy file per model
+version, so the server maps the raster instead of loading it and tiles are
+rendered by nearest-neighbour lookup without touching the forest.
+
+Build from the command line (uses all cores):
+
+    python risk_tiles.py [--resolution 0.02] [--workers N]
+
+The server builds the raster in the background the first time a model
+version is seen and serves /tiles and /risk-grid from it afterwards.
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from districts import DISTRICTS_PATH, DistrictIndex, district_codes, encode_districts
+from features import build_feature_matrix
+from inference import CompiledForest
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+RASTER_DIR = os.path.join(_HERE, "cache", "risk_raster")
+
+# south, west, north, east
+REGION_BBOX = (34.6, 72.5, 37.1, 77.8)
+DEFAULT_RESOLUTION = 0.02   # degrees per cell (~2 km)
+
+MONTHS   = list(range(1, 13))
+TERRAINS = ["Unknown", "Valley", "Hilly", "Mountainous"]
+
+# Environmental inputs per trigger scenario, in /predict field names
+SCENARIOS = {
+    "baseline":     {"rainfall": 0.0,   "river_level": 0.0,  "temperature_elevated": False, "seismic_activity": False},
+    "heavy_rain":   {"rainfall": 150.0, "river_level": 8.0,  "temperature_elevated": False, "seismic_activity": False},
+    "glacial_melt": {"rainfall": 10.0,  "river_level": 12.0, "temperature_elevated": True,  "seismic_activity": False},
+    "seismic":      {"rainfall": 0.0,   "river_level": 0.0,  "temperature_elevated": False, "seismic_activity": True},
+}
+
+# Same bands as fast_server.get_risk_level / RISK_COLORS, on the uint8 scale
+_RISK_BANDS = ((0.8 * 255, (0xef, 0x44, 0x44)), (0.5 * 255, (0xf9, 0x73, 0x16)))
+_LOW_RGB    = (0x10, 0xb9, 0x81)
+_CLASS_RGB  = {
+    "Earthquake": (0x8b, 0x5c, 0xf6),
+    "Flood":      (0x3b, 0x82, 0xf6),
+    "GLOF":       (0x06, 0xb6, 0xd4),
+    "Landslide":  (0xa1, 0x62, 0x07),
+}
+
+# Bumped when the raster contents change for the same model; older rasters are rebuilt
+RASTER_FORMAT = 2   # 2: per-cell district codes from the district boundaries
+
+TILE_SIZE       = 256
+TILE_CACHE_SIZE = 4096
+RISK_ALPHA      = 140
+
+
+def model_version(artifacts: dict) -> str:
+    """
+    Directory-safe version key: the registry version, else ``trained_at``
+    (the same precedence as the server's model_version, so a hot reload to
+    another registry version never reuses this one's raster).
+    """
+    version = str(artifacts.get("registry_version") or artifacts.get("trained_at") or "untimestamped")
+    return "".join(c if c.isalnum() else "-" for c in version)
+
+
+def grid_axes(resolution: float, bbox=REGION_BBOX) -> tuple[np.ndarray, np.ndarray]:
+    """Cell-centre latitudes (north to south) and longitudes (west to east)."""
+    south, west, north, east = bbox
+    n_rows = int(math.ceil((north - south) / resolution))
+    n_cols = int(math.ceil((east - west) / resolution))
+    lats = north - (np.arange(n_rows) + 0.5) * resolution
+    lons = west + (np.arange(n_cols) + 0.5) * resolution
+    return lats, lons
+
+
+# ── Raster build (runs in worker processes) ──────────────────────────────────
+
+_worker_state: dict = {}
+
+
+def _init_worker(forest: CompiledForest, features: list, district_enc, path: str, lats, lons):
+    _worker_state.update(
+        forest=forest, features=features, district_enc=district_enc,
+        raster=np.load(path, mmap_mode="r+"),
+        lat=np.repeat(lats, len(lons)), lon=np.tile(lons, len(lats)),
+    )
+
+
+def _build_block(task: tuple[int, int, int]) -> int:
+    """Score the full grid for one (month, terrain, scenario) and write it in place."""
+    m, t, s = task
+    st       = _worker_state
+    scenario = SCENARIOS[list(SCENARIOS)[s]]
+    X = build_feature_matrix(
+        latitude             = st["lat"],
+        longitude            = st["lon"],
+        district_enc         = st["district_enc"],
+        month                = MONTHS[m],
+        rainfall_mm          = scenario["rainfall"],
+        river_level_m        = scenario["river_level"],
+        temperature_elevated = scenario["temperature_elevated"],
+        terrain              = TERRAINS[t],
+        seismic_activity     = scenario["seismic_activity"],
+        features             = st["features"],
+    )
+    probs  = st["forest"].predict_proba(X)
+    raster = st["raster"]
+    raster[m, t, s] = np.rint(probs.T * 255).astype(np.uint8).reshape(raster.shape[3:])
+    raster.flush()
+    return len(X)
+
+
+def build_raster(
+    artifacts: dict,
+    out_dir: str = RASTER_DIR,
+    resolution: float = DEFAULT_RESOLUTION,
+    workers: int | None = None,
+    district_enc: int | None = None,
+    districts: DistrictIndex | str | None = DISTRICTS_PATH,
+) -> str:
+    """
+    Score the whole region for every scenario and write ``<out_dir>/<version>/``.
+    Work is split into one task per (month, terrain, scenario) block and
+    spread over ``workers`` processes, each writing straight into the shared
+    memory-mapped raster. Returns the version directory.
+
+    Each cell is scored with the district whose boundary contains it, as
+    /predict does (``districts``: an index or a boundary file; None gives
+    every cell the fallback code). ``district_enc`` forces one code for all.
+    """
+    version = model_version(artifacts)
+    final   = os.path.join(out_dir, version)
+    staging = final + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    forest  = CompiledForest.from_artifacts(artifacts)
+    classes = [str(c) for c in forest.classes_]
+    lats, lons = grid_axes(resolution)
+    if district_enc is None:
+        if isinstance(districts, str):
+            districts = DistrictIndex.load(districts) if os.path.exists(districts) else None
+        names = artifacts.get("district_classes")
+        if names is None and artifacts.get("district_le") is not None:
+            names = list(artifacts["district_le"].classes_)
+        lat, lon = np.repeat(lats, len(lons)), np.tile(lons, len(lats))
+        district_enc = encode_districts(lat, lon, ["Unknown"] * len(lat), district_codes(names or []), districts)
+        np.save(os.path.join(staging, "districts.npy"),
+                district_enc.astype(np.int16).reshape(len(lats), len(lons)))
+    shape = (len(MONTHS), len(TERRAINS), len(SCENARIOS), len(classes), len(lats), len(lons))
+
+    path = os.path.join(staging, "probs.npy")
+    np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape).flush()
+
+    tasks   = [(m, t, s) for m in range(shape[0]) for t in range(shape[1]) for s in range(shape[2])]
+    workers = workers or os.cpu_count() or 1
+    initargs = (forest, artifacts["features"], district_enc, path, lats, lons)
+    t0 = time.perf_counter()
+    if workers == 1:
+        _init_worker(*initargs)
+        n_rows = sum(_build_block(task) for task in tasks)
+        _worker_state.clear()
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=initargs) as pool:
+            n_rows = sum(pool.map(_build_block, tasks))
+    elapsed = time.perf_counter() - t0
+
+    meta = {
+        "format":       RASTER_FORMAT,
+        "version":      version,
+        "model_version": artifacts.get("registry_version") or artifacts.get("trained_at"),
+        "trained_at":   artifacts.get("trained_at"),
+        "bbox":         list(REGION_BBOX),
+        "resolution":   resolution,
+        "shape":        list(shape),
+        "months":       MONTHS,
+        "terrains":     TERRAINS,
+        "scenarios":    list(SCENARIOS),
+        "classes":      classes,
+        "district_enc": int(district_enc) if np.ndim(district_enc) == 0 else None,
+        "districts":    None if np.ndim(district_enc) == 0 else "districts.npy",
+        "rows_scored":  n_rows,
+        "build_seconds": round(elapsed, 1),
+    }
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(staging, final)
+    return final
+
+
+# ── Raster access and tile rendering ─────────────────────────────────────────
+
+class RiskRaster:
+    """Read-only view of one built raster directory."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.probs   = np.load(os.path.join(path, "probs.npy"), mmap_mode="r")
+        self.version = self.meta["version"]
+        self.classes = self.meta["classes"]
+        self.south, self.west, self.north, self.east = self.meta["bbox"]
+        self.resolution = self.meta["resolution"]
+        self._tiles: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def layer(self, month: int, terrain: str, scenario: str) -> np.ndarray:
+        """uint8 class probabilities (n_classes, rows, cols) for one scenario."""
+        try:
+            m = self.meta["months"].index(month)
+            t = self.meta["terrains"].index(terrain)
+            s = self.meta["scenarios"].index(scenario)
+        except ValueError:
+            raise KeyError(f"no raster for month={month}, terrain={terrain!r}, scenario={scenario!r}")
+        return self.probs[m, t, s]
+
+    def cell_index(self, lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row/col of the cells containing each point plus an inside-the-raster mask."""
+        rows = np.floor((self.north - lat) / self.resolution).astype(np.int64)
+        cols = np.floor((lon - self.west) / self.resolution).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.probs.shape[4]) & (cols >= 0) & (cols < self.probs.shape[5])
+        return np.clip(rows, 0, self.probs.shape[4] - 1), np.clip(cols, 0, self.probs.shape[5] - 1), inside
+
+    def grid(self, month: int, terrain: str, scenario: str, stride: int = 1, bbox=None) -> dict:
+        """JSON-ready class probability grids, optionally cropped and subsampled."""
+        probs = self.layer(month, terrain, scenario)
+        lats, lons = grid_axes(self.resolution, self.meta["bbox"])
+        r0, r1, c0, c1 = 0, len(lats), 0, len(lons)
+        if bbox is not None:
+            south, west, north, east = bbox
+            r0 = max(0, int((self.north - north) // self.resolution))
+            r1 = min(len(lats), int(math.ceil((self.north - south) / self.resolution)))
+            c0 = max(0, int((west - self.west) // self.resolution))
+            c1 = min(len(lons), int(math.ceil((east - self.west) / self.resolution)))
+        sl = (slice(r0, r1, stride), slice(c0, c1, stride))
+        return {
+            "model_version": self.meta.get("model_version", self.meta["trained_at"]),
+            "month":      month,
+            "terrain":    terrain,
+            "scenario":   scenario,
+            "latitudes":  np.round(lats[sl[0]], 5).tolist(),
+            "longitudes": np.round(lons[sl[1]], 5).tolist(),
+            "probabilities": {
+                cls: np.round(probs[i][sl] / 255.0, 3).tolist()
+                for i, cls in enumerate(self.classes)
+            },
+        }
+
+    def tile_png(self, z: int, x: int, y: int, month: int, terrain: str, scenario: str, layer: str = "risk") -> bytes:
+        """Rendered 256x256 RGBA PNG for one XYZ (web-mercator) tile, LRU-cached."""
+        key = (z, x, y, month, terrain, scenario, layer)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+        png = self._render(z, x, y, self.layer(month, terrain, scenario), layer)
+        with self._lock:
+            self._tiles[key] = png
+            if len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return png
+
+    def _render(self, z: int, x: int, y: int, probs: np.ndarray, layer: str) -> bytes:
+        n   = 2 ** z
+        pix = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lon = (x + pix) / n * 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + pix) / n))))
+        rows, cols, inside = self.cell_index(lat[:, None], lon[None, :])
+
+        rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        if not inside.any():
+            return encode_png(rgba)
+
+        if layer == "risk":
+            conf = probs.max(axis=0)[rows, cols]
+            rgba[..., :3] = _LOW_RGB
+            for cutoff, rgb in reversed(_RISK_BANDS):
+                rgba[conf > cutoff, :3] = rgb
+            rgba[..., 3] = RISK_ALPHA
+        elif layer in self.classes:
+            p = probs[self.classes.index(layer)][rows, cols]
+            rgba[..., :3] = _CLASS_RGB.get(layer, (0xef, 0x44, 0x44))
+            rgba[..., 3] = (p.astype(np.uint16) * 200 // 255).astype(np.uint8)
+        else:
+            raise KeyError(f"unknown layer {layer!r}")
+        rgba[~inside] = 0
+        return encode_png(rgba)
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Minimal RGBA8 PNG encoder (zlib + stdlib only)."""
+    h, w, _ = rgba.shape
+    raw = np.zeros((h, w * 4 + 1), dtype=np.uint8)   # filter byte 0 per scanline
+    raw[:, 1:] = rgba.reshape(h, w * 4)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+class RiskRasterStore:
+    """
+    Tracks the raster for the currently loaded model. Rasters are reused from
+    disk when one exists for the model's version (in the current format);
+    otherwise one build runs in a background thread and ``get`` returns None
+    until it finishes. ``districts`` are the boundaries cells are scored with.
+    """
+
+    def __init__(
+        self,
+        root: str = RASTER_DIR,
+        resolution: float = DEFAULT_RESOLUTION,
+        workers: int | None = None,
+        districts: DistrictIndex | str | None = DISTRICTS_PATH,
+    ):
+        self.root       = root
+        self.resolution = resolution
+        self.workers    = workers
+        self.districts  = districts
+        self.current: RiskRaster | None = None
+        self.building: str | None = None
+        self.last_error: str | None = None
+        self._lock = threading.Lock()
+
+    def get(self, artifacts: dict, build: bool = True) -> RiskRaster | None:
+        version = model_version(artifacts)
+        with self._lock:
+            if self.current is not None and self.current.version == version:
+                return self.current
+            path = os.path.join(self.root, version)
+            if os.path.exists(os.path.join(path, "meta.json")):
+                raster = RiskRaster(path)
+                if raster.meta.get("format") == RASTER_FORMAT:
+                    self.current = raster
+                    return raster
+            if build and self.building != version:
+                self.building = version
+                threading.Thread(target=self._build, args=(artifacts, version), daemon=True).start()
+        return None
+
+    def _build(self, artifacts: dict, version: str):
+        try:
+            build_raster(artifacts, self.root, self.resolution, self.workers, districts=self.districts)
+            self.last_error = None
+        except Exception as exc:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            print(f"Risk raster build failed: {self.last_error}")
+        finally:
+            with self._lock:
+                if self.building == version:
+                    self.building = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import joblib
+
+    from inference import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Build the regional risk raster.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--resolution", type=float, default=DEFAULT_RESOLUTION)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    artifacts = joblib.load(args.model)
+    out = build_raster(artifacts, resolution=args.resolution, workers=args.workers)
+    with open(os.path.join(out, "meta.json")) as f:
+        meta = json.load(f)
+    print(f"Raster written to {out}")
+    print(f"  Shape    : {meta['shape']}")
+    print(f"  Rows     : {meta['rows_scored']:,} in {meta['build_seconds']} s")
@@ -0,0 +1,292 @@
+"""
+Offline road routing over an OpenStreetMap extract.
+
+An OSM XML extract (e.g. Geofabrik's Pakistan extract clipped to the region
+and converted with ``osmium cat extract.osm.pbf -o region.osm``) is turned
+into a compressed sparse row (CSR) graph and written as plain .npy arrays:
+
+    node_lat, node_lon      float64 (n_nodes,)
+    indptr                  int64   (n_nodes + 1,)  edges of node u: indptr[u]:indptr[u+1]
+    indices                 int32   (n_edges,)      edge target node
+    length_m, time_s        float32 (n_edges,)      edge length and travel time
+
+The server memory-maps these files, snaps route endpoints to the nearest
+graph node and runs A* on travel time with a great-circle / top-speed
+heuristic. Build a graph with:
+
+    python road_network.py build region.osm cache/roads
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from safe_zones import EARTH_RADIUS_KM, haversine_np
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+GRAPH_DIR = os.path.join(_HERE, "cache", "roads")
+SYNTHETIC_OSM_PATH = os.path.join(_HERE, "data", "synthetic_roads.osm")
+
+# Assumed driving speeds (km/h) per OSM highway class; other classes are ignored
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 80, "trunk": 60, "primary": 50, "secondary": 40, "tertiary": 35,
+    "motorway_link": 40, "trunk_link": 40, "primary_link": 35, "secondary_link": 30, "tertiary_link": 30,
+    "unclassified": 25, "residential": 25, "living_street": 10, "service": 15, "road": 25, "track": 15,
+}
+
+# Leading number of an OSM maxspeed value and its unit ("50", "30 mph", "60 km/h")
+_MAXSPEED = re.compile(r"\s*(\d+(?:\.\d+)?)\s*(mph|km/h|kmh|kph)?\s*$")
+_KMH_PER_MPH = 1.609344
+
+# Endpoints further than this from any road node are not routed on the graph
+MAX_SNAP_KM = 5.0
+
+_ARRAYS = ("node_lat", "node_lon", "indptr", "indices", "length_m", "time_s")
+
+
+# ── Build ────────────────────────────────────────────────────────────────────
+
+def _haversine_m(lat1, lon1, lat2, lon2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2000 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _maxspeed_kmh(value: str | None, default: float) -> float:
+    """
+    Speed in km/h from an OSM ``maxspeed`` tag: the first of several
+    ``;``-separated values, in km/h or mph. Zero, implicit (``PK:urban``),
+    ``none``, ``walk`` and unparseable values give ``default``.
+    """
+    m = _MAXSPEED.match((value or "").split(";")[0])
+    if m is None or float(m.group(1)) <= 0:
+        return default
+    speed = float(m.group(1))
+    return speed * _KMH_PER_MPH if m.group(2) == "mph" else speed
+
+
+def parse_osm(path: str) -> tuple[dict, list]:
+    """
+    Stream an OSM XML file. Returns ``{osm_node_id: (lat, lon)}`` and a list of
+    ``(node_ids, speed_kmh, oneway)`` for every routable highway way.
+    """
+    coords: dict[int, tuple[float, float]] = {}
+    ways: list = []
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end":
+            continue
+        if elem.tag == "node":
+            coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            speed = HIGHWAY_SPEEDS_KMH.get(tags.get("highway"))
+            if speed is not None:
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                speed = _maxspeed_kmh(tags.get("maxspeed"), speed)
+                oneway = tags.get("oneway") in ("yes", "true", "1") or tags.get("junction") == "roundabout"
+                ways.append((refs, speed, oneway))
+        elif elem.tag != "relation":
+            continue
+        # Drop finished top-level elements from the root too, or their empty
+        # shells pile up under it over a full extract
+        root.clear()
+    return coords, ways
+
+
+def build_graph(osm_path: str, out_dir: str = GRAPH_DIR) -> dict:
+    """Convert an OSM extract to CSR arrays under ``out_dir``. Returns the metadata."""
+    coords, ways = parse_osm(osm_path)
+
+    node_of: dict[int, int] = {}
+    src, dst, length, time_s = [], [], [], []
+    for refs, speed, oneway in ways:
+        refs = [r for r in refs if r in coords]
+        for a, b in zip(refs, refs[1:]):
+            u = node_of.setdefault(a, len(node_of))
+            v = node_of.setdefault(b, len(node_of))
+            m = _haversine_m(*coords[a], *coords[b])
+            t = m / (speed / 3.6)
+            src.append(u); dst.append(v); length.append(m); time_s.append(t)
+            if not oneway:
+                src.append(v); dst.append(u); length.append(m); time_s.append(t)
+
+    n = len(node_of)
+    ids = np.empty(n, dtype=np.int64)
+    ids[list(node_of.values())] = list(node_of.keys())
+    src = np.asarray(src, dtype=np.int64)
+    order = np.argsort(src, kind="stable")
+
+    arrays = {
+        "node_lat": np.array([coords[i][0] for i in ids], dtype=np.float64),
+        "node_lon": np.array([coords[i][1] for i in ids], dtype=np.float64),
+        "indptr":   np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))]).astype(np.int64),
+        "indices":  np.asarray(dst, dtype=np.int32)[order],
+        "length_m": np.asarray(length, dtype=np.float32)[order],
+        "time_s":   np.asarray(time_s, dtype=np.float32)[order],
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    for name in _ARRAYS:
+        np.save(os.path.join(out_dir, f"{name}.npy"), arrays[name])
+    meta = {
+        "source":        os.path.basename(osm_path),
+        "n_nodes":       n,
+        "n_edges":       int(len(order)),
+        "max_speed_kmh": max((w[1] for w in ways), default=1),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# ── Query ────────────────────────────────────────────────────────────────────
+
+class RoadNetwork:
+    """Memory-mapped CSR road graph with nearest-node snapping and A* routing."""
+
+    def __init__(self, graph_dir: str = GRAPH_DIR, snap_cell_deg: float = 0.02):
+        with open(os.path.join(graph_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        for name in _ARRAYS:
+            # Plain ndarray views of the maps: same pages, no memmap.__getitem__ overhead
+            setattr(self, name, np.asarray(np.load(os.path.join(graph_dir, f"{name}.npy"), mmap_mode="r")))
+        self.max_speed_ms = self.meta["max_speed_kmh"] / 3.6
+        self._lat_rad = np.radians(self.node_lat)
+        self._lon_rad = np.radians(self.node_lon)
+        self._cos_lat = np.cos(self._lat_rad)
+
+        # Snapping grid: node ids sorted by cell, one contiguous slice per cell
+        self._cell_deg = snap_cell_deg
+        rows = np.floor(np.asarray(self.node_lat) / snap_cell_deg).astype(np.int64)
+        cols = np.floor(np.asarray(self.node_lon) / snap_cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        self._snap_order = order
+        self._snap_cells: dict[tuple[int, int], tuple[int, int]] = {}
+        if len(order):
+            r, c = rows[order], cols[order]
+            breaks = np.flatnonzero((np.diff(r) != 0) | (np.diff(c) != 0)) + 1
+            for a, b in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [len(order)]])):
+                self._snap_cells[(int(r[a]), int(c[a]))] = (int(a), int(b))
+
+    @classmethod
+    def load_if_present(cls, graph_dir: str = GRAPH_DIR) -> "RoadNetwork | None":
+        if os.path.exists(os.path.join(graph_dir, "meta.json")):
+            return cls(graph_dir)
+        return None
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_lat)
+
+    def snap(self, lat: float, lon: float, max_km: float = MAX_SNAP_KM) -> tuple[int, float] | None:
+        """Nearest graph node within ``max_km`` as ``(node, distance_km)``, else None."""
+        reach = int(math.ceil(max_km / (111.0 * self._cell_deg * max(math.cos(math.radians(abs(lat) + 1)), 0.1))))
+        r0 = math.floor(lat / self._cell_deg)
+        c0 = math.floor(lon / self._cell_deg)
+        slices = [self._snap_cells[(r, c)]
+                  for r in range(r0 - reach, r0 + reach + 1)
+                  for c in range(c0 - reach, c0 + reach + 1)
+                  if (r, c) in self._snap_cells]
+        if not slices:
+            return None
+        cand = self._snap_order[np.concatenate([np.arange(a, b) for a, b in slices])]
+        dist = haversine_np(lat, lon, self.node_lat[cand], self.node_lon[cand])
+        best = int(np.argmin(dist))
+        if dist[best] > max_km:
+            return None
+        return int(cand[best]), float(dist[best])
+
+    def _heuristic(self, target: int):
+        """Admissible A* bound: great-circle distance to ``target`` at top speed."""
+        lat_rad, lon_rad, cos_lat = self._lat_rad, self._lon_rad, self._cos_lat
+        phi_t, lam_t, cos_t = float(lat_rad[target]), float(lon_rad[target]), float(cos_lat[target])
+        scale = 2000 * EARTH_RADIUS_KM / self.max_speed_ms
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+        def h(v: int) -> float:
+            a = sin((phi_t - lat_rad[v]) / 2) ** 2 + cos_lat[v] * cos_t * sin((lam_t - lon_rad[v]) / 2) ** 2
+            return scale * asin(sqrt(min(a, 1.0)))
+        return h
+
+    def shortest_path(self, source: int, target: int) -> tuple[list[int], float, float] | None:
+        """A* on travel time. Returns ``(nodes, length_m, time_s)`` or None if unreachable."""
+        h = self._heuristic(target)
+        indptr, indices, time_s, length_m = self.indptr, self.indices, self.time_s, self.length_m
+
+        best = {source: 0.0}
+        prev: dict[int, tuple[int, int]] = {}
+        heap = [(h(source), 0.0, source)]
+        done = set()
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u == target:
+                break
+            if u in done:
+                continue
+            done.add(u)
+            start, stop = int(indptr[u]), int(indptr[u + 1])
+            for e, v, w in zip(range(start, stop), indices[start:stop].tolist(), time_s[start:stop].tolist()):
+                g_v = g + w
+                if g_v < best.get(v, math.inf):
+                    best[v] = g_v
+                    prev[v] = (u, e)
+                    heapq.heappush(heap, (g_v + h(v), g_v, v))
+        else:
+            return None
+
+        nodes, metres = [target], 0.0
+        while nodes[-1] != source:
+            u, e = prev[nodes[-1]]
+            metres += float(length_m[e])
+            nodes.append(u)
+        nodes.reverse()
+        return nodes, metres, best[target]
+
+    def route(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float) -> dict | None:
+        """
+        Road route between two points as ``{path, distance_km, time_mins}``,
+        or None when either end is off the network or no path exists.
+        Off-road legs to the snapped nodes are added to the path and distance.
+        """
+        a = self.snap(start_lat, start_lon)
+        b = self.snap(end_lat, end_lon)
+        if a is None or b is None:
+            return None
+        found = self.shortest_path(a[0], b[0])
+        if found is None:
+            return None
+        nodes, metres, seconds = found
+        nodes = np.asarray(nodes)
+        path = [[round(start_lat, 6), round(start_lon, 6)]]
+        path += np.round(np.column_stack([self.node_lat[nodes], self.node_lon[nodes]]), 6).tolist()
+        path.append([round(end_lat, 6), round(end_lon, 6)])
+        # Off-road legs at walking pace (5 km/h)
+        off_km = a[1] + b[1]
+        return {
+            "path":        path,
+            "distance_km": metres / 1000 + off_km,
+            "time_mins":   max(1, int(seconds / 60 + off_km / 5.0 * 60)),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the offline road graph from an OSM XML extract.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("osm", nargs="?", default=SYNTHETIC_OSM_PATH)
+    b.add_argument("out", nargs="?", default=GRAPH_DIR)
+    args = parser.parse_args()
+
+    meta = build_graph(args.osm, args.out)
+    print(f"Road graph written to {args.out}")
+    print(f"  Nodes : {meta['n_nodes']:,}")
+    print(f"  Edges : {meta['n_edges']:,}")
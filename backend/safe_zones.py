@@ -0,0 +1,199 @@
+"""
+Spatial index over safe zones (hospitals, shelters, open grounds, ...).
+
+Zones are bucketed into a regular lat/lon grid; the bucket of every zone is
+sorted so each cell maps to one contiguous slice of the coordinate arrays.
+Queries only touch the cells that can contain an answer and then run a
+vectorised haversine over those candidates:
+
+  - ``within_bbox``  — zones inside a map viewport
+  - ``within_radius`` — zones within ``radius_km`` of a point
+  - ``nearest``      — k nearest zones, exact: rings of cells are scanned
+    until k matches are found, then a radius query at the k-th distance
+    picks up anything closer in cells not yet visited. Once the rings would
+    cover more cells than there are occupied ones (a point far from every
+    zone) it measures all matching zones at once instead
+
+Radius queries wrap longitude at ±180 and take every longitude when the
+circle reaches a pole.
+
+All queries accept ``types`` and ``min_capacity`` filters.
+"""
+
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT  = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """Vectorised great-circle distance in km (broadcasts like NumPy arithmetic)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def load_zones(path: str) -> list[dict]:
+    """
+    Read safe zones from a JSON list or a CSV file with at least
+    ``lat,lng,name,type,capacity`` columns. Extra fields are kept as-is.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            zones = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            zones = json.load(f)
+    for z in zones:
+        z["lat"]      = float(z["lat"])
+        z["lng"]      = float(z["lng"])
+        z["capacity"] = int(float(z.get("capacity") or 0))
+    return zones
+
+
+class SafeZoneIndex:
+    def __init__(self, zones: list[dict], cell_deg: float = 0.1):
+        self.cell_deg = cell_deg
+        lat = np.array([z["lat"] for z in zones], dtype=np.float64)
+        lng = np.array([z["lng"] for z in zones], dtype=np.float64)
+
+        rows  = np.floor(lat / cell_deg).astype(np.int64)
+        cols  = np.floor(lng / cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+
+        self.zones    = [zones[i] for i in order]
+        self.lat      = lat[order]
+        self.lng      = lng[order]
+        self.capacity = np.array([z.get("capacity", 0) for z in self.zones], dtype=np.int64)
+        self.types    = sorted({z.get("type", "") for z in self.zones})
+        self.type_code = np.array([self.types.index(z.get("type", "")) for z in self.zones], dtype=np.int64)
+
+        # (row, col) -> (start, stop) slice of the sorted arrays
+        rows, cols = rows[order], cols[order]
+        self._cells: dict[tuple[int, int], tuple[int, int]] = {}
+        if len(order):
+            breaks = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            starts = np.concatenate([[0], breaks])
+            stops  = np.concatenate([breaks, [len(order)]])
+            for a, b in zip(starts, stops):
+                self._cells[(int(rows[a]), int(cols[a]))] = (int(a), int(b))
+            self._row_range = (int(rows.min()), int(rows.max()))
+            self._col_range = (int(cols.min()), int(cols.max()))
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _gather(self, cells) -> np.ndarray:
+        slices = [self._cells[c] for c in cells if c in self._cells]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(a, b) for a, b in slices])
+
+    def _filter(self, idx: np.ndarray, types=None, min_capacity: int | None = None) -> np.ndarray:
+        if types:
+            codes = [self.types.index(t) for t in types if t in self.types]
+            idx = idx[np.isin(self.type_code[idx], codes)]
+        if min_capacity:
+            idx = idx[self.capacity[idx] >= min_capacity]
+        return idx
+
+    def _bbox_cells(self, south: float, west: float, north: float, east: float):
+        r0, r1 = math.floor(south / self.cell_deg), math.floor(north / self.cell_deg)
+        c0, c1 = math.floor(west / self.cell_deg), math.floor(east / self.cell_deg)
+        r0, r1 = max(r0, self._row_range[0]), min(r1, self._row_range[1])
+        c0, c1 = max(c0, self._col_range[0]), min(c1, self._col_range[1])
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self._cells):
+            return [c for c in self._cells if r0 <= c[0] <= r1 and c0 <= c[1] <= c1]
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    def _result(self, idx: np.ndarray, dist: np.ndarray | None = None) -> list[dict]:
+        if dist is None:
+            return [self.zones[i] for i in idx]
+        return [{**self.zones[i], "distance_km": round(float(d), 3)} for i, d in zip(idx, dist)]
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def within_bbox(self, south, west, north, east, types=None, min_capacity=None) -> list[dict]:
+        if not self.zones:
+            return []
+        idx = self._gather(self._bbox_cells(south, west, north, east))
+        idx = idx[(self.lat[idx] >= south) & (self.lat[idx] <= north)
+                  & (self.lng[idx] >= west) & (self.lng[idx] <= east)]
+        return self._result(self._filter(idx, types, min_capacity))
+
+    def _radius_cells(self, lat, lng, radius_km):
+        dlat = radius_km / KM_PER_DEG_LAT
+        south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        # Any point within radius_km at latitude <= edge has sin(d/2) >= cos(edge) * sin(dlng/2)
+        edge = math.radians(max(abs(south), abs(north)))
+        s = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) / max(math.cos(edge), 1e-12)
+        if s >= 1.0:
+            return self._bbox_cells(south, -180.0, north, 180.0)
+        dlng = math.degrees(2 * math.asin(s))
+        west, east = lng - dlng, lng + dlng
+        cells = self._bbox_cells(south, max(west, -180.0), north, min(east, 180.0))
+        if west < -180.0:
+            cells += self._bbox_cells(south, west + 360.0, north, 180.0)
+        if east > 180.0:
+            cells += self._bbox_cells(south, -180.0, north, east - 360.0)
+        return list(dict.fromkeys(cells))
+
+    def _radius_idx(self, lat, lng, radius_km, types=None, min_capacity=None):
+        idx  = self._filter(self._gather(self._radius_cells(lat, lng, radius_km)), types, min_capacity)
+        dist = haversine_np(lat, lng, self.lat[idx], self.lng[idx])
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return idx[order], dist[order]
+
+    def within_radius(self, lat, lng, radius_km, types=None, min_capacity=None) -> list[dict]:
+        if not self.zones:
+            return []
+        return self._result(*self._radius_idx(lat, lng, radius_km, types, min_capacity))
+
+    def nearest(self, lat, lng, k: int = 1, types=None, min_capacity=None) -> list[dict]:
+        """k nearest zones matching the filters, closest first, with ``distance_km``."""
+        if not self.zones or k <= 0:
+            return []
+        r0 = math.floor(lat / self.cell_deg)
+        c0 = math.floor(lng / self.cell_deg)
+        max_ring = max(
+            abs(r0 - self._row_range[0]), abs(r0 - self._row_range[1]),
+            abs(c0 - self._col_range[0]), abs(c0 - self._col_range[1]),
+        )
+        found, visited = None, 0
+        for ring in range(max_ring + 1):
+            if ring == 0:
+                cells = [(r0, c0)]
+            else:
+                cells = [(r0 + dr, c0 + dc)
+                         for dr in range(-ring, ring + 1)
+                         for dc in (range(-ring, ring + 1) if abs(dr) == ring else (-ring, ring))]
+            visited += len(cells)
+            if visited > len(self._cells):
+                break
+            hits = self._filter(self._gather(cells), types, min_capacity)
+            found = hits if found is None else np.concatenate([found, hits])
+            if len(found) >= k:
+                break
+        if found is None or len(found) < k:
+            # Far from the zones, or too few matches: measure every matching zone
+            idx  = self._filter(np.arange(len(self.zones)), types, min_capacity)
+            dist = haversine_np(lat, lng, self.lat[idx], self.lng[idx])
+            order = np.argsort(dist, kind="stable")[:k]
+            return self._result(idx[order], dist[order])
+
+        dist = haversine_np(lat, lng, self.lat[found], self.lng[found])
+        kth  = np.partition(dist, k - 1)[k - 1]
+        idx, dist = self._radius_idx(lat, lng, kth * (1 + 1e-9), types, min_capacity)
+        return self._result(idx[:k], dist[:k])
@@ -0,0 +1,302 @@
+"""
+Gauge-station readings and their rolling 1h / 24h / 72h aggregates.
+
+Every station owns one row of fixed-size ring buffers (NumPy arrays shared by
+all stations, grown by doubling when stations are added):
+
+  - ``times[s, slot]``  reading time (Unix seconds), strictly increasing
+  - ``cum[s, slot, m]`` running total of metric ``m`` up to and including
+    that reading, ``n[s, slot, m]`` the running count of readings that had it
+
+Ingesting a reading is O(1): its running totals are the previous ones plus
+its own values. A window aggregate is then the difference of two running
+totals, at the newest reading and just before the first reading inside the
+window; that first reading is found by a bisection over ring positions run
+for all stations at once. Nothing is recomputed from the raw readings and
+nothing is allocated per reading.
+
+The buffers keep the last ``capacity`` readings per station (default 72 h at
+one reading a minute); a station that reports more often has its windows
+truncated to what is still in the buffer.
+
+``features`` turns the aggregates into model inputs for arbitrary points:
+inverse-distance weighting over the ``k`` nearest stations within
+``max_km`` that have data, giving ``rainfall`` (mm over the last 24 h, the
+unit of PredictionRequest.rainfall), ``river_level`` (latest, m above normal)
+and ``temperature_elevated`` (24 h mean above the station's normal, or its
+72 h mean, by ``TEMP_ANOMALY_C``).
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+
+from safe_zones import haversine_np
+
+METRICS = ("rainfall", "river_level", "temperature")
+WINDOWS = {"1h": 3600.0, "24h": 86400.0, "72h": 259200.0}
+
+DEFAULT_CAPACITY = 72 * 60
+TEMP_ANOMALY_C   = 3.0
+
+_RAIN, _RIVER, _TEMP = range(len(METRICS))
+
+
+def load_stations(path: str) -> list[dict]:
+    """Stations from a JSON list of ``{"id", "lat", "lon", "district"[, "normal_temperature"]}``."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SensorStore:
+    def __init__(self, stations: list[dict] = (), capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._size    = capacity + 1   # one extra slot keeps the total before the oldest reading
+        self.stations: list[dict] = []
+        self._index:   dict[str, int] = {}
+        self._lock     = threading.Lock()
+
+        self.lat    = np.empty(0)
+        self.lon    = np.empty(0)
+        self.normal = np.empty(0)                      # seasonal temperature, NaN if unknown
+        self.head   = np.zeros(0, dtype=np.int64)      # readings ever stored per station
+        self.times  = np.empty((0, self._size))
+        self.cum    = np.empty((0, self._size, len(METRICS)))
+        self.n      = np.empty((0, self._size, len(METRICS)), dtype=np.int64)
+        self.latest = np.empty((0, len(METRICS)))      # newest value of each metric, NaN if none yet
+
+        self.accepted = 0
+        self.late     = 0
+        self.unknown  = 0
+        for st in stations:
+            self.add_station(st)
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    # ── Stations ─────────────────────────────────────────────────────────────
+    def add_station(self, station: dict) -> int:
+        """Register (or move / rename) a station and return its row."""
+        with self._lock:
+            entry = {
+                "id":       str(station["id"]),
+                "lat":      float(station["lat"]),
+                "lon":      float(station["lon"]),
+                "district": station.get("district") or "Unknown",
+            }
+            normal = station.get("normal_temperature")
+            s = self._index.get(entry["id"])
+            if s is None:
+                s = len(self.stations)
+                if s == len(self.head):
+                    self._grow(max(16, 2 * s))
+                self.stations.append(entry)
+                self._index[entry["id"]] = s
+            else:
+                self.stations[s] = entry
+            self.lat[s], self.lon[s] = entry["lat"], entry["lon"]
+            self.normal[s] = np.nan if normal is None else float(normal)
+            return s
+
+    def _grow(self, rows: int):
+        def grow(a, fill):
+            out = np.full((rows,) + a.shape[1:], fill, dtype=a.dtype)
+            out[: len(a)] = a
+            return out
+
+        self.lat, self.lon, self.normal = grow(self.lat, 0.0), grow(self.lon, 0.0), grow(self.normal, np.nan)
+        self.head   = grow(self.head, 0)
+        self.times  = grow(self.times, -np.inf)
+        self.cum    = grow(self.cum, 0.0)
+        self.n      = grow(self.n, 0)
+        self.latest = grow(self.latest, np.nan)
+
+    def station_index(self, station_id: str) -> int | None:
+        return self._index.get(str(station_id))
+
+    # ── Ingestion ────────────────────────────────────────────────────────────
+    def ingest(self, station_ids, times, values) -> dict:
+        """
+        Store a batch of readings: ``station_ids`` and ``times`` (Unix seconds)
+        per reading and ``values`` of shape (n, len(METRICS)) with NaN for a
+        metric the reading does not have. Readings may arrive in any order
+        within the batch; a reading not newer than the station's newest stored
+        one is counted as ``late`` and skipped, as are unknown stations.
+        Returns the counts and the rows of the stations that got data.
+        """
+        names, inverse = np.unique(np.asarray(station_ids, dtype=str), return_inverse=True)
+        idx    = np.array([self._index.get(name, -1) for name in names.tolist()], dtype=np.int64)[inverse.ravel()]
+        times  = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(idx), len(METRICS))
+        known  = idx >= 0
+        unknown = int((~known).sum())
+        idx, times, values = idx[known], times[known], values[known]
+
+        with self._lock:
+            # Sort by station, then time; keep readings newer than what is stored (and than their predecessor)
+            order = np.lexsort((times, idx))
+            idx, times, values = idx[order], times[order], values[order]
+            newest = self.times[idx, (self.head[idx] - 1) % self._size]
+            prev   = np.concatenate([[-np.inf], times[:-1]])
+            fresh  = (times > newest) & ((idx != np.concatenate([[-1], idx[:-1]])) | (times > prev))
+            late   = int((~fresh).sum())
+            idx, times, values = idx[fresh], times[fresh], values[fresh]
+
+            if len(idx):
+                present = ~np.isnan(values)
+                filled  = np.where(present, values, 0.0)
+                # Each station's run within this batch, and each reading's position in it
+                starts  = np.flatnonzero(np.concatenate([[True], idx[1:] != idx[:-1]]))
+                lengths = np.diff(np.append(starts, len(idx)))
+                rank    = np.arange(len(idx)) - np.repeat(starts, lengths)
+
+                # Running totals continue from each station's newest stored reading
+                owner   = idx[starts]
+                last    = (self.head[owner] - 1) % self._size
+                has_old = (self.head[owner] > 0)[:, None]
+                run_c   = np.cumsum(filled, axis=0)
+                run_n   = np.cumsum(present, axis=0)
+                run_c  += np.repeat(np.where(has_old, self.cum[owner, last], 0.0) - run_c[starts] + filled[starts], lengths, axis=0)
+                run_n  += np.repeat(np.where(has_old, self.n[owner, last], 0) - run_n[starts] + present[starts], lengths, axis=0)
+
+                # Only the last ``_size`` readings of a station can still be in its ring
+                keep = np.flatnonzero(rank >= np.repeat(lengths - self._size, lengths))
+                rows = idx[keep]
+                slot = (self.head[rows] + rank[keep]) % self._size
+                self.times[rows, slot] = times[keep]
+                self.cum[rows, slot]   = run_c[keep]
+                self.n[rows, slot]     = run_n[keep]
+
+                for m in range(len(METRICS)):
+                    has = present[:, m]
+                    # Readings are time-sorted per station, so the last write per station wins
+                    rows = idx[has]
+                    if len(rows):
+                        tail = np.flatnonzero(np.append(rows[1:] != rows[:-1], True))
+                        self.latest[rows[tail], m] = values[has, m][tail]
+                self.head[owner] += lengths
+
+            self.accepted += len(idx)
+            self.late     += late
+            self.unknown  += unknown
+        return {
+            "accepted": int(len(idx)),
+            "late":     late,
+            "unknown":  unknown,
+            "stations": np.unique(idx).tolist(),
+        }
+
+    # ── Aggregates ───────────────────────────────────────────────────────────
+    def _first_after(self, since: np.ndarray) -> np.ndarray:
+        """Per station, the sequence number of the first stored reading at or after ``since``."""
+        head = self.head[: len(self)]
+        rows = np.arange(len(head))
+        lo   = np.maximum(head - self.capacity, 0)
+        hi   = head.copy()
+        while True:
+            open_ = lo < hi
+            if not open_.any():
+                return lo
+            mid   = (lo + hi) // 2
+            older = open_ & (self.times[rows, mid % self._size] < since)
+            lo    = np.where(older, mid + 1, lo)
+            hi    = np.where(open_ & ~older, mid, hi)
+
+    def aggregates(self, now: float | None = None) -> dict[str, np.ndarray]:
+        """
+        Rolling aggregates of every station, as arrays over stations:
+        ``rainfall_<w>`` (total mm), ``river_level_<w>`` / ``temperature_<w>``
+        (means) and ``readings_<w>`` for each window ``w``, plus the latest
+        ``river_level`` and ``temperature``. NaN where a station has no data.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            S    = len(self)
+            rows = np.arange(S)
+            head = self.head[:S]
+            last = (head - 1) % self._size
+            top_c = np.where((head > 0)[:, None], self.cum[rows, last], 0.0)
+            top_n = np.where((head > 0)[:, None], self.n[rows, last], 0)
+            out = {
+                "river_level": self.latest[:S, _RIVER].copy(),
+                "temperature": self.latest[:S, _TEMP].copy(),
+            }
+            for name, seconds in WINDOWS.items():
+                first  = self._first_after(now - seconds)
+                before = (first - 1) % self._size
+                has    = (first > 0)[:, None]
+                total  = top_c - np.where(has, self.cum[rows, before], 0.0)
+                count  = top_n - np.where(has, self.n[rows, before], 0)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    mean = total / count
+                out[f"rainfall_{name}"]    = np.where(count[:, _RAIN] > 0, total[:, _RAIN], np.nan)
+                out[f"river_level_{name}"] = mean[:, _RIVER]
+                out[f"temperature_{name}"] = mean[:, _TEMP]
+                out[f"readings_{name}"]    = head - first
+            return out
+
+    def _conditions(self, agg: dict) -> np.ndarray:
+        """Per-station model inputs (rainfall 24 h, river level, temperature anomaly)."""
+        baseline = np.where(np.isnan(self.normal[: len(self)]), agg["temperature_72h"], self.normal[: len(self)])
+        return np.stack([agg["rainfall_24h"], agg["river_level"], agg["temperature_24h"] - baseline], axis=1)
+
+    def features(self, lat, lon, now: float | None = None, k: int = 3, max_km: float = 30.0) -> dict:
+        """
+        Model inputs at points ``lat`` / ``lon`` from the nearest stations.
+        Returns arrays ``rainfall``, ``river_level``, ``temperature_elevated``
+        and ``stations`` (how many stations contributed, 0 = no coverage,
+        inputs left at 0 / False).
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        agg  = self.aggregates(now)
+        cond = self._conditions(agg)                                  # (S, 3)
+        out  = np.zeros((len(lat), 3))
+        used = np.zeros(len(lat), dtype=np.int64)
+        if len(self) and len(lat):
+            dist = haversine_np(lat[:, None], lon[:, None], self.lat[None, : len(self)], self.lon[None, : len(self)])
+            k    = min(k, len(self))
+            near = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < len(self) else np.broadcast_to(np.arange(k), dist.shape)
+            d    = np.take_along_axis(dist, near, axis=1)
+            w    = np.where(d <= max_km, 1.0 / np.maximum(d, 0.1) ** 2, 0.0)   # (P, k)
+            vals = cond[near]                                         # (P, k, 3)
+            ok   = ~np.isnan(vals) & (w[:, :, None] > 0)
+            wm   = np.where(ok, w[:, :, None], 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out = (np.where(ok, vals, 0.0) * wm).sum(axis=1) / wm.sum(axis=1)
+            out  = np.nan_to_num(out, nan=0.0)
+            used = ok.any(axis=2).sum(axis=1)
+        return {
+            "rainfall":             out[:, 0],
+            "river_level":          out[:, 1],
+            "temperature_elevated": out[:, 2] > TEMP_ANOMALY_C,
+            "stations":             used,
+        }
+
+    def district_rows(self, district: str) -> list[int]:
+        key = district.lower()
+        return [s for s, st in enumerate(self.stations) if st["district"].lower() == key]
+
+    def district_conditions(self, rows: list[int], now: float | None = None) -> dict:
+        """Mean rainfall / river level over stations ``rows`` and whether any of them runs warm."""
+        cond = self._conditions(self.aggregates(now))[rows]
+
+        def mean(col):
+            col = col[np.isfinite(col)]
+            return float(col.mean()) if len(col) else 0.0
+
+        return {
+            "rainfall":             mean(cond[:, 0]),
+            "river_level":          mean(cond[:, 1]),
+            "temperature_elevated": bool((np.nan_to_num(cond[:, 2]) > TEMP_ANOMALY_C).any()),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "stations": len(self),
+            "accepted": self.accepted,
+            "late":     self.late,
+            "unknown":  self.unknown,
+        }
@@ -0,0 +1,251 @@
+"""
+Shortest-path tree from every road node to its nearest reachable safe zone.
+
+One multi-source Dijkstra runs backwards over the road graph from the nodes
+that all safe zones snap to. For every node it records the zone reached, the
+travel time and the next node / edge towards that zone, so an evacuation
+route is a walk along ``next_node`` pointers: O(path length) per request.
+
+The tree is repaired incrementally rather than rebuilt:
+
+  - blocking a road segment or closing a full shelter invalidates only the
+    nodes whose tree path used it; they are re-seeded from their intact
+    neighbours and a Dijkstra limited to that region settles them again
+  - reopening a segment or shelter pushes the improved nodes and lets a
+    normal decrease-only Dijkstra propagate the gain
+
+Arrays are cached on disk next to the road graph, keyed on the zone list.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from road_network import MAX_SNAP_KM, RoadNetwork
+
+# Off-road legs between a zone and its snapped node, walking pace (m/s)
+WALK_SPEED_MS = 5.0 / 3.6
+
+_ARRAYS = ("zone", "time_s", "length_m", "next_node", "next_edge")
+
+
+class ShelterTree:
+    def __init__(self, network: RoadNetwork, zones: list[dict]):
+        self.network = network
+        self.zones   = zones
+        n = network.n_nodes
+
+        # Reverse CSR: incoming edges of every node (edge ids into the forward arrays)
+        targets = np.asarray(network.indices, dtype=np.int64)
+        order   = np.argsort(targets, kind="stable")
+        self._in_indptr = np.concatenate([[0], np.cumsum(np.bincount(targets, minlength=n))])
+        self._in_edge   = order
+        self._edge_src  = np.repeat(np.arange(n), np.diff(np.asarray(network.indptr)))
+
+        self.weight  = np.asarray(network.time_s, dtype=np.float64).copy()
+        self.blocked: set[int] = set()
+        self.closed:  set[int] = set()
+
+        # Zone roots: snapped node and the walking time from that node to the zone
+        self.root_node = np.full(len(zones), -1, dtype=np.int64)
+        self.root_time = np.zeros(len(zones))
+        self.root_len  = np.zeros(len(zones))
+        for i, z in enumerate(zones):
+            snapped = network.snap(z["lat"], z["lng"], MAX_SNAP_KM)
+            if snapped is not None:
+                self.root_node[i] = snapped[0]
+                self.root_len[i]  = snapped[1] * 1000
+                self.root_time[i] = self.root_len[i] / WALK_SPEED_MS
+
+        self.zone      = np.full(n, -1, dtype=np.int32)
+        self.time_s    = np.full(n, np.inf)
+        self.length_m  = np.full(n, np.inf)
+        self.next_node = np.full(n, -1, dtype=np.int64)
+        self.next_edge = np.full(n, -1, dtype=np.int64)
+
+    # ── Build / persistence ──────────────────────────────────────────────────
+
+    @staticmethod
+    def cache_key(network: RoadNetwork, zones: list[dict]) -> str:
+        payload = json.dumps([network.meta, [(z["lat"], z["lng"]) for z in zones]], sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    @classmethod
+    def build(cls, network: RoadNetwork, zones: list[dict]) -> "ShelterTree":
+        tree = cls(network, zones)
+        tree._run(tree._root_seeds())
+        return tree
+
+    @classmethod
+    def load_or_build(cls, network: RoadNetwork, zones: list[dict], cache_dir: str) -> "ShelterTree":
+        path = os.path.join(cache_dir, f"shelter_tree_{cls.cache_key(network, zones)}.npz")
+        if os.path.exists(path):
+            tree = cls(network, zones)
+            with np.load(path) as data:
+                for name in _ARRAYS:
+                    setattr(tree, name, data[name].copy())
+            return tree
+        tree = cls.build(network, zones)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, **{name: getattr(tree, name) for name in _ARRAYS})
+        return tree
+
+    # ── Dijkstra core ────────────────────────────────────────────────────────
+
+    def _root_seeds(self, zones=None) -> list[tuple]:
+        zones = range(len(self.zones)) if zones is None else zones
+        return [
+            (self.root_time[i], int(self.root_node[i]), i, -1, -1, self.root_len[i])
+            for i in zones
+            if self.root_node[i] >= 0 and i not in self.closed
+        ]
+
+    def _run(self, seeds: list[tuple]):
+        """
+        Decrease-only Dijkstra over reversed edges. Each seed is
+        ``(time, node, zone, next_node, next_edge, length)`` and is applied
+        only if it improves the node's current time.
+        """
+        time_s, length_m, zone = self.time_s, self.length_m, self.zone
+        next_node, next_edge, weight = self.next_node, self.next_edge, self.weight
+        in_indptr, in_edge, edge_src = self._in_indptr, self._in_edge, self._edge_src
+        edge_len = self.network.length_m
+
+        heap = []
+        for t, v, z, nxt, e, m in seeds:
+            if t < time_s[v]:
+                time_s[v], zone[v], next_node[v], next_edge[v], length_m[v] = t, z, nxt, e, m
+                heap.append((t, v))
+        heapq.heapify(heap)
+
+        while heap:
+            t, y = heapq.heappop(heap)
+            if t > time_s[y]:
+                continue
+            z, m = zone[y], length_m[y]
+            for e in in_edge[in_indptr[y]:in_indptr[y + 1]].tolist():
+                t_x = t + weight[e]
+                x = edge_src[e]
+                if t_x < time_s[x]:
+                    time_s[x], zone[x], next_node[x], next_edge[x] = t_x, z, y, e
+                    length_m[x] = m + edge_len[e]
+                    heapq.heappush(heap, (t_x, x))
+
+    def _invalidate(self, affected: np.ndarray):
+        """Reset ``affected`` nodes and settle them again from intact neighbours."""
+        if affected.size == 0:
+            return
+        self.time_s[affected]    = np.inf
+        self.length_m[affected]  = np.inf
+        self.zone[affected]      = -1
+        self.next_node[affected] = -1
+        self.next_edge[affected] = -1
+
+        indptr, indices, edge_len = self.network.indptr, self.network.indices, self.network.length_m
+        seeds = []
+        for x in affected.tolist():
+            for e in range(indptr[x], indptr[x + 1]):
+                y = indices[e]
+                t = self.time_s[y] + self.weight[e]
+                if t < math.inf:
+                    seeds.append((t, x, self.zone[y], y, e, self.length_m[y] + edge_len[e]))
+        affected_set = set(affected.tolist())
+        seeds += [s for s in self._root_seeds() if s[1] in affected_set]
+        self._run(seeds)
+
+    def _subtree(self, roots: np.ndarray) -> np.ndarray:
+        """All nodes whose next_node chain passes through any of ``roots``."""
+        children_order = np.argsort(self.next_node, kind="stable")
+        parents        = self.next_node[children_order]
+        found = [np.asarray(roots, dtype=np.int64)]
+        frontier = found[0]
+        while frontier.size:
+            lo = np.searchsorted(parents, frontier, side="left")
+            hi = np.searchsorted(parents, frontier, side="right")
+            frontier = np.concatenate([children_order[a:b] for a, b in zip(lo, hi)]) if len(lo) else frontier[:0]
+            found.append(frontier)
+        return np.unique(np.concatenate(found))
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+
+    def block_edges(self, edges):
+        """Mark road edges impassable and repair the affected part of the tree."""
+        edges = [int(e) for e in edges if int(e) not in self.blocked]
+        if not edges:
+            return
+        self.blocked.update(edges)
+        self.weight[edges] = np.inf
+        tree_edges = [e for e in edges if self.next_edge[self._edge_src[e]] == e]
+        self._invalidate(self._subtree(self._edge_src[tree_edges]))
+
+    def unblock_edges(self, edges):
+        """Reopen road edges; nodes that get faster routes are updated."""
+        edges = [int(e) for e in edges if int(e) in self.blocked]
+        if not edges:
+            return
+        self.blocked.difference_update(edges)
+        base = np.asarray(self.network.time_s, dtype=np.float64)
+        self.weight[edges] = base[edges]
+        seeds = []
+        for e in edges:
+            x, y = self._edge_src[e], self.network.indices[e]
+            if self.time_s[y] < math.inf:
+                seeds.append((self.time_s[y] + self.weight[e], x, self.zone[y], y, e,
+                              self.length_m[y] + self.network.length_m[e]))
+        self._run(seeds)
+
+    def set_zone_open(self, zone_index: int, is_open: bool):
+        """Close a shelter that reached capacity (or reopen it)."""
+        if is_open and zone_index in self.closed:
+            self.closed.discard(zone_index)
+            self._run(self._root_seeds([zone_index]))
+        elif not is_open and zone_index not in self.closed:
+            self.closed.add(zone_index)
+            self._invalidate(np.flatnonzero(self.zone == zone_index))
+
+    def edges_between(self, nodes: list[int]) -> list[int]:
+        """Edge ids (both directions) along consecutive ``nodes``."""
+        indptr, indices = self.network.indptr, self.network.indices
+        out = []
+        for a, b in zip(nodes, nodes[1:]):
+            for u, v in ((a, b), (b, a)):
+                for e in range(indptr[u], indptr[u + 1]):
+                    if indices[e] == v:
+                        out.append(e)
+        return out
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def route(self, lat: float, lng: float) -> dict | None:
+        """
+        Route from a point to its nearest reachable open zone as
+        ``{zone, path, distance_km, time_mins}``, or None when the point is
+        off the network or no zone can be reached.
+        """
+        snapped = self.network.snap(lat, lng)
+        if snapped is None:
+            return None
+        node, off_km = snapped
+        z = int(self.zone[node])
+        if z < 0:
+            return None
+
+        nodes = [node]
+        while self.next_node[nodes[-1]] >= 0:
+            nodes.append(int(self.next_node[nodes[-1]]))
+        nodes = np.asarray(nodes)
+
+        zone = self.zones[z]
+        path = [[round(lat, 6), round(lng, 6)]]
+        path += np.round(np.column_stack([self.network.node_lat[nodes], self.network.node_lon[nodes]]), 6).tolist()
+        path.append([round(zone["lat"], 6), round(zone["lng"], 6)])
+        return {
+            "zone":        zone,
+            "path":        path,
+            "distance_km": (self.length_m[node] / 1000) + off_km,
+            "time_mins":   max(1, int((self.time_s[node] + off_km * 1000 / WALK_SPEED_MS) / 60)),
+        }
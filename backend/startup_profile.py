@@ -0,0 +1,108 @@
+"""
+Startup-time accounting for fast_server.
+
+fast_server records how long each import group and each artifact load takes
+in a ``StartupProfile``; deferred loads (GBDMS_LAZY_STARTUP=1) are recorded
+when they finally run. The report is served by ``GET /startup``.
+
+Run this file to get the full breakdown of a cold import in a fresh
+interpreter: per-package import times from ``python -X importtime`` plus the
+server's own stages.
+
+    python startup_profile.py [--lazy] [--top 15]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class StartupProfile:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.ready_s: float | None = None
+        self.stages: list[dict] = []
+
+    @contextmanager
+    def stage(self, kind: str, name: str):
+        """Time one ``import`` or ``artifact`` step."""
+        start = time.perf_counter()
+        deferred = self.ready_s is not None
+        try:
+            yield
+        finally:
+            self.stages.append({
+                "kind":     kind,
+                "name":     name,
+                "ms":       round((time.perf_counter() - start) * 1000, 2),
+                "deferred": deferred,
+            })
+
+    def mark_ready(self):
+        """Module import finished; later stages count as deferred."""
+        self.ready_s = time.perf_counter() - self.t0
+
+    def report(self) -> dict:
+        return {
+            "import_ms": None if self.ready_s is None else round(self.ready_s * 1000, 2),
+            "stages":    self.stages,
+        }
+
+
+def importtime_breakdown(stderr: str, top: int = 15) -> list[tuple[str, float]]:
+    """Self time per top-level package (ms) from ``-X importtime`` output, largest first."""
+    totals: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        self_us, name = parts[0].strip(), parts[2].strip()
+        if not self_us.isdigit():
+            continue                                    # column header
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(self_us) / 1000
+    return sorted(totals.items(), key=lambda kv: -kv[1])[:top]
+
+
+def profile_cold_start(lazy: bool = False) -> dict:
+    """Import fast_server in a fresh interpreter; return its report and import breakdown."""
+    env = {**os.environ, "GBDMS_LAZY_STARTUP": "1" if lazy else "0"}
+    code = (
+        "import time; t = time.perf_counter(); import fast_server; "
+        "import json, sys; r = fast_server.startup.report(); "
+        "r['wall_ms'] = round((time.perf_counter() - t) * 1000, 2); "
+        "sys.stdout.write('\\n@@' + json.dumps(r))"
+    )
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_HERE, env=env, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(proc.stdout.rsplit("@@", 1)[1])
+    report["process_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    report["imports"] = importtime_breakdown(proc.stderr, top=10_000)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cold-start breakdown of fast_server.")
+    parser.add_argument("--lazy", action="store_true", help="profile with GBDMS_LAZY_STARTUP=1")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    report = profile_cold_start(args.lazy)
+    print(f"Cold start ({'lazy' if args.lazy else 'eager'}): "
+          f"import fast_server {report['wall_ms']:.0f} ms, process {report['process_ms']:.0f} ms")
+    print("\nImports by package (self time, -X importtime):")
+    for package, ms in report["imports"][:args.top]:
+        print(f"  {package:<28} {ms:8.1f} ms")
+    print("\nServer stages:")
+    for s in report["stages"]:
+        print(f"  {s['kind']:<9} {s['name']:<28} {s['ms']:8.1f} ms")
@@ -0,0 +1,145 @@
+"""
+Scenario sweeps: model probabilities over a cartesian grid of inputs.
+
+A sweep fixes a location and varies a few inputs (month, rainfall, river
+level) over a grid. Every feature column of the model then depends on at most
+one axis, so instead of scoring the n_0 x n_1 x ... rows one by one:
+
+1. the forest is specialized on the columns no axis touches
+   (CompiledForest.specialize), which removes most splits;
+2. each remaining tree only distinguishes a handful of values per axis (the
+   ones on different sides of its thresholds), so it is evaluated on the
+   product of those representatives and broadcast back to the full grid;
+3. trees are summed per subset of axes they use, so a tree that ignores the
+   month is expanded over rainfall x river level only.
+
+The result matches CompiledForest.predict_proba on the full grid exactly.
+"""
+
+import itertools
+
+import numpy as np
+
+from inference import CompiledForest
+
+LEVELS = ["Low", "Moderate", "Critical"]
+_LEVEL_BOUNDS = (0.5, 0.8)   # same bands as fast_server.get_risk_level
+
+
+def axis_columns(base: np.ndarray, axis_rows: list[np.ndarray]) -> list[np.ndarray] | None:
+    """Feature columns each axis changes, or None if two axes share a column."""
+    columns = [np.flatnonzero((rows != base).any(axis=0)) for rows in axis_rows]
+    used = np.concatenate(columns) if columns else np.empty(0, dtype=np.intp)
+    return columns if len(np.unique(used)) == len(used) else None
+
+
+def grid_proba(forest: CompiledForest, base: np.ndarray, axis_rows: list[np.ndarray]) -> np.ndarray | None:
+    """
+    Class probabilities over the grid, shape ``(n_classes, n_0, ..., n_k)``.
+
+    ``base`` is one feature row; ``axis_rows[a]`` holds the feature rows for
+    every value of axis ``a`` with all other axes at their base value. Returns
+    None when some feature column depends on two axes; the caller then has to
+    build and score the full grid.
+    """
+    shape     = tuple(len(rows) for rows in axis_rows)
+    n_classes = forest.value.shape[0]
+    columns   = axis_columns(base, axis_rows)
+    if columns is None:
+        return None
+
+    free  = set(np.concatenate(columns).tolist()) if columns else set()
+    fixed = {j: float(base[j]) for j in range(len(base)) if j not in free}
+    sub, bias = forest.specialize(fixed)
+
+    out = np.broadcast_to(bias.reshape((n_classes,) + (1,) * len(shape)), (n_classes, *shape)).copy()
+    if sub is not None:
+        col_axis = np.full(len(base), -1)
+        for a, cols in enumerate(columns):
+            col_axis[cols] = a
+        partial: dict[tuple, np.ndarray] = {}
+        ends = np.append(sub.roots[1:], sub.n_nodes)
+        for root, end in zip(sub.roots, ends):
+            _add_tree(sub, root, end, base, axis_rows, col_axis, partial)
+        for acc in partial.values():
+            out += acc
+    out /= forest.n_trees
+    return out
+
+
+def _add_tree(forest, root, end, base, axis_rows, col_axis, partial):
+    """Add one tree's class probabilities over the grid to ``partial``."""
+    nodes    = np.arange(root, end)
+    internal = nodes[forest.left[nodes] != nodes]
+    reps, inverse, used = [], [], []
+    for a, rows in enumerate(axis_rows):
+        mine = internal[col_axis[forest.feature[internal]] == a]
+        if mine.size == 0:
+            reps.append(np.zeros(1, dtype=np.intp))
+            inverse.append(None)
+            continue
+        # Axis values on the same side of every split of this tree behave alike
+        sides = rows[:, forest.feature[mine]] > forest.threshold[mine]
+        _, first, inv = np.unique(sides, axis=0, return_index=True, return_inverse=True)
+        reps.append(first)
+        inverse.append(inv.ravel())
+        used.append(a)
+
+    # Evaluate the tree on the product of representative axis values
+    combos = list(itertools.product(*reps))
+    X = np.repeat(base[None, :], len(combos), axis=0)
+    for a in used:
+        cols = np.flatnonzero(col_axis == a)
+        X[:, cols] = axis_rows[a][np.asarray([c[a] for c in combos])][:, cols]
+    idx = np.full(len(combos), root, dtype=np.intp)
+    for _ in range(forest.max_depth):
+        idx = forest.left[idx] + (X[np.arange(len(combos)), forest.feature[idx]] > forest.threshold[idx])
+    small = forest.value[:, idx].reshape((-1,) + tuple(len(r) for r in reps))
+
+    # Expand the representatives back to the full axes this tree uses
+    for a in used:
+        small = np.take(small, inverse[a], axis=a + 1)
+    key = tuple(used)
+    if key in partial:
+        partial[key] += small
+    else:
+        partial[key] = small
+
+
+def risk_levels(probs: np.ndarray) -> np.ndarray:
+    """Index into LEVELS of every grid cell from its highest class probability."""
+    conf = probs.max(axis=0)
+    return ((conf > _LEVEL_BOUNDS[0]).astype(np.int8) + (conf > _LEVEL_BOUNDS[1])).astype(np.int8)
+
+
+def crossings(levels: np.ndarray, axes: dict[str, np.ndarray], limit: int = 1000) -> tuple[list[dict], int]:
+    """
+    Neighbouring grid cells whose risk level differs, along each axis.
+    Returns up to ``limit`` entries like
+
+        {"axis": "rainfall", "between": [40.0, 45.0], "from": "Low", "to": "Moderate",
+         "month": 7, "river_level": 2.5}
+
+    and the total number of crossings found.
+    """
+    names  = list(axes)
+    values = [np.asarray(v) for v in axes.values()]
+    found, total = [], 0
+    for a, name in enumerate(names):
+        lo = np.take(levels, np.arange(levels.shape[a] - 1), axis=a)
+        hi = np.take(levels, np.arange(1, levels.shape[a]), axis=a)
+        cells = np.argwhere(lo != hi)
+        total += len(cells)
+        for cell in cells[: max(0, limit - len(found))]:
+            i = cell[a]
+            entry = {
+                "axis":    name,
+                "between": [values[a][i].item(), values[a][i + 1].item()],
+                "from":    LEVELS[lo[tuple(cell)]],
+                "to":      LEVELS[hi[tuple(cell)]],
+            }
+            for b, other in enumerate(names):
+                if b != a:
+                    entry[other] = values[b][cell[b]].item()
+            found.append(entry)
+    return found, total
@@ -0,0 +1,102 @@
+"""
+Synthetic model artifacts for tests and benchmarks.
+
+Builds an artifacts dict with the same keys and feature schema that
+fast_server.py expects from Model/output/model.joblib, trained on
+rule-labelled random samples drawn over the training feature ranges.
+Nothing here is used on the production inference path.
+"""
+
+from datetime import datetime
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+FEATURES = [
+    "latitude", "longitude", "district_enc", "month", "rainfall_mm",
+    "river_discharge", "temperature_elevated", "terrain_code",
+    "seismic_trigger", "glacial_trigger", "rainfall_trigger",
+]
+CLASSES = ["Earthquake", "Flood", "GLOF", "Landslide"]
+DISTRICTS = [
+    "Astore", "Diamer", "Ghanche", "Ghizer", "Gilgit",
+    "Hunza", "Kharmang", "Nagar", "Shigar", "Skardu",
+]
+TERRAIN_MAP = {"Valley": 1, "Hilly": 2, "Mountainous": 3}
+RIVER_DISCHARGE_SCALE = 167.0
+
+# Gilgit-Baltistan bounding box used to sample coordinates
+LAT_RANGE = (34.6, 37.1)
+LON_RANGE = (72.5, 77.8)
+
+
+def sample_features(n: int, seed: int = 0) -> np.ndarray:
+    """Draw n random rows in model feature space (column order = FEATURES)."""
+    rng = np.random.default_rng(seed)
+    lat      = rng.uniform(*LAT_RANGE, n)
+    lon      = rng.uniform(*LON_RANGE, n)
+    district = rng.integers(0, len(DISTRICTS), n)
+    month    = rng.integers(1, 13, n)
+    rainfall = rng.gamma(1.2, 80.0, n)
+    river    = rng.uniform(0.0, 30.0, n) * RIVER_DISCHARGE_SCALE
+    temp     = (rng.random(n) < 0.2).astype(np.int64)
+    terrain  = rng.integers(0, 4, n)
+    seismic  = (rng.random(n) < 0.25).astype(np.int64)
+    glacial  = temp.copy()
+    rain_trg = (rainfall > 20).astype(np.int64)
+    return np.column_stack([
+        lat, lon, district, month, rainfall, river,
+        temp, terrain, seismic, glacial, rain_trg,
+    ]).astype(np.float64)
+
+
+def label_features(X: np.ndarray, seed: int = 0, noise: float = 0.05) -> np.ndarray:
+    """Rule-based class labels (indices into CLASSES) with a little label noise."""
+    rng = np.random.default_rng(seed + 1)
+    col = {name: X[:, i] for i, name in enumerate(FEATURES)}
+    y = np.full(len(X), CLASSES.index("Flood"))
+    landslide = (col["terrain_code"] >= 2) & (col["rainfall_mm"] > 120)
+    y[landslide] = CLASSES.index("Landslide")
+    y[col["glacial_trigger"] == 1] = CLASSES.index("GLOF")
+    y[col["seismic_trigger"] == 1] = CLASSES.index("Earthquake")
+    flip = rng.random(len(X)) < noise
+    y[flip] = rng.integers(0, len(CLASSES), int(flip.sum()))
+    return y
+
+
+def make_synthetic_artifacts(
+    n_samples: int = 4000,
+    n_estimators: int = 200,
+    max_depth: int | None = 8,
+    seed: int = 0,
+) -> dict:
+    """Train a small RandomForest on synthetic data and return a model.joblib-shaped dict."""
+    X = sample_features(n_samples, seed)
+    y_idx = label_features(X, seed)
+    y = np.asarray(CLASSES)[y_idx]
+
+    scaler   = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+
+    n_train = int(n_samples * 0.8)
+    clf = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, random_state=seed, n_jobs=1,
+    )
+    clf.fit(X_scaled[:n_train], y[:n_train])
+    test_acc = float(clf.score(X_scaled[n_train:], y[n_train:]))
+
+    district_le = LabelEncoder().fit(DISTRICTS)
+
+    return {
+        "model":                 clf,
+        "scaler":                scaler,
+        "features":              list(FEATURES),
+        "classes":               list(clf.classes_),
+        "district_le":           district_le,
+        "district_classes":      list(DISTRICTS),
+        "river_discharge_scale": RIVER_DISCHARGE_SCALE,
+        "terrain_map":           dict(TERRAIN_MAP),
+        "test_accuracy":         round(test_acc, 4),
+        "trained_at":            datetime(2026, 1, 1, seed % 24).isoformat(),
+    }
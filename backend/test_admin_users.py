@@ -0,0 +1,97 @@
+import pytest
+
+from admin_users import SCAN_PAGE, UserDirectory
+from memory_firebase import MemoryAuth, MemoryDatabase
+
+
+@pytest.fixture
+def firebase(server, monkeypatch):
+    """Admin endpoints backed by the in-memory Firebase stand-in."""
+    auth, db = MemoryAuth(), MemoryDatabase()
+    monkeypatch.setattr(server, "_firebase_attempted", True)
+    monkeypatch.setattr(server, "FIREBASE_AVAILABLE", True)
+    monkeypatch.setattr(server, "user_directory", UserDirectory(auth, db, ttl_seconds=60))
+    return auth, db
+
+
+def seed(auth, n):
+    for i in range(n):
+        u = auth.create_user(email=f"user{i}@gb.pk", display_name=f"User {i}")
+        if i % 7 == 0:
+            auth.set_custom_user_claims(u.uid, {"role": "admin"})
+
+
+def collect(client, **params):
+    uids, cursor, pages = [], None, 0
+    while True:
+        resp = client.get("/admin/users", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        body = resp.json()
+        uids += [u["uid"] for u in body["users"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return uids, pages
+
+
+def test_pagination_covers_every_user_once(client, firebase):
+    auth, _ = firebase
+    seed(auth, 2500)
+    uids, pages = collect(client, limit=1000)
+    assert sorted(uids) == sorted(auth.users) and pages == 3
+
+    calls = auth.calls["list_users"]
+    assert collect(client, limit=1000)[0] == uids
+    assert auth.calls["list_users"] == calls       # served from the page cache
+
+    # Filtered listings cross Firebase page boundaries and match a full scan
+    admins, _ = collect(client, role="admin", limit=50)
+    assert admins == sorted(u.uid for u in auth.users.values() if (u.custom_claims or {}).get("role") == "admin")
+    hits, _ = collect(client, search="USER 12", limit=7)
+    assert hits == sorted(u.uid for u in auth.users.values() if "user 12" in u.display_name.lower())
+    assert len(admins) > SCAN_PAGE // 7 and len(hits) == 111
+
+
+def test_writes_invalidate_cache(client, firebase):
+    auth, db = firebase
+    seed(auth, 5)
+    assert len(client.get("/admin/users").json()["users"]) == 5
+
+    resp = client.post("/admin/users", json={"email": "new@gb.pk", "password": "secret1", "display_name": "New"})
+    uid = resp.json()["uid"]
+    users = {u["uid"]: u for u in client.get("/admin/users").json()["users"]}
+    assert uid in users and users[uid]["role"] == "user" and db.data["users"][uid]["name"] == "New"
+
+    client.put(f"/admin/users/{uid}", json={"role": "admin", "disabled": True})
+    user = client.get("/admin/users", params={"role": "admin"}).json()["users"][-1]
+    assert user["uid"] == uid and user["disabled"] and db.data["users"][uid]["role"] == "admin"
+
+    client.delete(f"/admin/users/{uid}")
+    assert uid not in {u["uid"] for u in client.get("/admin/users").json()["users"]}
+    assert uid not in db.data["users"]
+    assert client.get("/admin/users", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_bulk_operations_batch_round_trips(client, firebase):
+    auth, db = firebase
+    auth.create_user(email="taken@gb.pk", display_name="Taken")
+    rows = [{"email": f"bulk{i}@gb.pk", "display_name": f"Bulk {i}", "role": "volunteer"} for i in range(2400)]
+    rows[1500]["email"] = "taken@gb.pk"
+
+    result = client.post("/admin/users/import", json={"users": rows}).json()
+    assert result["imported"] == 2399 and [f["index"] for f in result["failed"]] == [1500]
+    assert auth.calls["import_users"] == 3 and db.calls["update"] == 5
+    assert len(db.data["users"]) == 2399
+    assert client.get("/admin/users", params={"role": "volunteer", "limit": 1000}).json()["next_cursor"]
+
+    uids = result["uids"]
+    updates = [{"uid": uid, "role": "admin"} for uid in uids[:600]] + [{"uid": "missing", "role": "admin"}]
+    result = client.post("/admin/users/bulk-update", json={"users": updates}).json()
+    assert result["updated"] == 600 and result["failed"][0]["uid"] == "missing"
+    assert db.calls["update"] == 5 + 2
+    assert all(db.data["users"][uid]["role"] == "admin" for uid in uids[:600])
+
+    result = client.post("/admin/users/bulk-delete", json={"uids": uids}).json()
+    assert result == {"deleted": 2399, "failed": []}
+    assert auth.calls["delete_users"] == 3 and db.data["users"] == {}
+    assert [u["email"] for u in client.get("/admin/users").json()["users"]] == ["taken@gb.pk"]
@@ -0,0 +1,77 @@
+import numpy as np
+
+from compaction import _compile, compact, forest_trees, merge_leaves, truncate
+from inference import load_model_arrays, save_model_arrays
+from model_registry import ModelRegistry
+from synthetic_model import CLASSES, label_features, sample_features
+
+
+def test_tree_surgery(artifacts):
+    X = sample_features(2000, seed=31)
+    for tree in forest_trees(artifacts["model"])[:10]:
+        merged = merge_leaves(tree)
+        assert len(merged["left"]) <= len(tree["left"])
+        # A single tree still votes for the same class everywhere
+        before = _compile(artifacts, [tree]).predict_proba(X).argmax(axis=1)
+        after  = _compile(artifacts, [merged]).predict_proba(X).argmax(axis=1)
+        np.testing.assert_array_equal(before, after)
+
+        cut = _compile(artifacts, [truncate(tree, 3)])
+        assert cut.max_depth <= 3
+
+
+def test_compact_within_budget(artifacts, tmp_path, client, server, monkeypatch):
+    X_test = sample_features(1500, seed=32)
+    y_test = np.asarray(CLASSES)[label_features(X_test, seed=32)]
+    report = compact(artifacts, max_drop=0.02, test=(X_test, y_test), n_samples=4000,
+                     tree_counts=[5, 15], depths=(4, 6), distill_grid=((5, 6),))
+
+    base = report["baseline"]
+    rows = report["candidates"]
+    assert any(r["pareto"] for r in rows)
+    # With a holdout the front trades size and latency against accuracy
+    for r in rows:
+        better = [o for o in rows if o["bytes"] <= r["bytes"] and o["latency_batch_ms"] <= r["latency_batch_ms"]
+                  and o["accuracy"] >= r["accuracy"] and o is not r
+                  and (o["bytes"], o["latency_batch_ms"], o["accuracy"]) != (r["bytes"], r["latency_batch_ms"], r["accuracy"])]
+        assert r["pareto"] == (not better)
+    chosen = next(r for r in report["candidates"] if r["name"] == report["chosen"])
+    assert chosen["n_nodes"] < base["n_nodes"] / 4
+    assert base["accuracy"] - chosen["accuracy"] <= 0.02
+    assert all(r["bytes"] >= chosen["bytes"] for r in report["candidates"] if r["within_budget"])
+
+    # Written like any array export and served unchanged
+    loaded = load_model_arrays(save_model_arrays(report["artifacts"], str(tmp_path / "compact")))
+    assert loaded["test_accuracy"] == chosen["accuracy"]
+    X = sample_features(1000, seed=33)
+    np.testing.assert_allclose(loaded["forest"].predict_proba(X),
+                               report["artifacts"]["forest"].predict_proba(X), rtol=0, atol=1e-12)
+    monkeypatch.setattr(server, "model_artifacts", loaded)
+    body = client.post("/predict", json={"latitude": 35.92, "longitude": 74.31, "rainfall": 80.0}).json()
+    assert body["prediction"] in CLASSES
+
+    strict = compact(artifacts, max_drop=0.0, n_samples=2000, tree_counts=[2], depths=(2,), distill_grid=())
+    assert all(r["agreement"] == 1.0 for r in strict["candidates"] if r["within_budget"])
+
+
+def test_compacted_model_has_its_own_version(artifacts, tmp_path):
+    from risk_tiles import model_version
+
+    report = compact(artifacts, max_drop=0.05, n_samples=2000, tree_counts=[2], depths=(4,), distill_grid=())
+    compacted = report["artifacts"]
+    assert compacted["trained_at"].startswith(artifacts["trained_at"] + "-compact-")
+    assert compacted["source_version"] == artifacts["trained_at"]
+    assert model_version(compacted) != model_version(artifacts)
+    # Without a holdout nothing was measured for accuracy; agreement is kept under its own key
+    chosen = next(r for r in report["candidates"] if r["name"] == report["chosen"])
+    assert compacted["test_accuracy"] is None and compacted["source_agreement"] == chosen["agreement"]
+
+    registry = ModelRegistry(str(tmp_path))
+    full = {k: v for k, v in artifacts.items() if k not in ("model", "scaler")}
+    full["forest"] = _compile(artifacts, forest_trees(artifacts["model"]))
+    full_version, compact_version = registry.publish(full), registry.publish(compacted)
+    assert full_version != compact_version and registry.versions() == sorted([full_version, compact_version])
+    assert registry.load(full_version)["forest"].n_trees == len(artifacts["model"].estimators_)
+    loaded = registry.load(compact_version)
+    assert loaded["source_version"] == artifacts["trained_at"] and loaded["compacted_at"]
+    assert loaded["test_accuracy"] is None and loaded["source_agreement"] == chosen["agreement"]
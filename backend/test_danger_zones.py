@@ -0,0 +1,131 @@
+import json
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from danger_zones import DangerZoneEngine, _NEIGHBOURS, synthetic_reports
+from memory_firebase import MemoryDatabase
+
+HOUR = 3600.0
+T0 = 1.8e9
+
+
+def _reports(points, t=T0, kind="Other", prefix="r"):
+    return [{"id": f"{prefix}{i}", "lat": lat, "lng": lon, "type": kind, "time": t}
+            for i, (lat, lon) in enumerate(points)]
+
+
+def _from_scratch(engine):
+    """Zones (as cell sets) recomputed from the current cell weights."""
+    limit = engine.min_weight * engine._scale(engine.clock)
+    left, zones = {k for k, c in engine.cells.items() if c.w >= limit}, set()
+    while left:
+        seed = left.pop()
+        part, stack = {seed}, [seed]
+        while stack:
+            r, c = stack.pop()
+            for dr, dc in _NEIGHBOURS:
+                n = (r + dr, c + dc)
+                if n in left:
+                    left.discard(n)
+                    part.add(n)
+                    stack.append(n)
+        zones.add(frozenset(part))
+    return zones
+
+
+def test_clusters_decay_and_split():
+    engine = DangerZoneEngine(cell_km=2, half_life_hours=24, min_weight=3)
+    row, col = round(35.9 / engine.dlat), round(74.3 / engine.dlon)
+    a, b0, b1, c = [((row + 0.5) * engine.dlat, (col + k + 0.5) * engine.dlon) for k in range(4)]
+
+    # Two dense spots three cells apart, then a bridge of reports joining them
+    engine.ingest(_reports([a] * 4 + [c] * 4, prefix="a"), now=T0)
+    assert len(engine.zones_at(T0)) == 2
+    engine.ingest(_reports([b0, b1] * 8, t=T0 + HOUR, prefix="b"), now=T0 + HOUR)
+    [zone] = engine.zones_at(T0 + HOUR)
+    assert (zone["cells"], zone["event_count"], zone["risk"], zone["type"]) == (4, 24, "Critical", "Other")
+    assert zone["bbox"][0] < a[0] < zone["bbox"][2] and len(zone["polygon"]) == 4
+
+    # Re-sent ids are ignored; reports without coordinates are rejected
+    assert engine.ingest(_reports([a], prefix="a") + [{"id": "x", "lat": None, "lng": 1}], now=T0 + HOUR) == \
+        {"accepted": 0, "duplicates": 1, "invalid": 1, "stale": 0}
+
+    # The older, lighter ends fall below min_weight first, leaving the bridge
+    [zone] = engine.zones_at(T0 + 12 * HOUR)
+    assert (zone["cells"], zone["event_count"]) == (2, 16)
+    # Fresh reports at one end bring it back
+    engine.ingest(_reports([a] * 4 + [b1] * 8, t=T0 + 13 * HOUR, prefix="c"), now=T0 + 13 * HOUR)
+    assert [z["cells"] for z in engine.zones_at(T0 + 13 * HOUR)] == [3]
+    # A day later the middle cell has faded but both sides have not: the zone splits
+    zones = engine.zones_at(T0 + 37 * HOUR)
+    assert sorted(z["cells"] for z in zones) == [1, 1]
+    assert {frozenset(z.cells) for z in engine.zones.values()} == _from_scratch(engine)
+
+    # Everything fades and is dropped; report ids remain for de-duplication
+    assert engine.zones_at(T0 + 24 * 30 * HOUR) == []
+    assert engine.stats()["cells"] == 0 and engine.stats()["report_ids"] == 36
+    assert engine.ingest(_reports([a] * 40, prefix="old"))["stale"] == 40
+
+
+def test_stream_matches_recompute_with_bounded_memory():
+    reports = synthetic_reports(40000, seed=4, hotspots=25, hours=24 * 90)
+    engine = DangerZoneEngine(half_life_hours=48, max_cells=3000, max_ids=20000)
+    tracemalloc.start()
+    for i in range(0, len(reports), 400):
+        batch = reports[i:i + 400]
+        engine.ingest(batch, now=batch[-1]["time"])
+        if i % 8000 == 0:
+            assert {frozenset(z.cells) for z in engine.zones.values()} == _from_scratch(engine)
+            for z in engine.zones.values():
+                assert abs(z.w - sum(engine.cells[k].w for k in z.cells)) <= 1e-6 * z.w
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    stats = engine.stats()
+    assert stats["cells"] <= 3000 and stats["report_ids"] == 20000
+    assert stats["heap"] <= 4 * 3000 + 2048
+    assert peak < 20e6
+    # Zones sit on hotspots that were active recently
+    end = reports[-1]["time"]
+    recent = {r["hotspot"] for r in reports if r["time"] > end - 14 * 24 * HOUR and r["hotspot"] >= 0}
+    zones = engine.zones_at(end)
+    assert zones and len(zones) <= len(recent) + 3
+
+
+def test_reports_endpoint_and_listener(client, server, monkeypatch):
+    engine = DangerZoneEngine(label=server._zone_labels())
+    monkeypatch.setattr(server, "danger_engine", engine)
+    monkeypatch.setattr(server, "_live_zones", (None, b"[]"))
+    monkeypatch.setattr(server, "precomputed_danger_zones", b"")
+    assert client.get("/danger-zones").status_code == 503
+
+    now = datetime.now(timezone.utc).isoformat()
+    reports = [{"id": f"r{i}", "type": "Flash Flood", "status": "verified", "location": "Gilgit Mock Data",
+                "createdAt": now} for i in range(3)]
+    reports += [{"id": "p", "type": "Flood", "status": "pending", "latitude": 35.9, "longitude": 74.3},
+                {"id": "u", "type": "Flood", "status": "verified", "location": "nowhere at all"}]
+    got = client.post("/admin/reports", json={"reports": reports}).json()
+    assert got == {"unverified": 1, "unlocated": 1, "accepted": 3, "duplicates": 0, "invalid": 0, "stale": 0}
+    [zone] = client.get("/danger-zones").json()
+    assert zone["type"] == "Flash Flood" and zone["event_count"] == 3 and zone["source"] == "reports"
+    assert zone["location"].startswith("Gilgit")
+
+    monkeypatch.setattr(server, "precomputed_danger_zones", b'[{"lat": 36.3, "lng": 74.6, "type": "Flood"}]\n')
+    assert [z.get("source") for z in client.get("/danger-zones").json()] == [None, "reports"]
+    assert len(client.get("/danger-zones", params={"source": "historical"}).json()) == 1
+    assert len(client.get("/danger-zones", params={"source": "live"}).json()) == 1
+
+    # Listener: the initial snapshot, a new report, then a status change read back from the tree
+    db = MemoryDatabase()
+    monkeypatch.setattr(server, "firebase_db", db)
+    near = {"type": "Landslide", "latitude": 36.32, "longitude": 74.66, "createdAt": now}
+    tree = {"a": {**near, "status": "verified"}, "b": {**near, "status": "pending"}}
+    db.reference("reports").set(tree)
+    server.on_report_event(SimpleNamespace(event_type="put", path="/", data=tree))
+    server.on_report_event(SimpleNamespace(event_type="put", path="/c", data={**near, "status": "verified"}))
+    db.reference("reports/b").update({"status": "verified"})
+    server.on_report_event(SimpleNamespace(event_type="patch", path="/b", data={"status": "verified"}))
+    server.on_report_event(SimpleNamespace(event_type="put", path="/c/description", data="edited"))
+    zones = {z["type"]: z for z in json.loads(server.live_danger_zones())}
+    assert sorted(zones) == ["Flash Flood", "Landslide"] and zones["Landslide"]["event_count"] == 3
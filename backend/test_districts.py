@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+
+from districts import DistrictIndex, district_codes, encode_districts
+from gazetteer import Gazetteer
+
+GILGIT = {"latitude": 35.92, "longitude": 74.31, "rainfall": 80.0, "river_level": 6.0, "terrain": "Hilly"}
+
+
+def test_bundled_boundaries():
+    index = DistrictIndex.load()
+    assert len(index) == 10
+    for place in Gazetteer.load().places:
+        if place["class"] == "place":
+            assert index.district(place["lat"], place["lon"]) == place["district"], place["name"]
+
+    # Grid shortcut and border tests agree with testing every polygon
+    rng = np.random.default_rng(7)
+    lat, lon = rng.uniform(34.4, 37.3, 50000), rng.uniform(72.3, 78.0, 50000)
+    found = index.locate(lat, lon)
+    np.testing.assert_array_equal(found, index._test_all(lat, lon))
+    assert [index.locate(a, b)[0] for a, b in zip(lat[:300], lon[:300])] == found[:300].tolist()
+    assert index.district(40.0, 70.0) is None
+
+
+def test_polygon_with_hole(tmp_path):
+    outer = [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]
+    hole  = [[1, 1], [1, 3], [3, 3], [3, 1], [1, 1]]
+    inner = [[1, 1], [3, 1], [3, 3], [1, 3], [1, 1]]
+    path = tmp_path / "d.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"name": "Ring"},
+         "geometry": {"type": "Polygon", "coordinates": [outer, hole]}},
+        {"type": "Feature", "properties": {"district": "Core"},
+         "geometry": {"type": "MultiPolygon", "coordinates": [[inner]]}},
+    ]}))
+    index = DistrictIndex.load(str(path), cell_deg=0.5)
+    names = [index.district(lat, lon) for lat, lon in [(0.5, 0.5), (2, 2), (3.9, 2), (2.6, 1.2), (5, 5)]]
+    assert names == ["Ring", "Core", "Ring", "Core", None]
+
+
+def test_encode_districts():
+    index = DistrictIndex.load()
+    codes = district_codes(index.names)
+    lat   = [35.92, 35.92, 40.0, 40.0]
+    lon   = [74.31, 74.31, 70.0, 70.0]
+    names = ["Gilgit", "Skardu", "Hunza", "Atlantis"]
+    got = encode_districts(lat, lon, names, codes, index)
+    # Coordinates win; outside every boundary the name sent is used, else the middle code
+    assert got.tolist() == [codes["Gilgit"], codes["Gilgit"], codes["Hunza"], len(codes) // 2]
+    assert encode_districts(lat, lon, names, codes, None).tolist() == [codes["Gilgit"], codes["Skardu"],
+                                                                       codes["Hunza"], len(codes) // 2]
+
+
+def test_predict_uses_location_district(client, server, artifacts):
+    col = artifacts["features"].index("district_enc")
+    reqs = [server.PredictionRequest(**GILGIT, district=d) for d in ("Skardu", "Unknown", "Gilgit")]
+    X = server.requests_to_matrix(reqs, 6, artifacts)
+    assert X[:, col].tolist() == [artifacts["district_classes"].index("Gilgit")] * 3
+
+    answers = [client.post("/predict", json={**GILGIT, "district": d}).json() for d in ("Skardu", "Unknown")]
+    assert answers[0] == answers[1]
@@ -0,0 +1,90 @@
+import types
+
+import numpy as np
+import pytest
+
+from evacuation import candidate_zones, nearest_only, plan
+
+ZONES = [
+    {"name": "Gilgit Ground",   "lat": 35.92, "lng": 74.31, "type": "open_ground", "capacity": 300},
+    {"name": "Hunza Hall",      "lat": 36.32, "lng": 74.65, "type": "shelter",     "capacity": 150},
+    {"name": "Skardu Hospital", "lat": 35.30, "lng": 75.63, "type": "hospital",    "capacity": 500},
+]
+
+
+def _optimum(lat, lon, people, zone_lat, zone_lng, capacity, k):
+    """Same problem (k candidates + a "stay" arc) as an LP."""
+    linprog = pytest.importorskip("scipy.optimize").linprog
+    sparse  = pytest.importorskip("scipy.sparse")
+    cand, dist = candidate_zones(lat, lon, zone_lat, zone_lng, k)
+    n, k = cand.shape
+    stay = dist.max() + 1
+    cost = np.concatenate([dist.ravel(), np.full(n, stay)])
+    cols = np.arange(n * k + n)
+    rows = np.concatenate([np.repeat(np.arange(n), k), np.arange(n)])
+    a_eq = sparse.coo_matrix((np.ones(len(cols)), (rows, cols)), shape=(n, n * k + n))
+    a_ub = sparse.coo_matrix((np.ones(n * k), (cand.ravel(), np.arange(n * k))), shape=(len(capacity), n * k + n))
+    res = linprog(cost, A_ub=a_ub, b_ub=capacity, A_eq=a_eq, b_eq=people, method="highs")
+    return res.fun, stay
+
+
+@pytest.mark.parametrize("ratio", [0.6, 1.0, 1.5])
+def test_plan_matches_linear_program(ratio):
+    rng = np.random.default_rng(int(ratio * 10))
+    n, z = 400, 12
+    lat, lon = 35 + rng.random(n) * 2, 73 + rng.random(n) * 3
+    people   = rng.integers(1, 200, n)
+    z_lat, z_lng = 35 + rng.random(z) * 2, 73 + rng.random(z) * 3
+    capacity = rng.integers(1, 100, z)
+    capacity = (capacity / capacity.sum() * people.sum() * ratio).astype(np.int64)
+
+    result = plan(lat, lon, people, z_lat, z_lng, capacity, k=6, eps=0.001)
+    assert (result["load"] <= capacity).all()
+    placed = np.bincount(result["point"], weights=result["people"], minlength=n) + result["unassigned"]
+    np.testing.assert_array_equal(placed, people)
+    assert result["unassigned"].sum() >= people.sum() - capacity.sum()
+
+    optimum, stay = _optimum(lat, lon, people, z_lat, z_lng, capacity, k=6)
+    total = result["cost"] + result["unassigned"].sum() * stay
+    assert total <= optimum + 0.001 * people.sum() + 1e-6
+
+    if ratio > 1:
+        assert result["cost"] >= nearest_only(lat, lon, people, z_lat, z_lng)["cost"] - 1e-6
+
+
+def test_plan_limits():
+    lat, lon = np.array([35.9, 36.3, 30.0]), np.array([74.3, 74.6, 70.0])
+    z_lat, z_lng = [z["lat"] for z in ZONES], [z["lng"] for z in ZONES]
+
+    # Nothing within max_km of the third point, and a zone with no room is never used
+    result = plan(lat, lon, [100, 100, 50], z_lat, z_lng, [300, 0, 500], max_km=100)
+    assert result["unassigned"].tolist() == [0, 0, 50]
+    assert result["load"].tolist() == [200, 0, 0]
+
+    empty = plan(lat, lon, [1, 2, 3], [], [], [])
+    assert empty["unassigned"].tolist() == [1, 2, 3] and empty["cost"] == 0
+
+
+def test_plan_endpoint(client, server, monkeypatch):
+    monkeypatch.setattr(server, "SAFE_ZONES", ZONES)
+    monkeypatch.setattr(server, "shelter_tree", None)
+    points = [
+        {"latitude": 35.91, "longitude": 74.30, "people": 250},   # Gilgit
+        {"latitude": 35.93, "longitude": 74.33, "people": 200},   # Gilgit
+        {"latitude": 36.31, "longitude": 74.66, "people": 100},   # Hunza
+    ]
+    body = client.post("/evacuation/plan", json={"points": points}).json()
+    loads = {z["name"]: (z["load"], z["nearest_only_load"]) for z in body["zones"]}
+    assert loads == {"Gilgit Ground": (300, 450), "Hunza Hall": (150, 100), "Skardu Hospital": (100, 0)}
+    assert body["summary"]["unassigned"] == 0 and body["unassigned"] == []
+    assert body["summary"]["nearest_only"]["over_capacity"] == 150
+    assert sum(a["people"] for a in body["assignments"] if a["point"] == 2) == 100
+
+    # Zones marked full are skipped; whoever fits nowhere else within max_km is unassigned
+    tree = types.SimpleNamespace(zones=ZONES, closed={0})
+    monkeypatch.setattr(server, "shelter_tree", tree)
+    body = client.post("/evacuation/plan", json={"points": points, "max_km": 80}).json()
+    assert [z["name"] for z in body["zones"]] == ["Hunza Hall", "Skardu Hospital"]
+    assert body["summary"]["assigned"] == 150 and body["summary"]["unassigned"] == 400
+
+    assert client.post("/evacuation/plan", json={"points": []}).status_code == 422
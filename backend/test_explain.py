@@ -0,0 +1,56 @@
+import numpy as np
+
+from explain import PathExplainer
+from inference import CompiledForest
+from model_binary import artifacts_meta, read_model_binary, sklearn_trees, write_model_binary
+from synthetic_model import sample_features
+
+GLOF = {"latitude": 36.32, "longitude": 74.65, "district": "Hunza", "rainfall": 10.0,
+        "river_level": 2.0, "terrain": "Mountainous", "temperature_elevated": True}
+
+
+def test_contributions_sum_to_probabilities(artifacts, tmp_path):
+    forest = CompiledForest.from_artifacts(artifacts)
+    explainer = PathExplainer(forest)
+    X = sample_features(700, seed=41)
+    contrib = explainer.contributions(X)
+    assert contrib.shape == (700, forest.n_features, len(forest.classes_))
+    np.testing.assert_allclose(explainer.bias + contrib.sum(axis=1), forest.predict_proba(X), atol=1e-12)
+    roots = [e.tree_.value[0, 0] / e.tree_.value[0, 0].sum() for e in artifacts["model"].estimators_]
+    np.testing.assert_allclose(explainer.bias, np.mean(roots, axis=0))
+
+    # Features the forest never splits on get nothing; grouping keeps the totals
+    unused = ~np.isin(np.arange(forest.n_features), forest.feature[np.isfinite(forest.threshold)])
+    assert np.all(contrib[:, unused] == 0)
+    inputs, grouped = explainer.explain(X, artifacts["features"])
+    assert "glacial_trigger" not in inputs and "temperature_elevated" in inputs
+    np.testing.assert_allclose(grouped.sum(axis=1), contrib.sum(axis=1), atol=1e-12)
+
+    # model.bin keeps no internal-node values; they are rebuilt from the leaves
+    path = str(tmp_path / "model.bin")
+    write_model_binary(path, artifacts_meta(artifacts), sklearn_trees(artifacts["model"]))
+    small = CompiledForest.from_export(read_model_binary(path))
+    explainer = PathExplainer(small)
+    np.testing.assert_allclose(explainer.bias + explainer.contributions(X).sum(axis=1),
+                               small.predict_proba(X), atol=1e-12)
+
+
+def test_predict_explain(client):
+    plain = client.post("/predict", json=GLOF).json()
+    assert "attributions" not in plain
+    body = client.post("/predict?explain=true", json=GLOF).json()
+    attributions = body["attributions"]
+    assert attributions["method"] == "saabas"
+    assert set(attributions["contributions"]) <= {
+        "location", "district", "month", "rainfall", "river_level",
+        "temperature_elevated", "terrain", "seismic_activity",
+    }
+    pred = body["prediction"]
+    total = attributions["base"][pred] + sum(c[pred] for c in attributions["contributions"].values())
+    assert abs(total - body["class_probabilities"][pred]) < 0.002
+    # The strongest reason for a GLOF call is the elevated temperature (glacial trigger)
+    assert pred == "GLOF" and next(iter(attributions["contributions"])) == "temperature_elevated"
+
+    batch = client.post("/predict/batch?explain=true", json={"rows": [GLOF, {"latitude": "x"}]}).json()
+    assert batch["results"][0]["attributions"] == attributions
+    assert "attributions" not in batch["results"][1]
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+GILGIT = {"latitude": 35.92, "longitude": 74.31, "district": "Gilgit",
+          "rainfall": 80.0, "river_level": 6.0, "terrain": "Hilly"}
+
+
+def test_feature_matrix_matches_feature_row(server, artifacts):
+    row = server.build_feature_row(35.9, 74.3, 4, 7, 35.0, 3.0, True, "Valley", False)
+    X = server.build_feature_matrix(
+        [35.9], [74.3], [4], 7, [35.0], [3.0], [True], ["Valley"], [False],
+        artifacts["features"],
+    )
+    assert X.shape == (1, len(artifacts["features"]))
+    assert np.allclose(X[0], [row[f] for f in artifacts["features"]])
+
+
+def test_batch_matches_single_predictions(client):
+    rows = [
+        GILGIT,
+        {**GILGIT, "seismic_activity": True},
+        {**GILGIT, "temperature_elevated": True, "district": "Skardu"},
+    ]
+    batch = client.post("/predict/batch", json={"rows": rows}).json()
+    assert batch["count"] == 3 and batch["failed"] == 0
+    for i, row in enumerate(rows):
+        single = client.post("/predict", json=row).json()
+        result = batch["results"][i]
+        assert result["index"] == i
+        assert result["prediction"] == single["prediction"]
+        assert result["class_probabilities"] == single["class_probabilities"]
+
+
+def test_batch_reports_per_row_errors(client):
+    rows = [GILGIT, {"latitude": "north", "longitude": 74.3}, {"longitude": 74.3}, GILGIT]
+    body = client.post("/predict/batch", json={"rows": rows}).json()
+    assert body["failed"] == 2
+    assert "prediction" in body["results"][0] and "prediction" in body["results"][3]
+    assert "latitude" in body["results"][1]["error"]
+    assert "latitude" in body["results"][2]["error"]
+
+
+def test_predict_returns_503_without_model(server, client, monkeypatch):
+    monkeypatch.setattr(server, "model_artifacts", None)
+    assert client.post("/predict", json=GILGIT).status_code == 503
+    assert client.post("/predict/batch", json={"rows": [GILGIT]}).status_code == 503
+
+
+def test_sklearn_and_compiled_engines_agree(client, server, monkeypatch):
+    rows = [GILGIT, {**GILGIT, "seismic_activity": True}, {**GILGIT, "terrain": "Valley"}]
+    monkeypatch.setattr(server, "INFERENCE_ENGINE", "compiled")
+    compiled = client.post("/predict/batch", json={"rows": rows}).json()
+    monkeypatch.setattr(server, "INFERENCE_ENGINE", "sklearn")
+    reference = client.post("/predict/batch", json={"rows": rows}).json()
+    assert compiled == reference
+
+
+def test_lazy_startup_defers_model_and_heavy_imports(artifacts, tmp_path):
+    import json
+    import os
+    import subprocess
+    import sys
+
+    from inference import save_model_arrays
+
+    arrays = save_model_arrays(artifacts, str(tmp_path / "model_arrays"))
+    code = (
+        "import asyncio, json, sys, fast_server as s\n"
+        "before = sorted(m for m in ('joblib', 'sklearn', 'firebase_admin') if m in sys.modules)\n"
+        "loaded = s.model_artifacts is not None\n"
+        "r = asyncio.run(s.predict_risk(s.PredictionRequest(latitude=35.92, longitude=74.31)))\n"
+        "print(json.dumps({'before': before, 'loaded': loaded, 'prediction': r['prediction'],\n"
+        "                  'stages': [st['name'] for st in s.startup.report()['stages'] if st['deferred']]}))\n"
+    )
+    env = {**os.environ, "GBDMS_LAZY_STARTUP": "1", "GBDMS_MODEL_ARRAYS_DIR": arrays,
+           "GBDMS_MODEL_PATH": str(tmp_path / "absent.joblib")}
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    assert result["before"] == [] and not result["loaded"]
+    assert result["prediction"] in artifacts["classes"]
+    assert result["stages"] == ["model arrays"]
+
+
+def test_predict_sweep_matches_batch(client, server, artifacts):
+    from datetime import datetime
+
+    from sweep import grid_proba
+
+    body = {**{k: GILGIT[k] for k in ("latitude", "longitude", "district", "terrain")},
+            "rainfall": {"min": 0, "max": 150, "steps": 7}, "river_level": {"min": 0, "max": 12, "steps": 5}}
+    resp = client.post("/predict/sweep", json=body)
+    assert resp.status_code == 200
+    sweep = resp.json()
+    assert sweep["shape"] == [12, 7, 5] and sweep["axes"]["rainfall"][1] == 25.0
+
+    # The current month's slice agrees with /predict/batch on the same inputs
+    month = datetime.now().month - 1
+    rows = [{**GILGIT, "rainfall": r, "river_level": v}
+            for r in sweep["axes"]["rainfall"] for v in sweep["axes"]["river_level"]]
+    batch = client.post("/predict/batch", json={"rows": rows}).json()["results"]
+    for k, result in enumerate(batch):
+        i, j = divmod(k, 5)
+        for cls, p in result["class_probabilities"].items():
+            assert abs(sweep["probabilities"][cls][month][i][j] / 1000 - p) <= 0.0015
+        assert sweep["risk_levels"][sweep["risk_level"][month][i][j]] == result["risk_level"]
+
+    for c in sweep["crossings"]:
+        lo = sweep["axes"][c["axis"]].index(c["between"][0])
+        assert c["from"] != c["to"] and c["between"][1] == sweep["axes"][c["axis"]][lo + 1]
+    assert sweep["crossings_total"] >= len(sweep["crossings"])
+
+    # The factored grid evaluation is exact against scoring every row
+    forest = server.compiled_forest(artifacts)
+    req = server.SweepRequest(**body)
+    axes = [np.arange(1, 13), req.rainfall.values(), req.river_level.values()]
+    base = server._sweep_rows(req, artifacts, 1.0, 0.0, 0.0)[0]
+    axis_rows = [server._sweep_rows(req, artifacts, axes[0], 0.0, 0.0),
+                 server._sweep_rows(req, artifacts, 1.0, axes[1], 0.0),
+                 server._sweep_rows(req, artifacts, 1.0, 0.0, axes[2])]
+    grid = np.meshgrid(*axes, indexing="ij")
+    X = server._sweep_rows(req, artifacts, *(g.ravel() for g in grid))
+    full = forest.predict_proba(X).T.reshape((-1, 12, 7, 5))
+    assert np.allclose(grid_proba(forest, base, axis_rows), full, rtol=0, atol=1e-12)
+
+    too_big = {**body, "rainfall": {"max": 100, "steps": 1000}, "river_level": {"max": 10, "steps": 1000}}
+    assert client.post("/predict/sweep", json=too_big).status_code == 422
+    assert client.post("/predict/sweep", json={**body, "months": [0, 5]}).status_code == 422
+    assert sweep["model_version"] == server.model_version(artifacts)
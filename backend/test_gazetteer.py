@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from gazetteer import Gazetteer, normalize
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer.load()
+
+
+def test_normalize():
+    assert normalize("  Eidgah,  Astore ") == "eidgah astore"
+    assert normalize("Skārdu") == "skardu"
+
+
+def test_prefix_alt_names_and_word_suffixes(gazetteer):
+    assert [r["name"] for r in gazetteer.search("karim")] == ["Karimabad"]
+    assert gazetteer.search("Gilgit City")[0]["name"] == "Gilgit"
+    assert "Attabad Lake" in [r["name"] for r in gazetteer.search("lake", limit=10)]
+    hit = gazetteer.search("hunza")[0]
+    assert hit["type"] == "administrative" and hit["edits"] == 0
+    assert "Hunza" in hit["display_name"] and float(hit["lat"]) > 36
+
+
+def test_fuzzy_matches_rank_after_exact(gazetteer):
+    assert gazetteer.search("krimabad")[0]["name"] == "Karimabad"
+    assert gazetteer.search("Fairy medows")[0]["name"] == "Fairy Meadows"
+    results = gazetteer.search("gil")
+    assert [r["edits"] for r in results] == sorted(r["edits"] for r in results)
+    assert gazetteer.search("karimabd", fuzzy=False) == []
+    assert gazetteer.search("xyzzy") == []
+
+
+def test_autocomplete_is_sub_millisecond(gazetteer):
+    queries = ["g", "gil", "karimabd", "skardu", "nanga parbat", "fairy medows"] * 50
+    t0 = time.perf_counter()
+    for q in queries:
+        gazetteer.search(q)
+    assert (time.perf_counter() - t0) / len(queries) < 1e-3
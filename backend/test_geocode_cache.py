@@ -0,0 +1,57 @@
+import time
+
+from geocode_cache import GeocodeCache
+from upstream import UpstreamUnavailable
+
+
+def test_entries_persist_and_expire(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    cache = GeocodeCache(path, ttl_seconds=60)
+    assert cache.get("islamabad") is None
+    cache.put("islamabad", [{"display_name": "Islamabad"}])
+    cache.close()
+
+    reopened = GeocodeCache(path, ttl_seconds=60)
+    assert reopened.get("islamabad") == ([{"display_name": "Islamabad"}], True)
+    reopened.ttl_seconds = 0
+    assert reopened.get("islamabad") == ([{"display_name": "Islamabad"}], False)
+    assert reopened.purge_expired(0) == 1 and len(reopened) == 0
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["stale"] == 1
+
+
+def test_geocode_endpoint_prefers_local_then_cache(client, server, monkeypatch):
+    calls = []
+
+    async def nominatim(path, params=None):
+        calls.append(params["q"])
+        return [{"display_name": params["q"], "lat": "33.7", "lon": "73.1"}]
+
+    monkeypatch.setattr(server.nominatim, "get_json", nominatim)
+
+    body = client.get("/geocode", params={"q": "Karimabad"}).json()
+    assert body[0]["source"] == "gazetteer" and calls == []
+
+    for _ in range(3):
+        assert client.get("/geocode", params={"q": " islamabad "}).json()[0]["display_name"] == " islamabad "
+    assert calls == [" islamabad "]
+
+    # Expired entry is served when Nominatim is down
+    async def down(path, params=None):
+        raise UpstreamUnavailable("nominatim: circuit open")
+
+    monkeypatch.setattr(server.nominatim, "get_json", down)
+    server.geocode_cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert client.get("/geocode", params={"q": "Islamabad"}).json()[0]["lat"] == "33.7"
+    # Unknown to everything: fuzzy gazetteer matches, else 503
+    assert client.get("/geocode", params={"q": "Karimabd"}).json()[0]["name"] == "Karimabad"
+    assert client.get("/geocode", params={"q": "Lahore"}).status_code == 503
+
+
+def test_autocomplete_never_calls_upstream(client, server, monkeypatch):
+    async def fail(path, params=None):
+        raise AssertionError("autocomplete must stay local")
+
+    monkeypatch.setattr(server.nominatim, "get_json", fail)
+    body = client.get("/geocode/autocomplete", params={"q": "sk", "limit": 3}).json()
+    assert len(body) == 3 and all(r["name"].startswith("Sk") for r in body)
@@ -27,5 +27,118 @@ def test_predictions():
         else:
             print("Status: FAILED (No confidence)")
 
+
+# ── Compiled forest parity (pytest) ──────────────────────────────────────────
+
+def _sklearn_proba(artifacts, X):
+    return artifacts["model"].predict_proba(artifacts["scaler"].transform(X))
+
+
+def test_compiled_forest_matches_sklearn(artifacts):
+    import numpy as np
+    from inference import CompiledForest
+    from synthetic_model import sample_features
+
+    forest = CompiledForest.from_artifacts(artifacts)
+    X = sample_features(5000, seed=11)
+    X[::2, 0] = np.round(X[::2, 0], 2)      # values sitting on typical split points
+    for n in (1, 100, 5000):
+        ref = _sklearn_proba(artifacts, X[:n])
+        got = forest.predict_proba(X[:n])
+        assert np.array_equal(ref.argmax(axis=1), got.argmax(axis=1))
+        assert np.allclose(ref, got, rtol=0, atol=1e-12)
+
+
+def test_specialized_forest_matches_full_forest(artifacts):
+    import numpy as np
+    from inference import CompiledForest
+    from synthetic_model import sample_features
+
+    forest = CompiledForest.from_artifacts(artifacts)
+    X = sample_features(2000, seed=12)
+    fixed = {0: 35.9, 1: 74.3, 2: 3.0, 7: 2.0, 8: 0.0}
+    for j, v in fixed.items():
+        X[:, j] = v
+    sub, bias = forest.specialize(fixed)
+    assert sub.n_nodes < forest.n_nodes and sub.n_trees <= forest.n_trees
+    got = (sub.predict_proba(X) * sub.n_trees + bias) / forest.n_trees
+    assert np.allclose(got, forest.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_compiled_forest_from_export(artifacts):
+    import json
+
+    import numpy as np
+    from inference import CompiledForest
+    from synthetic_model import sample_features
+    from train_and_export import export_rf_to_json
+
+    model_json = json.loads(json.dumps(export_rf_to_json(artifacts)))
+    forest = CompiledForest.from_export(model_json)
+    X = sample_features(2000, seed=12)
+    assert np.allclose(forest.predict_proba(X), _sklearn_proba(artifacts, X), rtol=0, atol=1e-12)
+
+
+def test_engine_predict_risk(artifacts):
+    from inference import InferenceEngine
+
+    engine = InferenceEngine(artifacts=artifacts)
+    assert engine.loaded
+    result = engine.predict_risk(35.92, 74.31, {"rainfall": 10, "seismic_activity": True}, month=6)
+    assert result["prediction"] in artifacts["classes"]
+    assert abs(sum(result["class_probabilities"].values()) - 1.0) < 0.01
+
+
+def test_model_arrays_round_trip(artifacts, tmp_path):
+    import numpy as np
+    from inference import InferenceEngine, load_model_arrays, save_model_arrays
+    from synthetic_model import sample_features
+
+    out = save_model_arrays(artifacts, str(tmp_path / "model_arrays"))
+    loaded = load_model_arrays(out)
+    assert "model" not in loaded and loaded["trained_at"] == artifacts["trained_at"]
+    assert isinstance(np.load(tmp_path / "model_arrays" / "threshold.npy", mmap_mode="r"), np.memmap)
+
+    X = sample_features(1000, seed=13)
+    assert np.allclose(loaded["forest"].predict_proba(X), _sklearn_proba(artifacts, X), rtol=0, atol=1e-12)
+
+    engine = InferenceEngine(model_path=out)
+    reference = InferenceEngine(artifacts=artifacts)
+    inputs = {"rainfall": 40, "district": "Hunza"}
+    assert engine.predict_risk(36.3, 74.6, inputs, month=7) == reference.predict_risk(36.3, 74.6, inputs, month=7)
+
+
+def test_shared_model_arrays_exports_once(artifacts, tmp_path, monkeypatch):
+    import os
+
+    import joblib
+    import numpy as np
+    import pytest
+    from inference import shared_model_arrays
+    from synthetic_model import sample_features
+
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(artifacts, model_path)
+    cache = tmp_path / "shared"
+
+    first = shared_model_arrays(str(model_path), str(cache))
+    # Later workers map the export without unpickling the model
+    monkeypatch.setattr(joblib, "load", lambda *a, **k: pytest.fail("model.joblib unpickled twice"))
+    second = shared_model_arrays(str(model_path), str(cache))
+    monkeypatch.undo()
+
+    threshold = second["forest"].threshold
+    assert not threshold.flags.writeable and isinstance(threshold.base, np.memmap)
+    X = sample_features(500, seed=21)
+    assert np.array_equal(first["forest"].predict_proba(X), second["forest"].predict_proba(X))
+
+    # A retrained model gets a fresh export and the old one is removed
+    old_exports = set(os.listdir(cache)) - {".lock"}
+    os.utime(model_path, ns=(0, 0))
+    shared_model_arrays(str(model_path), str(cache))
+    new_exports = set(os.listdir(cache)) - {".lock"}
+    assert len(new_exports) == 1 and not new_exports & old_exports
+
+
 if __name__ == "__main__":
     test_predictions()
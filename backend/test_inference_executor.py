@@ -0,0 +1,104 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from inference_executor import DeadlineExceeded, InferenceExecutor, QueueFull
+
+
+class GatedPredict:
+    """predict() that records batch sizes and blocks until released."""
+
+    def __init__(self, inner=None):
+        self.inner   = inner
+        self.gate    = threading.Event()
+        self.started = threading.Event()
+        self.batches: list[int] = []
+
+    def __call__(self, payload, X):
+        self.started.set()
+        self.gate.wait(5)
+        self.batches.append(X.shape[0])
+        if self.inner is not None:
+            return self.inner(payload, X)
+        return np.column_stack([X[:, 0] * payload, X[:, 0]])
+
+
+def test_concurrent_jobs_are_micro_batched():
+    predict = GatedPredict()
+    ex = InferenceExecutor(predict, workers=1, max_batch_rows=64)
+    key = object()
+
+    first = ex.submit(key, 2.0, np.array([[0.0]]))
+    assert predict.started.wait(5)
+    # Queued while the worker is busy: scored together in one forest call
+    futures = [ex.submit(key, 2.0, np.array([[float(i)], [float(i)]])) for i in range(1, 11)]
+    predict.gate.set()
+
+    assert first.result(5).tolist() == [[0.0, 0.0]]
+    for i, f in enumerate(futures, 1):
+        assert f.result(5).tolist() == [[2.0 * i, float(i)]] * 2
+    assert predict.batches == [1, 20]
+    stats = ex.stats()
+    assert stats["batches"] == 2 and stats["mean_batch_rows"] == 10.5
+    assert stats["batch_rows_histogram"]["<=1"] == 1 and stats["batch_rows_histogram"]["<=32"] == 1
+    ex.shutdown()
+
+
+def test_jobs_for_different_models_are_not_merged():
+    predict = GatedPredict()
+    ex = InferenceExecutor(predict, workers=1)
+    a, b = object(), object()
+    ex.submit(a, 1.0, np.zeros((1, 1)))
+    assert predict.started.wait(5)
+    futures = [ex.submit(k, 1.0, np.zeros((1, 1))) for k in (a, a, b, b)]
+    predict.gate.set()
+    for f in futures:
+        f.result(5)
+    assert predict.batches == [1, 2, 2]
+    ex.shutdown()
+
+
+def test_full_queue_and_expired_deadlines_shed_load():
+    predict = GatedPredict()
+    ex = InferenceExecutor(predict, workers=1, max_queue_rows=4, deadline_ms=50)
+    ex.submit(None, 1.0, np.zeros((1, 1)), deadline_ms=5000)
+    assert predict.started.wait(5)
+
+    queued = [ex.submit(None, 1.0, np.zeros((2, 1))) for _ in range(2)]
+    with pytest.raises(QueueFull):
+        ex.submit(None, 1.0, np.zeros((1, 1)))
+
+    time.sleep(0.1)                     # queued jobs outlive their 50 ms deadline
+    predict.gate.set()
+    for f in queued:
+        with pytest.raises(DeadlineExceeded):
+            f.result(5)
+    stats = ex.stats()
+    assert stats["rejected"] == 1 and stats["expired"] == 2 and stats["queue_depth"] == 0
+    ex.shutdown()
+
+
+def test_predict_sheds_load_without_blocking_other_endpoints(client, server, monkeypatch):
+    predict = GatedPredict(lambda artifacts, X: server.predict_proba_matrix(X, artifacts))
+    ex = InferenceExecutor(predict, workers=1, max_queue_rows=1)
+    monkeypatch.setattr(server, "inference_executor", ex)
+    server.prediction_cache.max_size = 0
+    X = np.zeros((1, len(server.model_artifacts["features"])))
+    ex.submit(server.model_artifacts, server.model_artifacts, X)
+    assert predict.started.wait(5)
+    ex.submit(server.model_artifacts, server.model_artifacts, X)     # fills the queue
+
+    body = {"latitude": 35.92, "longitude": 74.31}
+    resp = client.post("/predict", json=body)
+    assert resp.status_code == 429 and resp.headers["retry-after"] == "1"
+    assert client.post("/predict/batch", json={"rows": [body]}).status_code == 429
+    assert client.get("/safe-zones").status_code == 200
+    assert client.get("/").json()["inference"]["rejected"] == 2
+
+    predict.gate.set()
+    time.sleep(0.05)
+    resp = client.post("/predict", json=body, headers={"X-Deadline-Ms": "1000"})
+    assert resp.status_code == 200 and resp.json()["prediction"]
+    ex.shutdown()
@@ -0,0 +1,84 @@
+import re
+import threading
+
+from metrics import Counter, Histogram, HistogramChild, Registry
+
+
+def test_exposition_format():
+    reg = Registry()
+    hits = Counter("demo_hits_total", "Hits.", ("route",), registry=reg)
+    lat  = Histogram("demo_seconds", "Latency.", ("route",), buckets=(0.1, 1.0), registry=reg)
+    hits.inc("/a")
+    hits.inc("/a", amount=2)
+    lat.observe("/a", value=0.05)
+    lat.observe("/a", value=0.5)
+    lat.observe("/a", value=5.0)
+
+    shared = HistogramChild((0.1, 1.0))
+    shared.observe(0.2)
+
+    @reg.collector
+    def extra():
+        yield "demo_up", "gauge", "Up.", [({"name": "x"}, 1)]
+        yield "demo_up", "gauge", "Up.", [({"name": "y"}, 0)]
+        yield "demo_ext_seconds", "histogram", "External.", [({}, shared)]
+
+    text = reg.render()
+    assert 'demo_hits_total{route="/a"} 3' in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+    assert 'demo_ext_seconds_bucket{le="1.0"} 1' in text
+    # One HELP/TYPE per family even when a collector yields it twice
+    assert text.count("# TYPE demo_up gauge") == 1
+    assert 'demo_up{name="x"} 1' in text and 'demo_up{name="y"} 0' in text
+    assert shared.quantile(0.5) == 1.0
+
+
+def test_metrics_endpoint(client, server):
+    before = server.http_requests.value("POST", "/predict", "200")
+    body = {"latitude": 35.92, "longitude": 74.31, "rainfall": 80}
+    for _ in range(3):
+        assert client.post("/predict", json=body).status_code == 200
+    client.get("/tiles/99/0/0.png")
+    client.get("/no/such/path")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    assert server.http_requests.value("POST", "/predict", "200") == before + 3
+    assert re.search(r'gbdms_http_requests_total\{method="GET",route="/tiles/\{z\}/\{x\}/\{y\}.png",status="404"\} \d+', text)
+    assert 'route="unmatched",status="404"' in text
+    assert 'gbdms_http_request_duration_seconds_bucket{method="POST",route="/predict",le="+Inf"}' in text
+    for stage in ("features", "queue", "forest", "response"):
+        assert f'gbdms_predict_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'gbdms_model_info{version="' in text
+    assert 'gbdms_upstream_request_duration_seconds_count{upstream="osrm"}' in text
+    assert 'gbdms_upstream_circuit_open{upstream="nominatim"} 0' in text
+    assert "gbdms_prediction_cache_hits " in text and "gbdms_inference_queue_depth 0" in text
+
+    types = re.findall(r"^# TYPE (\S+)", text, flags=re.M)
+    assert len(types) == len(set(types))
+
+
+def test_profile_endpoint(client, server, monkeypatch):
+    assert client.get("/admin/profile", params={"seconds": 0.1}).status_code == 404
+    monkeypatch.setattr(server, "PROFILER_ENABLED", True)
+
+    stop = threading.Event()
+
+    def busy_loop_for_profiler():
+        while not stop.is_set():
+            sum(i * i for i in range(1000))
+
+    t = threading.Thread(target=busy_loop_for_profiler, name="busy", daemon=True)
+    t.start()
+    try:
+        resp = client.get("/admin/profile", params={"seconds": 0.3, "hz": 200})
+    finally:
+        stop.set()
+        t.join()
+    assert resp.status_code == 200 and int(resp.headers["x-profile-samples"]) > 10
+    lines = [line for line in resp.text.splitlines() if "busy_loop_for_profiler" in line]
+    assert lines and all(line.startswith("busy;") and line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+from inference import CompiledForest
+from model_binary import artifacts_meta, float32_floor, read_model_binary, sklearn_trees, write_model_binary
+from synthetic_model import sample_features
+from train_and_export import export_rf_to_json
+
+
+@pytest.mark.parametrize("prob_bits", [8, 16])
+def test_binary_export_matches_sklearn(artifacts, tmp_path, prob_bits):
+    path = str(tmp_path / "model.bin")
+    stats = write_model_binary(path, artifacts_meta(artifacts), sklearn_trees(artifacts["model"]), prob_bits)
+    assert stats["n_trees"] == len(artifacts["model"].estimators_)
+    assert stats["unique_leaves"] < stats["leaf_nodes"]
+    assert stats["bytes"] * 4 < len(json.dumps(export_rf_to_json(artifacts)))
+
+    model = read_model_binary(path)
+    assert model["features"] == artifacts["features"] and model["classes"] == list(artifacts["classes"])
+    assert model["scaler"]["mean"] == artifacts["scaler"].mean_.tolist()
+
+    X = sample_features(5000, seed=21)
+    X[::2, 0] = np.round(X[::2, 0], 2)      # values sitting on typical split points
+    ref = artifacts["model"].predict_proba(artifacts["scaler"].transform(X))
+    got = CompiledForest.from_export(model).predict_proba(X)
+    step = 1 / ((1 << prob_bits) - 1)
+    assert np.abs(got - ref).max() < step
+    top2 = np.sort(ref, axis=1)[:, -2:]
+    clear = top2[:, 1] - top2[:, 0] > 2 * step
+    assert np.array_equal(got.argmax(axis=1)[clear], ref.argmax(axis=1)[clear])
+
+
+def test_float32_thresholds_split_like_sklearn():
+    rng = np.random.default_rng(4)
+    t = rng.normal(size=20000) * 10.0 ** rng.integers(-3, 4, 20000)
+    x = np.concatenate([t, np.nextafter(t, np.inf), np.nextafter(t, -np.inf), rng.normal(size=20000)])
+    x32 = x.astype(np.float32)
+    t = np.concatenate([t, t, t, t])
+    np.testing.assert_array_equal(x32 <= t, x32 <= float32_floor(t))
+
+
+def test_binary_rejects_other_files(tmp_path):
+    with pytest.raises(ValueError, match="not a GBRF"):
+        read_model_binary(b"{}" * 8)
+    path = tmp_path / "model.bin"
+    meta = {"features": ["a"], "classes": ["x", "y"]}
+    write_model_binary(str(path), meta, [{"left": [-1], "right": [-1], "feature": [-2], "threshold": [-2.0],
+                                          "value": [[3.0, 1.0]]}])
+    model = read_model_binary(str(path))
+    assert model["forest"][0]["value"].tolist() == [[191 / 255, 64 / 255]]
+    data = bytearray(path.read_bytes())
+    data[4] = 9
+    with pytest.raises(ValueError, match="version 9"):
+        read_model_binary(bytes(data))
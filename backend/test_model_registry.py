@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from inference import CompiledForest
+from model_registry import ModelRegistry, ModelReloader, ModelValidationError
+
+
+def _scrambled(artifacts: dict) -> dict:
+    """Same trees with the class columns reversed: well-formed output, wrong labels."""
+    f = CompiledForest.from_artifacts(artifacts)
+    forest = CompiledForest(
+        f.left, f.feature, f.threshold, np.ascontiguousarray(f.value[::-1]),
+        f.roots, list(f.classes_), f.n_features,
+    )
+    return {**artifacts, "forest": forest}
+
+
+@pytest.fixture
+def registry(artifacts, tmp_path):
+    reg = ModelRegistry(str(tmp_path / "registry"))
+    reg.publish(artifacts, "v1", make_current=True)
+    reg.write_golden(reg.load("v1"), n=48)
+    reg.publish(artifacts, "v2")
+    reg.publish(_scrambled(artifacts), "v3-bad")
+    return reg
+
+
+def test_registry_versions_and_validation(registry):
+    assert registry.versions() == ["v1", "v2", "v3-bad"]
+    assert registry.current() == "v1"
+    registry.set_current("v2")
+    assert registry.current() == "v2"
+
+    report = registry.validate(registry.load("v2"))
+    assert report["agreement"] == 1.0 and report["golden_rows"] == 48
+    with pytest.raises(ModelValidationError):
+        registry.validate(registry.load("v3-bad"))
+
+
+def test_reloader_installs_only_validated_versions(registry):
+    installed = []
+    reloader = ModelReloader(registry, installed.append)
+
+    assert reloader.request("v3-bad")
+    reloader.wait(10)
+    assert reloader.status["state"] == "failed" and installed == []
+
+    assert reloader.request("v2")
+    reloader.wait(10)
+    assert reloader.status["state"] == "installed"
+    assert [a["registry_version"] for a in installed] == ["v2"]
+
+
+def test_hot_reload_endpoint(server, client, registry, monkeypatch):
+    monkeypatch.setattr(server, "model_registry", registry)
+    monkeypatch.setattr(server, "model_reloader", ModelReloader(registry, server.install_model))
+    body = {"latitude": 35.92, "longitude": 74.31, "rainfall": 120, "river_level": 6}
+
+    before = server.model_artifacts
+    expected = client.post("/predict", json=body).json()["class_probabilities"]
+
+    assert client.post("/admin/model/reload", json={"version": "nope"}).status_code == 404
+    resp = client.post("/admin/model/reload", json={"version": "v2"})
+    assert resp.status_code == 202
+    server.model_reloader.wait(10)
+
+    status = client.get("/admin/model").json()
+    assert status["serving"] == "v2" and status["reload"]["state"] == "installed"
+    assert client.post("/predict", json=body).json()["class_probabilities"] == expected
+    # A request that took the old snapshot still scores on it
+    X = server.requests_to_matrix([server.PredictionRequest(**body)], 6, before)
+    assert server.predict_proba_matrix(X, before).shape == (1, len(server.model_classes(before)))
+
+    client.post("/admin/model/reload", json={"version": "v3-bad"})
+    server.model_reloader.wait(10)
+    status = client.get("/admin/model").json()
+    assert status["serving"] == "v2" and status["reload"]["state"] == "failed"
+
+
+def test_shadow_scoring_reports_disagreement(server, client, registry, monkeypatch):
+    monkeypatch.setattr(server, "model_registry", registry)
+    monkeypatch.setattr(server, "shadow", None)
+
+    assert client.post("/admin/model/shadow", json={"version": "v3-bad", "percent": 100}).status_code == 200
+    rows = [{"latitude": 35 + i * 0.05, "longitude": 74 + i * 0.05, "rainfall": 10 * i} for i in range(20)]
+    client.post("/predict/batch", json={"rows": rows})
+    server.shadow.drain()
+
+    stats = client.delete("/admin/model/shadow").json()
+    assert stats["version"] == "v3-bad" and stats["compared"] == 20
+    assert stats["disagreement_rate"] > 0.5
+    assert stats["primary_ms"]["p50"] >= 0 and stats["shadow_ms"]["p50"] >= 0
+    assert client.delete("/admin/model/shadow").status_code == 404
@@ -0,0 +1,61 @@
+from prediction_cache import PredictionCache
+
+GILGIT = {"latitude": 35.9208, "longitude": 74.3089, "rainfall": 81.0, "river_level": 6.2}
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    import prediction_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(max_size=2, ttl_seconds=10)
+    cache.put("a", 1, "v1")
+    cache.put("b", 2, "v1")
+    assert cache.get("a", "v1") == 1          # a is now most recent
+    cache.put("c", 3, "v1")                    # evicts b
+    assert cache.get("b", "v1") is None
+    now[0] += 11
+    assert cache.get("a", "v1") is None        # expired
+    stats = cache.stats()
+    assert (stats["hits"], stats["evictions"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_model_version_change_invalidates():
+    cache = PredictionCache()
+    cache.put("a", 1, "2026-01-01")
+    assert cache.get("a", "2026-02-01") is None
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["size"] == 0
+
+
+def test_nearby_requests_share_an_entry_when_bucketed(client, server, monkeypatch):
+    monkeypatch.setattr(server, "prediction_cache",
+                        PredictionCache(latlon_decimals=2, rainfall_bucket=5.0, river_bucket=0.5))
+    first  = client.post("/predict", json=GILGIT).json()
+    second = client.post("/predict", json={**GILGIT, "latitude": 35.9191, "rainfall": 84.0}).json()
+    assert first == second
+    stats = client.get("/").json()["prediction_cache"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    # Buckets are floor-aligned and never span the rainfall trigger
+    cache = server.prediction_cache
+    keys = [cache.key(cache.normalize({**GILGIT, "rainfall": r}), 7) for r in (15.0, 19.9, 20.0, 20.5, 24.9, 25.0)]
+    assert keys[0] == keys[1] != keys[2] != keys[3] == keys[4] != keys[5]
+
+
+def test_cached_predict_matches_batch(client):
+    # 22 mm sits inside a 5 mm bucket and above the rainfall trigger
+    row = {**GILGIT, "rainfall": 22.0, "river_level": 6.3}
+    batch = client.post("/predict/batch", json={"rows": [row]}).json()["results"][0]
+    for _ in range(2):   # miss, then hit
+        single = client.post("/predict", json=row).json()
+        assert single["prediction"] == batch["prediction"]
+        assert single["class_probabilities"] == batch["class_probabilities"]
+    assert client.post("/predict", params={"explain": "true"}, json=row).json()["class_probabilities"] == \
+        batch["class_probabilities"]
+
+
+def test_retrained_model_is_not_served_from_cache(client, server, artifacts, monkeypatch):
+    client.post("/predict", json=GILGIT)
+    monkeypatch.setattr(server, "model_artifacts", {**artifacts, "trained_at": "2026-03-01T00:00:00"})
+    client.post("/predict", json=GILGIT)
+    assert client.get("/").json()["prediction_cache"]["misses"] == 2
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import pytest
+
+from risk_stream import RiskStream, Subscription
+
+POINTS = [
+    {"name": "Gilgit", "district": "Gilgit", "lat": 35.92, "lon": 74.31},
+    {"name": "Danyor", "district": "Gilgit", "lat": 35.93, "lon": 74.38},
+    {"name": "Skardu", "district": "Skardu", "lat": 35.30, "lon": 75.63},
+]
+
+
+def rain_model(rows, month):
+    """Flood above 50 mm, Critical above 100 mm."""
+    out = []
+    for r in rows:
+        rain = r["rainfall"]
+        out.append({
+            "prediction": "Flood" if rain > 50 else "Landslide",
+            "risk_level": "Critical" if rain > 100 else "Moderate" if rain > 50 else "Low",
+            "confidence": min(rain, 100.0),
+        })
+    return out
+
+
+@pytest.fixture
+def stream(server, monkeypatch):
+    stream = RiskStream(POINTS, rain_model, min_interval=0.0)
+    monkeypatch.setattr(server, "risk_stream", stream)
+    return stream
+
+
+def test_fan_out_filters_and_coalesces():
+    async def scenario():
+        stream = RiskStream(POINTS, rain_model, min_interval=0.05)
+        gilgit = stream.subscribe(Subscription(districts=["gilgit"]), 7)
+        skardu = stream.subscribe(Subscription(bboxes=[(35.0, 75.0, 35.5, 76.0)]), 7)
+        assert [p["name"] for p in json.loads(await gilgit.next_message())["points"]] == ["Gilgit", "Danyor"]
+        assert json.loads(await skardu.next_message())["points"][0]["risk_level"] == "Low"
+
+        # Scoring happens off the loop; only Gilgit's subscriber hears about Gilgit
+        await asyncio.to_thread(stream.update_conditions, "Gilgit", {"rainfall": 80.0}, 7)
+        update = json.loads(await gilgit.next_message(timeout=1))
+        assert update["type"] == "update" and {c["name"] for c in update["changes"]} == {"Gilgit", "Danyor"}
+        assert update["changes"][0]["previous"] == {"prediction": "Landslide", "risk_level": "Low"}
+        assert await skardu.next_message(timeout=0.1) is None
+
+        # Rapid updates collapse to the latest state; a flip and flip back sends nothing
+        for rain in (120.0, 60.0, 130.0):
+            await asyncio.to_thread(stream.update_conditions, "Gilgit", {"rainfall": rain}, 7)
+        update = json.loads(await gilgit.next_message(timeout=1))
+        assert [c["risk_level"] for c in update["changes"]] == ["Critical", "Critical"]
+        for rain in (200.0, 10.0):
+            await asyncio.to_thread(stream.update_conditions, "Skardu", {"rainfall": rain}, 7)
+        assert await skardu.next_message(timeout=0.2) is None
+        assert stream.coalesced >= 3
+
+        stream.resubscribe(skardu, Subscription(districts=["Gilgit"]))
+        assert len(json.loads(await skardu.next_message())["points"]) == 2
+        stream.unsubscribe(gilgit)
+        stream.unsubscribe(skardu)
+        assert stream.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_websocket_and_conditions_endpoint(client, stream):
+    with client.websocket_connect("/ws/risk?district=Skardu") as ws:
+        snapshot = json.loads(ws.receive_text())
+        assert snapshot["type"] == "snapshot" and [p["name"] for p in snapshot["points"]] == ["Skardu"]
+
+        resp = client.put("/admin/conditions/Skardu", json={"rainfall": 150})
+        assert resp.status_code == 200 and resp.json()["conditions"]["rainfall"] == 150
+        update = json.loads(ws.receive_text())
+        assert update["changes"][0]["risk_level"] == "Critical"
+
+        ws.send_json({"districts": ["Nowhere"]})
+        assert json.loads(ws.receive_text())["type"] == "error"
+        ws.send_json({"districts": ["Gilgit"]})
+        assert len(json.loads(ws.receive_text())["points"]) == 2
+
+    assert client.put("/admin/conditions/Nowhere", json={"rainfall": 1}).status_code == 404
+    assert client.get("/conditions").json()["Skardu"]["rainfall"] == 150
+    assert client.get("/stream/risk", params={"bbox": "1,2,3"}).status_code == 422
+
+
+def test_sse_events_and_real_model(server, stream):
+    async def read_events():
+        resp = await server.risk_events(district=["Gilgit"], bbox=[])
+        assert resp.media_type == "text/event-stream"
+        events = resp.body_iterator
+        first = await events.__anext__()
+        await asyncio.to_thread(stream.update_conditions, "Gilgit", {"rainfall": 70.0}, 7)
+        second = await events.__anext__()
+        await events.aclose()
+        return first, second
+
+    first, second = asyncio.run(read_events())
+    assert first.startswith("data: ") and json.loads(first[6:])["type"] == "snapshot"
+    assert json.loads(second[6:])["changes"][0]["prediction"] == "Flood"
+    assert stream.stats()["subscribers"] == 0
+
+    # The server's own scorer returns the /predict fields for every row
+    rows = [{"latitude": p["lat"], "longitude": p["lon"], "district": p["district"], "rainfall": 90.0} for p in POINTS]
+    results = server._stream_evaluate(rows, 7)
+    assert len(results) == 3 and set(results[0]) == {"prediction", "risk_level", "confidence"}
@@ -0,0 +1,96 @@
+import os
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from risk_tiles import RiskRaster, RiskRasterStore, build_raster, grid_axes
+
+
+def _decode_png(png: bytes) -> np.ndarray:
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    w, h = struct.unpack(">II", png[16:24])
+    idat_len = struct.unpack(">I", png[33:37])[0]
+    raw = np.frombuffer(zlib.decompress(png[41:41 + idat_len]), dtype=np.uint8)
+    return raw.reshape(h, w * 4 + 1)[:, 1:].reshape(h, w, 4)
+
+
+def test_raster_matches_forest(artifacts, tmp_path):
+    from inference import CompiledForest
+    from features import build_feature_matrix
+
+    path = build_raster(artifacts, str(tmp_path), resolution=0.25, workers=1)
+    raster = RiskRaster(path)
+    lats, lons = grid_axes(0.25)
+    assert raster.probs.shape[-2:] == (len(lats), len(lons))
+
+    lat, lon = np.repeat(lats, len(lons)), np.tile(lons, len(lats))
+    districts = np.load(os.path.join(path, "districts.npy"))
+    assert len(np.unique(districts)) > 1
+    X = build_feature_matrix(lat, lon, districts.ravel(), 7, 150.0, 8.0, False, "Hilly", False,
+                             artifacts["features"])
+    expected = CompiledForest.from_artifacts(artifacts).predict_proba(X)
+    got = raster.layer(7, "Hilly", "heavy_rain").reshape(len(raster.classes), -1).T / 255.0
+    assert np.abs(got - expected).max() <= 0.5 / 255 + 1e-9
+
+
+def test_parallel_build_matches_serial(artifacts, tmp_path):
+    serial   = RiskRaster(build_raster(artifacts, str(tmp_path / "a"), resolution=0.5, workers=1))
+    parallel = RiskRaster(build_raster(artifacts, str(tmp_path / "b"), resolution=0.5, workers=2))
+    assert np.array_equal(np.asarray(serial.probs), np.asarray(parallel.probs))
+
+
+def test_tiles_and_grid_endpoints(client, server, artifacts, tmp_path, monkeypatch):
+    build_raster(artifacts, str(tmp_path), resolution=0.25, workers=1)
+    monkeypatch.setattr(server, "risk_rasters", RiskRasterStore(str(tmp_path)))
+
+    # z=7 tile covering Gilgit; the raster edge falls inside it
+    resp = client.get("/tiles/7/90/50.png", params={"month": 7, "scenario": "seismic"})
+    assert resp.status_code == 200 and resp.headers["content-type"] == "image/png"
+    rgba = _decode_png(resp.content)
+    assert rgba.shape == (256, 256, 4) and rgba[..., 3].any()
+
+    # far outside the region: fully transparent
+    assert not _decode_png(client.get("/tiles/7/10/10.png").content)[..., 3].any()
+    assert client.get("/tiles/7/90/50.png", params={"scenario": "volcano"}).status_code == 404
+
+    grid = client.get("/risk-grid", params={"month": 1, "stride": 2, "bbox": "35.5,74,36.5,75"}).json()
+    assert set(grid["probabilities"]) == set(artifacts["classes"])
+    assert len(grid["probabilities"]["GLOF"]) == len(grid["latitudes"])
+
+
+def test_raster_matches_predict(client, artifacts, tmp_path):
+    path = build_raster(artifacts, str(tmp_path), resolution=0.25, workers=1)
+    raster = RiskRaster(path)
+    lats, lons = grid_axes(0.25)
+    districts = np.load(os.path.join(path, "districts.npy"))
+    fallback = len(artifacts["district_classes"]) // 2
+    month = datetime.now().month          # /predict scores the current month
+    layer = raster.layer(month, "Hilly", "heavy_rain") / 255.0
+
+    # Cells whose boundary district differs from the fallback code
+    for r, c in np.argwhere(districts != fallback)[::40][:5]:
+        body = client.post("/predict", json={
+            "latitude": float(lats[r]), "longitude": float(lons[c]), "rainfall": 150.0, "river_level": 8.0,
+            "terrain": "Hilly",
+        }).json()
+        for k, cls in enumerate(raster.classes):
+            assert abs(body["class_probabilities"][cls] - layer[k, r, c]) <= 0.5 / 255 + 0.0005
+
+
+def test_store_rebuilds_when_model_version_changes(artifacts, tmp_path):
+    store = RiskRasterStore(str(tmp_path), resolution=0.5, workers=1)
+    build_raster(artifacts, str(tmp_path), resolution=0.5, workers=1)
+    assert store.get(artifacts) is not None
+
+    retrained = {**artifacts, "trained_at": "2026-02-02T00:00:00"}
+    assert store.get(retrained, build=False) is None
+
+    # A registry version with the same trained_at is a different model too
+    reloaded = {**artifacts, "registry_version": "v2"}
+    assert store.get(reloaded, build=False) is None
+    path = build_raster(reloaded, str(tmp_path), resolution=0.5, workers=1)
+    assert RiskRaster(path).meta["model_version"] == "v2"
+    assert store.get(reloaded).version == "v2" and store.get(artifacts).version != "v2"
+    assert store.get(reloaded).grid(1, "Unknown", "baseline", stride=8)["model_version"] == "v2"
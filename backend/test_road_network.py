@@ -0,0 +1,88 @@
+import heapq
+import math
+
+import pytest
+
+from road_network import SYNTHETIC_OSM_PATH, RoadNetwork, build_graph
+
+
+@pytest.fixture(scope="module")
+def roads(tmp_path_factory):
+    out = tmp_path_factory.mktemp("roads")
+    build_graph(SYNTHETIC_OSM_PATH, str(out))
+    return RoadNetwork(str(out))
+
+
+def _dijkstra(net, source):
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(net.indptr[u], net.indptr[u + 1]):
+            v, nd = int(net.indices[e]), d + float(net.time_s[e])
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def test_graph_skips_footways_and_respects_oneway(roads):
+    assert roads.meta["n_nodes"] == 53
+    # 36 grid nodes: 6 two-way rows and 5 two-way columns plus one one-way column
+    grid_edges = 6 * 5 * 2 + 5 * 5 * 2 + 5
+    assert roads.meta["n_edges"] == grid_edges + 12 * 2 + 3 * 2 + 2
+
+
+def test_astar_is_optimal(roads):
+    for source in range(0, roads.n_nodes, 4):
+        expected = _dijkstra(roads, source)
+        for target in range(roads.n_nodes):
+            found = roads.shortest_path(source, target)
+            if target not in expected:
+                assert found is None
+                continue
+            nodes, _, seconds = found
+            assert nodes[0] == source and nodes[-1] == target
+            assert seconds == pytest.approx(expected[target], rel=1e-6)
+
+
+def test_route_to_karimabad(roads):
+    route = roads.route(35.905, 74.285, 36.31, 74.85)
+    assert route["path"][0] == [35.905, 74.285] and route["path"][-1] == [36.31, 74.85]
+    assert 60 < route["distance_km"] < 80
+    assert roads.route(35.905, 74.285, 35.30, 75.64) is None      # isolated track
+    assert roads.route(34.0, 70.0, 35.905, 74.285) is None        # off the network
+
+
+def test_routes_endpoint_uses_offline_graph(client, server, roads, monkeypatch):
+    def no_network(*args, **kwargs):
+        raise AssertionError("OSRM must not be called when a road graph is loaded")
+
+    monkeypatch.setattr(server, "road_network", roads)
+    monkeypatch.setattr(server.osrm, "get_json", no_network)
+    body = client.post("/routes", json={"start": {"latitude": 36.3, "longitude": 74.84}}).json()
+    assert body["safe_zone"]["name"] == "Karimabad Community Hall"
+    assert "offline" in body["note"] and len(body["path"]) > 2
+    assert body["distance"].endswith(" km") and body["estimated_time"].endswith(" mins")
+
+
+def test_maxspeed_tags(tmp_path):
+    from road_network import parse_osm
+
+    maxspeeds = ["0", "30 mph", "60", "none", "PK:urban", "50;30", "45mph"]
+    nodes = "".join(f'<node id="{i}" lat="35.9" lon="{74.3 + i / 100}"/>' for i in range(len(maxspeeds) + 1))
+    ways = "".join(
+        f'<way id="{i}"><nd ref="{i}"/><nd ref="{i + 1}"/><tag k="highway" v="primary"/>'
+        f'<tag k="oneway" v="yes"/><tag k="maxspeed" v="{v}"/></way>'
+        for i, v in enumerate(maxspeeds)
+    )
+    path = tmp_path / "speeds.osm"
+    path.write_text(f'<?xml version="1.0"?><osm version="0.6">{nodes}{ways}<relation id="1"/></osm>')
+
+    _, parsed = parse_osm(str(path))
+    assert [round(speed, 2) for _, speed, _ in parsed] == [50, 48.28, 60, 50, 50, 50, 72.42]
+    build_graph(str(path), str(tmp_path / "graph"))
+    net = RoadNetwork(str(tmp_path / "graph"))
+    assert net.n_nodes == len(maxspeeds) + 1 and (net.time_s > 0).all()
@@ -0,0 +1,73 @@
+import numpy as np
+
+from safe_zones import SafeZoneIndex, haversine_np
+
+
+def _random_zones(n, seed=0):
+    rng = np.random.default_rng(seed)
+    types = ["Hospital", "Shelter", "Open Ground", "School", "Helipad"]
+    return [
+        {"lat": float(rng.uniform(34.6, 37.1)), "lng": float(rng.uniform(72.5, 77.8)),
+         "name": f"Zone {i}", "type": types[i % len(types)], "capacity": int(rng.integers(10, 2000))}
+        for i in range(n)
+    ]
+
+
+def _brute_nearest(zones, lat, lng, k, types=None, min_capacity=None):
+    pool = [z for z in zones
+            if (not types or z["type"] in types) and (not min_capacity or z["capacity"] >= min_capacity)]
+    d = haversine_np(lat, lng, [z["lat"] for z in pool], [z["lng"] for z in pool])
+    return [pool[i]["name"] for i in np.argsort(d, kind="stable")[:k]]
+
+
+def test_nearest_matches_brute_force():
+    zones = _random_zones(3000)
+    index = SafeZoneIndex(zones)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        lat, lng = rng.uniform(34, 38), rng.uniform(72, 78.5)
+        assert [z["name"] for z in index.nearest(lat, lng, 5)] == _brute_nearest(zones, lat, lng, 5)
+        got = [z["name"] for z in index.nearest(lat, lng, 3, types=["Helipad"], min_capacity=1500)]
+        assert got == _brute_nearest(zones, lat, lng, 3, ["Helipad"], 1500)
+
+
+def test_nearest_far_away_and_across_the_antimeridian():
+    zones = _random_zones(13, seed=3)
+    index = SafeZoneIndex(zones)
+    for lat, lng in [(40, -100), (36, 179.9), (-89, -179), (-60, -170), (89.9, 74)]:
+        got = index.nearest(lat, lng, 3)
+        assert [z["name"] for z in got] == _brute_nearest(zones, lat, lng, 3)
+        assert all(a["distance_km"] <= b["distance_km"] for a, b in zip(got, got[1:]))
+
+    # Rings find the zone at 179.5 first; the radius query has to wrap to reach -179.9
+    dateline = [{"lat": 10.0, "lng": lng, "name": str(lng), "type": "Shelter", "capacity": 100}
+                for lng in (179.5, -179.9, -178.0, 170.0)]
+    index = SafeZoneIndex(dateline)
+    assert [z["name"] for z in index.nearest(10.0, 179.6, 2)] == ["179.5", "-179.9"]
+    assert [z["name"] for z in index.nearest(10.0, 179.95, 3)] == ["-179.9", "179.5", "-178.0"]
+    assert {z["name"] for z in index.within_radius(10.0, -179.95, 70.0)} == {"179.5", "-179.9"}
+
+
+def test_radius_and_bbox_queries():
+    zones = _random_zones(2000, seed=2)
+    index = SafeZoneIndex(zones)
+    near = index.within_radius(35.9, 74.3, 40.0, types=["Hospital"])
+    expected = {z["name"] for z in zones if z["type"] == "Hospital"
+                and haversine_np(35.9, 74.3, z["lat"], z["lng"]) <= 40.0}
+    assert {z["name"] for z in near} == expected
+    assert all(a["distance_km"] <= b["distance_km"] for a, b in zip(near, near[1:]))
+
+    box = index.within_bbox(35.5, 74.0, 36.0, 75.0, min_capacity=500)
+    expected = {z["name"] for z in zones if 35.5 <= z["lat"] <= 36.0 and 74.0 <= z["lng"] <= 75.0
+                and z["capacity"] >= 500}
+    assert {z["name"] for z in box} == expected
+
+
+def test_safe_zone_endpoint_queries(client, server):
+    assert client.get("/safe-zones").json() == server.SAFE_ZONES
+    nearest = client.get("/safe-zones", params={"near": "35.92,74.31", "k": 2}).json()
+    assert nearest[0]["name"] == "DHQ Hospital Gilgit" and len(nearest) == 2
+    skardu = client.get("/safe-zones", params={"bbox": "35.2,75.5,35.4,75.7", "type": "Hospital"}).json()
+    assert [z["name"] for z in skardu] == ["CMH Skardu"]
+    assert client.get("/safe-zones", params={"near": "35.9"}).status_code == 422
+    assert len(client.get("/safe-zones", params={"near": "-89,-179", "k": 2}).json()) == 2
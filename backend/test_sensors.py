@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from risk_stream import RiskStream
+from sensors import SensorStore
+
+T0 = 1_700_000_000.0
+
+
+def test_rolling_aggregates_match_raw_readings():
+    rng = np.random.default_rng(3)
+    stations = [{"id": f"S{i}", "lat": 35 + i * 0.1, "lon": 74.0, "district": "Gilgit"} for i in range(6)]
+    store = SensorStore(stations, capacity=300)
+
+    kept: dict[int, list] = {}
+    for _ in range(12):
+        n   = int(rng.integers(1, 400))
+        ids = rng.integers(0, 7, n)                     # S6 is not registered
+        t   = np.round(T0 + rng.random(n) * 86400 * 3)
+        v   = rng.random((n, 3)) * 5
+        v[rng.random((n, 3)) < 0.25] = np.nan
+        result = store.ingest([f"S{i}" for i in ids], t, v)
+        assert result["unknown"] == int((ids == 6).sum())
+        for j in np.lexsort((t, ids)):
+            if ids[j] < 6 and (not kept.get(ids[j]) or t[j] > kept[ids[j]][-1][0]):
+                kept.setdefault(ids[j], []).append((t[j], v[j]))
+
+    now = T0 + 86400 * 3
+    agg = store.aggregates(now)
+    for s in range(6):
+        buffered = kept.get(s, [])[-300:]
+        for window, seconds in (("1h", 3600), ("24h", 86400), ("72h", 259200)):
+            inside = [v for t, v in buffered if t >= now - seconds]
+            assert agg[f"readings_{window}"][s] == len(inside)
+            rain  = [v[0] for v in inside if not np.isnan(v[0])]
+            river = [v[1] for v in inside if not np.isnan(v[1])]
+            assert agg[f"rainfall_{window}"][s] == pytest.approx(sum(rain) if rain else np.nan, nan_ok=True)
+            assert agg[f"river_level_{window}"][s] == pytest.approx(np.mean(river) if river else np.nan, nan_ok=True)
+        rivers = [v[1] for _, v in kept.get(s, []) if not np.isnan(v[1])]
+        assert agg["river_level"][s] == pytest.approx(rivers[-1] if rivers else np.nan, nan_ok=True)
+
+    # Readings not newer than what a station already has are rejected
+    newest = max(t for t, _ in kept[0])
+    assert store.ingest(["S0", "S0"], [newest, newest + 60], np.ones((2, 3)))["late"] == 1
+
+    # Features: the point next to S0 is dominated by it; a point far from every station gets nothing
+    feats = store.features([35.0, 10.0], [74.0, 10.0], now=newest + 60, k=2, max_km=20)
+    assert feats["stations"].tolist()[1] == 0 and feats["rainfall"][1] == 0
+    assert feats["river_level"][0] == pytest.approx(1.0, abs=0.05)
+
+
+def test_sensor_ingestion_feeds_predictions_and_stream(server, client, monkeypatch):
+    monkeypatch.setattr(server, "sensor_store", SensorStore())
+    points = [p for p in server.gazetteer.places if p["class"] == "place"]
+    stream = RiskStream(points, server._stream_evaluate, min_interval=0.0)
+    monkeypatch.setattr(server, "risk_stream", stream)
+
+    now = server.time.time()
+    readings = [
+        {"station": "GLT-1", "time": now - 30 - 60 * m, "rainfall": 1.5, "river_level": 4.0 + m / 100, "temperature": 20}
+        for m in range(120)
+    ]
+    resp = client.post("/sensors/readings", json={
+        "stations": [{"id": "GLT-1", "lat": 35.92, "lon": 74.31, "district": "Gilgit", "normal_temperature": 12}],
+        "readings": readings + [{"station": "nowhere", "time": now, "rainfall": 1}],
+    })
+    assert resp.json() == {"accepted": 120, "late": 0, "unknown": 1, "districts": ["Gilgit"]}
+
+    station = client.get("/sensors/stations").json()["stations"][0]
+    assert station["readings_1h"] == 60 and station["rainfall_24h"] == pytest.approx(180.0)
+    assert station["river_level"] == pytest.approx(4.0)
+    assert server.risk_stream.district_conditions("Gilgit") == {
+        "rainfall": 180.0, "river_level": 4.0, "temperature_elevated": True, "seismic_activity": False,
+    }
+
+    # District mode: one pass over every Gilgit place, identical to /predict/batch with the same inputs
+    body = client.post("/predict/sensors", json={"district": "gilgit", "max_km": 50}).json()
+    gilgit = [p for p in points if p["district"] == "Gilgit"]
+    assert body["count"] == len(gilgit)
+    rows = [
+        {"latitude": r["latitude"], "longitude": r["longitude"], "district": r["district"], **r["inputs"]}
+        for r in body["results"]
+    ]
+    batch = client.post("/predict/batch", json={"rows": rows}).json()["results"]
+    for r, b in zip(body["results"], batch):
+        assert r["inputs"]["stations"] == 1
+        assert r["inputs"]["rainfall"] == pytest.approx(180.0)
+        assert r["class_probabilities"] == b["class_probabilities"]
+
+    far = client.post("/predict/sensors", json={"locations": [{"latitude": 30.0, "longitude": 70.0}]}).json()
+    assert far["results"][0]["inputs"] == {"rainfall": 0.0, "river_level": 0.0, "temperature_elevated": False, "stations": 0}
+    assert client.post("/predict/sensors", json={"district": "Atlantis"}).status_code == 404
+    assert client.post("/predict/sensors", json={}).status_code == 422
@@ -0,0 +1,113 @@
+import heapq
+import math
+
+import numpy as np
+import pytest
+
+from road_network import SYNTHETIC_OSM_PATH, RoadNetwork, build_graph
+from shelter_tree import ShelterTree
+
+ZONES = [
+    {"lat": 35.9220, "lng": 74.3120, "name": "Gilgit A",    "type": "Hospital", "capacity": 200},
+    {"lat": 35.9300, "lng": 74.3200, "name": "Gilgit B",    "type": "Shelter",  "capacity": 500},
+    {"lat": 36.3100, "lng": 74.8500, "name": "Karimabad",   "type": "Shelter",  "capacity": 300},
+    {"lat": 35.3000, "lng": 75.6400, "name": "Skardu",      "type": "Hospital", "capacity": 150},
+    {"lat": 30.0000, "lng": 70.0000, "name": "Off network", "type": "Shelter",  "capacity": 10},
+]
+
+
+@pytest.fixture(scope="module")
+def roads(tmp_path_factory):
+    out = tmp_path_factory.mktemp("roads")
+    build_graph(SYNTHETIC_OSM_PATH, str(out))
+    return RoadNetwork(str(out))
+
+
+def _brute_force(tree):
+    """Dijkstra from every node to every open zone root, honouring blocked edges."""
+    net, best = tree.network, np.full(tree.network.n_nodes, np.inf)
+    for source in range(net.n_nodes):
+        dist, heap = {source: 0.0}, [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for e in range(net.indptr[u], net.indptr[u + 1]):
+                v, nd = int(net.indices[e]), d + tree.weight[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        for i, root in enumerate(tree.root_node):
+            if root >= 0 and i not in tree.closed and root in dist:
+                best[source] = min(best[source], dist[root] + tree.root_time[i])
+    return best
+
+
+def _check_consistent(tree):
+    np.testing.assert_allclose(tree.time_s, _brute_force(tree), rtol=1e-9)
+    for v in np.flatnonzero(tree.zone >= 0):
+        nxt = tree.next_node[v]
+        if nxt >= 0:
+            assert tree.zone[nxt] == tree.zone[v]
+            assert tree.time_s[v] == pytest.approx(tree.time_s[nxt] + tree.weight[tree.next_edge[v]])
+
+
+def test_build_matches_brute_force(roads):
+    tree = ShelterTree.build(roads, ZONES)
+    assert tree.root_node[4] == -1
+    _check_consistent(tree)
+    route = tree.route(36.3, 74.84)
+    assert route["zone"]["name"] == "Karimabad" and len(route["path"]) > 2
+    assert tree.route(34.0, 70.0) is None
+
+
+def test_block_and_unblock_repair_incrementally(roads):
+    tree = ShelterTree.build(roads, ZONES)
+    start = roads.snap(35.905, 74.285)[0]
+    before = tree.time_s.copy()
+    first_hop = [int(tree.next_node[start]), start]
+
+    tree.block_edges(tree.edges_between(first_hop))
+    _check_consistent(tree)
+    assert tree.time_s[start] > before[start]
+
+    tree.unblock_edges(tree.edges_between(first_hop))
+    _check_consistent(tree)
+    np.testing.assert_allclose(tree.time_s, before)
+
+
+def test_full_zone_reroutes_to_next_shelter(roads):
+    tree = ShelterTree.build(roads, ZONES)
+    tree.set_zone_open(2, False)
+    _check_consistent(tree)
+    assert tree.route(36.3, 74.84)["zone"]["name"] in ("Gilgit A", "Gilgit B")
+
+    tree.set_zone_open(2, True)
+    _check_consistent(tree)
+    assert tree.route(36.3, 74.84)["zone"]["name"] == "Karimabad"
+
+
+def test_cache_round_trip(roads, tmp_path):
+    built  = ShelterTree.load_or_build(roads, ZONES, str(tmp_path))
+    loaded = ShelterTree.load_or_build(roads, ZONES, str(tmp_path))
+    np.testing.assert_array_equal(built.next_node, loaded.next_node)
+    np.testing.assert_array_equal(built.time_s, loaded.time_s)
+
+
+def test_admin_endpoints_update_routes(client, server, roads, monkeypatch):
+    monkeypatch.setattr(server, "road_network", roads)
+    monkeypatch.setattr(server, "shelter_tree", ShelterTree.build(roads, server.SAFE_ZONES))
+
+    start = {"start": {"latitude": 36.3, "longitude": 74.84}}
+    assert client.post("/routes", json=start).json()["safe_zone"]["name"] == "Karimabad Community Hall"
+
+    for name in ("Karimabad Community Hall", "Civil Hospital Hunza"):
+        r = client.put(f"/admin/safe-zones/{name}/status", json={"at_capacity": True})
+        assert r.status_code == 200
+    body = client.post("/routes", json=start).json()
+    assert body["safe_zone"]["name"] not in ("Karimabad Community Hall", "Civil Hospital Hunza")
+    assert client.put("/admin/safe-zones/Nowhere/status", json={"at_capacity": True}).status_code == 404
+
+    seg = {"start": {"latitude": 35.905, "longitude": 74.285}, "end": {"latitude": 35.91, "longitude": 74.29}}
+    assert client.post("/admin/roads/block", json=seg).json()["blocked_edges"] > 0
+    assert client.post("/admin/roads/unblock", json=seg).json()["total_blocked"] == 0
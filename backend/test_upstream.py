@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from upstream import Upstream, UpstreamError, UpstreamUnavailable
+
+
+class _Stub(BaseHTTPRequestHandler):
+    """Local upstream: answers with ``config`` status / body after ``config`` delay."""
+
+    def do_GET(self):
+        cfg = self.server.config
+        with self.server.lock:
+            self.server.hits += 1
+        time.sleep(cfg["delay"])
+        body = json.dumps(cfg["body"]).encode()
+        self.send_response(cfg["status"])
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    srv.config = {"delay": 0.0, "status": 200, "body": {"ok": True}}
+    srv.hits, srv.lock = 0, threading.Lock()
+    srv.daemon_threads = True
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _gather(up, calls):
+    async def main():
+        try:
+            return await asyncio.gather(*(up.get_json(p, q) for p, q in calls), return_exceptions=True)
+        finally:
+            await up.aclose()
+    return asyncio.run(main())
+
+
+def test_identical_requests_are_coalesced(stub):
+    stub.config["delay"] = 0.2
+    up = Upstream("stub", stub.url)
+    results = _gather(up, [("/search", {"q": "gilgit"})] * 10)
+    assert results == [{"ok": True}] * 10
+    assert stub.hits == 1 and up.coalesced == 9
+
+
+def test_concurrency_limit_rejects_excess(stub):
+    stub.config["delay"] = 0.3
+    up = Upstream("stub", stub.url, max_concurrency=2, queue_timeout=0.05)
+    results = _gather(up, [("/search", {"q": str(i)}) for i in range(5)])
+    assert sum(r == {"ok": True} for r in results) == 2
+    assert sum(isinstance(r, UpstreamUnavailable) for r in results) == 3
+    assert stub.hits == 2 and up.rejected == 3
+
+
+def test_circuit_opens_and_recovers(stub):
+    stub.config["status"] = 500
+    up = Upstream("stub", stub.url, failure_threshold=3, reset_seconds=0.2)
+
+    async def main():
+        for i in range(3):
+            with pytest.raises(UpstreamError):
+                await up.get_json("/search", {"q": str(i)})
+        assert up.breaker.state == "open"
+
+        t0 = time.perf_counter()
+        with pytest.raises(UpstreamUnavailable):
+            await up.get_json("/search", {"q": "fast"})
+        assert time.perf_counter() - t0 < 0.05 and stub.hits == 3
+
+        stub.config["status"] = 200
+        await asyncio.sleep(0.25)
+        assert await up.get_json("/search", {"q": "probe"}) == {"ok": True}
+        assert up.breaker.state == "closed"
+        await up.aclose()
+    asyncio.run(main())
+
+
+def test_client_errors_do_not_trip_the_breaker(stub):
+    stub.config["status"] = 404
+    up = Upstream("stub", stub.url, failure_threshold=1)
+    results = _gather(up, [("/missing", {"q": str(i)}) for i in range(3)])
+    assert all(isinstance(r, UpstreamError) and not isinstance(r, UpstreamUnavailable) for r in results)
+    assert up.breaker.state == "closed"
+
+
+def test_endpoints_fall_back_when_upstream_degraded(client, server, stub, monkeypatch):
+    monkeypatch.setattr(server, "osrm", Upstream("osrm", stub.url, failure_threshold=2, reset_seconds=60))
+    monkeypatch.setattr(server, "nominatim", Upstream("nominatim", stub.url, failure_threshold=2, reset_seconds=60))
+    start = {"start": {"latitude": 35.92, "longitude": 74.31}}
+
+    stub.config["body"] = {"code": "Ok", "routes": [
+        {"geometry": {"coordinates": [[74.31, 35.92], [74.312, 35.922]]}, "distance": 400, "duration": 120},
+    ]}
+    assert client.post("/routes", json=start).json()["path"] == [[35.92, 74.31], [35.922, 74.312]]
+
+    stub.config.update(status=503, delay=0.1)
+    for _ in range(2):
+        assert "Straight-line" in client.post("/routes", json=start).json()["note"]
+    hits = stub.hits
+    t0 = time.perf_counter()
+    assert "Straight-line" in client.post("/routes", json=start).json()["note"]
+    assert stub.hits == hits and time.perf_counter() - t0 < 0.1
+    assert client.get("/").json()["upstreams"]["osrm"]["circuit"] == "open"
+
+    assert client.get("/geocode", params={"q": "Islamabad"}).status_code == 502
+    stub.config.update(status=200, body=[{"display_name": "Islamabad"}])
+    assert client.get("/geocode", params={"q": "Islamabad"}).json() == [{"display_name": "Islamabad"}]
@@ -1,11 +1,19 @@
 """
-Export the trained model to JSON for optional client-side inference.
+Export the trained model for optional client-side inference.
 The FastAPI server (fast_server.py) is the primary inference path;
 this export is provided for offline / embedded browser use cases.
 
+Writes model.bin, the compact binary format of model_binary.py (typed
+arrays, float32 thresholds, a shared quantized leaf table). ``--json`` also
+writes the older model.json.
+
+Also writes the memory-mapped array export (Model/output/model_arrays/) that
+the server prefers over model.joblib: it loads without joblib or sklearn.
+
 Must be run AFTER run_model.py has produced Model/output/model.joblib.
 """
 
+import argparse
 import json
 import os
 import sys
@@ -16,6 +24,7 @@ import numpy as np
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "../Model/output/model.joblib")
 OUT_PATH   = os.path.join(BASE_DIR, "model.json")
+BIN_PATH   = os.path.join(BASE_DIR, "model.bin")
 
 
 def export_rf_to_json(artifacts: dict) -> dict:
@@ -61,6 +70,12 @@ def export_rf_to_json(artifacts: dict) -> dict:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export model.joblib for client-side inference.")
+    parser.add_argument("--prob-bits", type=int, choices=(8, 16), default=8,
+                        help="leaf probability precision in model.bin (default 8)")
+    parser.add_argument("--json", action="store_true", help="also write the legacy model.json")
+    args = parser.parse_args()
+
     if not os.path.exists(MODEL_PATH):
         print(f"ERROR: model not found at {MODEL_PATH}")
         print("Run 'python Model/scripts/run_model.py' first.")
@@ -69,14 +84,20 @@ if __name__ == "__main__":
     print(f"Loading model from {MODEL_PATH} ...")
     artifacts = joblib.load(MODEL_PATH)
 
-    print("Exporting to JSON ...")
-    model_json = export_rf_to_json(artifacts)
+    from model_binary import artifacts_meta, sklearn_trees, write_model_binary
+    stats = write_model_binary(BIN_PATH, artifacts_meta(artifacts), sklearn_trees(artifacts["model"]),
+                               prob_bits=args.prob_bits)
+    print(f"Exported to {BIN_PATH}  ({stats['bytes'] / 1024:.0f} KB)")
+    print(f"  Features : {artifacts['features']}")
+    print(f"  Classes  : {artifacts['classes']}")
+    print(f"  Trees    : {stats['n_trees']}  ({stats['n_internal']:,} splits, "
+          f"{stats['leaf_nodes']:,} leaves -> {stats['unique_leaves']:,} distinct rows)")
 
-    with open(OUT_PATH, "w") as f:
-        json.dump(model_json, f)
+    if args.json:
+        with open(OUT_PATH, "w") as f:
+            json.dump(export_rf_to_json(artifacts), f)
+        print(f"Exported to {OUT_PATH}  ({os.path.getsize(OUT_PATH) / 1024:.0f} KB)")
 
-    size_kb = os.path.getsize(OUT_PATH) / 1024
-    print(f"Exported to {OUT_PATH}  ({size_kb:.0f} KB)")
-    print(f"  Features : {model_json['features']}")
-    print(f"  Classes  : {model_json['classes']}")
-    print(f"  Trees    : {len(model_json['forest'])}")
+    from inference import save_model_arrays
+    arrays_dir = save_model_arrays(artifacts)
+    print(f"Exported memory-mapped arrays to {os.path.normpath(arrays_dir)}")
@@ -0,0 +1,182 @@
+"""
+Async client for the public upstream services (OSRM routing, Nominatim).
+
+Each ``Upstream`` wraps one base URL with:
+
+  - a shared ``httpx.AsyncClient`` so connections are pooled and reused
+  - single-flight coalescing: identical requests already in flight share one
+    upstream call instead of issuing their own
+  - a concurrency limit; callers wait at most ``queue_timeout`` for a slot
+  - a circuit breaker: after ``failure_threshold`` consecutive failures the
+    upstream is skipped for ``reset_seconds``, then one probe decides whether
+    it is healthy again
+
+Callers catch ``UpstreamUnavailable`` (the call was not attempted) and
+``UpstreamError`` (the call failed) and fall back to local answers.
+"""
+
+import asyncio
+import time
+
+from metrics import HistogramChild
+
+USER_AGENT = "GBDMS-RiskEngine/2.0"
+
+
+class UpstreamError(Exception):
+    """The upstream call was made and failed (network error, 5xx, bad body)."""
+
+
+class UpstreamUnavailable(UpstreamError):
+    """The call was not attempted: circuit open or no concurrency slot free."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds     = reset_seconds
+        self.state     = "closed"          # closed | open | half_open
+        self.failures  = 0
+        self.opened_at = 0.0
+        self.trips     = 0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"       # let exactly one probe through
+            return True
+        return self.state == "closed"
+
+    def record_success(self):
+        self.state    = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state     = "open"
+            self.opened_at = time.monotonic()
+
+
+class Upstream:
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        max_concurrency: int = 8,
+        timeout: float = 8.0,
+        queue_timeout: float = 1.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.name            = name
+        self.base_url        = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout         = timeout
+        self.queue_timeout   = queue_timeout
+        self.breaker         = CircuitBreaker(failure_threshold, reset_seconds)
+
+        # Client, semaphore and in-flight map belong to one event loop
+        self._loop      = None
+        self._client    = None
+        self._semaphore = None
+        self._inflight: dict = {}
+
+        self.requests        = 0
+        self.coalesced       = 0
+        self.failures        = 0
+        self.rejected        = 0
+        self.short_circuited = 0
+        self.latency         = HistogramChild()      # seconds per attempted call, success or not
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            import httpx                       # deferred: not needed until the first upstream call
+
+            self._loop      = loop
+            self._client    = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight  = {}
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._loop = self._client = self._semaphore = None
+
+    async def get_json(self, path: str, params: dict | None = None):
+        """GET ``path`` and return the decoded JSON body."""
+        self._bind()
+        key = (path, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(path, params))
+            self._inflight[key] = task
+
+            def _done(t, key=key, inflight=self._inflight):
+                inflight.pop(key, None)
+                if not t.cancelled():
+                    t.exception()          # mark retrieved even if every waiter went away
+            task.add_done_callback(_done)
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _fetch(self, path: str, params: dict | None):
+        import httpx
+
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            if self.breaker.state == "half_open":
+                self.breaker.state = "open"
+            raise UpstreamUnavailable(f"{self.name}: too many concurrent requests") from None
+
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            resp = await self._client.get(path, params=params)
+            if resp.status_code >= 500 or resp.status_code == 429:
+                raise UpstreamError(f"{self.name}: HTTP {resp.status_code}")
+            # Other 4xx: the service is healthy, the request itself was bad
+            rejected_request = resp.status_code >= 400
+            data = None if rejected_request else resp.json()
+        except (httpx.HTTPError, ValueError, UpstreamError) as exc:
+            self.failures += 1
+            self.breaker.record_failure()
+            if isinstance(exc, UpstreamError):
+                raise
+            raise UpstreamError(f"{self.name}: {exc.__class__.__name__}: {exc}") from exc
+        finally:
+            self._semaphore.release()
+            self.latency.observe(time.perf_counter() - start)
+        self.breaker.record_success()
+        if rejected_request:
+            raise UpstreamError(f"{self.name}: HTTP {resp.status_code}")
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "circuit":         self.breaker.state,
+            "trips":           self.breaker.trips,
+            "requests":        self.requests,
+            "coalesced":       self.coalesced,
+            "failures":        self.failures,
+            "rejected":        self.rejected,
+            "short_circuited": self.short_circuited,
+            "in_flight":       len(self._inflight),
+        }
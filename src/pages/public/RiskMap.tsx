@@ -116,6 +116,7 @@ export function RiskMap() {
     const [safeZones, setSafeZones] = useState<SafeZone[]>([]);
     const [showDangerZones, setShowDangerZones] = useState(false);
     const [showSafeZones, setShowSafeZones] = useState(false);
+    const [showRiskSurface, setShowRiskSurface] = useState(false);
 
     // Nearest historical zone to the selected point
     const [nearestZone, setNearestZone] = useState<NearestZoneResult | null>(null);
@@ -397,6 +398,14 @@ export function RiskMap() {
                                 attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
                                 url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
                             />
+                            {/* Precomputed model risk surface (backend /tiles) */}
+                            {showRiskSurface && (
+                                <TileLayer
+                                    url={`http://localhost:8000/tiles/{z}/{x}/{y}.png?month=${new Date().getMonth() + 1}`}
+                                    opacity={0.6}
+                                    zIndex={10}
+                                />
+                            )}
                             <LocationMarker onLocationSelect={handleLocationSelect} />
 
                             {/* Sync map center with search result */}
@@ -497,6 +506,16 @@ export function RiskMap() {
                                         </span>
                                         {showSafeZones ? <Eye className="h-3 w-3" /> : <EyeOff className="h-3 w-3 opacity-50" />}
                                     </button>
+                                    <button
+                                        onClick={() => setShowRiskSurface(!showRiskSurface)}
+                                        className={`w-full flex items-center justify-between gap-3 px-3 py-1.5 rounded transition-colors ${showRiskSurface ? 'bg-orange-50 text-orange-700 font-medium' : 'hover:bg-slate-50 text-slate-600'}`}
+                                    >
+                                        <span className="flex items-center gap-2">
+                                            <span className="w-2 h-2 rounded-sm bg-gradient-to-r from-emerald-500 via-orange-500 to-red-500"></span>
+                                            Risk Surface
+                                        </span>
+                                        {showRiskSurface ? <Eye className="h-3 w-3" /> : <EyeOff className="h-3 w-3 opacity-50" />}
+                                    </button>
                                 </div>
                             </div>
 